@@ -0,0 +1,122 @@
+﻿"""
+Micro-benchmark cho các engine tìm kiếm của ImageSearcher
+
+So sánh độ trễ và tỷ lệ trúng của color / gray / pyramid / multiscale
+trên các screenshot đã ghi lại (không chụp màn hình thật).
+
+Cách dùng:
+    python benchmark_image_search.py <thư mục screenshots> <thư mục templates> [--repeat 10] [--accuracy 80]
+
+- Mỗi cặp (screenshot, template) được chạy với mọi engine
+- Kết quả của engine color (hành vi gốc) được dùng làm chuẩn:
+  engine khác "trúng" khi tìm thấy trong bán kính TOLERANCE_PX so với color
+- Cặp mà color không tìm thấy vẫn được tính vào found rate (để thấy false positive)
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import cv2
+
+from models.image_search import ImageSearcher, SEARCH_MODES, SEARCH_MODE_COLOR
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp")
+TOLERANCE_PX = 5
+
+
+def list_images(folder):
+    return sorted(
+        os.path.join(folder, name)
+        for name in os.listdir(folder)
+        if name.lower().endswith(IMAGE_EXTENSIONS)
+    )
+
+
+def load_rgb(path):
+    image = cv2.imread(path, cv2.IMREAD_COLOR)
+    if image is None:
+        raise ValueError(f"Could not load image: {path}")
+    return cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+
+
+def time_match(searcher, screenshot, repeat):
+    """Chạy searcher.match() repeat lần, trả về (danh sách ms, kết quả lần cuối)"""
+    timings = []
+    result = (False, None)
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = searcher.match(screenshot)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings, result
+
+
+def run_benchmark(screenshots_dir, templates_dir, repeat=10, accuracy=80):
+    screenshots = [(path, load_rgb(path)) for path in list_images(screenshots_dir)]
+    templates = list_images(templates_dir)
+    if not screenshots or not templates:
+        print("[BENCHMARK] No screenshots or templates found")
+        return {}
+
+    stats = {mode: {'timings': [], 'found': 0, 'hits': 0, 'baseline': 0, 'pairs': 0} for mode in SEARCH_MODES}
+
+    for screenshot_path, screenshot in screenshots:
+        for template_path in templates:
+            baseline = None
+            for mode in SEARCH_MODES:
+                searcher = ImageSearcher(template_path, accuracy=accuracy, search_mode=mode)
+                # Warm-up: cache template + JIT của OpenCV không tính vào kết quả
+                searcher.match(screenshot)
+                timings, (found, result) = time_match(searcher, screenshot, repeat)
+
+                entry = stats[mode]
+                entry['timings'].extend(timings)
+                entry['pairs'] += 1
+                if found:
+                    entry['found'] += 1
+
+                if mode == SEARCH_MODE_COLOR:
+                    baseline = result if found else None
+                if baseline is not None:
+                    entry['baseline'] += 1
+                    if found and abs(result[0] - baseline[0]) <= TOLERANCE_PX and abs(result[1] - baseline[1]) <= TOLERANCE_PX:
+                        entry['hits'] += 1
+
+            print(f"[BENCHMARK] {os.path.basename(screenshot_path)} x {os.path.basename(template_path)} done")
+
+    return stats
+
+
+def print_report(stats):
+    if not stats:
+        return
+    print()
+    print(f"{'mode':<12}{'median ms':>12}{'p95 ms':>10}{'found':>10}{'hit rate':>10}")
+    for mode, entry in stats.items():
+        timings = sorted(entry['timings'])
+        if not timings:
+            continue
+        median = statistics.median(timings)
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        found = f"{entry['found']}/{entry['pairs']}"
+        hit_rate = f"{entry['hits'] / entry['baseline'] * 100:.0f}%" if entry['baseline'] else "n/a"
+        print(f"{mode:<12}{median:>12.2f}{p95:>10.2f}{found:>10}{hit_rate:>10}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark ImageSearcher search modes")
+    parser.add_argument("screenshots_dir")
+    parser.add_argument("templates_dir")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--accuracy", type=int, default=80)
+    args = parser.parse_args(argv)
+
+    stats = run_benchmark(args.screenshots_dir, args.templates_dir, args.repeat, args.accuracy)
+    print_report(stats)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
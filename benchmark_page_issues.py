@@ -0,0 +1,164 @@
+﻿"""
+Micro-benchmark cho helpers/page_issue_detector trên các trang HTML đã lưu
+
+So sánh detector cũ (page_source.lower() + chuỗi `in` tuần tự) với rule đã biên dịch
+(tín hiệu rẻ trước, body sau) trên cùng HTML - không cần trình duyệt.
+
+Cách dùng:
+    python benchmark_page_issues.py <thư mục html> [--repeat 20]
+
+- Title lấy từ thẻ <title>, URL = "file:///<tên file>"
+- Kết quả của detector cũ là chuẩn: báo số trang khác blocked/clean
+- Cột "bytes" = dữ liệu detector cũ phải kéo về qua driver.page_source;
+  detector mới quét body trong page nên chỉ nhận title/URL + bitmap
+"""
+
+import argparse
+import html
+import os
+import re
+import statistics
+import sys
+import time
+
+from helpers.page_issue_detector import PageIssueDetector
+
+HTML_EXTENSIONS = (".html", ".htm")
+TITLE_RE = re.compile(r"<title[^>]*>(.*?)</title>", re.IGNORECASE | re.DOTALL)
+
+
+def legacy_detect(page_source, title, url):
+    """Bản sao logic _detect_page_issues cũ (chỉ phần quyết định), trả về reason hoặc None"""
+    page_source = page_source.lower()
+    page_title = title.lower()
+    current_url = url.lower()
+
+    if "404" in page_title and ("not found" in page_title or "error" in page_title):
+        return "HTTP 404 Not Found"
+    if "500" in page_title and "error" in page_title:
+        return "HTTP 500 Internal Server Error"
+    if "503" in page_title and "unavailable" in page_title:
+        return "HTTP 503 Service Unavailable"
+    if len(page_source.strip()) < 100:
+        return "Empty Page"
+    if any([
+        ("your connection is not private" in page_source),
+        ("your connection is not secure" in page_source),
+        ("net::err_cert_" in page_source),
+        ("ssl_error_" in page_source),
+        ("this site can't provide a secure connection" in page_source),
+        ("certificate error" in page_source and "continue" in page_source),
+        ("privacy error" in page_title and "chrome-error:" not in current_url),
+    ]):
+        return "SSL Certificate Error"
+    if any([
+        ("checking your browser" in page_source and "cloudflare" in page_source),
+        ("just a moment" in page_title and "cloudflare" in page_source),
+        ("ray id" in page_source and "performance & security by cloudflare" in page_source),
+        ("<title>just a moment...</title>" in page_source),
+    ]):
+        return "Cloudflare Challenge"
+    if any([
+        ("access denied" in page_title or "403 forbidden" in page_title),
+        ("your ip has been blocked" in page_source and len(page_source) < 5000),
+        ("you have been blocked" in page_source and "cloudflare" in page_source),
+    ]):
+        return "Access Denied / IP Blocked"
+    if any([
+        ("429" in page_title and "too many requests" in page_source),
+        ("rate limit exceeded" in page_source and len(page_source) < 3000),
+    ]):
+        return "Rate Limited"
+    if any(err in current_url for err in ["/error", "/404", "/blocked", "/denied"]):
+        return "Redirected to Error Page"
+    return None
+
+
+def load_pages(folder):
+    pages = []
+    for name in sorted(os.listdir(folder)):
+        if not name.lower().endswith(HTML_EXTENSIONS):
+            continue
+        with open(os.path.join(folder, name), "r", encoding="utf-8", errors="replace") as f:
+            source = f.read()
+        match = TITLE_RE.search(source)
+        title = html.unescape(match.group(1).strip()) if match else ""
+        pages.append((name, source, title, f"file:///{name}"))
+    return pages
+
+
+def time_calls(func, repeat):
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings, result
+
+
+def run_benchmark(folder, repeat=20):
+    pages = load_pages(folder)
+    if not pages:
+        print("[BENCHMARK] No HTML pages found")
+        return None
+
+    detector = PageIssueDetector()
+    legacy_timings, compiled_timings = [], []
+    mismatches = 0
+    blocked = 0
+    total_bytes = 0
+
+    for name, source, title, url in pages:
+        timings, legacy_reason = time_calls(lambda: legacy_detect(source, title, url), repeat)
+        legacy_timings.extend(timings)
+        timings, result = time_calls(lambda: detector.evaluate_html(source, title, url), repeat)
+        compiled_timings.extend(timings)
+
+        compiled_reason = result[0] if result else None
+        total_bytes += len(source.encode("utf-8"))
+        if legacy_reason:
+            blocked += 1
+        if bool(legacy_reason) != bool(compiled_reason):
+            mismatches += 1
+            print(f"[BENCHMARK] MISMATCH {name}: legacy={legacy_reason} compiled={compiled_reason}")
+        elif legacy_reason != compiled_reason:
+            print(f"[BENCHMARK] Reason differs {name}: legacy={legacy_reason} compiled={compiled_reason}")
+
+    return {
+        'pages': len(pages),
+        'blocked': blocked,
+        'mismatches': mismatches,
+        'bytes': total_bytes,
+        'legacy': legacy_timings,
+        'compiled': compiled_timings,
+    }
+
+
+def print_report(stats):
+    if not stats:
+        return
+    print()
+    print(f"pages: {stats['pages']}  blocked: {stats['blocked']}  mismatches: {stats['mismatches']}  "
+          f"page_source bytes avoided: {stats['bytes'] / 1024 / 1024:.1f} MB")
+    print(f"{'detector':<12}{'median ms':>12}{'p95 ms':>10}{'total ms':>12}")
+    for name in ("legacy", "compiled"):
+        timings = sorted(stats[name])
+        median = statistics.median(timings)
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        print(f"{name:<12}{median:>12.3f}{p95:>10.3f}{sum(timings):>12.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark page issue detection on saved HTML")
+    parser.add_argument("html_dir")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    stats = run_benchmark(args.html_dir, args.repeat)
+    print_report(stats)
+    return 0 if stats and not stats['mismatches'] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+﻿"""
+Kiểm tra khác biệt + benchmark cho models/row_index so với reader cũ của Read CSV / Read TXT
+
+Reader cũ (đọc cả file vào list mỗi lần chạy action) là chuẩn: mọi dòng của index phải
+giống hệt. Không truyền file → chạy trên bộ case dựng sẵn (quote lẻ trong field, '\\r' lẻ,
+CRLF, dòng trống, field nhiều dòng, BOM...).
+
+Cách dùng:
+    python benchmark_row_index.py [file.csv|file.txt ...] [--repeat 5]
+"""
+
+import argparse
+import csv
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from models.row_index import CsvRowIndex, TextRowIndex
+
+BUILTIN_CASES = {
+    "bare_quote.csv": b'TV,55" screen\nPhone,6" screen\nLaptop,15 inch\n',
+    "quoted_multiline.csv": b'name,note\r\n"a","line1\r\nline2"\r\nb,"x ""q"" y"\r\n',
+    "lone_cr.csv": b'a,b\rc,d\r\re,"f\rg"\rh,i',
+    "blank_lines.csv": b'\xef\xbb\xbfh1,h2\r\n\r\n,\r\n  \nx,y\n\n',
+    "unterminated_quote.csv": b'a,b\n"c,d\ne,f\n',
+    "lone_cr.txt": b'one\rtwo\r\n\r  three  \n\n',
+    "unicode_space.txt": '\ufeffa\n\xa0\n\u3000\nb\x1c\n\x1c\nc'.encode("utf-8"),
+}
+
+
+def legacy_csv(path):
+    """Bản sao _read_csv cũ"""
+    rows = []
+    with open(path, 'r', encoding='utf-8-sig') as f:
+        for row in csv.reader(f):
+            if row:
+                rows.append(row)
+    return rows
+
+
+def legacy_txt(path):
+    """Bản sao đoạn đọc file của ReadTxtAction cũ"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f.readlines() if line.strip()]
+
+
+def kind_of(path):
+    return 'csv' if path.lower().endswith('.csv') else 'txt'
+
+
+def read_indexed(path):
+    index = CsvRowIndex(path) if kind_of(path) == 'csv' else TextRowIndex(path)
+    try:
+        return [index.row(i) for i in range(len(index))]
+    finally:
+        index.close()
+
+
+def time_calls(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def check_file(path, repeat):
+    legacy = legacy_csv if kind_of(path) == 'csv' else legacy_txt
+    expected = legacy(path)
+    actual = read_indexed(path)
+    name = os.path.basename(path)
+    if actual != expected:
+        print(f"[ROW_INDEX_CHECK] MISMATCH {name}")
+        print(f"    legacy : {expected[:10]}")
+        print(f"    indexed: {actual[:10]}")
+        return False, None
+    timings = None
+    if repeat:
+        timings = (time_calls(lambda: legacy(path), repeat), time_calls(lambda: read_indexed(path), repeat))
+    print(f"[ROW_INDEX_CHECK] OK {name}: {len(expected)} row(s)")
+    return True, timings
+
+
+def run_builtin_cases():
+    ok = True
+    with tempfile.TemporaryDirectory() as folder:
+        for name, data in BUILTIN_CASES.items():
+            path = os.path.join(folder, name)
+            with open(path, 'wb') as f:
+                f.write(data)
+            ok = check_file(path, 0)[0] and ok
+    return ok
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare row_index against the legacy CSV/TXT readers")
+    parser.add_argument("files", nargs="*")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    if not args.files:
+        return 0 if run_builtin_cases() else 1
+
+    ok = True
+    for path in args.files:
+        matched, timings = check_file(path, args.repeat)
+        ok = ok and matched
+        if timings:
+            legacy_ms, indexed_ms = (statistics.median(t) for t in timings)
+            print(f"    full read median: legacy {legacy_ms:.1f} ms | index + all rows {indexed_ms:.1f} ms")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
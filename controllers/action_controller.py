@@ -1,4 +1,6 @@
 ﻿from models.action_model import ActionItem
+from models.action_program import ActionProgram
+from models.streaming_writer import get_streaming_writer
 import os
 import time
 import pyautogui
@@ -21,6 +23,8 @@ class ActionController:
         self.is_execution_stopped = False
         self._keyboard_listener = None
         self.is_actions_running = False
+        self.handler_pool = None  # HandlerPool của lần run hiện tại (None = không cache)
+        self.headless = False  # True = bỏ qua tra cứu/highlight action frame khi chạy
         
         # ========== AUTO-TRIGGER STATE (NEW) ==========
         self.auto_trigger_remaining = 0
@@ -505,34 +509,22 @@ class ActionController:
 
     def _find_and_execute_else_if_for_standalone(self, if_index):
         """Tìm và thực thi ELSE IF cho IF độc lập"""
-        all_actions = self.model.get_all_actions()
+        program = self.model.get_program()
     
-        # Tìm ELSE IF đầu tiên cùng cấp với IF này
-        i = if_index + 1
-        nesting_level = 0
+        # Tìm ELSE IF đầu tiên cùng cấp với IF này (tra bảng nhảy đã biên dịch)
+        i = program.first_else_if(if_index)
+        if i == -1:
+            return  # Hết khối IF, không có ELSE IF
     
-        while i < len(all_actions):
-            action = all_actions[i]
-        
-            if action.action_type == ActionType.IF_CONDITION:
-                nesting_level += 1
-            elif action.action_type == ActionType.END_IF_CONDITION:
-                if nesting_level == 0:
-                    break  # Hết khối IF, không có ELSE IF
-                nesting_level -= 1
-            elif action.action_type == ActionType.ELSE_IF_CONDITION and nesting_level == 0:
-                # Tìm thấy ELSE IF cùng cấp, thực thi nó
-                from controllers.actions.action_factory import ActionFactory
-                else_if_handler = ActionFactory.get_handler(self.root, action, self.view, self.model, self)
-            
-                if else_if_handler:
-                    action_frame = self.view.action_frames[i] if i < len(self.view.action_frames) else None
-                    if action_frame:
-                        else_if_handler.action_frame = action_frame
-                    else_if_handler.play()
-                return
-        
-            i += 1
+        action = program.actions[i]
+        from controllers.actions.action_factory import ActionFactory
+        else_if_handler = ActionFactory.get_handler(self.root, action, self.view, self.model, self)
+    
+        if else_if_handler:
+            action_frame = self.view.action_frames[i] if i < len(self.view.action_frames) else None
+            if action_frame:
+                else_if_handler.action_frame = action_frame
+            else_if_handler.play()
 
             
     def delete_all_actions(self):
@@ -694,11 +686,12 @@ class ActionController:
         
         from models.global_variables import GlobalVariables
         from constants import ActionType
-        from controllers.actions.action_factory import ActionFactory
+        from controllers.actions.action_factory import ActionFactory, HandlerPool
         
         # 🔄 RESET execution state
         self.is_execution_stopped = False
         self.is_actions_running = True  # ← SET FLAG: ACTIONS BẮT ĐẦU CHẠY
+        self.handler_pool = HandlerPool()  # Dùng lại handler theo action.id trong lần run này
         
         # ========== AUTO-RESTART: SET BIẾN MÔI TRƯỜNG (NEW) ==========
         # Đánh dấu app đã Start (watchdog sẽ check biến này để tự exit)
@@ -715,8 +708,9 @@ class ActionController:
         self.start_conditional_keyboard_listener()
 
         try:
-            # Lấy danh sách hành động từ model
-            actions = self.model.get_all_actions()
+            # Lấy danh sách hành động đã biên dịch (bảng nhảy For/If tính sẵn)
+            program = self.model.get_program()
+            actions = program.actions
     
             # Khởi tạo đối tượng quản lý biến toàn cục
             global_vars = GlobalVariables()
@@ -724,9 +718,6 @@ class ActionController:
             # Khởi tạo stack để theo dõi các If condition lồng nhau
             if_stack = []
     
-            # Thêm biến để theo dõi các khối cần bỏ qua
-            skip_blocks = []
-    
             # Hiển thị thông báo đang thực thi
             # self.view.show_message("Thực thi", "Đang thực thi chuỗi hành động...")
             import time       
@@ -743,17 +734,6 @@ class ActionController:
                     i += 1
                     continue
     
-                # Kiểm tra xem action hiện tại có nằm trong khối cần bỏ qua không
-                should_skip = False
-                for block in skip_blocks:
-                    if i >= block['start'] and i < block['end']:
-                        should_skip = True
-                        break
-                
-                if should_skip:              
-                    i += 1
-                    continue
-            
                 # KHÔNG bỏ qua ELSE_IF khi IF sai - để IfConditionAction tự xử lý
                 if if_stack and not if_stack[-1]['condition_met']:
                     # CHỈ bỏ qua action thông thường, KHÔNG bỏ qua ELSE_IF
@@ -808,8 +788,7 @@ class ActionController:
     
                     handler = ActionFactory.get_handler(self.root, action, self.view, self.model, self)
                     if handler:
-                        action_frame = next((f for f in self.view.action_frames 
-                                            if f.action.id == action.id), None)
+                        action_frame = self.get_action_frame(action)
                         if action_frame:
                             handler.action_frame = action_frame
         
@@ -851,27 +830,19 @@ class ActionController:
     
                     print(f"[CONTROLLER DEBUG] 🔄 Bắt đầu For Loop với {total_loops} lần")
     
-                    # Tìm vị trí End For tương ứng
-                    nesting_level = 0
-                    end_for_index = i
-                    while end_for_index + 1 < len(actions):
-                        end_for_index += 1
-                        check_action = actions[end_for_index]
-                        if check_action.action_type == ActionType.FOR_LOOP:
-                            nesting_level += 1
-                        elif check_action.action_type == ActionType.END_FOR_LOOP:
-                            if nesting_level == 0:
-                                break
-                            nesting_level -= 1
+                    # Tra End For tương ứng từ bảng nhảy
+                    end_for_index = program.end_for.get(i, -1)
     
                     # Kiểm tra tính hợp lệ của For Loop
-                    if end_for_index >= len(actions) or actions[end_for_index].action_type != ActionType.END_FOR_LOOP:
+                    if end_for_index == -1:
                         print("[CONTROLLER ERROR] Không tìm thấy End For Loop tương ứng!")
                         i += 1
                         continue
     
                     # Thực thi vòng lặp For với Exception handling - FIXED
                     loop_count = 0
+                    # Handler For chỉ dùng để set loop index → lấy một lần cho cả vòng lặp
+                    for_handler = ActionFactory.get_handler(self.root, action, self.view, self.model, self)
     
                     try:
                         while loop_count < total_loops:
@@ -882,7 +853,6 @@ class ActionController:
                                 break  # Exit for loop
                             # ==========================================
                             print(f"[CONTROLLER DEBUG] For Loop - Iteration {loop_count}/{total_loops}")
-                            for_handler = ActionFactory.get_handler(self.root, action, self.view, self.model, self)
                             if for_handler:
                                 for_handler.set_loop_index(loop_count, total_loops)  # 0-based index
                                 
@@ -930,19 +900,10 @@ class ActionController:
         
                                             # ✅ FIX: Skip đến END_IF để tránh thực thi lại actions trong khối IF
                                             if condition_result:  # Nếu IF đúng và đã thực thi
-                                                # Tìm END_IF tương ứng và skip đến đó
-                                                nesting_level_if = 0
-                                                skip_to_end_if = nested_i + 1
-                                                while skip_to_end_if < end_for_index:
-                                                    skip_action = actions[skip_to_end_if]
-                                                    if skip_action.action_type == ActionType.IF_CONDITION:
-                                                        nesting_level_if += 1
-                                                    elif skip_action.action_type == ActionType.END_IF_CONDITION:
-                                                        if nesting_level_if == 0:
-                                                            nested_i = skip_to_end_if  # Skip đến END_IF
-                                                            break
-                                                        nesting_level_if -= 1
-                                                    skip_to_end_if += 1
+                                                # Skip đến END_IF tương ứng (tra bảng nhảy)
+                                                end_if_index = program.end_if.get(nested_i, -1)
+                                                if nested_i < end_if_index < end_for_index:
+                                                    nested_i = end_if_index
                     
                                     elif nested_action_type == ActionType.ELSE_IF_CONDITION:
                                         handler_nested = ActionFactory.get_handler(self.root, nested_action, self.view, self.model, self)
@@ -957,8 +918,7 @@ class ActionController:
                                         # Thực thi action bình thường - EXCEPTION SẼ ĐƯỢC THROW TẠI ĐÂY
                                         handler_nested = ActionFactory.get_handler(self.root, nested_action, self.view, self.model, self)
                                         if handler_nested:
-                                            action_frame = next((f for f in self.view.action_frames
-                                                                if f.action.id == nested_action.id), None)
+                                            action_frame = self.get_action_frame(nested_action)
                                             if action_frame:
                                                 handler_nested.action_frame = action_frame
                             
@@ -1011,21 +971,6 @@ class ActionController:
                     handler = ActionFactory.get_handler(self.root, action, self.view, self.model, self)
                     if handler and handler.prepare_play():
                         print(f"[CONTROLLER DEBUG] Skip For được kích hoạt tại index {i}")
-                        # Tìm End For tương ứng để skip đến iteration tiếp theo
-                        nesting_level = 0
-                        skip_to_idx = i + 1
-        
-                        while skip_to_idx < len(actions):
-                            check_action = actions[skip_to_idx]
-                            if check_action.action_type == ActionType.FOR_LOOP:
-                                nesting_level += 1
-                            elif check_action.action_type == ActionType.END_FOR_LOOP:
-                                if nesting_level == 0:
-                                    # Tìm thấy End For cùng level, skip đến đây để iteration tiếp theo
-                                    break
-                                nesting_level -= 1
-                            skip_to_idx += 1
-        
                         # Set flag để báo hiệu skip iteration trong For Loop
                         skip_current_iteration = True
                         break  # Thoát khỏi nested loop hiện tại
@@ -1047,7 +992,7 @@ class ActionController:
                 elif action_type == ActionType.BANPHIM:
                     handler = ActionFactory.get_handler(self.root, action, self.view, self.model, self)
                     if handler:
-                        action_frame = next((f for f in self.view.action_frames if f.action.id == action.id), None)
+                        action_frame = self.get_action_frame(action)
                         if action_frame:
                             handler.action_frame = action_frame
                         handler.play()
@@ -1068,8 +1013,7 @@ class ActionController:
                         handler = ActionFactory.get_handler(self.root, action, self.view, self.model, self)
                         if handler:
                             # Thiết lập action frame
-                            action_frame = next((f for f in self.view.action_frames 
-                                                if f.action.id == action.id), None)
+                            action_frame = self.get_action_frame(action)
                             if action_frame:
                                 handler.action_frame = action_frame
                             handler.play()
@@ -1102,6 +1046,9 @@ class ActionController:
         finally:
             # ✅ QUAN TRỌNG: LUÔN RESET FLAGS VÀ DỪNG LISTENER
             self.is_actions_running = False
+            self.handler_pool = None
+            # Flush + fsync dữ liệu Write CSV/TXT (buffered hoặc chưa sync) khi dừng run
+            get_streaming_writer().close_all(fsync=True)
             self.stop_keyboard_listener()
             print("[EXECUTION CONTROL] 🔄 Reset execution state")
             
@@ -1587,7 +1534,7 @@ class ActionController:
     def _execute_actions_internal(self, actions):
         """
         ✅ FIXED: Internal method để execute actions với logic For/If
-        Sử dụng helper methods mới: find_matching_end(), execute_for_loop_range(), execute_if_range()
+        Sử dụng ActionProgram (bảng nhảy), execute_for_loop_range(), execute_if_range()
     
         ⚠️ ẢNH HƯỞNG:
         - Không ảnh hưởng run_sequence() (vẫn dùng logic cũ)
@@ -1597,6 +1544,7 @@ class ActionController:
     
         i = 0
         context = {'if_stack': [], 'skip_blocks': []}
+        program = self._get_program(actions, context)
     
         while i < len(actions):
             if self.is_execution_stopped:
@@ -1613,10 +1561,7 @@ class ActionController:
         
             # ========== XỬ LÝ FOR LOOP ==========
             if action_type == ActionType.FOR_LOOP:
-                # ✅ SỬ DỤNG find_matching_end() thay vì _find_matching_end_for()
-                end_for_index = self.find_matching_end(
-                    actions, i, ActionType.FOR_LOOP, ActionType.END_FOR_LOOP
-                )
+                end_for_index = program.end_for.get(i, -1)
             
                 if end_for_index == -1:
                     print(f"[ERROR] For loop tại index {i} không có End For")
@@ -1634,10 +1579,7 @@ class ActionController:
         
             # ========== XỬ LÝ IF CONDITION ==========
             elif action_type == ActionType.IF_CONDITION:
-                # ✅ SỬ DỤNG find_matching_end() thay vì _find_matching_end_if()
-                end_if_index = self.find_matching_end(
-                    actions, i, ActionType.IF_CONDITION, ActionType.END_IF_CONDITION
-                )
+                end_if_index = program.end_if.get(i, -1)
             
                 if end_if_index == -1:
                     print(f"[ERROR] If condition tại index {i} không có End If")
@@ -1686,9 +1628,36 @@ class ActionController:
         return True
 
     
+    def get_action_frame(self, action):
+        """
+        Tra ActionItemFrame của action qua index id -> frame của view (O(1))
+        Trả về None khi chạy headless hoặc không có view gắn vào
+        """
+        if self.headless or self.view is None:
+            return None
+        get_frame = getattr(self.view, 'get_frame', None)
+        if get_frame is None:
+            return None
+        return get_frame(action.id)
+
     # ==================== CONTROL FLOW HELPERS (REFACTORED) ====================
     # Những method này được tách ra để REUSE cho run_sequence() và execute_nested_actions()
 
+    def _get_program(self, actions, context=None):
+        """
+        Lấy ActionProgram đã biên dịch cho list actions
+        Dùng cache của model nếu actions chính là model.actions, cache tiếp vào context
+        """
+        program = context.get('program') if context is not None else None
+        if program is None or program.source is not actions:
+            if actions is self.model.actions:
+                program = self.model.get_program()
+            else:
+                program = ActionProgram(actions)
+            if context is not None:
+                context['program'] = program
+        return program
+
     def find_matching_end(self, actions, start_index, start_type, end_type):
         """
         🆕 NEW METHOD - Tìm keyword kết thúc tương ứng (End For, End If)
@@ -1742,6 +1711,7 @@ class ActionController:
     
         if context is None:
             context = {'if_stack': [], 'skip_blocks': []}
+        program = self._get_program(actions, context)
     
         i = start_index + 1
     
@@ -1763,9 +1733,7 @@ class ActionController:
         
             # ===== XỬ LÝ NESTED FOR LOOP =====
             if action_type == ActionType.FOR_LOOP:
-                end_for = self.find_matching_end(
-                    actions, i, ActionType.FOR_LOOP, ActionType.END_FOR_LOOP
-                )
+                end_for = program.end_for.get(i, -1)
             
                 if end_for == -1:
                     print(f"[ERROR] For loop at index {i} missing End For")
@@ -1781,9 +1749,7 @@ class ActionController:
         
             # ===== XỬ LÝ NESTED IF CONDITION =====
             elif action_type == ActionType.IF_CONDITION:
-                end_if = self.find_matching_end(
-                    actions, i, ActionType.IF_CONDITION, ActionType.END_IF_CONDITION
-                )
+                end_if = program.end_if.get(i, -1)
             
                 if end_if == -1:
                     print(f"[ERROR] If condition at index {i} missing End If")
@@ -1814,10 +1780,7 @@ class ActionController:
             
                 if handler:
                     # Link action frame nếu có
-                    action_frame = next(
-                        (f for f in self.view.action_frames if f.action.id == action.id),
-                        None
-                    )
+                    action_frame = self.get_action_frame(action)
                     if action_frame:
                         handler.action_frame = action_frame
                 
@@ -1927,22 +1890,7 @@ class ActionController:
         print(f"[IF CONDITION] 🔍 Condition at index {if_index} = {condition_result}")
     
         # ===== FIND ELSE IF (NẾU CÓ) =====
-        else_if_index = -1
-        nesting_level = 0
-    
-        for i in range(if_index + 1, end_if_index):
-            act = actions[i]
-        
-            # Track nesting
-            if act.action_type == ActionType.IF_CONDITION:
-                nesting_level += 1
-            elif act.action_type == ActionType.END_IF_CONDITION:
-                nesting_level -= 1
-        
-            # Tìm Else If cùng cấp
-            elif act.action_type == ActionType.ELSE_IF_CONDITION and nesting_level == 0:
-                else_if_index = i
-                break
+        else_if_index = self._get_program(actions, context).first_else_if(if_index)
     
         # ===== EXECUTE DỰA VÀO CONDITION =====
         if condition_result:
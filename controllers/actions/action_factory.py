@@ -33,13 +33,60 @@ from controllers.actions.gologin_selenium_stop_action import GoLoginSeleniumStop
 from controllers.actions.gologin_clone_action import GoLoginCloneAction
 from controllers.actions.gologin_auto_action import GoLoginAutoAction
 
+# Bảng dispatch ActionType -> lớp handler (tra O(1) thay cho chuỗi if/elif)
+HANDLER_CLASSES = {
+    ActionType.DI_CHUYEN_CHUOT: MouseMoveAction,
+    ActionType.TIM_HINH_ANH: ImageSearchAction,
+    ActionType.TAO_BIEN: TaoBienAction,
+    ActionType.IF_CONDITION: IfConditionAction,
+    ActionType.ELSE_IF_CONDITION: ElseIfConditionAction,
+    ActionType.END_IF_CONDITION: EndIfConditionAction,
+    ActionType.FOR_LOOP: ForAction,
+    ActionType.END_FOR_LOOP: EndForAction,
+    ActionType.BREAK_FOR_LOOP: BreakForAction,
+    ActionType.SKIP_FOR_LOOP: SkipForAction,
+    ActionType.BANPHIM: KeyboardAction,
+    ActionType.INPUT_TEXT: InputTextAction,
+    ActionType.READ_TXT: ReadTxtAction,
+    ActionType.READ_CSV: ReadCsvAction,
+    ActionType.WRITE_TXT: WriteTxtAction,
+    ActionType.WRITE_CSV: WriteCsvAction,
+    ActionType.TEXT_SEARCH: TextSearchAction,
+    ActionType.SHOW_HIDE_PROGRAM: ShowHideProgramAction,
+    ActionType.CHECK_FULLSCREEN: CheckFullscreenAction,
+    ActionType.IMAGE_SEARCH_LIVE: ImageSearchLiveAction,
+    ActionType.COPY_FOLDER: CopyFolderAction,
+    ActionType.RUN_CMD: RunCmdAction,
+    ActionType.GOLOGIN_CREATE_PROFILE: GoLoginCreateAction,
+    ActionType.GOLOGIN_START_PROFILE: GoLoginStartAction,
+    ActionType.GOLOGIN_STOP_PROFILE: GoLoginStopAction,
+    ActionType.UPLOAD_SCRIPT: UploadScriptAction,
+    ActionType.GOLOGIN_GET_COOKIES: GoLoginGetCookiesAction,
+    ActionType.GOLOGIN_SELENIUM_COLLECT: GoLoginSeleniumCollectAction,
+    ActionType.GET_NEW_PROXY: GetNewProxyAction,
+    ActionType.GOLOGIN_SELENIUM_START: GoLoginSeleniumStartAction,
+    ActionType.GOLOGIN_SELENIUM_STOP: GoLoginSeleniumStopAction,
+    ActionType.GOLOGIN_CLONE_PROFILE: GoLoginCloneAction,
+    ActionType.GOLOGIN_AUTO: GoLoginAutoAction,
+}
+
+
 class ActionFactory:
     """Factory tạo ra play handler dựa vào loại action"""
     
+    @staticmethod
+    def create_handler(root, action, view, model, controller):
+        """Luôn tạo handler mới, trả về None nếu không có handler phù hợp"""
+        handler_class = HANDLER_CLASSES.get(action.action_type)
+        if handler_class is None:
+            return None
+        return handler_class(root, action, view, model, controller)
+
     @staticmethod
     def get_handler(root, action, view, model, controller):
         """
         Trả về handler phù hợp với loại action
+        Nếu controller đang có HandlerPool (trong một lần run) thì dùng lại handler đã tạo
         
         Args:
             root: Tkinter root window
@@ -49,83 +96,37 @@ class ActionFactory:
         Returns:
             BasePlayHandler: Handler phù hợp
         """
-        action_type = action.action_type   
-        
-        if action_type == ActionType.DI_CHUYEN_CHUOT:
-            return MouseMoveAction(root, action, view, model, controller)
-        elif action_type == ActionType.TIM_HINH_ANH:
-            return ImageSearchAction(root, action, view, model, controller)
-        elif action_type == ActionType.TAO_BIEN:
-            return TaoBienAction(root, action, view, model, controller)
-        elif action_type == ActionType.IF_CONDITION:
-            return IfConditionAction(root, action, view, model, controller)
-        elif action_type == ActionType.ELSE_IF_CONDITION:
-            handler = ElseIfConditionAction(root, action, view, model, controller)
-            return handler
-        elif action_type == ActionType.END_IF_CONDITION:
-            return EndIfConditionAction(root, action, view, model, controller)
-        elif action_type == ActionType.FOR_LOOP:
-            return ForAction(root, action, view, model, controller)
-        elif action_type == ActionType.END_FOR_LOOP:
-            return EndForAction(root, action, view, model, controller)
-        elif action_type == ActionType.BREAK_FOR_LOOP:
-            return BreakForAction(root, action, view, model, controller)
-        elif action_type == ActionType.SKIP_FOR_LOOP:
-            return SkipForAction(root, action, view, model, controller)
-        elif action_type == ActionType.BANPHIM:
-             return KeyboardAction(root, action, view, model, controller)
-        elif action_type == ActionType.INPUT_TEXT:
-            return InputTextAction(root, action, view, model, controller)
-        elif action_type == ActionType.READ_TXT:
-            return ReadTxtAction(root, action, view, model, controller)
-        elif action_type == ActionType.READ_CSV:
-            return ReadCsvAction(root, action, view, model, controller)
-        elif action_type == ActionType.WRITE_TXT:
-            return WriteTxtAction(root, action, view, model, controller)
-        elif action_type == ActionType.WRITE_CSV:
-            return WriteCsvAction(root, action, view, model, controller)
-        elif action_type == ActionType.TEXT_SEARCH:
-            return TextSearchAction(root, action, view, model, controller)
-        elif action_type == ActionType.SHOW_HIDE_PROGRAM:
-            return ShowHideProgramAction(root, action, view, model, controller)
-        elif action_type == ActionType.CHECK_FULLSCREEN:
-            return CheckFullscreenAction(root, action, view, model, controller)
-        elif action_type == ActionType.IMAGE_SEARCH_LIVE:
-            return ImageSearchLiveAction(root, action, view, model, controller)
-        elif action_type == ActionType.COPY_FOLDER:
-            return CopyFolderAction(root, action, view, model, controller)
-        elif action_type == ActionType.RUN_CMD:
-            return RunCmdAction(root, action, view, model, controller)
-        elif action_type == ActionType.GOLOGIN_CREATE_PROFILE:
-            return GoLoginCreateAction(root, action, view, model, controller)
+        handler_pool = getattr(controller, 'handler_pool', None)
+        if handler_pool is not None:
+            return handler_pool.get(root, action, view, model, controller)
+        return ActionFactory.create_handler(root, action, view, model, controller)
 
-        elif action_type == ActionType.GOLOGIN_START_PROFILE:
-            return GoLoginStartAction(root, action, view, model, controller)
 
-        elif action_type == ActionType.GOLOGIN_STOP_PROFILE:
-            return GoLoginStopAction(root, action, view, model, controller)
-        
-        elif action_type == ActionType.UPLOAD_SCRIPT:
-            return UploadScriptAction(root, action, view, model, controller)
-        
-        elif action_type == ActionType.GOLOGIN_GET_COOKIES:
-            return GoLoginGetCookiesAction(root, action, view, model, controller)
-        
-        elif action_type == ActionType.GOLOGIN_SELENIUM_COLLECT:
-            return GoLoginSeleniumCollectAction(root, action, view, model, controller)
-        
-        elif action_type == ActionType.GET_NEW_PROXY:
-            return GetNewProxyAction(root, action, view, model, controller)
-        
-        elif action_type == ActionType.GOLOGIN_SELENIUM_START:
-            return GoLoginSeleniumStartAction(root, action, view, model, controller)
-        
-        elif action_type == ActionType.GOLOGIN_SELENIUM_STOP:
-            return GoLoginSeleniumStopAction(root, action, view, model, controller)
-        elif action_type == ActionType.GOLOGIN_CLONE_PROFILE:
-            return GoLoginCloneAction(root, action, view, model, controller)
-        elif action_type == ActionType.GOLOGIN_AUTO:
-            return GoLoginAutoAction(root, action, view, model, controller)
+class HandlerPool:
+    """
+    Cache handler theo ActionItem.id trong phạm vi một lần run
+    
+    Handler được dùng lại thay vì tạo mới ở mỗi vòng For. Trước mỗi lần trả ra,
+    pool gọi handler.reset_execution_state() - lớp con có trạng thái riêng
+    cho mỗi lần thực thi phải override method này (xem BaseAction).
+    """
+
+    def __init__(self):
+        self._handlers = {}
+
+    def get(self, root, action, view, model, controller):
+        handler = self._handlers.get(action.id)
+        if handler is None or handler.action is not action or handler.view is not view:
+            handler = ActionFactory.create_handler(root, action, view, model, controller)
+            if handler is None:
+                return None
+            self._handlers[action.id] = handler
         else:
-            # Trả về None nếu không tìm thấy handler phù hợp
-            return None
+            handler.reset_execution_state()
+        return handler
+
+    def clear(self):
+        self._handlers.clear()
+
+    def __len__(self):
+        return len(self._handlers)
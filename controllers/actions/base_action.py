@@ -46,11 +46,6 @@ class BaseAction(ABC):
                 self.condition_evaluated = False
             return True  # Trả về True để biểu thị điều kiện sai
 
-        # Lấy action frame từ ActionListView
-        for frame in self.view.action_frames:
-            if frame.action.id == self.action.id:  # Cần thêm id vào ActionItem để so sánh             
-                break    
-
         # ➊ REFACTORED: Lấy giá trị repeat_fixed và repeat_random
         repeat_fixed = self.params.get("repeat_fixed", "0")
         repeat_random = self.params.get("repeat_random", "0")
@@ -109,8 +104,26 @@ class BaseAction(ABC):
         return final_result  # Return SAU KHI hoàn thành vòng lặp
 
 
+    def find_action_frame(self, action):
+        """Tra frame của action trong view (O(1)), None nếu chạy headless hoặc không có view"""
+        if self.controller is not None and hasattr(self.controller, 'get_action_frame'):
+            return self.controller.get_action_frame(action)
+        get_frame = getattr(self.view, 'get_frame', None)
+        return get_frame(action.id) if get_frame else None
+
     def reset_execution_state(self):
-        """Reset execution state để có thể chạy lại"""
+        """
+        Reset execution state để có thể chạy lại
+        
+        HandlerPool gọi method này trước mỗi lần dùng lại handler (vd: mỗi vòng For).
+        Lớp con có trạng thái riêng cho mỗi lần thực thi phải override và gọi super().
+        """
+        self.params = self.action.parameters
+        self.is_running = False
+        self.stop_requested = False
+        self.action_frame = None
+        if hasattr(self, 'condition_evaluated'):
+            delattr(self, 'condition_evaluated')
         if hasattr(self, '_already_executed'):
             delattr(self, '_already_executed')
         if hasattr(self, '_cached_result'):
@@ -487,6 +500,10 @@ class BaseAction(ABC):
                     pyautogui.click()
                 elif click_type == "double_click":
                     pyautogui.doubleClick()
+    
+                # Màn hình đã đổi sau click → bỏ frame đã cache cho lần tìm tiếp theo
+                from models.image_search import get_frame_cache
+                get_frame_cache().invalidate()
 
             return target_x, target_y
         except:
@@ -522,7 +539,7 @@ class BaseAction(ABC):
             from controllers.actions.action_factory import ActionFactory
         
             all_actions = self.model.get_all_actions()
-            current_index = next((i for i, a in enumerate(all_actions) if a.id == self.action.id), -1)
+            current_index = self.model.get_program().find_index(self.action.id)
             if current_index < 0:
                 return
             
@@ -551,8 +568,7 @@ class BaseAction(ABC):
                 
                     if handler:
                         # Thiết lập action frame
-                        action_frame = next((f for f in self.view.action_frames
-                                           if f.action.id == action.id), None)
+                        action_frame = self.find_action_frame(action)
                         if action_frame:
                             handler.action_frame = action_frame
                     
@@ -82,8 +82,7 @@ class ElseIfConditionAction(BaseAction):
         )
         
         if handler:
-            action_frame = next((f for f in self.view.action_frames 
-                               if f.action.id == action.id), None)
+            action_frame = self.find_action_frame(action)
             if action_frame:
                 handler.action_frame = action_frame
             
@@ -91,7 +90,4 @@ class ElseIfConditionAction(BaseAction):
     
     def _find_current_index(self, all_actions):
         """Tìm index của ELSE IF hiện tại"""
-        for i, action in enumerate(all_actions):
-            if action.id == self.action.id:
-                return i
-        return -1
+        return self.model.get_program().find_index(self.action.id)
@@ -216,7 +216,7 @@ class BaseFlowAutoAction:
 
     # ========== IMAGE DETECTION (REUSABLE) ==========
 
-    def _find_image_on_screen(self, image_path, region=None, accuracy=0.7, click_offset_x=0, click_offset_y=0):
+    def _find_image_on_screen(self, image_path, region=None, accuracy=0.7, click_offset_x=0, click_offset_y=0, search_mode="color"):
         """
         Find image on screen using template matching
         Reusable cho search icon, channel logo, button detection, etc.
@@ -227,6 +227,7 @@ class BaseFlowAutoAction:
             accuracy: Match accuracy (0.0 - 1.0) - will be converted to 0-100 for ImageSearcher
             click_offset_x: X offset from found image center (for clickable area)
             click_offset_y: Y offset from found image center (for clickable area)
+            search_mode: ImageSearcher engine ("color", "gray", "pyramid", "multiscale")
     
         Returns:
             dict: {
@@ -245,7 +246,8 @@ class BaseFlowAutoAction:
             searcher = ImageSearcher(
                 image_path=image_path,
                 region=region,
-                accuracy=accuracy_percent
+                accuracy=accuracy_percent,
+                search_mode=search_mode
             )
         
             # Search returns: (success: bool, result: tuple or None)
@@ -275,7 +277,7 @@ class BaseFlowAutoAction:
             return None
 
 
-    def _find_multiple_images(self, image_path, region=None, accuracy=0.7):
+    def _find_multiple_images(self, image_path, region=None, accuracy=0.7, search_mode="color"):
         """
         Find all occurrences of image on screen
         Useful for finding multiple channel logos, buttons, etc.
@@ -284,37 +286,58 @@ class BaseFlowAutoAction:
             image_path: Path to template image
             region: Search region (x, y, width, height) or None for full screen
             accuracy: Match accuracy (0.0 - 1.0)
+            search_mode: ImageSearcher engine ("color", "gray", "pyramid", "multiscale")
         
         Returns:
-            list: List of dicts with 'center' and 'click_position', or empty list
+            list: List of dicts with 'center', 'click_position', 'confidence', sorted by confidence (best first)
+        """
+        results = self._find_images_on_screen([image_path], region=region, accuracy=accuracy, search_mode=search_mode)
+        matches = results.get(image_path, [])
+        if not matches:
+            self.log(f"No matches found for: {image_path}", "WARNING")
+        else:
+            self.log(f"✓ Found {len(matches)} matches")
+        return matches
+
+    def _find_images_on_screen(self, image_paths, region=None, accuracy=0.7, search_mode="color"):
+        """
+        Find N templates on ONE screen capture (ImageSearcher.search_batch)
+        Mọi match đều được trả về (đã NMS) để caller quyết định trên cùng một frame
+    
+        Args:
+            image_paths: List of template paths
+            region: Search region (x, y, width, height) or None for full screen
+            accuracy: Match accuracy (0.0 - 1.0)
+            search_mode: ImageSearcher engine ("color", "gray", "pyramid", "multiscale")
+    
+        Returns:
+            dict: {image_path: [{'center', 'click_position', 'confidence'}, ...]} - empty list if not found
         """
         try:
-            import pyautogui
-        
-            # Find all matches
-            matches = list(pyautogui.locateAllOnScreen(image_path, confidence=accuracy, region=region))
-        
-            if not matches:
-                self.log(f"No matches found for: {image_path}", "WARNING")
-                return []
+            from models.image_search import ImageSearcher
         
-            results = []
-            for match in matches:
-                center_x = match.left + (match.width // 2)
-                center_y = match.top + (match.height // 2)
-            
-                results.append({
-                    'center': (center_x, center_y),
-                    'click_position': (center_x, center_y),
-                    'bbox': (match.left, match.top, match.width, match.height)
-                })
+            batch = ImageSearcher.search_batch(
+                image_paths,
+                region=region,
+                accuracy=accuracy * 100,
+                search_mode=search_mode
+            )
         
-            self.log(f"✓ Found {len(results)} matches")
-            return results
+            return {
+                path: [
+                    {
+                        'center': (center_x, center_y),
+                        'click_position': (center_x, center_y),
+                        'confidence': confidence
+                    }
+                    for center_x, center_y, confidence in matches
+                ]
+                for path, matches in batch.items()
+            }
         
         except Exception as e:
-            self.log(f"Multiple image detection error: {e}", "ERROR")
-            return []
+            self.log(f"Batch image detection error: {e}", "ERROR")
+            return {path: [] for path in image_paths}
 
     # ========== TAB MANAGEMENT (ORBITA BROWSER) ==========
 
@@ -310,19 +310,21 @@ class YouTubeFindClickVideoAutoAction(BaseFlowAutoAction):
             search_region = (0, 0, screen_width, screen_height)
             self.log("No region defined, using full screen", "WARNING")
     
-        # Use base class to find logo
-        result = self._find_image_on_screen(
+        # Một lần chụp → mọi logo khớp trong region (đã NMS, best first)
+        matches = self._find_multiple_images(
             image_path=self.logo_path,
             region=search_region,  # ← FIX: Always pass valid region
-            accuracy=0.85,
-            click_offset_x=0,  # Return center of logo
-            click_offset_y=0
+            accuracy=0.85
         )
     
-        if not result or not result['found']:
+        if not matches:
             return None
     
+        # Lấy match tốt nhất (best first, giống single search)
+        result = matches[0]
+
         logo_x, logo_y = result['center']
+        self.log(f"✓ {len(matches)} logo match(es), chosen confidence: {result['confidence']:.2f}")
     
         # ========== CALCULATE CLICK POSITION BASED ON AREA ==========
         if self.area == "sidebar":
@@ -3,6 +3,7 @@
 import time
 import random
 from helpers.gologin_profile_helper import GoLoginProfileHelper
+from helpers.corpus_service import get_corpus_service, KIND_KEYWORDS
 from models.global_variables import GlobalVariables
 import logging
 logger = logging.getLogger('TomSamAutobot')
@@ -122,8 +123,8 @@ class BaseYouTubeFlowAutoIterator:
             return False
     
         try:
-            with open(keywords_file_path, 'r', encoding='utf-8') as f:
-                keywords_list = [line.strip() for line in f if line.strip()]
+            # Corpus dùng chung: 100 iterator cùng channel không đọc lại file 100 lần
+            keywords_list = get_corpus_service().get(keywords_file_path, KIND_KEYWORDS, self.log_prefix).lines
         
             if not keywords_list:
                 self.log(f"Keywords file is empty: {keywords_file_path}", "ERROR")
@@ -45,14 +45,16 @@ class YouTubeFlowAutoIterator(BaseYouTubeFlowAutoIterator):
         # ========== CHAIN 2-N: VIDEO INTERACTIONS (RANDOM) ==========
         
         opened_profiles = self.parameters.get('opened_profiles', [])
+        # Sliding window: số profile chạy đồng thời = window_size (opened_profiles lúc mở chỉ là số profile đang live)
+        concurrent_profiles = self.parameters.get('window_size') or len(opened_profiles)
         #
         # This code to guarantee the profile run enough time to get new proxy (min 6 minutes). 3+ profiles run in minimum 6+ minutes for 2 chain actions
         #
         repeat_count = 3
        
-        if len(opened_profiles) == 2:
+        if concurrent_profiles == 2:
             repeat_count = 10
-        elif len(opened_profiles) == 1:
+        elif concurrent_profiles == 1:
             repeat_count = 25
         
         for i in range(repeat_count):
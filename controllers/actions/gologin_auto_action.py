@@ -25,6 +25,7 @@ from helpers.selenium_registry import register_selenium_driver, unregister_selen
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
 from helpers.website_manager import get_random_warmup_url
+from helpers.profile_pipeline import ProfilePipeline
 
 class GoLoginAutoAction(BaseAction):
     """Handler for GoLogin Selenium Start Profile action"""
@@ -161,26 +162,14 @@ class GoLoginAutoAction(BaseAction):
             return False
 
     
-    def _open_profile(self, profile_id, batch_num=None):
+    def _prepare_profile(self, profile_id, log_prefix):
         """
-        Open profile via pywinauto (Automate GoLogin App UI) - Updated with per-profile proxy assignment before UI.
-
-        Flow:
-        1. Assign proxy if file provided (new: retry all lines, raise if fail + required)
-        2. Connect to GoLogin app
-        3. Focus window
-        4. Send Ctrl+F to open search (using pywinauto)
-        5. Type profile ID + Enter (using pywinauto)
-        6. Click Run button (using pywinauto)
-
-        Args:
-            profile_id: Profile ID to open
-            batch_num: Batch number for logging (optional)
+        Phần gọi API trước khi mở profile (remove/assign proxy, refresh fingerprint)
+        Không đụng UI GoLogin → chạy song song giữa các profile, ngoài lock mở UI
 
-        Returns:
-            dict: {'success': bool, 'profile_id': str, 'error': str or None} - success for UI open; proxy fail raises if required
+        Raises:
+            ProxyAssignmentFailed: proxy bắt buộc nhưng gán thất bại
         """
-        log_prefix = f"[BATCH {batch_num}][{profile_id}]" if batch_num else f"[GOLOGIN AUTO][{profile_id}]"
         proxy_file = self.params.get('proxy_file', '').strip()
         remove_proxy = self.params.get('remove_proxy', False)
     
@@ -208,20 +197,47 @@ class GoLoginAutoAction(BaseAction):
                 logger.error(f"{log_prefix} Proceeding without proxy (using local IP)")
                 raise        
 
+        # ========== REFRESH FINGERPRINT (OPTIONAL) ==========
+        refresh_fingerprint = self.params.get("refresh_fingerprint", False)
+
+        if refresh_fingerprint:
+            try:
+                success = self.gologin_api.refresh_fingerprint(profile_id)        
+                if not success:
+                    logger.error(f"{log_prefix} ⚠️ Failed to refresh fingerprint")
+            except Exception as e:
+                logger.error(f"{log_prefix} ⚠️ Refresh fingerprint error: {e}")
+
+    def _open_profile(self, profile_id, batch_num=None, prepared=False):
+        """
+        Open profile via pywinauto (Automate GoLogin App UI) - Updated with per-profile proxy assignment before UI.
+
+        Flow:
+        1. Assign proxy if file provided (new: retry all lines, raise if fail + required)
+        2. Connect to GoLogin app
+        3. Focus window
+        4. Send Ctrl+F to open search (using pywinauto)
+        5. Type profile ID + Enter (using pywinauto)
+        6. Click Run button (using pywinauto)
+
+        Args:
+            profile_id: Profile ID to open
+            batch_num: Batch number for logging (optional)
+            prepared: True nếu _prepare_profile() đã chạy (bỏ qua bước 1 + refresh fingerprint)
+
+        Returns:
+            dict: {'success': bool, 'profile_id': str, 'error': str or None} - success for UI open; proxy fail raises if required
+        """
+        log_prefix = f"[BATCH {batch_num}][{profile_id}]" if batch_num else f"[GOLOGIN AUTO][{profile_id}]"
+        if not prepared:
+            self._prepare_profile(profile_id, log_prefix)
+
         # Original UI code (kept 100% unchanged, from refresh to end)
         try:
             # Import dependencies
             from pywinauto.application import Application
             from pywinauto.keyboard import send_keys
     
-            # ========== REFRESH FINGERPRINT (OPTIONAL) ==========
-            refresh_fingerprint = self.params.get("refresh_fingerprint", False)
-    
-            if refresh_fingerprint:               
-                success = self.gologin_api.refresh_fingerprint(profile_id)        
-                if not success:
-                    logger.error(f"{log_prefix} ⚠️ Failed to refresh fingerprint")        
-    
             # ========== STEP 2: CONNECT TO GOLOGIN APP (OPTIMIZED WITH HELPER) ==========
            
 
@@ -393,21 +409,21 @@ class GoLoginAutoAction(BaseAction):
         
     def _start_parallel(self, profile_list):
         """
-        Execute parallel mode with BATCH PROCESSING - Updated to pass proxy args to open, stop if proxy fail + required.
+        Execute parallel mode with a SLIDING WINDOW (ProfilePipeline) - stop if proxy fail + required.
 
-        NEW WORKFLOW:
-        - Divide profiles into batches of size max_workers
-        - For each batch:
-            1. Open all profiles in batch (parallel, with proxy assign per-profile)
-            2. Execute all chains round-robin with lock - if action_type != None
-            3. Close all profiles in batch (parallel) - if action_type != None
-        - Repeat until all profiles processed; raise/stop if proxy fail + require (IP risk for YouTube)
+        WORKFLOW:
+        - Luôn giữ max_workers profile live; profile nào đóng xong thì profile kế tiếp mở ngay
+          (không còn chờ cả batch như trước)
+        - Mỗi profile:
+            1. OPEN: _prepare_profile (API, song song) → _open_profile (UI GoLogin, giữ physical lock)
+            2. RUN: chain round-robin giữa các profile đang chạy - if action_type != None
+            3. CLOSE: Alt+F4 (giữ physical lock) - if action_type != None
+        - Exception khi mở (vd. proxy fail + require) → ngừng mở mới, đóng profile đang live, re-raise
 
         Args:
             profile_list: List of profile IDs to execute
         """
         import threading
-        from concurrent.futures import ThreadPoolExecutor, as_completed
 
         max_parallel_profiles = int(self.params.get("max_workers", 1))
         action_type = self.params.get("action_type", None)
@@ -415,11 +431,15 @@ class GoLoginAutoAction(BaseAction):
 
         print("[GOLOGIN AUTO] ========== PARALLEL MODE ==========")
         print("=" * 80)
-        print(f"[PARALLEL MODE] BATCH PROCESSING (batch size: {max_parallel_profiles})")
+        print(f"[PARALLEL MODE] SLIDING WINDOW (live profiles: {max_parallel_profiles})")
         print(f"[PARALLEL MODE] Total profiles: {len(profile_list)}")
         print(f"[PARALLEL MODE] Action type: {action_type}")
         print("=" * 80)
 
+        # Số profile chạy đồng thời khi window đầy - flow dựa vào đây để chọn số chain
+        # (một profile không live 2 lần nên bị giới hạn bởi số profile khác nhau)
+        window_size = max(1, min(max_parallel_profiles, len(set(profile_list))))
+
         # ========== RANDOMIZE PROFILE LIST IF NEEDED ==========
         how_to_get = self.params.get("how_to_get", "Random")
     
@@ -430,403 +450,126 @@ class GoLoginAutoAction(BaseAction):
                 max_workers=max_parallel_profiles,
                 log_prefix="[GOLOGIN WARMUP]"
             )
-        # Divide profiles into batches
-        batches = []
-        for i in range(0, len(profile_list), max_parallel_profiles):
-            batch = profile_list[i:i + max_parallel_profiles]
-            batches.append(batch)
-
-        print(f"[PARALLEL MODE] Divided into {len(batches)} batches\n")
-
-        total_success = 0
-        total_failed = 0
-        # ========== ADD GLOBAL LOCK FOR PROFILE OPENING ==========
-        profile_open_lock = threading.Lock()  # ← THÊM LOCK MỚI
-        # ========== PROCESS EACH BATCH ==========
-        for batch_num, batch_profiles in enumerate(batches, 1):
-            # ===== CHECK STOP FLAG AT START OF BATCH (FIX) =====
-            if self.controller and hasattr(self.controller, 'is_execution_stopped') and self.controller.is_execution_stopped:
-                logger.info(f"[BATCH {batch_num}] PAUSE/BREAK detected at start - Skipping this batch")
-                break  # Exit outer loop, không xử lý batch này nữa
-            # ====================================================
-
-            print("=" * 80)
-            print(f"[BATCH {batch_num}/{len(batches)}] Processing {len(batch_profiles)} profiles: {batch_profiles}")
-            print("=" * 80)
-            print()
-    
-            # ========== PHASE 1: OPEN BATCH PROFILES (UPDATED) ==========
-            print(f"[BATCH {batch_num}] PHASE 1: Opening {len(batch_profiles)} profiles (max {max_parallel_profiles} concurrent)...")
-    
-            profile_data = {}  # profile_id → {'driver': ..., 'debugger_address': ..., 'status': ...}
-            open_lock = threading.Lock()
-    
-            def open_profile_thread(profile_id):
-                """Thread function to open 1 profile WITHOUT Selenium"""
-                try:
-                    with profile_open_lock:  # ← LOCK TOÀN BỘ OPEN PROCESS                
+        # ========== SLIDING WINDOW PIPELINE ==========
+        # Thao tác vật lý (UI GoLogin, chain chuột/phím, Alt+F4) dùng chung 1 lock;
+        # phần gọi API (_prepare_profile) của profile kế tiếp chạy song song ngoài lock
+        physical_lock = threading.Lock()
 
-                        print(f"[BATCH {batch_num}][{profile_id}] Opening profile...")
-                        
-                        # ========== CALL _open_profile() METHOD (UPDATED: PASS PROXY ARGS) ==========
-                        result = self._open_profile(profile_id, batch_num)
-            
-                    with open_lock:
-                        if result['success']:
-                            # ========== PROFILE OPENED - SET driver=None, debugger_address=None ==========
-                            # These will be defined later when implementing manual control flows
-                            profile_data[profile_id] = {
-                                'driver': None,  # ← NO SELENIUM CONNECTION
-                                'debugger_address': None,  # ← NOT NEEDED (manual mode)
-                                'status': 'opened'
-                            }
-                            print(f"[BATCH {batch_num}][{profile_id}] ✓ Profile opened successfully (MANUAL mode)")
-                        else:
-                            # ========== OPENING FAILED ==========
-                            profile_data[profile_id] = {
-                                'status': 'failed',
-                                'error': result['error']
-                            }
-                            print(f"[BATCH {batch_num}][{profile_id}] ❌ Failed to open: {result['error']}")
-        
-                except ProxyAssignmentFailed:
-                    # New: Propagate proxy fail raise (stop entire action if required)
-                    print(f"[BATCH {batch_num}][{profile_id}] Proxy failed - propagating stop")
-                    raise  # Re-raise to as_completed
-                except Exception as e:
-                    print(f"[BATCH {batch_num}][{profile_id}] ❌ Exception while opening: {e}")
-                    import traceback
-                    traceback.print_exc()
-            
-                    with open_lock:
-                        profile_data[profile_id] = {
-                            'status': 'error',
-                            'error': str(e)
-                        }
-                    raise
-            # ========== USE THREADPOOLEXECUTOR TO OPEN PROFILES ==========
-            executor = ThreadPoolExecutor(max_workers=max_parallel_profiles)
-            # ========== CHECK EXCEPTIONS FROM THREADS (NEW) ==========
-            exception_from_thread = None
-            exception_traceback = None
-            try:
-                future_to_profile = {}
-        
-                for i, profile_id in enumerate(batch_profiles):
-                    if i > 0:
-                        time.sleep(2)  # Stagger delay
-                    future = executor.submit(open_profile_thread, profile_id)
-                    future_to_profile[future] = profile_id
-                    print(f"[BATCH {batch_num}] PHASE 1: Submitted thread {i+1}/{len(batch_profiles)}: {profile_id}")
-        
-                # Wait for all to complete
-                for future in as_completed(future_to_profile):                    
-
-                    profile_id = future_to_profile[future]
-                    try:
-                        # future.result() sẽ:
-                        # - Block đến khi thread xong
-                        # - Re-raise exception nếu thread có exception
-                        future.result()
-                    except (ProxyAssignmentFailed, Exception) as thread_exception:
-                        # ========== EXCEPTION FROM THREAD (UPDATED) ==========
-                        print("=" * 80)
-                        print(f"[BATCH {batch_num}] ⚠ EXCEPTION CAUGHT FROM THREAD: {profile_id}")
-                        print(f"[BATCH {batch_num}] Exception type: {type(thread_exception).__name__}")
-                        print(f"[BATCH {batch_num}] Exception message: {thread_exception}")
-                        print("=" * 80)
-                    
-                        import traceback
-                        exception_traceback = traceback.format_exc()
-                        print(exception_traceback)
-                    
-                        # LƯU EXCEPTION ĐẦU TIÊN
-                        if exception_from_thread is None:
-                            exception_from_thread = thread_exception
-                    
-                        # ===== BREAK IMMEDIATELY - KHÔNG CHỜ CÁC THREADS KHÁC =====
-                        print(f"[BATCH {batch_num}] ⚠ Breaking immediately, will cleanup and re-raise")
-                        break  # ← BREAK RA KHỎI LOOP NGAY
-                    
-                    except ProxyAssignmentFailed:
-                        # New: If proxy fail raised, cleanup partial opened in this batch, then propagate stop
-                        print(f"[BATCH {batch_num}] Proxy fail in thread {profile_id} - cleanup partial and stop action")
-                        opened_so_far = [pid for pid, data in profile_data.items() if data.get('status') == 'opened']
-                        if opened_so_far:
-                            self._close_profiles_batch(opened_so_far)  # Assume helper method for close
-                        raise  # Propagate to prepare_play
-    
-            finally:
-                executor.shutdown(wait=True)
-                print(f"[BATCH {batch_num}] PHASE 1: Thread pool shut down")
-    
-            # ========== CHECK OPENING RESULTS ==========
-            if exception_from_thread is not None:
-                print("=" * 80)
-                print(f"[BATCH {batch_num}] ⚠ CRITICAL: Exception occurred, cleaning up...")
-                print("=" * 80)
-            
-                # ===== CLEANUP: CLOSE ALL OPENED PROFILES IN THIS BATCH =====
-                opened_profiles = [pid for pid, data in profile_data.items() if data.get('status') == 'opened']
-            
-                if opened_profiles:
-                    print(f"[BATCH {batch_num}] Closing {len(opened_profiles)} opened profiles before re-raise...")
-                
-                    try:
-                        for profile_id in opened_profiles:
-                            try:
-                                print(f"[BATCH {batch_num}][{profile_id}] Closing profile...")
-                            
-                                # Bring to front
-                                bring_result = GoLoginProfileHelper.bring_profile_to_front(
-                                    profile_id,
-                                    driver=None,
-                                    log_prefix=f"[BATCH {batch_num}][{profile_id}]"
-                                )
-                                if bring_result:
-                                    time.sleep(1)
-                            
-                                    # Send Alt+F4
-                                    pyautogui.hotkey('alt', 'f4')
-                                    time.sleep(1)
-                            
-                                    print(f"[BATCH {batch_num}][{profile_id}] ✓ Profile closed")
-                            
-                            except Exception as close_err:
-                                print(f"[BATCH {batch_num}][{profile_id}] ⚠ Failed to close: {close_err}")
-                            
-                        print(f"[BATCH {batch_num}] ✓ Cleanup completed")
-                    
-                    except Exception as cleanup_err:
-                        print(f"[BATCH {batch_num}] ⚠ Error during cleanup: {cleanup_err}")
-            
-                # ===== RE-RAISE EXCEPTION TO PROPAGATE TO MAIN THREAD =====
-                print("=" * 80)
-                print(f"[BATCH {batch_num}] RE-RAISING EXCEPTION TO MAIN THREAD")
-                print("=" * 80)
-            
-                raise exception_from_thread  # ← RE-RAISE ĐỂ BUBBLE UP
-                # ===========================================================
+        def is_stopped():
+            return bool(self.controller and getattr(self.controller, 'is_execution_stopped', False))
 
+        def open_profile(profile_id):
+            log_prefix = f"[PIPELINE][{profile_id}]"
+            self._prepare_profile(profile_id, log_prefix)
+            if is_stopped():
+                return None
 
+            with physical_lock:  # ← LOCK PHẦN THAO TÁC UI GOLOGIN (một cửa sổ app)
+                print(f"{log_prefix} Opening profile...")
+                result = self._open_profile(profile_id, prepared=True)
 
-            opened_profiles = [pid for pid, data in profile_data.items() if data.get('status') == 'opened']
-            failed_profiles = [pid for pid, data in profile_data.items() if data.get('status') in ['failed', 'error']]
+            if not result['success']:
+                print(f"{log_prefix} ❌ Failed to open: {result['error']}")
+                return None
+            print(f"{log_prefix} ✓ Profile opened successfully (MANUAL mode)")
+            return {
+                'driver': None,  # ← NO SELENIUM CONNECTION
+                'debugger_address': None,  # ← NOT NEEDED (manual mode)
+                'status': 'opened'
+            }
 
-            print(f"[BATCH {batch_num}] PHASE 1: Opening results:")
-            print(f"  ✓ Successfully opened: {len(opened_profiles)}/{len(batch_profiles)}")
-    
-            if failed_profiles:
-                print(f"  ❌ Failed: {len(failed_profiles)}")
-            print()
-    
-            if not opened_profiles:
-                print(f"[BATCH {batch_num}] No profiles opened successfully, skipping to next batch")
-                total_failed += len(batch_profiles)
-                continue
-            
-            # ===== CHECK STOP FLAG AFTER PHASE 1 (NEW) =====
-            if self.controller and hasattr(self.controller, 'is_execution_stopped') and self.controller.is_execution_stopped:
-                logger.info(f"[BATCH {batch_num}] PAUSE/BREAK detected after PHASE 1 - Closing opened profiles")
-                # Close opened profiles before exit
-                for profile_id in opened_profiles:
-                    try:
-                        result_bring = GoLoginProfileHelper.bring_profile_to_front(profile_id, driver=None, log_prefix=f"[BATCH {batch_num}][{profile_id}]")
-                        if result_bring:
-                            time.sleep(1)
-                            pyautogui.hotkey('alt', 'f4')
-                            time.sleep(1)
-                    except:
-                        pass
-                break  # Exit batch loop
-            # ================================================
-    
-            # ========== PHASE 2, 3, 4: KEEP EXACTLY AS ORIGINAL (START ACTION CODE) ==========
-            # Check action type
+        def start_flow(profile_id, context, live_profiles):
+            log_prefix = f"[PIPELINE][{profile_id}]"
             if action_type is None:
-                print(f"[BATCH {batch_num}] PHASE 2: Action type is None, skipping flow creation and execution")
-                print(f"[BATCH {batch_num}] Batch profiles opened and kept running (no cleanup)")
-                total_success += len(opened_profiles)
-                total_failed += len(failed_profiles)
-                continue  # Skip to next batch, profiles stay open
-    
-            # ========== PHASE 2: CREATE FLOW ITERATORS (KEEP ORIGINAL) ==========
-            print(f"[BATCH {batch_num}] PHASE 2: Creating flow iterators for opened profiles...")
-    
-            flow_iterators = {}  # profile_id → flow_iterator
-           
-            for profile_id in opened_profiles:              
-        
-                try:
-                    mixed_keyword, keyword_type = self._get_mixed_keyword_google()
-                    if action_type == "Youtube":
-                        if browse_youtube:
-                            flow_iterator = YouTubeFlowAutoFactory.create_flow_iterator(
-                                profile_id=profile_id,
-                                parameters={**self.params, 'opened_profiles': opened_profiles, 'max_workers' : max_parallel_profiles, 'list_warmup_url' : mixed_keyword, 'keyword_type' : keyword_type},
-                                log_prefix=f"[BATCH {batch_num}][{profile_id}]",
-                                flow_type="browse",
-                                controller = self.controller
-                            )
-                        else:
-                            flow_iterator = YouTubeFlowAutoFactory.create_flow_iterator(
-                                profile_id=profile_id,
-                                parameters={**self.params, 'opened_profiles': opened_profiles, 'max_workers' : max_parallel_profiles, 'list_warmup_url' : mixed_keyword, 'keyword_type' : keyword_type},
-                                log_prefix=f"[BATCH {batch_num}][{profile_id}]",
-                                flow_type="search",
-                                controller = self.controller
-                            )
-                      
-                    elif action_type == "Google":
-                        # TODO: Implement GoogleFlowAuto later
-                        print(f"[BATCH {batch_num}][{profile_id}] Google flow not implemented for Auto Action yet")
-                        continue
-                    else:
-                        print(f"[BATCH {batch_num}][{profile_id}] Unknown action type: {action_type}")
-                        continue
-            
-                    flow_iterators[profile_id] = flow_iterator
-        
-                except Exception as e:
-                    print(f"[BATCH {batch_num}][{profile_id}] Failed to create flow iterator: {e}")
-                    import traceback
-                    traceback.print_exc()
-                    opened_profiles.remove(profile_id)
-    
-            print(f"[BATCH {batch_num}] PHASE 2: Created {len(flow_iterators)} flow iterators")
-    
-            # ========== PHASE 3: EXECUTE CHAINS ROUND-ROBIN (KEEP ORIGINAL) ==========
-            print(f"[BATCH {batch_num}] PHASE 3: Starting round-robin chain execution...")
-            print("=" * 80)
-    
-            active_profiles = opened_profiles.copy()
-            round_num = 0
-    
-            while active_profiles:
-                round_num += 1
-                print()
-                print("=" * 80)
-                print(f"[BATCH {batch_num}] ROUND {round_num}: Active profiles ({len(active_profiles)}/{len(opened_profiles)})")
-                print("=" * 80)
-                print()
-        
-                profiles_to_remove = []
-        
-                for profile_id in active_profiles:
-                    # ===== CHECK PAUSE/BREAK FLAG AT START (FIX) =====
-                    if self.controller and hasattr(self.controller, 'is_execution_stopped') and self.controller.is_execution_stopped:
-                        logger.info(f"[BATCH {batch_num}] ROUND {round_num} ESC detected - Stopping all profiles")
-                        active_profiles.clear()  # Clear để thoát outer loop
-                        break
-                    # =========================================
-                    flow = flow_iterators[profile_id]
-            
-                    # Show progress
-                    progress = flow.get_progress()
-                    print(f"[BATCH {batch_num}] ROUND {round_num} [{profile_id}] Progress: {progress['current']}/{progress['total']} chains ({progress['percentage']:.1f}%)")
-            
-                    # Check if completed
-                    if not flow.has_next_chain():
-                        print(f"[BATCH {batch_num}] ROUND {round_num} [{profile_id}] All chains completed")
-                        profiles_to_remove.append(profile_id)
-                        continue
-            
-                    # Bring window to front
-                    try:
-                        GoLoginProfileHelper.bring_profile_to_front(
-                            profile_id,
-                            driver=profile_data[profile_id]['driver'],
-                            log_prefix=f"[BATCH {batch_num}] ROUND {round_num} [{profile_id}]"
-                        )
-                        print(f"[BATCH {batch_num}] ROUND {round_num} [{profile_id}] Window brought to front")
-                    except Exception as e:
-                        print(f"[BATCH {batch_num}] ROUND {round_num} [{profile_id}] Could not bring to front: {e}")
-            
-                    # Execute chain with lock
-                    print(f"[BATCH {batch_num}] ROUND {round_num} [{profile_id}] ========== ACQUIRING LOCK → EXECUTING CHAIN")
-                    
-                    # ===== CHECK PAUSE/BREAK FLAG BEFORE EXECUTE (FIX) =====
-                    if self.controller and hasattr(self.controller, 'is_execution_stopped') and self.controller.is_execution_stopped:
-                        logger.info(f"[BATCH {batch_num}] [{profile_id}] ESC detected before execute")
-                        profiles_to_remove.append(profile_id)
-                        continue
-                    # ===============================================
-            
-                    try:
-                        success = flow.execute_next_chain()
-                        # ===== CHECK PAUSE/BREAK FLAG AFTER EXECUTE (FIX) =====
-                        if self.controller and hasattr(self.controller, 'is_execution_stopped') and self.controller.is_execution_stopped:
-                            logger.info(f"[BATCH {batch_num}] [{profile_id}] ESC detected after execute")
-                            profiles_to_remove.append(profile_id)
-                            continue
-                        # ==============================================
-                        if success:
-                            print(f"[BATCH {batch_num}] ROUND {round_num} [{profile_id}] ✓ Chain executed successfully")
-                        else:
-                            print(f"[BATCH {batch_num}] ROUND {round_num} [{profile_id}] ❌ Chain execution failed")
-                            profiles_to_remove.append(profile_id)
-            
-                    except Exception as e:
-                        print(f"[BATCH {batch_num}] ROUND {round_num} [{profile_id}] ❌ Exception during chain execution: {e}")
-                        import traceback
-                        traceback.print_exc()
-                        profiles_to_remove.append(profile_id)
-            
-                    print(f"[BATCH {batch_num}] ROUND {round_num} [{profile_id}] ========== LOCK RELEASED")
-        
-                # Remove completed/failed profiles
-                profiles_to_remove_set = set(profiles_to_remove)
-                active_profiles = [pid for pid in active_profiles if pid not in profiles_to_remove_set]
-    
-            print()
-            print("=" * 80)
-            print(f"[BATCH {batch_num}] PHASE 3: All profiles completed all chains")
-            print("=" * 80)
-            print()
-    
-            # ========== PHASE 4: CLOSE BROWSERS WITH ALT+F4 (UPDATED) ==========
-            print(f"[BATCH {batch_num}] PHASE 4: Closing {len(opened_profiles)} browsers with Alt+F4 (FIFO order)...")
-            print(f"[BATCH {batch_num}] Order: {opened_profiles}")
+                print(f"{log_prefix} Action type is None, profile kept running (no chains, no cleanup)")
+                context['keep_open'] = True
+                return None
+
+            mixed_keyword, keyword_type = self._get_mixed_keyword_google()
+            flow_params = {**self.params, 'opened_profiles': live_profiles, 'window_size': window_size, 'max_workers' : max_parallel_profiles, 'list_warmup_url' : mixed_keyword, 'keyword_type' : keyword_type}
+            if action_type == "Youtube":
+                return YouTubeFlowAutoFactory.create_flow_iterator(
+                    profile_id=profile_id,
+                    parameters=flow_params,
+                    log_prefix=log_prefix,
+                    flow_type="browse" if browse_youtube else "search",
+                    controller = self.controller
+                )
+            if action_type == "Google":
+                # TODO: Implement GoogleFlowAuto later
+                print(f"{log_prefix} Google flow not implemented for Auto Action yet")
+            else:
+                print(f"{log_prefix} Unknown action type: {action_type}")
+            return None
+
+        def run_chain(profile_id, flow):
+            log_prefix = f"[PIPELINE][{profile_id}]"
+            # ===== CHECK PAUSE/BREAK FLAG BEFORE EXECUTE =====
+            if is_stopped():
+                logger.info(f"{log_prefix} ESC detected before execute")
+                return False
 
-            closed_count = 0
-            for profile_id in opened_profiles:  # opened_profiles đã theo thứ tự FIFO
+            progress = flow.get_progress()
+            print(f"{log_prefix} Progress: {progress['current']}/{progress['total']} chains ({progress['percentage']:.1f}%)")
+
+            with physical_lock:
                 try:
-                    log_prefix = f"[BATCH {batch_num}][{profile_id}]"    
-                   
-                    result_bring = GoLoginProfileHelper.bring_profile_to_front(
-                        profile_id,
-                        driver=profile_data[profile_id]['driver'],
-                        log_prefix=log_prefix
-                    )
-                    logger.info(f"[{profile_id}] PHASE 4: Closing browser with Alt+F4... result_bring {result_bring}")
-                    if result_bring:
-                        time.sleep(1)
-    
-                        pyautogui.hotkey('alt', 'f4')
-                        time.sleep(1)
-    
-                        print(f"{log_prefix} ✓ Browser closed")
-                        closed_count += 1
-    
+                    GoLoginProfileHelper.bring_profile_to_front(profile_id, driver=None, log_prefix=log_prefix)
                 except Exception as e:
-                    print(f"{log_prefix} ❌ Failed to close: {e}")
-                    import traceback
-                    traceback.print_exc()
+                    print(f"{log_prefix} Could not bring to front: {e}")
 
-            print(f"[BATCH {batch_num}] PHASE 4: Closed {closed_count}/{len(opened_profiles)} browsers")
-            
-    
-            total_success += len(opened_profiles)
-            total_failed += len(failed_profiles)
+                print(f"{log_prefix} ========== ACQUIRING LOCK → EXECUTING CHAIN")
+                success = flow.execute_next_chain()
+                print(f"{log_prefix} ========== LOCK RELEASED")
+
+            # ===== CHECK PAUSE/BREAK FLAG AFTER EXECUTE =====
+            if is_stopped():
+                logger.info(f"{log_prefix} ESC detected after execute")
+                return False
+            if success:
+                print(f"{log_prefix} ✓ Chain executed successfully")
+            else:
+                print(f"{log_prefix} ❌ Chain execution failed")
+            return success
+
+        def close_profile(profile_id, context):
+            if context.get('keep_open'):
+                return True
+            log_prefix = f"[PIPELINE][{profile_id}]"
+            with physical_lock:
+                result_bring = GoLoginProfileHelper.bring_profile_to_front(profile_id, driver=None, log_prefix=log_prefix)
+                logger.info(f"{log_prefix} Closing browser with Alt+F4... result_bring {result_bring}")
+                if not result_bring:
+                    return False
+                time.sleep(1)
+                pyautogui.hotkey('alt', 'f4')
+                time.sleep(1)
+            print(f"{log_prefix} ✓ Browser closed")
+            return True
+
+        pipeline = ProfilePipeline(
+            window=max_parallel_profiles,
+            open_workers=max_parallel_profiles,
+            close_workers=1,  # Alt+F4 là thao tác vật lý
+            should_stop=is_stopped,
+            fatal_exceptions=(Exception,),  # Giống batch cũ: lỗi khi mở → dọn dẹp + re-raise
+            log_prefix="[PIPELINE]"
+        )
+        results = pipeline.run(profile_list, open_profile, start_flow, run_chain, close_profile)
 
         # ========== FINAL SUMMARY ==========
+        statuses = list(results.values())
+        total_success = statuses.count('completed') + statuses.count('failed')  # Đã mở được
+        total_failed = statuses.count('open_failed')
         print()
         print("=" * 80)
-        print("[PARALLEL MODE] ========== ALL BATCHES COMPLETED ==========")
+        print("[PARALLEL MODE] ========== ALL PROFILES COMPLETED ==========")
         print("=" * 80)
         print(f"Total profiles processed: {len(profile_list)}")
-        print(f"  ✓ Success: {total_success}")
+        print(f"  ✓ Success: {total_success} (chains completed: {statuses.count('completed')})")
         print(f"  ❌ Failed: {total_failed}")
+        if statuses.count('stopped'):
+            print(f"  ⏹ Stopped: {statuses.count('stopped')}")
         print("=" * 80)
 
         self.set_variable(total_success > 0)
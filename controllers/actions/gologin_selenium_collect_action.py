@@ -11,6 +11,7 @@ from exceptions.gologin_exceptions import ProxyAssignmentFailed
 # Import helpers
 from helpers.gologin_profile_helper import GoLoginProfileHelper
 from helpers.selenium_registry import register_selenium_driver, unregister_selenium_driver
+from helpers.page_issue_detector import get_page_issue_detector
 
 # ========== IMPORT WEBSITE MANAGER ==========
 from helpers.website_manager import (
@@ -810,103 +811,22 @@ class GoLoginSeleniumCollectAction(BaseAction):
         """
         Detect bot challenges, HTTP errors, and blocked pages
         Uses STRICT context-based detection to avoid false positives
+        Rule set: helpers/page_issue_detector.PAGE_ISSUE_RULES (title/URL trước, body quét trong page khi cần)
     
         Returns:
             tuple: (is_blocked: bool, reason: str)
         """
         try:
-            page_source = driver.page_source.lower()
-            page_title = driver.title.lower()
-            current_url = driver.current_url.lower()          
-            # ========== HTTP ERRORS (ALWAYS STRICT) ==========
-            # These are reliable - based on page title
-        
-            # HTTP 404
-            if "404" in page_title and ("not found" in page_title or "error" in page_title):
-                print(f"[GOLOGIN WARMUP {profile_id}] ❌ 404 Not Found: {url}")
-                return True, "HTTP 404 Not Found"
-        
-            # HTTP 500
-            if "500" in page_title and "error" in page_title:
-                print(f"[GOLOGIN WARMUP {profile_id}] ❌ 500 Server Error: {url}")
-                return True, "HTTP 500 Internal Server Error"
-        
-            # HTTP 503
-            if "503" in page_title and "unavailable" in page_title:
-                print(f"[GOLOGIN WARMUP {profile_id}] ❌ 503 Service Unavailable: {url}")
-                return True, "HTTP 503 Service Unavailable"
-        
-            # Empty page
-            if len(page_source.strip()) < 100:
-                print(f"[GOLOGIN WARMUP {profile_id}] ⚪ Empty Page: {url}")
-                return True, "Empty Page"
-            
-            # ========== SSL/CERTIFICATE ERROR ==========
-            # "Your connection is not private" error page
-            ssl_error_indicators = [
-                # Chrome error page
-                ("your connection is not private" in page_source),
-                ("your connection is not secure" in page_source),
-                # SSL error codes
-                ("net::err_cert_" in page_source),  # Chrome SSL errors
-                ("ssl_error_" in page_source),      # Firefox SSL errors
-                # Certificate error phrases
-                ("this site can't provide a secure connection" in page_source),
-                ("certificate error" in page_source and "continue" in page_source),
-                # Check title + URL pattern
-                ("privacy error" in page_title and "chrome-error:" not in current_url),
-            ]
-        
-            if any(ssl_error_indicators):
-                print(f"[GOLOGIN WARMUP {profile_id}] 🔒 SSL Certificate Error: {url}")
-                return True, "SSL Certificate Error"
-        
-        
-            # ========== CLOUDFLARE DETECTION (STRICTER) ==========
-            # Must have MULTIPLE indicators, not just "cloudflare" keyword
-        
-            cloudflare_strict_indicators = [
-                ("checking your browser" in page_source and "cloudflare" in page_source),
-                ("just a moment" in page_title and "cloudflare" in page_source),
-                ("ray id" in page_source and "performance & security by cloudflare" in page_source),
-                ("<title>just a moment...</title>" in page_source),
-            ]
-        
-            if any(cloudflare_strict_indicators):
-                print(f"[GOLOGIN WARMUP {profile_id}] 🛡️ Cloudflare challenge detected: {url}")
-                return True, "Cloudflare Challenge"
-        
-            # ========== ACCESS DENIED (STRICTER) ==========
-            # Must have clear denial message, not just keyword
-        
-            access_denied_strict = [
-                ("access denied" in page_title or "403 forbidden" in page_title),
-                ("your ip has been blocked" in page_source and len(page_source) < 5000),  # Short page = block page
-                ("you have been blocked" in page_source and "cloudflare" in page_source),
-            ]
-        
-            if any(access_denied_strict):
-                print(f"[GOLOGIN WARMUP {profile_id}] 🚫 Access Denied/IP Blocked: {url}")
-                return True, "Access Denied / IP Blocked"
-        
-            # ========== RATE LIMITING (STRICTER) ==========
-            rate_limit_strict = [
-                ("429" in page_title and "too many requests" in page_source),
-                ("rate limit exceeded" in page_source and len(page_source) < 3000),
-            ]
-        
-            if any(rate_limit_strict):
-                print(f"[GOLOGIN WARMUP {profile_id}] ⏱️ Rate Limited: {url}")
-                return True, "Rate Limited"        
-           
-        
-            # ========== REDIRECT TO ERROR PAGE ==========
-            if any(err in current_url for err in ["/error", "/404", "/blocked", "/denied"]):
-                print(f"[GOLOGIN WARMUP {profile_id}] 🔄 Redirected to error page: {current_url}")
-                return True, "Redirected to Error Page"
-        
-            # ========== NO ISSUES ==========
-            return False, ""
+            issue = get_page_issue_detector().detect(driver)
+            if not issue:
+                # ========== NO ISSUES ==========
+                return False, ""
+        
+            reason, label, current_url = issue
+            # Redirect rule log URL thực tế sau redirect (giống trước)
+            shown_url = current_url if reason == "Redirected to Error Page" else url
+            print(f"[GOLOGIN WARMUP {profile_id}] {label}: {shown_url}")
+            return True, reason
     
         except Exception as e:
             print(f"[GOLOGIN WARMUP {profile_id}] Error detecting page issues: {e}")
@@ -3,7 +3,9 @@
 from controllers.actions.base_action import BaseAction
 from models.global_variables import GlobalVariables
 from models.gologin_api import get_gologin_api
+import contextlib
 import random
+import threading
 import time
 import os
 # Import helpers
@@ -17,6 +19,7 @@ from exceptions.gologin_exceptions import ProxyAssignmentFailed
 
 from helpers.selenium_registry import register_selenium_driver, unregister_selenium_driver
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from helpers.profile_pipeline import ProfilePipeline
 
 class GoLoginSeleniumStartAction(BaseAction):
     """Handler for GoLogin Selenium Start Profile action"""
@@ -201,218 +204,56 @@ class GoLoginSeleniumStartAction(BaseAction):
 
         
 
-    def _execute_round_robin(self, profile_data, batch_num, flow_type):
+    def _build_flow_keywords(self):
         """
-        Execute chains in round-robin fashion (GUI mode)
-    
-        Round-robin execution:
-        - Profile A executes chain 1 → Profile B executes chain 1 → Profile C executes chain 1
-        - Profile A executes chain 2 → Profile B executes chain 2 → Profile C executes chain 2
-        - ... (repeat until all profiles complete all chains)
-    
-        Each profile executes 1 chain per round, then moves to next profile.
-        This ensures fair resource distribution and allows window switching.
-    
-        Args:
-            profile_data: Dict containing all profile data (driver, status, etc.)
-            batch_num: Batch number for logging
-            flow_type: 'Youtube' or 'Google'
+        Keywords + YouTube area params dùng chung cho mọi flow iterator (GUI mode)
+
+        Returns:
+            dict: keywords dict truyền vào YouTubeFlow / GoogleFlow.create_flow_iterator
         """
-        print(f"\n{'='*70}")
-        print(f"[BATCH {batch_num}] GUI MODE: Starting round-robin chain execution")
-        print(f"[BATCH {batch_num}] Flow type: {flow_type}")
-        print(f"{'='*70}\n")
-    
-        # ========== STEP 1: FILTER SUCCESSFULLY OPENED PROFILES ==========
-        opened_profiles = [
-            pid for pid, data in profile_data.items()
-            if data.get('status') == 'opened' and data.get('driver')
-        ]
-    
-        if not opened_profiles:
-            print(f"[BATCH {batch_num}] ✗ No profiles opened successfully")
-            return
-    
-        print(f"[BATCH {batch_num}] ✓ {len(opened_profiles)} profile(s) ready for execution")
-    
-        # ========== STEP 2: LOAD KEYWORDS ==========
         keywords_suffix_prefix = self.params.get("keywords_suffix_prefix", "").strip()
         keywords_youtube = GoLoginProfileHelper.load_keywords(self.params, "[Get Youtube Keywords]")
         keywords_google = GoLoginProfileHelper.load_keywords(self.params, "[Get Google Keywords]", "Google")
     
-        # Get YouTube option params
-        youtube_main_area_x = int(self.params.get("youtube_main_area_x", "0"))
-        youtube_main_area_y = int(self.params.get("youtube_main_area_y", "0"))
-        youtube_main_area_width = int(self.params.get("youtube_main_area_width", "1920"))
-        youtube_main_area_height = int(self.params.get("youtube_main_area_height", "1080"))
-        youtube_image_search_path = self.params.get("youtube_image_search_path", "").strip()
-    
-        youtube_sidebar_area_x = int(self.params.get("youtube_sidebar_area_x", "0"))
-        youtube_sidebar_area_y = int(self.params.get("youtube_sidebar_area_y", "0"))
-        youtube_sidebar_area_width = int(self.params.get("youtube_sidebar_area_width", "400"))
-        youtube_sidebar_area_height = int(self.params.get("youtube_sidebar_area_height", "1080"))
-        youtube_sidebar_image_search_path = self.params.get("youtube_sidebar_image_search_path", "").strip()
-    
-        keywords = {
+        return {
             "keywords_youtube": keywords_youtube,
             "keywords_google": keywords_google,
             "suffix_prefix": keywords_suffix_prefix,
             # Youtube Option params
-            "youtube_main_area_x": youtube_main_area_x,
-            "youtube_main_area_y": youtube_main_area_y,
-            "youtube_main_area_width": youtube_main_area_width,
-            "youtube_main_area_height": youtube_main_area_height,
-            "youtube_image_search_path": youtube_image_search_path,
+            "youtube_main_area_x": int(self.params.get("youtube_main_area_x", "0")),
+            "youtube_main_area_y": int(self.params.get("youtube_main_area_y", "0")),
+            "youtube_main_area_width": int(self.params.get("youtube_main_area_width", "1920")),
+            "youtube_main_area_height": int(self.params.get("youtube_main_area_height", "1080")),
+            "youtube_image_search_path": self.params.get("youtube_image_search_path", "").strip(),
             # Sidebar params
-            "youtube_sidebar_area_x": youtube_sidebar_area_x,
-            "youtube_sidebar_area_y": youtube_sidebar_area_y,
-            "youtube_sidebar_area_width": youtube_sidebar_area_width,
-            "youtube_sidebar_area_height": youtube_sidebar_area_height,
-            "youtube_sidebar_image_search_path": youtube_sidebar_image_search_path,
+            "youtube_sidebar_area_x": int(self.params.get("youtube_sidebar_area_x", "0")),
+            "youtube_sidebar_area_y": int(self.params.get("youtube_sidebar_area_y", "0")),
+            "youtube_sidebar_area_width": int(self.params.get("youtube_sidebar_area_width", "400")),
+            "youtube_sidebar_area_height": int(self.params.get("youtube_sidebar_area_height", "1080")),
+            "youtube_sidebar_image_search_path": self.params.get("youtube_sidebar_image_search_path", "").strip(),
         }
-    
-        if not keywords:
-            print(f"[BATCH {batch_num}] ✗ Failed to load keywords")
-            return
-    
-        # ========== STEP 3: CREATE FLOW ITERATORS ==========
-        print(f"[BATCH {batch_num}] Creating flow iterators...")
-    
-        flow_iterators = {}  # {profile_id: flow_iterator}
-    
-        for profile_id in opened_profiles:
-            driver = profile_data[profile_id]['driver']
-            debugger_address = profile_data[profile_id]['debugger_address']
-        
-            try:
-                # Create flow iterator based on flow type
-                if flow_type == "Youtube":
-                    flow_iterator = YouTubeFlow.create_flow_iterator(
-                        driver=driver,
-                        keywords=keywords,
-                        profile_id=profile_id,
-                        debugger_address=debugger_address,
-                        log_prefix=f"[BATCH {batch_num}][{profile_id}]"
-                    )
-                elif flow_type == "Google":
-                    flow_iterator = GoogleFlow.create_flow_iterator(
-                        driver=driver,
-                        keywords=keywords,
-                        profile_id=profile_id,
-                        debugger_address=debugger_address,
-                        log_prefix=f"[BATCH {batch_num}][{profile_id}]"
-                    )
-                else:
-                    print(f"[BATCH {batch_num}][{profile_id}] ✗ Unknown flow type: {flow_type}")
-                    continue
-            
-                flow_iterators[profile_id] = flow_iterator
-            
-            except Exception as e:
-                print(f"[BATCH {batch_num}][{profile_id}] ✗ Failed to create flow iterator: {e}")
-                import traceback
-                traceback.print_exc()
-    
-        if not flow_iterators:
-            print(f"[BATCH {batch_num}] ✗ No flow iterators created")
-            return
-    
-        print(f"[BATCH {batch_num}] ✓ Created {len(flow_iterators)} flow iterator(s)\n")
-    
-        # ========== STEP 4: ROUND-ROBIN EXECUTION ==========
-        print(f"[BATCH {batch_num}] Starting round-robin execution...")
-        print("="*70)
-    
-        active_profiles = list(flow_iterators.keys())
-        round_num = 0
-    
-        # Loop until all profiles complete all chains
-        while active_profiles:
-            round_num += 1
-        
-            print()
-            print("="*70)
-            print(f"[BATCH {batch_num}][ROUND {round_num}] Active profiles: {len(active_profiles)}/{len(flow_iterators)}")
-            print("="*70)
-            print()
-        
-            profiles_to_remove = []
-        
-            # Execute 1 chain for each active profile
-            for profile_id in active_profiles:
-                flow = flow_iterators[profile_id]
-            
-                # Check if profile completed all chains
-                if not flow.has_next_chain():
-                    print(f"[BATCH {batch_num}][ROUND {round_num}][{profile_id}] ✓ All chains completed")
-                    profiles_to_remove.append(profile_id)
-                    continue
-            
-                # Show progress
-                progress = flow.get_progress()
-                print(f"[BATCH {batch_num}][ROUND {round_num}][{profile_id}] "
-                      f"Progress: {progress['current']}/{progress['total']} chains "
-                      f"({progress['percentage']:.1f}%)")
-            
-                # Bring window to front
-                try:
-                    GoLoginProfileHelper.bring_profile_to_front(
-                        profile_id,
-                        driver=profile_data[profile_id]['driver'],
-                        log_prefix=f"[BATCH {batch_num}][ROUND {round_num}][{profile_id}]"
-                    )
-                    print(f"[BATCH {batch_num}][ROUND {round_num}][{profile_id}] ✓ Window brought to front")
-                except Exception as e:
-                    print(f"[BATCH {batch_num}][ROUND {round_num}][{profile_id}] "
-                          f"⚠ Could not bring to front: {e}")
-            
-                # Execute one chain (IMPLICIT LOCK via sequential loop)
-                print(f"\n[BATCH {batch_num}][ROUND {round_num}][{profile_id}] "
-                      f">>> EXECUTING CHAIN (LOCKED) <<<")
-            
-                try:
-                    success = flow.execute_next_chain()
-                
-                    if success:
-                        print(f"[BATCH {batch_num}][ROUND {round_num}][{profile_id}] ✓ Chain executed successfully")
-                    else:
-                        print(f"[BATCH {batch_num}][ROUND {round_num}][{profile_id}] ✗ Chain execution failed")
-                        profiles_to_remove.append(profile_id)
-                    
-                except Exception as e:
-                    print(f"[BATCH {batch_num}][ROUND {round_num}][{profile_id}] "
-                          f"✗ Exception during chain execution: {e}")
-                    import traceback
-                    traceback.print_exc()
-                    profiles_to_remove.append(profile_id)
-            
-                print(f"[BATCH {batch_num}][ROUND {round_num}][{profile_id}] "
-                      f">>> LOCK RELEASED <<<\n")
-        
-            # Remove completed/failed profiles
-            profiles_to_remove_set = set(profiles_to_remove)
-            active_profiles = [pid for pid in active_profiles if pid not in profiles_to_remove_set]
-        
-            print()
-    
-        print("="*70)
-        print(f"[BATCH {batch_num}] ✓ All profiles completed all chains")
-        print("="*70)
-        print()
-    
-        # ========== STEP 5: CLEANUP ALL PROFILES ==========
-        print(f"[BATCH {batch_num}] Cleaning up {len(opened_profiles)} profile(s)...")
-    
-        # Use centralized helper method
-        cleanup_results = GoLoginProfileHelper.cleanup_profiles(
-            profile_data={pid: profile_data[pid] for pid in opened_profiles},
-            gologin_api=self.gologin_api,
-            log_prefix=f"[BATCH {batch_num}][CLEANUP]"
-        )
-    
-        # Count results
-        cleanup_success = sum(1 for r in cleanup_results.values() if r)
-        print(f"[BATCH {batch_num}] ✓ Cleanup completed: {cleanup_success}/{len(cleanup_results)}")
+
+
+    def _create_flow_iterator(self, profile_id, driver, debugger_address, keywords, flow_type, log_prefix):
+        """Create YouTube / Google flow iterator cho 1 profile (None nếu flow type không hỗ trợ)"""
+        if flow_type == "Youtube":
+            return YouTubeFlow.create_flow_iterator(
+                driver=driver,
+                keywords=keywords,
+                profile_id=profile_id,
+                debugger_address=debugger_address,
+                log_prefix=log_prefix
+            )
+        if flow_type == "Google":
+            return GoogleFlow.create_flow_iterator(
+                driver=driver,
+                keywords=keywords,
+                profile_id=profile_id,
+                debugger_address=debugger_address,
+                log_prefix=log_prefix
+            )
+        print(f"{log_prefix} ✗ Unknown flow type: {flow_type}")
+        return None
 
 
 
@@ -450,8 +291,8 @@ class GoLoginSeleniumStartAction(BaseAction):
                 flow_type=flow_type
             )
         else:
-            # ===== GUI MODE: Batch processing with round-robin =====
-            self._start_parallel_gui_with_batches(
+            # ===== GUI MODE: Sliding window pipeline with round-robin =====
+            self._start_parallel_gui_pipeline(
                 profile_list=profile_list,
                 max_workers=max_parallel_profiles,
                 flow_type=flow_type
@@ -461,147 +302,110 @@ class GoLoginSeleniumStartAction(BaseAction):
         self.set_variable(True)
         
 
-    def _start_parallel_gui_with_batches(self, profile_list, max_workers, flow_type):
+    def _start_parallel_gui_pipeline(self, profile_list, max_workers, flow_type):
         """
-        GUI mode: Batch processing with round-robin
-        This is EXTRACTED from existing _start_parallel() batch processing logic
+        GUI mode: sliding window (ProfilePipeline) với round-robin
+    
+        - Luôn giữ max_workers profile live, profile close xong → profile kế tiếp mở ngay
+        - OPEN: _open_single_profile_internal (API + Selenium), tối đa max_concurrent_launch
+        - RUN: chain round-robin trên thread hiện tại (1 chain / lượt / profile)
+        - CLOSE: GoLoginProfileHelper.cleanup_profiles chạy nền, không chặn runner
+        - Spawn/attach browser, chain và đóng browser dùng chung physical_lock
+          (download/extract profile của OPEN chạy ngoài lock)
         """
-        import threading
-    
-        # Divide into batches
-        batches = []
-        for i in range(0, len(profile_list), max_workers):
-            batch = profile_list[i:i + max_workers]
-            batches.append(batch)
+        # Launch pipeline của GoLoginAPI giới hạn số browser spawn cùng lúc
+        max_concurrent_launch = str(self.params.get("max_concurrent_launch", "")).strip()
+        if max_concurrent_launch.isdigit():
+            self.gologin_api.launcher.set_launch_concurrency(int(max_concurrent_launch))
+        open_workers = min(max_workers, self.gologin_api.launcher.launch_concurrency)
+    
+        keywords = self._build_flow_keywords() if flow_type != "None" else None
+        drivers = {}  # profile_id → driver (bring to front)
+        # Thao tác ảnh hưởng cửa sổ / focus (spawn browser, chain, đóng browser) dùng chung 1 lock;
+        # phần gọi API (proxy, fingerprint, chờ process thoát) chạy song song ngoài lock
+        physical_lock = threading.Lock()
+    
+        def open_profile(profile_id):
+            success, driver, debugger_address, error = self._open_single_profile_internal(
+                profile_id,
+                log_prefix="[PIPELINE]",
+                window_lock=physical_lock
+            )
+            if not success:
+                print(f"[PIPELINE][{profile_id}] ✗ Failed to open: {error}")
+                return None
+            print(f"[PIPELINE][{profile_id}] ✓ Opened successfully")
+            drivers[profile_id] = driver
+            return {
+                'driver': driver,
+                'debugger_address': debugger_address,
+                'profile_id': profile_id,
+                'status': 'opened'
+            }
     
-        print(f"\n[GUI MODE] Divided into {len(batches)} batch(es)")
+        def start_flow(profile_id, context, live_profiles):
+            if flow_type == "None":
+                print(f"[PIPELINE][{profile_id}] Action type is 'None', profile will be kept running...")
+                context['keep_open'] = True
+                return None
+            return self._create_flow_iterator(
+                profile_id,
+                context['driver'],
+                context['debugger_address'],
+                keywords,
+                flow_type,
+                log_prefix=f"[PIPELINE][{profile_id}]"
+            )
     
-        total_success = 0
-        total_failed = 0
+        def run_chain(profile_id, flow):
+            log_prefix = f"[PIPELINE][{profile_id}]"
+            progress = flow.get_progress()
+            print(f"{log_prefix} Progress: {progress['current']}/{progress['total']} chains "
+                  f"({progress['percentage']:.1f}%)")
     
-        # ========== PROCESS EACH BATCH ==========
-        for batch_num, batch_profiles in enumerate(batches, 1):
-            print(f"\n{'='*70}")
-            print(f"[BATCH {batch_num}] ========== PROCESSING BATCH {batch_num}/{len(batches)} ==========")
-            print(f"[BATCH {batch_num}] Profiles in this batch: {len(batch_profiles)}")
-            print(f"{'='*70}")
-        
-            # ===== PHASE 1: OPEN BATCH PROFILES IN PARALLEL =====
-            print(f"\n[BATCH {batch_num}] Phase 1: Opening {len(batch_profiles)} profile(s)...")
-        
-            opened_profiles = {}
-            failed_profiles = []
-            profile_lock = threading.Lock()
-        
-            def open_profile_worker(profile_id):
-                """Worker thread to open single profile"""
+            with physical_lock:
                 try:
-                    success, driver, debugger_address, error = self._open_single_profile_internal(
+                    GoLoginProfileHelper.bring_profile_to_front(
                         profile_id,
-                        log_prefix=f"[BATCH {batch_num}]"
+                        driver=drivers.get(profile_id),
+                        log_prefix=log_prefix
                     )
-                
-                    with profile_lock:
-                        if success:
-                            opened_profiles[profile_id] = {
-                                'driver': driver,
-                                'debugger_address': debugger_address,
-                                'profile_id': profile_id
-                            }
-                            print(f"[BATCH {batch_num}][{profile_id}] ✓ Opened successfully")
-                        else:
-                            failed_profiles.append(profile_id)
-                            print(f"[BATCH {batch_num}][{profile_id}] ✗ Failed to open: {error}")
-                        
                 except Exception as e:
-                    with profile_lock:
-                        failed_profiles.append(profile_id)
-                        print(f"[BATCH {batch_num}][{profile_id}] ✗ Exception: {e}")
-        
-            # Open profiles in parallel
-            with ThreadPoolExecutor(max_workers=max_workers) as executor:
-                futures = []
-                for i, profile_id in enumerate(batch_profiles):
-                    if i > 0:
-                        time.sleep(2)  # Stagger delay
-                    future = executor.submit(open_profile_worker, profile_id)
-                    futures.append(future)
-            
-                # Wait for all to complete
-                for future in futures:
-                    future.result()
-        
-            print(f"\n[BATCH {batch_num}] ✓ Opening phase completed:")
-            print(f"[BATCH {batch_num}]   - Opened: {len(opened_profiles)}")
-            print(f"[BATCH {batch_num}]   - Failed: {len(failed_profiles)}")
-        
-            if not opened_profiles:
-                print(f"[BATCH {batch_num}] ✗ No profiles opened, skipping execution...")
-                total_failed += len(failed_profiles)
-                continue
-        
-            # Prepare profile_data dict for execution
-            profile_data = {}
-            for profile_id, data in opened_profiles.items():
-                profile_data[profile_id] = {
-                    'driver': data['driver'],
-                    'debugger_address': data['debugger_address'],
-                    'profile_id': profile_id,
-                    'status': 'opened'
-                }
-        
-            # ===== PHASE 2: EXECUTE CHAINS (GUI ROUND-ROBIN MODE) =====
-            print(f"\n[BATCH {batch_num}] Phase 2: Executing chains (GUI round-robin mode)...")
-        
-            if flow_type == "None":
-                print(f"[BATCH {batch_num}] Action type is 'None', profiles will be kept running...")
-            else:
-                # Execute round-robin
-                self._execute_round_robin(
-                    profile_data=profile_data,
-                    batch_num=batch_num,
-                    flow_type=flow_type,
-                    max_parallel_profiles=max_workers
-                )
-        
-            # ===== PHASE 3: CLEANUP BATCH =====
-            print(f"\n[BATCH {batch_num}] Phase 3: Cleaning up {len(opened_profiles)} profile(s)...")
-        
+                    print(f"{log_prefix} ⚠ Could not bring to front: {e}")
+    
+                print(f"\n{log_prefix} >>> EXECUTING CHAIN (LOCKED) <<<")
+                success = flow.execute_next_chain()
+                print(f"{log_prefix} ✓ Chain executed successfully" if success else f"{log_prefix} ✗ Chain execution failed")
+                print(f"{log_prefix} >>> LOCK RELEASED <<<\n")
+            return success
+    
+        def close_profile(profile_id, context):
+            drivers.pop(profile_id, None)
+            if context.get('keep_open'):
+                return True
             cleanup_results = GoLoginProfileHelper.cleanup_profiles(
-                profile_data=profile_data,
+                profile_data={profile_id: context},
                 gologin_api=self.gologin_api,
-                log_prefix=f"[BATCH {batch_num}][CLEANUP]"
+                log_prefix="[PIPELINE][CLEANUP]",
+                window_lock=physical_lock
             )
-        
-            cleanup_success = sum(1 for r in cleanup_results.values() if r)
-            print(f"[BATCH {batch_num}][CLEANUP] ✓ Cleanup completed: {cleanup_success}/{len(cleanup_results)}")
-        
-            # ===== UPDATE STATISTICS =====
-            completed_profiles = [
-                pid for pid, data in profile_data.items()
-                if data.get('status') == 'completed'
-            ]
-            error_profiles = [
-                pid for pid, data in profile_data.items()
-                if data.get('status') == 'error'
-            ]
-        
-            total_success += len(completed_profiles)
-            total_failed += len(failed_profiles) + len(error_profiles)
-        
-            print(f"\n[BATCH {batch_num}] ========== BATCH {batch_num} SUMMARY ==========")
-            print(f"[BATCH {batch_num}] Total: {len(batch_profiles)}")
-            print(f"[BATCH {batch_num}] Success: {len(completed_profiles)}")
-            print(f"[BATCH {batch_num}] Failed: {len(failed_profiles) + len(error_profiles)}")
-            print(f"{'='*70}\n")
+            return bool(cleanup_results.get(profile_id))
+    
+        pipeline = ProfilePipeline(
+            window=max_workers,
+            open_workers=open_workers,
+            close_workers=max_workers,
+            log_prefix="[PIPELINE]"
+        )
+        results = pipeline.run(profile_list, open_profile, start_flow, run_chain, close_profile)
     
         # ===== OVERALL SUMMARY =====
+        statuses = list(results.values())
         print(f"\n{'='*80}")
         print(f"[GUI MODE] ========== OVERALL SUMMARY ==========")
-        print(f"[GUI MODE] Total batches: {len(batches)}")
         print(f"[GUI MODE] Total profiles: {len(profile_list)}")
-        print(f"[GUI MODE] Total success: {total_success}")
-        print(f"[GUI MODE] Total failed: {total_failed}")
+        print(f"[GUI MODE] Total success: {statuses.count('completed')}")
+        print(f"[GUI MODE] Total failed: {statuses.count('failed') + statuses.count('open_failed')}")
         print(f"{'='*80}")
 
 
@@ -620,6 +424,12 @@ class GoLoginSeleniumStartAction(BaseAction):
         print(f"\n[HEADLESS] Submitting ALL {len(profile_list)} profiles...")
         print(f"[HEADLESS] Max workers: {max_workers}")
         print(f"[HEADLESS] Flow type: {flow_type}")
+
+        # Launch pipeline của GoLoginAPI giới hạn số browser spawn cùng lúc (thay stagger sleep)
+        max_concurrent_launch = str(self.params.get("max_concurrent_launch", "")).strip()
+        if max_concurrent_launch.isdigit():
+            self.gologin_api.launcher.set_launch_concurrency(int(max_concurrent_launch))
+        print(f"[HEADLESS] Max concurrent launches: {self.gologin_api.launcher.launch_concurrency}")
     
         # Submit all profiles to thread pool
         executor = ThreadPoolExecutor(max_workers=max_workers)
@@ -627,11 +437,8 @@ class GoLoginSeleniumStartAction(BaseAction):
         try:
             future_to_profile = {}
         
-            # Submit ALL profiles at once (stagger delay)
+            # Submit ALL profiles at once - launcher tự xếp hàng download/spawn
             for i, profile_id in enumerate(profile_list):
-                if i > 0:
-                    time.sleep(2)  # Stagger delay
-            
                 # Each future executes: open → execute chains → cleanup
                 future = executor.submit(
                     self._execute_profile_full_lifecycle_headless,
@@ -737,13 +544,17 @@ class GoLoginSeleniumStartAction(BaseAction):
         # NOTE: Cleanup is handled in _execute_all_chains_for_profile's finally block
 
 
-    def _open_single_profile_internal(self, profile_id, log_prefix="[GOLOGIN START]"):
+    def _open_single_profile_internal(self, profile_id, log_prefix="[GOLOGIN START]", window_lock=None):
         """
         Internal method to open profile (proxy + fingerprint + start + connect + cleanup tabs)
     
         This is a SHARED method used by:
         - _start_single_profile() (Sequential mode)
         - open_profile_thread() in _start_parallel() (Parallel mode)
+
+        window_lock: lock thao tác vật lý dùng chung với runner (GUI pipeline) - giữ trong lúc
+        spawn browser, attach Selenium, set_window_size và dọn tab; proxy/fingerprint,
+        download/extract profile và stop khi lỗi chạy ngoài lock
     
         Returns:
             tuple: (success: bool, driver: WebDriver or None, debugger_address: str or None, error: str or None)
@@ -866,50 +677,56 @@ class GoLoginSeleniumStartAction(BaseAction):
                     "--gcm-channel-status-poll-interval-seconds=0",
                 ]
 
-            # Start profile with extra params
-            success, debugger_address = self.gologin_api.start_profile(profile_id, extra_params=extra_params)
+            # Download/extract profile chạy ngoài lock; chỉ bước spawn browser giữ window_lock
+            success, debugger_address = self.gologin_api.start_profile(
+                profile_id, extra_params=extra_params, spawn_lock=window_lock
+            )
             if not success:
                 print(f"{log_prefix}[{profile_id}] ✗ Failed to start profile: {debugger_address}")
                 return (False, None, None, debugger_address)
 
             print(f"{log_prefix}[{profile_id}] ✓ Profile started: {debugger_address}")
-        
-            # ========== CONNECT SELENIUM ==========
-            driver = GoLoginProfileHelper.connect_selenium(debugger_address, log_prefix)
-            if not driver:
-                print(f"{log_prefix}[{profile_id}] ✗ Failed to connect Selenium")
-                self.gologin_api.stop_profile(profile_id)
-                return (False, None, debugger_address, 'Selenium connection failed')
-        
-            # ========== REGISTER DRIVER ==========
-            register_selenium_driver(driver, profile_id)
-            
 
-            # ========== FIX: SET WINDOW SIZE VIA SELENIUM (Chrome Headless Bug Workaround) ==========
-            if resolution_str:
-                width, height = resolution_str.split('x')            
-                # Set via Selenium API (works around Chrome 128+ bug)
-                driver.set_window_size(int(width), int(height))
-                time.sleep(0.5)  # Wait for resize
-            
-                # Verify
-                actual_size = driver.get_window_size()
-                print(f"{log_prefix}[{profile_id}] ✓ Window size set via Selenium: "
-                        f"{actual_size['width']}x{actual_size['height']}")
+            # Attach Selenium + resize + dọn tab đổi focus / cửa sổ → cùng lock với chain
+            error = None
+            with window_lock or contextlib.nullcontext():
+                # ========== CONNECT SELENIUM ==========
+                driver = GoLoginProfileHelper.connect_selenium(debugger_address, log_prefix)
+                if not driver:
+                    print(f"{log_prefix}[{profile_id}] ✗ Failed to connect Selenium")
+                    error = 'Selenium connection failed'
+                else:
+                    # ========== REGISTER DRIVER ==========
+                    register_selenium_driver(driver, profile_id)
 
-            # ========== CHECK AND FIX CRASHED TABS FIRST ==========
-            if not GoLoginProfileHelper.check_and_fix_crashed_tabs(driver, debugger_address, log_prefix, use_window_lock=False):
-                print(f"{log_prefix}[{profile_id}] ✗ Could not fix crashed tabs")
-                driver.quit()
-                self.gologin_api.stop_profile(profile_id)
-                return (False, None, debugger_address, 'Crashed tabs cannot be fixed')
+                    # ========== FIX: SET WINDOW SIZE VIA SELENIUM (Chrome Headless Bug Workaround) ==========
+                    if resolution_str:
+                        width, height = resolution_str.split('x')
+                        # Set via Selenium API (works around Chrome 128+ bug)
+                        driver.set_window_size(int(width), int(height))
+                        time.sleep(0.5)  # Wait for resize
 
-            # ========== CLEANUP TABS ==========
-            print(f"{log_prefix}[{profile_id}] Cleaning up browser tabs...")
-            GoLoginProfileHelper.cleanup_browser_tabs(driver, log_prefix)
-            time.sleep(1)
+                        # Verify
+                        actual_size = driver.get_window_size()
+                        print(f"{log_prefix}[{profile_id}] ✓ Window size set via Selenium: "
+                                f"{actual_size['width']}x{actual_size['height']}")
+
+                    # ========== CHECK AND FIX CRASHED TABS FIRST ==========
+                    if not GoLoginProfileHelper.check_and_fix_crashed_tabs(driver, debugger_address, log_prefix, use_window_lock=False):
+                        print(f"{log_prefix}[{profile_id}] ✗ Could not fix crashed tabs")
+                        driver.quit()
+                        error = 'Crashed tabs cannot be fixed'
+                    else:
+                        # ========== CLEANUP TABS ==========
+                        print(f"{log_prefix}[{profile_id}] Cleaning up browser tabs...")
+                        GoLoginProfileHelper.cleanup_browser_tabs(driver, log_prefix)
+                        time.sleep(1)
+
+            # Stop profile (upload + teardown) ngoài lock
+            if error:
+                self.gologin_api.stop_profile(profile_id)
+                return (False, None, debugger_address, error)
 
-        
             print(f"{log_prefix}[{profile_id}] ✓ Profile opened successfully")
             return (True, driver, debugger_address, None)
         
@@ -4,6 +4,11 @@ from constants import ActionType
 import uuid
 
 class IfConditionAction(BaseAction):
+    def reset_execution_state(self):
+        """Xóa các vùng nested IF đã xử lý của lần chạy trước"""
+        super().reset_execution_state()
+        self._handled_ranges = []
+
     def prepare_play(self):
         """Xử lý điều kiện IF - Thực thi IF block khi đúng, xử lý ELSE_IF khi sai"""
         # Tạo ID duy nhất cho IF này
@@ -179,8 +184,7 @@ class IfConditionAction(BaseAction):
         
         if handler:
             # Thiết lập action frame
-            action_frame = next((f for f in self.view.action_frames 
-                                if f.action.id == action.id), None)
+            action_frame = self.find_action_frame(action)
             if action_frame:
                 handler.action_frame = action_frame
             handler.play()
@@ -195,8 +199,7 @@ class IfConditionAction(BaseAction):
         )
     
         if nested_handler:
-            action_frame = next((f for f in self.view.action_frames 
-                                if f.action.id == nested_if_action.id), None)
+            action_frame = self.find_action_frame(nested_if_action)
             if action_frame:
                 nested_handler.action_frame = action_frame
         
@@ -208,32 +211,15 @@ class IfConditionAction(BaseAction):
 
     def _skip_actions_handled_by_nested_if(self, nested_if_index):
         """Đánh dấu các action đã được nested IF xử lý để parent IF bỏ qua"""
-        all_actions = self.model.get_all_actions()
-    
-        # Tìm END_IF tương ứng với nested IF
-        i = nested_if_index + 1
-        nesting_level = 0
-    
-        while i < len(all_actions):
-            action = all_actions[i]
-        
-            if action.action_type == ActionType.IF_CONDITION:
-                nesting_level += 1
-            elif action.action_type == ActionType.END_IF_CONDITION:
-                if nesting_level == 0:
-                    # Đánh dấu vùng từ nested_if_index đến i đã được xử lý
-                    if not hasattr(self, '_handled_ranges'):
-                        self._handled_ranges = []
-                    self._handled_ranges.append((nested_if_index, i))
-                    break
-                nesting_level -= 1
-        
-            i += 1
+        # END_IF tương ứng với nested IF lấy từ bảng nhảy đã biên dịch
+        end_if_index = self.model.get_program().end_if.get(nested_if_index, -1)
+        if end_if_index != -1:
+            # Đánh dấu vùng từ nested_if_index đến end_if_index đã được xử lý
+            if not hasattr(self, '_handled_ranges'):
+                self._handled_ranges = []
+            self._handled_ranges.append((nested_if_index, end_if_index))
 
 
     def _find_current_index(self, all_actions):
         """Tìm index của IF hiện tại"""
-        for i, action in enumerate(all_actions):
-            if action.id == self.action.id:
-                return i
-        return -1
+        return self.model.get_program().find_index(self.action.id)
@@ -1,6 +1,6 @@
 ﻿from controllers.actions.base_action import BaseAction
 from models.global_variables import GlobalVariables
-from models.image_search import ImageSearcher
+from models.image_search import ImageSearcher, SEARCH_MODE_COLOR
 import os
 
 class ImageSearchAction(BaseAction):
@@ -14,6 +14,7 @@ class ImageSearchAction(BaseAction):
         region = self.get_region()
         x, y, width, height = region
         accuracy = int(self.params.get("accuracy", 80))
+        search_mode = self.params.get("search_mode", SEARCH_MODE_COLOR) or SEARCH_MODE_COLOR
         
         # Kiểm tra nếu không có đường dẫn hình ảnh hoặc file không tồn tại
         if not image_path or not os.path.exists(image_path):
@@ -33,7 +34,7 @@ class ImageSearchAction(BaseAction):
         try:
             
             # Tạo instance của ImageSearcher
-            image_searcher = ImageSearcher(image_path, region, accuracy)
+            image_searcher = ImageSearcher(image_path, region, accuracy, search_mode=search_mode)
             
             # Thực hiện tìm kiếm
             found, result = image_searcher.search()
@@ -6,12 +6,16 @@ import time
 import cv2
 import numpy as np
 from PIL import ImageGrab
+from models.motion_detector import MotionSampler, COMPARE_MODE_PAIR, COMPARE_MODE_SAMPLING, SAMPLE_FPS
 import os
 import tempfile
 
 class ImageSearchLiveAction(BaseAction):
     """Handler để so sánh 2 screenshots để phát hiện thay đổi (video play/pause)"""
     
+    # Chuỗi (elapsed_s, similarity_pct) của lần lấy mẫu gần nhất (chế độ sampling)
+    motion_series = ()
+    
     def prepare_play(self):
         """Thực hiện so sánh 2 screenshots sau khi trì hoãn"""
         
@@ -29,25 +33,35 @@ class ImageSearchLiveAction(BaseAction):
             if x > 0 or y > 0 or width > 0 or height > 0:
                 screenshot_region = (int(x), int(y), int(width), int(height))
             
-            print(f"[IMAGE_SEARCH_LIVE] Taking first screenshot... Region: {screenshot_region}")
-            
-            # Screenshot 1
-            screenshot1 = self.take_screenshot(screenshot_region)
-            
-            # Delay
-            print(f"[IMAGE_SEARCH_LIVE] Waiting {compare_delay} seconds...")
-            time.sleep(compare_delay)
+            compare_mode = self.params.get("compare_mode", COMPARE_MODE_PAIR) or COMPARE_MODE_PAIR
             
-            # Screenshot 2
-            print(f"[IMAGE_SEARCH_LIVE] Taking second screenshot...")
-            screenshot2 = self.take_screenshot(screenshot_region)
-            
-            # So sánh 2 screenshots
-            is_similar, similarity_score = self.compare_screenshots(
-                screenshot1, 
-                screenshot2, 
-                similarity_threshold
-            )
+            if compare_mode == COMPARE_MODE_SAMPLING:
+                # Lấy mẫu frame nhỏ liên tục, compare_delay chỉ là giới hạn trên
+                is_similar, similarity_score = self.sample_motion(
+                    screenshot_region,
+                    similarity_threshold,
+                    compare_delay
+                )
+            else:
+                print(f"[IMAGE_SEARCH_LIVE] Taking first screenshot... Region: {screenshot_region}")
+                
+                # Screenshot 1
+                screenshot1 = self.take_screenshot(screenshot_region)
+                
+                # Delay
+                print(f"[IMAGE_SEARCH_LIVE] Waiting {compare_delay} seconds...")
+                time.sleep(compare_delay)
+                
+                # Screenshot 2
+                print(f"[IMAGE_SEARCH_LIVE] Taking second screenshot...")
+                screenshot2 = self.take_screenshot(screenshot_region)
+                
+                # So sánh 2 screenshots
+                is_similar, similarity_score = self.compare_screenshots(
+                    screenshot1, 
+                    screenshot2, 
+                    similarity_threshold
+                )
             
             print(f"[IMAGE_SEARCH_LIVE] Similarity: {similarity_score:.2f}% | Threshold: {similarity_threshold}%")
             print(f"[IMAGE_SEARCH_LIVE] Result: {'SIMILAR (pause)' if is_similar else 'DIFFERENT (playing)'}")
@@ -97,6 +111,27 @@ class ImageSearchLiveAction(BaseAction):
             if variable:
                 GlobalVariables().set(variable, "false")
     
+    def sample_motion(self, region, threshold, max_seconds):
+        """
+        Chế độ sampling: MotionSampler lấy mẫu frame thu nhỏ và dừng sớm
+        
+        Returns:
+            tuple: (is_similar: bool, similarity_score: float)
+        """
+        try:
+            fps = float(self.params.get("sample_fps", SAMPLE_FPS) or SAMPLE_FPS)
+        except (TypeError, ValueError):
+            fps = SAMPLE_FPS
+        
+        sampler = MotionSampler(region, threshold, max_seconds, fps)
+        print(f"[IMAGE_SEARCH_LIVE] Sampling {fps:g} fps, max {max_seconds}s... Region: {region}")
+        is_similar, similarity_score = sampler.run(should_stop=self.should_stop)
+        
+        self.motion_series = sampler.motion_series
+        print(f"[IMAGE_SEARCH_LIVE] {sampler.decision_reason} | rolling motion: {sampler.motion_score:.2f}%")
+        print(f"[IMAGE_SEARCH_LIVE] Motion series (s, similarity%): {self.motion_series}")
+        return is_similar, similarity_score
+    
     def take_screenshot(self, region=None):
         """
         Chụp screenshot và return numpy array
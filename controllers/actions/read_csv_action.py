@@ -2,9 +2,10 @@
 
 from controllers.actions.base_action import BaseAction
 from models.global_variables import GlobalVariables
+from models.row_index import get_row_index_cache
+from models.streaming_writer import get_streaming_writer
 import random
 import os
-import csv
 
 class ReadCsvAction(BaseAction):
     """Handler for read CSV/Excel file action."""
@@ -26,7 +27,7 @@ class ReadCsvAction(BaseAction):
             print(f"[READ_CSV] Error: File not found: {file_path}")
             return
         
-        # Read file based on extension
+        # Read file based on extension (index cache theo path + mtime, không parse lại toàn file)
         try:
             rows = self._read_file(file_path)
         except Exception as e:
@@ -38,16 +39,19 @@ class ReadCsvAction(BaseAction):
             return
         
         # Skip header if specified
+        first_row = 0
+        row_count = len(rows)
         skip_header = self.params.get("skip_header", False)
-        if skip_header and len(rows) > 1:
-            rows = rows[1:]
-            print(f"[READ_CSV] Skipped header row, {len(rows)} data rows remaining")
+        if skip_header and row_count > 1:
+            first_row = 1
+            row_count -= 1
+            print(f"[READ_CSV] Skipped header row, {row_count} data rows remaining")
         
         # Get how_to_get method
         how_to_get = self.params.get("how_to_get", "Random")
         
         # Select row based on method
-        selected_row = self._select_row(rows, how_to_get)
+        selected_row = rows.row(first_row + self._select_row_index(row_count, how_to_get))
         
         print(f"[READ_CSV] Selected row: {selected_row}")
         
@@ -57,41 +61,27 @@ class ReadCsvAction(BaseAction):
             self._assign_variables(selected_row, variables_str)
     
     def _read_file(self, file_path):
-        """Read CSV or Excel file and return rows"""
+        """
+        Return row index of CSV or Excel file (len() + row(i), O(1) per row)
+        Excel sheet chỉ được chuyển đổi một lần cho mỗi mtime
+        """
         ext = os.path.splitext(file_path)[1].lower()
         
+        # Dòng Write CSV đang buffer phải xuống file trước khi index
+        get_streaming_writer().flush(file_path)
+        
         if ext == '.csv':
-            return self._read_csv(file_path)
+            return get_row_index_cache().get(file_path, 'csv')
         elif ext in ['.xlsx', '.xls']:
             return self._read_excel(file_path)
         else:
             print(f"[READ_CSV] Warning: Unknown file type {ext}, trying CSV format...")
-            return self._read_csv(file_path)
-    
-    def _read_csv(self, file_path):
-        """Read CSV file"""
-        rows = []
-        with open(file_path, 'r', encoding='utf-8-sig') as f:
-            reader = csv.reader(f)
-            for row in reader:
-                if row:
-                    rows.append(row)
-        return rows
+            return get_row_index_cache().get(file_path, 'csv')
     
     def _read_excel(self, file_path):
         """Read Excel file"""
         try:
-            import openpyxl
-            workbook = openpyxl.load_workbook(file_path, data_only=True)
-            sheet = workbook.active
-            
-            rows = []
-            for row in sheet.iter_rows(values_only=True):
-                if any(cell is not None for cell in row):
-                    row_data = [str(cell) if cell is not None else "" for cell in row]
-                    rows.append(row_data)
-            
-            return rows
+            return get_row_index_cache().get(file_path, 'excel')
         except ImportError:
             print("[READ_CSV] Error: openpyxl not installed. Install with: pip install openpyxl")
             return []
@@ -99,19 +89,18 @@ class ReadCsvAction(BaseAction):
             print(f"[READ_CSV] Error reading Excel file: {e}")
             return []
     
-    def _select_row(self, rows, how_to_get):
-        """Select row based on how_to_get method"""
+    def _select_row_index(self, row_count, how_to_get):
+        """Select row index based on how_to_get method"""
         if how_to_get == "Random":
-            return random.choice(rows)
+            return random.randrange(row_count)
         elif how_to_get == "Sequential by loop":        
             loop_index = GlobalVariables().get("loop_index", "0")
             try:             
-                index = int(loop_index) % len(rows)
-                return rows[index]
+                return int(loop_index) % row_count
             except:
-                return rows[0]
+                return 0
         else:
-            return rows[0]
+            return 0
     
     def _assign_variables(self, row, variables_str):
         """
@@ -1,5 +1,7 @@
 ﻿from controllers.actions.base_action import BaseAction
 from models.global_variables import GlobalVariables
+from models.row_index import get_row_index_cache
+from models.streaming_writer import get_streaming_writer
 import pyautogui
 import pyperclip
 import random
@@ -28,15 +30,15 @@ class ReadTxtAction(BaseAction):
             print(f"[READ_TXT] Error: File not found: {file_path}")
             return
         
-        # Read all lines from file
+        # Index các dòng không rỗng (cache theo path + mtime, mmap - không đọc lại toàn file)
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                lines = [line.strip() for line in f.readlines() if line.strip()]
+            get_streaming_writer().flush(file_path)
+            lines = get_row_index_cache().get(file_path, 'txt')
         except Exception as e:
             print(f"[READ_TXT] Error reading file: {e}")
             return
         
-        if not lines:
+        if not len(lines):
             print("[READ_TXT] Error: File is empty or contains no valid lines")
             return
         
@@ -44,7 +46,7 @@ class ReadTxtAction(BaseAction):
         how_to_get = self.params.get("how_to_get", "Random")
         
         # Select line based on method
-        selected_line = self._select_line(lines, how_to_get)
+        selected_line = lines.row(self._select_line_index(len(lines), how_to_get))
         
         # Process special formats (same as Input Text)
         processed_text = self._process_text(selected_line)
@@ -62,10 +64,10 @@ class ReadTxtAction(BaseAction):
         how_to_input = self.params.get("how_to_input", "Random")
         self._input_text(processed_text, how_to_input)
     
-    def _select_line(self, lines, how_to_get):
-        """Select line based on how_to_get method"""
+    def _select_line_index(self, line_count, how_to_get):
+        """Select line index based on how_to_get method"""
         if how_to_get == "Random":
-            return random.choice(lines)
+            return random.randrange(line_count)
         elif how_to_get == "Sequential by loop":
             # Get loop index from global variables
             globals_var = GlobalVariables()
@@ -73,14 +75,13 @@ class ReadTxtAction(BaseAction):
             try:
                 loop_index = int(loop_index_str)
                 # Use modulo to loop through lines (1-based index)
-                index = loop_index % len(lines)
-                return lines[index]
+                return loop_index % line_count
             except:
                 # Fallback to first line
-                return lines[0]
+                return 0
         else:
             # Default: first line
-            return lines[0]
+            return 0
     
     def _process_text(self, text):
         """Process special text formats (same as Input Text action)"""
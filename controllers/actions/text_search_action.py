@@ -44,11 +44,14 @@ class TextSearchAction(BaseAction):
             
             texts_to_search = selected_texts if isinstance(selected_texts, list) else [selected_texts]
             
+            # Chỉ OCR lại các dải màn hình đã thay đổi (OCR cache dùng chung giữa các text)
+            incremental = bool(self.params.get("incremental_ocr", False))
+            
             for text in texts_to_search:
                 # Xử lý pattern đặc biệt trước khi search
                 processed_text = self.process_text_pattern(text)
                 
-                text_searcher = TextSearcher(processed_text, search_region)
+                text_searcher = TextSearcher(processed_text, search_region, incremental=incremental)
                 found, result = text_searcher.search()
                 
                 if found and result:
@@ -2,11 +2,11 @@
 
 from controllers.actions.base_action import BaseAction
 from models.global_variables import GlobalVariables
+from models.streaming_writer import get_streaming_writer, buffer_options
 import os
 import re
 import random
 import string
-import csv
 
 try:
     from openpyxl import load_workbook, Workbook
@@ -82,42 +82,15 @@ class WriteCsvAction(BaseAction):
     def _write_to_csv(self, file_path, processed_items):
         """Write to CSV file"""
         try:
-            # Đọc tất cả rows hiện tại
-            existing_rows = []
-            
-            try:
-                with open(file_path, 'r', encoding='utf-8', newline='') as f:
-                    reader = csv.reader(f)
-                    existing_rows = list(reader)
-            except Exception as e:
-                print(f"[WRITE_CSV] Could not read CSV file (may be empty): {e}")
-                existing_rows = []
-            
-            # ✅ XÓA CÁC ROW HOÀN TOÀN RỖNG Ở CUỐI
-            while existing_rows and all(cell.strip() == '' for cell in existing_rows[-1]):
-                existing_rows.pop()
-                print(f"[WRITE_CSV] Removed empty row at end")
-            
-            # ✅ ĐẢM BẢO SỐ COLUMNS KHỚP
-            if existing_rows:
-                max_cols = max(len(row) for row in existing_rows)
-                
-                if len(processed_items) < max_cols:
-                    processed_items.extend([''] * (max_cols - len(processed_items)))
-                
-                for row in existing_rows:
-                    if len(row) < max(max_cols, len(processed_items)):
-                        row.extend([''] * (max(max_cols, len(processed_items)) - len(row)))
-            
-            # ✅ THÊM ROW MỚI
-            existing_rows.append(processed_items)
-            
-            # ✅ GHI LẠI TOÀN BỘ FILE
-            with open(file_path, 'w', encoding='utf-8', newline='') as f:
-                writer = csv.writer(f)
-                writer.writerows(existing_rows)
-            
-            print(f"[WRITE_CSV] Successfully wrote {len(processed_items)} column(s) to row {len(existing_rows)} in: {file_path}")
+            # ✅ APPEND: số cột được cache, chỉ normalize toàn file khi schema đổi
+            # (dòng rỗng ở cuối bị bỏ, mọi dòng được pad đủ số cột như trước)
+            row_number = get_streaming_writer().append_csv_row(
+                file_path,
+                processed_items,
+                **buffer_options(self.params)
+            )
+            
+            print(f"[WRITE_CSV] Successfully wrote {len(processed_items)} column(s) to row {row_number} in: {file_path}")
             for idx, content in enumerate(processed_items, 1):
                 print(f"[WRITE_CSV]   Column {idx}: {content}")
             
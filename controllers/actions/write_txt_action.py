@@ -2,6 +2,7 @@
 
 from controllers.actions.base_action import BaseAction
 from models.global_variables import GlobalVariables
+from models.streaming_writer import get_streaming_writer, buffer_options
 import os
 import re
 import random
@@ -58,29 +59,14 @@ class WriteTxtAction(BaseAction):
             processed_text = self._process_text(item)
             processed_items.append(processed_text)
     
-        # ✅ WRITE ALL: Ghi với logic xuống dòng thông minh
+        # ✅ WRITE ALL: Append với logic xuống dòng thông minh
+        # (xóa dòng trắng cuối file, cách content cũ 1 xuống dòng) - không đọc/ghi lại toàn file
         try:
-            # Đọc content hiện tại
-            with open(final_path, 'r', encoding='utf-8') as f:
-                existing_content = f.read()
-        
-            # Xử lý content hiện tại: xóa dòng trắng cuối
-            if existing_content:
-                existing_content = existing_content.rstrip('\n')
-            
-                # Nếu còn content, thêm 1 xuống dòng để cách content mới
-                if existing_content:
-                    existing_content += '\n'
-        
-            # Tạo nội dung mới (các items cách nhau bởi \n)
-            new_content = '\n'.join(processed_items)
-        
-            # Gộp content cũ + content mới
-            final_content = existing_content + new_content
-        
-            # Ghi đè toàn bộ file
-            with open(final_path, 'w', encoding='utf-8') as f:
-                f.write(final_content)
+            get_streaming_writer().append_txt_lines(
+                final_path,
+                processed_items,
+                **buffer_options(self.params)
+            )
         
             print(f"[WRITE_TXT] Successfully wrote {len(processed_items)} line(s) to: {final_path}")
             for idx, content in enumerate(processed_items, 1):
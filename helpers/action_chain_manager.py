@@ -8,12 +8,15 @@ FEATURES:
 2. Profile health monitoring during chain execution
 3. Force release lock when profile closes/crashes
 4. Smart waiting with bring-to-front for next profile
+5. Fair handoff: waiter xếp hàng, release trao lock ngay cho waiter kế tiếp
+   (chain ngắn được ưu tiên, có aging chống starve) + histogram wait/hold
 
 WORKFLOW:
 - Profile A: acquire lock → start monitor → execute chain → release lock → stop monitor
 - Profile B: wait for lock → (if A closes → A force releases) → bring to front → acquire lock → execute
 """
 
+import itertools
 import threading
 import time
 import random
@@ -21,6 +24,141 @@ import random
 # Import health monitor
 from helpers.profile_health_monitor import get_health_monitor
 
+LOCK_WAIT_TIMEOUT = 300          # Safety timeout chờ lock (5 phút)
+LOCK_LOG_INTERVAL = 5            # Log trạng thái chờ mỗi N giây
+PRIORITY_AGING = 1.0             # Mỗi giây chờ bù 1 giây "độ dài chain dự kiến"
+STARVATION_SECONDS = 120         # Chờ quá ngần này → ưu tiên tuyệt đối (FIFO)
+CHAIN_DURATION_EMA = 0.3         # Hệ số EMA thời gian giữ lock theo chain function
+LOCK_HISTOGRAM_BUCKETS = (0.1, 0.5, 1, 2, 5, 10, 30, 60, 120, 300)
+
+
+class _LockHistogram:
+    """Histogram thời gian (giây) theo LOCK_HISTOGRAM_BUCKETS, bucket cuối = vượt mọi ngưỡng"""
+
+    def __init__(self):
+        self.counts = [0] * (len(LOCK_HISTOGRAM_BUCKETS) + 1)
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        index = len(LOCK_HISTOGRAM_BUCKETS)
+        for i, bound in enumerate(LOCK_HISTOGRAM_BUCKETS):
+            if seconds <= bound:
+                index = i
+                break
+        self.counts[index] += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def snapshot(self):
+        count = sum(self.counts)
+        labels = [f"<={bound}s" for bound in LOCK_HISTOGRAM_BUCKETS] + [f">{LOCK_HISTOGRAM_BUCKETS[-1]}s"]
+        return {
+            'count': count,
+            'avg_s': round(self.total / count, 3) if count else 0.0,
+            'max_s': round(self.max, 3),
+            'buckets': dict(zip(labels, self.counts)),
+        }
+
+
+class _Waiter:
+    __slots__ = ("profile_id", "expected_hold", "enqueued_at", "seq", "granted")
+
+    def __init__(self, profile_id, expected_hold, seq):
+        self.profile_id = profile_id
+        self.expected_hold = expected_hold
+        self.enqueued_at = time.monotonic()
+        self.seq = seq
+        self.granted = False
+
+
+class PhysicalActionQueue:
+    """
+    Lock chuột/bàn phím có hàng đợi: release() trao lock TRỰC TIẾP cho waiter kế tiếp
+    (Condition.notify) thay vì để các thread poll 0.5s rồi tranh nhau
+
+    Thứ tự trao lock:
+    1. Waiter đã chờ > STARVATION_SECONDS, theo FIFO
+    2. Còn lại: điểm = expected_hold - PRIORITY_AGING * waited nhỏ nhất
+       (chain ngắn được ưu tiên, chờ càng lâu càng được đẩy lên), hòa → FIFO
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._holder = None
+        self._acquired_at = None
+        self._waiters = []
+        self._seq = itertools.count()
+        self.wait_histogram = _LockHistogram()
+        self.hold_histogram = _LockHistogram()
+
+    def acquire(self, profile_id, expected_hold=0.0, timeout=LOCK_WAIT_TIMEOUT, log_prefix="[ACTION CHAIN]"):
+        """Block tới khi được trao lock; False nếu quá timeout"""
+        with self._cond:
+            waiter = _Waiter(profile_id, expected_hold, next(self._seq))
+            if self._holder is None and not self._waiters:
+                self._grant(waiter)
+                return True
+
+            self._waiters.append(waiter)
+            deadline = waiter.enqueued_at + timeout
+            next_log = waiter.enqueued_at + LOCK_LOG_INTERVAL
+            while not waiter.granted:
+                now = time.monotonic()
+                if now >= deadline:
+                    self._waiters.remove(waiter)
+                    print(f"{log_prefix} ✗ TIMEOUT waiting for lock after {now - waiter.enqueued_at:.1f}s")
+                    return False
+                self._cond.wait(min(next_log, deadline) - now)
+                if not waiter.granted and time.monotonic() >= next_log:
+                    next_log += LOCK_LOG_INTERVAL
+                    position = sorted(self._waiters, key=self._score).index(waiter) + 1
+                    print(f"{log_prefix} ⏳ Waiting for lock... (waited {time.monotonic() - waiter.enqueued_at:.1f}s, "
+                          f"current holder: {self._holder}, queue position: {position}/{len(self._waiters)})")
+            return True
+
+    def release(self, profile_id):
+        """Trả lock của profile_id; trao cho waiter kế tiếp. False nếu profile_id không giữ lock"""
+        with self._cond:
+            if self._holder != profile_id:
+                return False
+            self.hold_histogram.add(time.monotonic() - self._acquired_at)
+            self._holder = None
+            self._acquired_at = None
+            if self._waiters:
+                waiter = min(self._waiters, key=self._score)
+                self._waiters.remove(waiter)
+                self._grant(waiter)
+                self._cond.notify_all()
+            return True
+
+    def locked(self):
+        with self._cond:
+            return self._holder is not None
+
+    def is_idle(self):
+        with self._cond:
+            return self._holder is None and not self._waiters
+
+    def waiting_count(self):
+        with self._cond:
+            return len(self._waiters)
+
+    def _grant(self, waiter):
+        now = time.monotonic()
+        self.wait_histogram.add(now - waiter.enqueued_at)
+        waiter.granted = True
+        self._holder = waiter.profile_id
+        self._acquired_at = now
+
+    @staticmethod
+    def _score(waiter):
+        waited = time.monotonic() - waiter.enqueued_at
+        if waited > STARVATION_SECONDS:
+            return (0, waiter.seq)
+        return (1, waiter.expected_hold - PRIORITY_AGING * waited, waiter.seq)
+
+
 class ActionChainManager:
     """
     Manages action chains with global lock to prevent profile interference
@@ -34,7 +172,11 @@ class ActionChainManager:
     
     # ==================== GLOBAL LOCK ====================
     # This lock ensures only ONE profile can perform physical actions (mouse/keyboard) at a time
-    physical_action_lock = threading.Lock()
+    physical_action_lock = PhysicalActionQueue()
+    
+    # Thời gian giữ lock trung bình (EMA, giây) theo chain function → ưu tiên chain ngắn
+    chain_durations = {}
+    durations_lock = threading.Lock()
     
     # ==================== PROFILE TRACKING ====================
     active_profile = None  # Currently executing profile ID
@@ -73,28 +215,20 @@ class ActionChainManager:
         print(f"{log_prefix} REQUESTING ACTION LOCK")
         print(f"{log_prefix} ========================================")
     
+        chain_key = getattr(chain_function, '__qualname__', repr(chain_function))
+        
         try:
-            # ========== STEP 1: ACQUIRE LOCK (BLOCKING) ==========
+            # ========== STEP 1: ACQUIRE LOCK (BLOCKING, QUEUED) ==========
             wait_start = time.time()
+            expected_hold = ActionChainManager._expected_hold(chain_key)
         
-            while not manager.acquire_lock(profile_id):
-                elapsed = time.time() - wait_start
-            
-                # Log mỗi 5 giây
-                if int(elapsed) % 5 == 0 and elapsed > 0:
-                    current_holder = manager.current_lock_holder
-                    print(f"{log_prefix} ⏳ Waiting for lock... (waited {elapsed:.1f}s, current holder: {current_holder})")
-            
-                time.sleep(0.5)
-            
-                # Safety timeout (5 phút)
-                if elapsed > 300:
-                    print(f"{log_prefix} ✗ TIMEOUT waiting for lock after {elapsed:.1f}s")
-                    return False
+            if not manager.acquire_lock(profile_id, expected_hold=expected_hold, log_prefix=log_prefix):
+                return False
         
             lock_acquired = True
-            wait_time = time.time() - wait_start
-            print(f"{log_prefix} ✓ LOCK ACQUIRED (waited {wait_time:.1f}s)")
+            hold_start = time.time()
+            wait_time = hold_start - wait_start
+            print(f"{log_prefix} ✓ LOCK ACQUIRED (waited {wait_time:.1f}s, expected hold {expected_hold:.1f}s)")
         
             # ========== STEP 2: START HEALTH MONITORING ==========
             health_monitor = get_health_monitor()
@@ -194,11 +328,16 @@ class ActionChainManager:
         
             # Release lock
             if lock_acquired:
+                ActionChainManager._record_hold(chain_key, time.time() - hold_start)
                 try:
                     manager.release_lock(profile_id)
                     print(f"{log_prefix} ✓ LOCK RELEASED")
                 except Exception as e:
                     print(f"{log_prefix} ✗ Error releasing lock: {e}")
+            
+                # Hết profile chờ → in histogram wait/hold của đợt vừa xong
+                if ActionChainManager.physical_action_lock.is_idle():
+                    ActionChainManager.print_lock_stats()
         
             print(f"{log_prefix} ========================================\n")
 
@@ -206,34 +345,33 @@ class ActionChainManager:
     
     # ==================== LOCK MANAGEMENT METHODS ====================
 
-    def acquire_lock(self, profile_id):
+    def acquire_lock(self, profile_id, expected_hold=0.0, timeout=LOCK_WAIT_TIMEOUT, log_prefix="[ACTION CHAIN]"):
         """
-        Acquire physical action lock
+        Acquire physical action lock (BLOCKING - xếp hàng trong PhysicalActionQueue)
     
         Args:
             profile_id: Profile ID requesting lock
+            expected_hold: Thời gian giữ lock dự kiến (giây) - nhỏ hơn được ưu tiên
+            timeout: Thời gian chờ tối đa (giây)
     
         Returns:
-            bool: True nếu acquire thành công, False nếu lock đang bị giữ
+            bool: True nếu được trao lock, False nếu quá timeout
         """
-        # Try to acquire lock (non-blocking)
-        acquired = ActionChainManager.physical_action_lock.acquire(blocking=False)
+        if not ActionChainManager.physical_action_lock.acquire(profile_id, expected_hold, timeout, log_prefix):
+            return False
     
-        if acquired:
-            # Update tracking
-            ActionChainManager.active_profile = profile_id
-            ActionChainManager.lock_start_time = time.time()
-        
-            with ActionChainManager.holder_lock:
-                ActionChainManager.current_holder = profile_id
-        
-            return True
+        # Update tracking
+        ActionChainManager.active_profile = profile_id
+        ActionChainManager.lock_start_time = time.time()
     
-        return False
+        with ActionChainManager.holder_lock:
+            ActionChainManager.current_holder = profile_id
+    
+        return True
 
     def release_lock(self, profile_id):
         """
-        Release physical action lock
+        Release physical action lock (trao ngay cho waiter kế tiếp)
     
         Args:
             profile_id: Profile ID releasing lock
@@ -247,12 +385,12 @@ class ActionChainManager:
             
                 ActionChainManager.current_holder = None
         
-            # Clear tracking
-            ActionChainManager.active_profile = None
-            ActionChainManager.lock_start_time = None
+                # Clear tracking
+                ActionChainManager.active_profile = None
+                ActionChainManager.lock_start_time = None
         
-            # Release lock
-            ActionChainManager.physical_action_lock.release()
+                # Release lock (handoff)
+                ActionChainManager.physical_action_lock.release(profile_id)
         
         except Exception as e:
             print(f"[ACTION CHAIN] ✗ [{profile_id}] Error releasing lock: {e}")
@@ -280,12 +418,11 @@ class ActionChainManager:
                     ActionChainManager.active_profile = None
                     ActionChainManager.lock_start_time = None
                 
-                    # Release lock
-                    try:
-                        ActionChainManager.physical_action_lock.release()
+                    # Release lock (handoff cho waiter kế tiếp)
+                    if ActionChainManager.physical_action_lock.release(profile_id):
                         print(f"[ACTION CHAIN] [{profile_id}] ✓ Lock force released")
-                    except Exception as e:
-                        print(f"[ACTION CHAIN] [{profile_id}] ⚠ Lock already released: {e}")
+                    else:
+                        print(f"[ACTION CHAIN] [{profile_id}] ⚠ Lock already released")
                 else:
                     print(f"[ACTION CHAIN] [{profile_id}] Was not holding lock, no release needed")
                 
@@ -356,3 +493,55 @@ class ActionChainManager:
     def is_locked():
         """Check if lock is currently held"""
         return ActionChainManager.physical_action_lock.locked()
+    
+    # ==================== PRIORITY / STATS ====================
+    
+    @staticmethod
+    def _expected_hold(chain_key):
+        """Thời gian giữ lock dự kiến của chain; chain chưa chạy lần nào → trung bình các chain"""
+        with ActionChainManager.durations_lock:
+            durations = ActionChainManager.chain_durations
+            if chain_key in durations:
+                return durations[chain_key]
+            if durations:
+                return sum(durations.values()) / len(durations)
+            return 0.0
+    
+    @staticmethod
+    def _record_hold(chain_key, seconds):
+        with ActionChainManager.durations_lock:
+            previous = ActionChainManager.chain_durations.get(chain_key)
+            if previous is None:
+                ActionChainManager.chain_durations[chain_key] = seconds
+            else:
+                ActionChainManager.chain_durations[chain_key] = (
+                    (1 - CHAIN_DURATION_EMA) * previous + CHAIN_DURATION_EMA * seconds
+                )
+    
+    @staticmethod
+    def get_lock_stats():
+        """
+        Returns:
+            dict: {'wait': histogram, 'hold': histogram, 'waiting': int, 'chain_durations': {chain: giây}}
+        """
+        lock = ActionChainManager.physical_action_lock
+        with lock._cond:
+            wait = lock.wait_histogram.snapshot()
+            hold = lock.hold_histogram.snapshot()
+        with ActionChainManager.durations_lock:
+            durations = {key: round(value, 2) for key, value in ActionChainManager.chain_durations.items()}
+        return {
+            'wait': wait,
+            'hold': hold,
+            'waiting': lock.waiting_count(),
+            'chain_durations': durations,
+        }
+    
+    @staticmethod
+    def print_lock_stats():
+        stats = ActionChainManager.get_lock_stats()
+        for name in ('wait', 'hold'):
+            histogram = stats[name]
+            buckets = ", ".join(f"{label}: {count}" for label, count in histogram['buckets'].items() if count)
+            print(f"[ACTION CHAIN] Lock {name}: n={histogram['count']} avg={histogram['avg_s']}s "
+                  f"max={histogram['max_s']}s [{buckets}]")
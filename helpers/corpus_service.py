@@ -0,0 +1,212 @@
+﻿# helpers/corpus_service.py
+
+"""
+Corpus Service - keyword / URL file dùng chung cho mọi action, flow iterator và thread
+
+- Mỗi file đọc MỘT lần (mmap) thành Corpus snapshot, mọi caller dùng chung
+- Hot reload: os.stat tối đa mỗi CORPUS_STAT_INTERVAL giây, mtime/size đổi → đọc lại
+- Sampling O(1), thread-safe:
+  choice() đều, weighted_choice() (alias table), no_repeat_choice(key) (xào bài theo vòng)
+
+Định dạng dòng:
+- KIND_KEYWORDS: mỗi dòng 1 keyword, bỏ dòng trống
+- KIND_URLS: như trên, chỉ nhận http:// / https://
+- Tuỳ call site (mặc định tắt, để file cũ giữ nguyên cách đọc):
+  skip_comments=True → bỏ dòng bắt đầu bằng '#' (keyword kiểu "#shorts" sẽ mất)
+  weighted=True → "<text>\\t<weight>" (weight > 0) là trọng số, không có → 1
+"""
+
+import mmap
+import os
+import random
+import threading
+import time
+
+KIND_KEYWORDS = "keywords"
+KIND_URLS = "urls"
+
+CORPUS_STAT_INTERVAL = 1.0     # Giây giữa 2 lần os.stat cùng một file
+
+
+class Corpus:
+    """Snapshot bất biến của một file: lines + weights (None = đều nhau)"""
+
+    def __init__(self, path, kind, lines, weights, signature):
+        self.path = path
+        self.kind = kind
+        self.lines = lines
+        self.weights = weights
+        self.signature = signature    # (mtime_ns, size) lúc đọc
+        self._lock = threading.Lock()
+        self._alias = None
+        self._decks = {}
+
+    def __len__(self):
+        return len(self.lines)
+
+    def choice(self):
+        if not self.lines:
+            return None
+        return self.lines[random.randrange(len(self.lines))]
+
+    def weighted_choice(self):
+        """Chọn theo trọng số (Vose alias method: build O(n) một lần, mỗi lần chọn O(1))"""
+        if not self.lines:
+            return None
+        if self.weights is None:
+            return self.choice()
+        if self._alias is None:
+            with self._lock:
+                if self._alias is None:
+                    self._alias = _build_alias(self.weights)
+        probability, alias = self._alias
+        index = random.randrange(len(self.lines))
+        return self.lines[index] if random.random() < probability[index] else self.lines[alias[index]]
+
+    def no_repeat_choice(self, key="default"):
+        """Mỗi key đi hết một vòng xáo trộn trước khi lặp lại dòng nào (O(1) amortized)"""
+        if not self.lines:
+            return None
+        with self._lock:
+            deck = self._decks.get(key)
+            if not deck:
+                deck = list(range(len(self.lines)))
+                random.shuffle(deck)
+                self._decks[key] = deck
+            return self.lines[deck.pop()]
+
+    def sample(self, no_repeat_key=None):
+        """File có trọng số → weighted_choice; có no_repeat_key → no_repeat_choice; còn lại choice"""
+        if self.weights is not None:
+            return self.weighted_choice()
+        if no_repeat_key is not None:
+            return self.no_repeat_choice(no_repeat_key)
+        return self.choice()
+
+
+def _build_alias(weights):
+    n = len(weights)
+    total = sum(weights)
+    scaled = [w * n / total for w in weights]
+    probability = [1.0] * n
+    alias = list(range(n))
+    small = [i for i, w in enumerate(scaled) if w < 1.0]
+    large = [i for i, w in enumerate(scaled) if w >= 1.0]
+    while small and large:
+        s = small.pop()
+        l = large.pop()
+        probability[s] = scaled[s]
+        alias[s] = l
+        scaled[l] -= 1.0 - scaled[s]
+        (small if scaled[l] < 1.0 else large).append(l)
+    return probability, alias
+
+
+def _parse_line(raw, kind, skip_comments=False, weighted=False):
+    """(text, weight) hoặc None nếu bỏ qua dòng; weight None = không ghi trọng số"""
+    text = raw.decode("utf-8", errors="replace").lstrip("\ufeff").strip()
+    if not text or (skip_comments and text.startswith("#")):
+        return None
+    weight = None
+    if weighted and "\t" in text:
+        head, _, tail = text.rpartition("\t")
+        try:
+            value = float(tail)
+            if value > 0 and head.strip():
+                text, weight = head.strip(), value
+        except ValueError:
+            pass
+    if kind == KIND_URLS and not text.startswith(("http://", "https://")):
+        return False
+    return text, weight
+
+
+class CorpusService:
+    """Registry Corpus theo (file, kind) với invalidation theo mtime"""
+
+    def __init__(self, stat_interval=CORPUS_STAT_INTERVAL):
+        self.stat_interval = stat_interval
+        self._lock = threading.Lock()
+        self._entries = {}      # (abspath, kind, skip_comments, weighted) → [Corpus, checked_at]
+        self._load_locks = {}   # cùng key → Lock (1 thread đọc file, thread khác chờ)
+        self.stats = {'hits': 0, 'loads': 0, 'reloads': 0}
+
+    def get(self, path, kind=KIND_KEYWORDS, log_prefix="[CORPUS]", skip_comments=False, weighted=False):
+        """
+        Args:
+            skip_comments: bỏ dòng bắt đầu bằng '#'
+            weighted: đọc "<text>\\t<weight>" thành trọng số
+
+        Returns:
+            Corpus: snapshot hiện tại của file
+
+        Raises:
+            FileNotFoundError / OSError nếu không stat / đọc được file
+        """
+        key = (os.path.abspath(path), kind, bool(skip_comments), bool(weighted))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[1] < self.stat_interval:
+                self.stats['hits'] += 1
+                return entry[0]
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        with load_lock:
+            st = os.stat(path)
+            signature = (st.st_mtime_ns, st.st_size)
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and entry[0].signature == signature:
+                    entry[1] = time.monotonic()
+                    self.stats['hits'] += 1
+                    return entry[0]
+
+            corpus, skipped = self._load(path, kind, signature, skip_comments, weighted)
+            with self._lock:
+                self.stats['reloads' if entry is not None else 'loads'] += 1
+                self._entries[key] = [corpus, time.monotonic()]
+
+        action = "Reloaded (file changed)" if entry is not None else "Loaded"
+        weighted = ", weighted" if corpus.weights is not None else ""
+        invalid = f", {skipped} invalid line(s) skipped" if skipped else ""
+        print(f"{log_prefix} {action} {len(corpus)} {kind} from {os.path.basename(path)}{weighted}{invalid}")
+        return corpus
+
+    def invalidate(self, path=None):
+        """Bỏ cache của một file (mọi kind) hoặc toàn bộ"""
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+                return
+            target = os.path.abspath(path)
+            for key in [key for key in self._entries if key[0] == target]:
+                del self._entries[key]
+
+    @staticmethod
+    def _load(path, kind, signature, skip_comments, weighted):
+        lines = []
+        weights = []
+        has_weights = False
+        skipped = 0
+        with open(path, "rb") as f:
+            if signature[1] > 0:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    for raw in iter(mm.readline, b""):
+                        parsed = _parse_line(raw, kind, skip_comments, weighted)
+                        if parsed is None:
+                            continue
+                        if parsed is False:
+                            skipped += 1
+                            continue
+                        text, weight = parsed
+                        lines.append(text)
+                        weights.append(weight if weight is not None else 1.0)
+                        has_weights = has_weights or weight is not None
+        return Corpus(path, kind, lines, weights if has_weights else None, signature), skipped
+
+
+_corpus_service = CorpusService()
+
+def get_corpus_service():
+    """Get the global CorpusService instance"""
+    return _corpus_service
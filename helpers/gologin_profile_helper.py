@@ -2,10 +2,13 @@
 
 from models.global_variables import GlobalVariables
 from models.gologin_api import get_gologin_api
+from models.process_index import get_process_index
+import contextlib
 import random
 import threading
 import time
 from exceptions.gologin_exceptions import ProxyAssignmentFailed
+from helpers.corpus_service import get_corpus_service, KIND_KEYWORDS
 
 
 
@@ -16,7 +19,7 @@ _cleanup_lock = threading.Lock()
 class GoLoginProfileHelper:
     """Helper class for common GoLogin profile operations"""
      # ========== THÊM CLASS VARIABLES ĐỂ CACHE ==========
-    _keywords_cache = {}   # Cache: {file_path: [keywords]}
+    # Keywords: cache trong CorpusService (reload khi file đổi)
     _websites_cache = {}   # Cache: {file_path: [websites]}
     # ==================================================
     @staticmethod
@@ -119,65 +122,47 @@ class GoLoginProfileHelper:
         return profile_list
     
     @staticmethod
-    def create_randomized_profile_list(original_profile_list, max_workers, log_prefix="[GOLOGIN]"):
+    def create_randomized_profile_list(original_profile_list, max_workers, log_prefix="[GOLOGIN]",
+                                       weight_by_last_run=False):
         """
         Create randomized profile list with no duplicates within max_workers * 2 window
-    
+
         Args:
             original_profile_list: List of profile IDs (length N)
             max_workers: Number of parallel workers
             log_prefix: Prefix for log messages
-    
+            weight_by_last_run: Ưu tiên profile chạy lâu rồi / chưa chạy trong phiên này
+
         Returns:
-            list: New randomized profile list (same length as original)
-        
+            RandomizedProfileSequence: iterable lazy, len() = N - phần tử sinh khi được lấy
+            (O(1) mỗi phần tử) nên profile đầu tiên mở được ngay
+
         Example:
             original_profile_list = [1,2,3,...,50] (length=50)
             max_workers = 3
             window_size = 3 * 2 = 6
-        
+
             Result: [3, 15, 42, 8, 29, 11, 7, ...]
             - Index 0: profile_id = 3
             - Index 1-5 (window): Cannot contain profile_id = 3
             - Index 6+: Can contain profile_id = 3 again
         """
-        import random
-    
-        list_length = len(original_profile_list)
+        from helpers.profile_sequence import RandomizedProfileSequence
+
         window_size = max_workers * 2
-    
+
         print(f"{log_prefix} Creating randomized profile list...")
-        print(f"{log_prefix} - Original list length: {list_length}")
+        print(f"{log_prefix} - Original list length: {len(original_profile_list)}")
         print(f"{log_prefix} - Window size (max_workers * 2): {window_size}")
-    
-        new_profile_list = []
-    
-        for i in range(list_length):
-            # Get list of recently used profile IDs (within window)
-            start_window = max(0, i - window_size + 1)  # Window start index
-            recent_profiles = set(new_profile_list[start_window:i])  # Profile IDs in window
-        
-            # Get available profiles (not in recent window)
-            available_profiles = [p for p in original_profile_list if p not in recent_profiles]
-        
-            # If no available profiles (rare case when window > unique profiles)
-            # Fall back to full list
-            if not available_profiles:
-                print(f"{log_prefix} Warning: No available profiles at index {i}, using full list")
-                available_profiles = original_profile_list
-        
-            # Random choice from available profiles
-            selected_profile = random.choice(available_profiles)
-            new_profile_list.append(selected_profile)
-    
-        # Log statistics
-        unique_count = len(set(new_profile_list))
-        print(f"{log_prefix} ✓ Randomized list created:")
-        print(f"{log_prefix}   - Total items: {len(new_profile_list)}")
-        print(f"{log_prefix}   - Unique profiles used: {unique_count}")
-        print(f"{log_prefix}   - Duplicates: {len(new_profile_list) - unique_count}")
-    
-        return new_profile_list
+        if weight_by_last_run:
+            print(f"{log_prefix} - Weighted by last run time")
+
+        return RandomizedProfileSequence(
+            original_profile_list,
+            window_size,
+            weight_by_last_run=weight_by_last_run,
+            log_prefix=log_prefix
+        )
 
     @staticmethod
     def capture_page_screenshot(driver, collect_file_path, profile_id=""):
@@ -275,7 +260,7 @@ class GoLoginProfileHelper:
     @staticmethod
     def load_keywords(params, log_prefix="[GOLOGIN]", type_kw = None):
         """
-        Load keywords from file with caching
+        Load keywords from file (cached by CorpusService, reload khi file đổi)
     
         Args:
             params: Dict containing keywords_file or keywords_variable
@@ -314,27 +299,14 @@ class GoLoginProfileHelper:
                 print(f"{log_prefix} Keywords file not found: {keywords_file}")
                 return []
         
-            # ========== CHECK CACHE FIRST ==========
-            if keywords_file in GoLoginProfileHelper._keywords_cache:
-                cached = GoLoginProfileHelper._keywords_cache[keywords_file]
-                print(f"{log_prefix} ✓ Using cached {len(cached)} keywords")
-                return cached
-            # ======================================
-        
-            # Load from file (first time only)
-            print(f"{log_prefix} Loading keywords from file (first time)...")
-            with open(keywords_file, 'r', encoding='utf-8') as f:
-                keywords = [line.strip() for line in f if line.strip() and not line.startswith('#')]
+            # ========== SHARED CORPUS (READ ONCE, MTIME INVALIDATED) ==========
+            keywords = get_corpus_service().get(keywords_file, KIND_KEYWORDS, log_prefix, skip_comments=True).lines
         
             if not keywords:
                 print(f"{log_prefix} ✗ No valid keywords found in file")
                 return []
         
-            # ========== SAVE TO CACHE ==========
-            GoLoginProfileHelper._keywords_cache[keywords_file] = keywords
-            print(f"{log_prefix} ✓ Loaded and cached {len(keywords)} keywords")
-            # ==================================
-        
+            print(f"{log_prefix} ✓ Using {len(keywords)} keywords")
             return keywords
         except Exception as e:
             print(f"{log_prefix} Error loading keywords: {e}")
@@ -432,13 +404,16 @@ class GoLoginProfileHelper:
             return False
         
     @staticmethod
-    def cleanup_profiles(profile_data, gologin_api, log_prefix="[CLEANUP]"):
+    def cleanup_profiles(profile_data, gologin_api, log_prefix="[CLEANUP]", window_lock=None):
         """
-        Cleanup profiles: tabs → flush → unregister → quit → wait → stop SDK
-    
+        Cleanup profiles: tabs → unregister → close browser → wait exit → wait file handles → stop SDK
+
         Unified method for both single profile and batch profiles cleanup.
         Can be called from Start action, Collect action, or any other action.
-    
+        Các profile được cleanup song song (tối đa CLEANUP_WORKERS); mỗi step chờ tín hiệu
+        thật (DevTools đóng, process thoát, file được nhả) có timeout thay cho sleep cố định.
+        Timing từng step được ghi vào run log.
+
         Args:
             profile_data: Can be either:
                           1. Single dict: {"profile_id": "xxx", "driver": driver_instance}
@@ -448,15 +423,19 @@ class GoLoginProfileHelper:
                              }
             gologin_api: GoLoginAPI instance for stop_profile()
             log_prefix: Prefix for log messages (default: "[CLEANUP]")
-    
+            window_lock: Lock thao tác vật lý của caller - giữ khi đóng tab / đóng browser
+                         (đổi focus cửa sổ), các bước chờ chạy ngoài lock
+
         Returns:
             dict: {profile_id: cleanup_success_bool, ...}
         """
-        from helpers.selenium_registry import unregister_selenium_driver
-        import time
-    
+        from concurrent.futures import ThreadPoolExecutor
+        from models.profile_teardown import CLEANUP_WORKERS, TeardownStats
+        import logging
+
+        logger = logging.getLogger('TomSamAutobot')
         cleanup_results = {}
-    
+
         # ========== NORMALIZE INPUT TO BATCH FORMAT ==========
         # Convert single profile to batch format for unified processing
         if "profile_id" in profile_data and "driver" in profile_data:
@@ -473,161 +452,168 @@ class GoLoginProfileHelper:
             # Batch format: {profile_id: {status, driver, ...}, ...}
             profiles_to_cleanup = profile_data
             print(f"{log_prefix} Batch cleanup: {len(profiles_to_cleanup)} profile(s)")
-    
-        # ========== CLEANUP EACH PROFILE ==========
-        for profile_id, data in profiles_to_cleanup.items():            
+
+        # ========== FILTER PROFILES ==========
+        pending = []
+        for profile_id, data in profiles_to_cleanup.items():
             # Skip profiles that didn't open successfully
             if data.get('status') not in ['opened', None]:  # None for single profile
                 print(f"{log_prefix}[{profile_id}] Skipping (status: {data.get('status')})")
                 cleanup_results[profile_id] = False
                 continue
-        
+
             driver_in_loop = data.get('driver')
             if not driver_in_loop:
                 print(f"{log_prefix}[{profile_id}] ⚠ No driver found, skipping")
                 cleanup_results[profile_id] = False
                 continue
-        
-            try:
-                print(f"{log_prefix}[{profile_id}] Starting cleanup sequence...")
-            
-                # ========== STEP 1: CLEANUP EXTRA TABS ==========
-                print(f"{log_prefix}[{profile_id}] Step 1/6: Closing extra tabs...")
+
+            cleanup_results[profile_id] = False
+            pending.append((profile_id, driver_in_loop))
+
+        # ========== CLEANUP CONCURRENTLY ==========
+        stats = TeardownStats()
+        started = time.perf_counter()
+
+        def _run(item):
+            profile_id, driver_in_loop = item
+            cleanup_results[profile_id] = GoLoginProfileHelper._cleanup_single_profile(
+                profile_id, driver_in_loop, gologin_api, log_prefix, stats, window_lock
+            )
+
+        if len(pending) == 1:
+            _run(pending[0])
+        elif pending:
+            workers = min(CLEANUP_WORKERS, len(pending))
+            print(f"{log_prefix} Cleaning up {len(pending)} profile(s) with {workers} worker(s)...")
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ProfileCleanup") as executor:
+                list(executor.map(_run, pending))
+
+        summary = f"{log_prefix} Cleanup timing: {stats.format(time.perf_counter() - started)}"
+        print(summary)
+        logger.info(summary)
+        print(f"{log_prefix} ✓ All profiles cleanup completed")
+        return cleanup_results
+
+    @staticmethod
+    def _cleanup_single_profile(profile_id, driver_in_loop, gologin_api, log_prefix, stats, window_lock=None):
+        """
+        Cleanup sequence của một profile (chạy trên worker của cleanup_profiles)
+
+        Returns:
+            bool: True nếu stop_profile thành công
+        """
+        from helpers.selenium_registry import unregister_selenium_driver
+        from models import profile_teardown as teardown
+        import logging
+        import os
+
+        logger = logging.getLogger('TomSamAutobot')
+        prefix = f"{log_prefix}[{profile_id}]"
+        timer = teardown.StepTimer()
+        success = False
+
+        try:
+            print(f"{prefix} Starting cleanup sequence...")
+
+            # Snapshot trước khi đóng: endpoint DevTools + cây process browser + thư mục profile
+            debugger_address = teardown.get_debugger_address(driver_in_loop)
+            browser_processes = gologin_api.get_browser_processes(profile_id)
+            profile_path = os.path.join(gologin_api.tmpdir, f"gologin_{profile_id}")
+
+            # ========== STEP 1: CLEANUP EXTRA TABS ==========
+            print(f"{prefix} Step 1/6: Closing extra tabs...")
+            with timer.step("tabs"):
                 try:
-                    GoLoginProfileHelper.cleanup_browser_tabs(driver_in_loop, f"{log_prefix}[{profile_id}]")
-                    print(f"{log_prefix}[{profile_id}] ✓ Tabs cleaned up")
-                    time.sleep(2)  # Wait for tab cleanup
+                    with window_lock or contextlib.nullcontext():
+                        GoLoginProfileHelper.cleanup_browser_tabs(driver_in_loop, prefix)
+                    closed, _ = teardown.wait_until(
+                        lambda: len(driver_in_loop.window_handles) <= 1, teardown.TAB_CLOSE_TIMEOUT
+                    )
+                    print(f"{prefix} ✓ Tabs cleaned up" if closed else f"{prefix} ⚠ Extra tabs still open after {teardown.TAB_CLOSE_TIMEOUT:.0f}s")
                 except Exception as tab_err:
-                    print(f"{log_prefix}[{profile_id}] ⚠ Tab cleanup warning: {tab_err}")
-            
-                # ========== STEP 2: WAIT FOR BROWSER FLUSH ==========
-                print(f"{log_prefix}[{profile_id}] Step 2/6: Waiting for browser to flush cookies/history...")
-                time.sleep(3)  # Allow browser to write to disk
-            
-                # ========== STEP 3: UNREGISTER SELENIUM DRIVER ==========
-                print(f"{log_prefix}[{profile_id}] Step 3/6: Unregistering Selenium driver...")
+                    print(f"{prefix} ⚠ Tab cleanup warning: {tab_err}")
+
+            # ========== STEP 2: UNREGISTER SELENIUM DRIVER ==========
+            print(f"{prefix} Step 2/6: Unregistering Selenium driver...")
+            with timer.step("unregister"):
                 try:
                     unregister_selenium_driver(profile_id)
-                    print(f"{log_prefix}[{profile_id}] ✓ Driver unregistered")
+                    print(f"{prefix} ✓ Driver unregistered")
                 except Exception as unreg_err:
-                    print(f"{log_prefix}[{profile_id}] ⚠ Failed to unregister: {unreg_err}")
-            
-                # ========== STEP 4: QUIT SELENIUM DRIVER (ENHANCED FOR GRACEFUL SHUTDOWN) ==========
-                print(f"{log_prefix}[{profile_id}] Step 4/6: Quitting Selenium driver...")
+                    print(f"{prefix} ⚠ Failed to unregister: {unreg_err}")
+
+            # ========== STEP 3: CLOSE BROWSER + QUIT SELENIUM DRIVER ==========
+            # Browser.close = shutdown bình thường → Chrome tự flush cookies/history xuống đĩa
+            print(f"{prefix} Step 3/6: Closing browser and quitting Selenium driver...")
+            with timer.step("quit"), window_lock or contextlib.nullcontext():
+                try:
+                    driver_in_loop.execute_cdp_cmd("Browser.close", {})
+                except Exception:
+                    pass  # Kết nối CDP đứt khi browser đóng là bình thường
                 try:
-                    # # ========== 4A: NAVIGATE TO BLANK PAGE ==========
-                    # # Unload all page resources to help Chrome cleanup faster
-                    # try:
-                    #     print(f"{log_prefix}[{profile_id}] Navigating to about:blank to unload resources...")
-                    #     driver.get("about:blank")
-                    #     time.sleep(1)  # Let page unload
-                    # except Exception as blank_err:
-                    #     print(f"{log_prefix}[{profile_id}] ℹ Navigate to blank warning: {blank_err}")
-    
-                    # # ========== 4B: WAIT FOR CHROME TO FLUSH COOKIES ==========
-                    # # Give Chrome time to write cookies/cache to disk BEFORE quit
-                    # print(f"{log_prefix}[{profile_id}] Waiting 5s for Chrome to flush cookies/cache...")
-                    # time.sleep(5)
-    
-                    # ========== 4C: QUIT DRIVER ==========
                     driver_in_loop.quit()
-                    print(f"{log_prefix}[{profile_id}] ✓ Driver quit")
-    
+                    print(f"{prefix} ✓ Driver quit")
                 except Exception as quit_err:
-                    print(f"{log_prefix}[{profile_id}] ⚠ Driver quit error: {quit_err}")
-
-                # ========== 4D: TERMINATE CHROMEDRIVER PROCESS ==========
-                # Ensure chromedriver process is killed
-                # try:
-                #     if hasattr(driver, 'service') and driver.service and hasattr(driver.service, 'process'):
-                #         if driver.service.process:
-                #             driver.service.process.terminate()
-                #             print(f"{log_prefix}[{profile_id}] ✓ Chromedriver process terminated")
-                # except Exception as terminate_err:
-                #     print(f"{log_prefix}[{profile_id}] ℹ Chromedriver terminate: {terminate_err}")
-
-            
-                # ========== STEP 5: WAIT FOR CHROME CLEANUP ==========
-                # CRITICAL: Wait 10 seconds for Chrome to release file handles
-                # This prevents WinError 32 when gl.stop() tries to cleanup files
-                print(f"{log_prefix}[{profile_id}] Step 5/6: Waiting 10s for Driver Quittttttttttttttttttttttttttttttttttttttttt...")
-                time.sleep(10)
-                
-                # # ========== STEP 6: STOP PROFILE VIA GOLOGIN SDK ==========
-                # print(f"{log_prefix}[{profile_id}] Step 6/6: Stopping profile via GoLogin SDK...")
-                # try:
-                #     success = gologin_api.stop_profile(profile_id)
-                #     if success:
-                #         print(f"{log_prefix}[{profile_id}] ✓ Profile stopped via SDK")
-                #         cleanup_results[profile_id] = True
-                #     else:
-                #         print(f"{log_prefix}[{profile_id}] ⚠ Profile stop returned False")
-                #         cleanup_results[profile_id] = True  # Still consider success if cookies synced
-                
-                # except Exception as stop_err:
-                #     error_msg = str(stop_err)
-                
-                #     # WinError 32 on *_upload.zip is non-critical (cookies synced)
-                #     if "WinError 32" in error_msg and "_upload.zip" in error_msg:
-                #         print(f"{log_prefix}[{profile_id}] ℹ Stop completed with file lock (non-critical)")
-                #         cleanup_results[profile_id] = True
-                #     else:
-                #         print(f"{log_prefix}[{profile_id}] ✗ Failed to stop: {stop_err}")
-                #         cleanup_results[profile_id] = False
-            
-                # print(f"{log_prefix}[{profile_id}] ✓ Cleanup completed")
+                    print(f"{prefix} ⚠ Driver quit error: {quit_err}")
 
+            # ========== STEP 4: WAIT FOR BROWSER EXIT ==========
+            print(f"{prefix} Step 4/6: Waiting for DevTools socket close + browser process exit...")
+            with timer.step("browser_exit"):
+                closed, elapsed = teardown.wait_devtools_closed(debugger_address)
+                alive, _ = teardown.wait_processes_exit(browser_processes)
+                if closed and not alive:
+                    print(f"{prefix} ✓ Browser exited ({timer.steps.get('quit', 0.0) + elapsed:.1f}s after close)")
+                else:
+                    # gl.stop() sẽ kill phần còn lại
+                    print(f"{prefix} ⚠ Browser still running (DevTools open: {not closed}, {len(alive)} process(es) alive)")
 
-                # ========== STEP 6: STOP PROFILE VIA GOLOGIN SDK (WITH LOCK) ==========
-                print(f"{log_prefix}[{profile_id}] Step 6/6: Stopping profile via GoLogin SDK...")
+            # ========== STEP 5: WAIT FOR FILE HANDLES ==========
+            # Tránh WinError 32 khi gl.stop() zip/xóa thư mục profile
+            print(f"{prefix} Step 5/6: Waiting for profile file handles to release...")
+            with timer.step("file_release"):
+                released, _ = teardown.wait_files_released(profile_path)
+                if not released:
+                    print(f"{prefix} ⚠ Profile files still locked after {teardown.FILE_RELEASE_TIMEOUT:.0f}s")
 
-                # ========== CRITICAL: LOCK CLEANUP TO PREVENT DB CONFLICTS ==========
-                # When multiple profiles cleanup simultaneously, Chrome subprocesses
-                # may not release DB file handles fast enough, causing "unable to open
-                # database file" errors. Serialize gl.stop() calls to avoid this.            
-    
+            # ========== STEP 6: STOP PROFILE VIA GOLOGIN SDK ==========
+            print(f"{prefix} Step 6/6: Stopping profile via GoLogin SDK...")
+            with timer.step("stop_sdk"):
                 try:
-                    # Call GoLogin stop (now protected by lock)
                     # Returns: (success: bool, message: str)
                     result = gologin_api.stop_profile(profile_id)
-                    cleanup_results[profile_id] = False
                     # Handle tuple return
                     if result:
                         if isinstance(result, tuple):
-                            success, message = result
-                            if success:
-                                print(f"{log_prefix}[{profile_id}] ✓ Profile stopped via SDK")
-                                cleanup_results[profile_id] = True
+                            stopped, message = result
+                            if stopped:
+                                print(f"{prefix} ✓ Profile stopped via SDK")
+                                success = True
                             else:
-                                print(f"{log_prefix}[{profile_id}] ⚠ Stop warning: {message}")
+                                print(f"{prefix} ⚠ Stop warning: {message}")
                         else:
                             # Fallback for unexpected return type
-                            print(f"{log_prefix}[{profile_id}] ✓ Profile stopped (unexpected return type)")
+                            print(f"{prefix} ✓ Profile stopped (unexpected return type)")
                     else:
-                        print(f"{log_prefix}[{profile_id}] ⚠ Stop warning: No response from SDK")
-            
+                        print(f"{prefix} ⚠ Stop warning: No response from SDK")
                 except Exception as stop_err:
-                    print(f"{log_prefix}[{profile_id}] ⚠ Stop error: {stop_err}")
-    
-                finally:
-                    # ========== WAIT BEFORE RELEASING LOCK ==========
-                    # Give Chrome extra time to release file handles before
-                    # next profile tries to stop
-                    print(f"{log_prefix}[{profile_id}] Waiting 3s for file handles to release...")
-                    time.sleep(3)
+                    print(f"{prefix} ⚠ Stop error: {stop_err}")
 
+            print(f"{prefix} ✓ Cleanup completed")
 
-                print(f"{log_prefix}[{profile_id}] ✓ Cleanup completed")
+        except Exception as e:
+            print(f"{prefix} ✗ Cleanup error: {e}")
+            import traceback
+            traceback.print_exc()
+            success = False
 
-            
-            except Exception as e:
-                print(f"{log_prefix}[{profile_id}] ✗ Cleanup error: {e}")
-                import traceback
-                traceback.print_exc()
-                cleanup_results[profile_id] = False
-    
-        print(f"{log_prefix} ✓ All profiles cleanup completed")
-        return cleanup_results
+        finally:
+            timing = f"{prefix} Cleanup timing: {timer.format()}"
+            print(timing)
+            logger.info(timing)
+            stats.add(timer)
+
+        return success
 
 
     
@@ -755,45 +741,35 @@ class GoLoginProfileHelper:
                     print(f"{log_prefix} [{profile_id}] ℹ Physical close not implemented for this OS")
                     return False
                 
-                import psutil
                 import win32gui
                 import win32process
                 import win32con
                 from controllers.actions.mouse_move_action import MouseMoveAction
                 import time
                 
-                # Find browser window for this profile
+                # Find browser window for this profile (tra ProcessIndex dùng chung)
                 hwnd = None
-                for proc in psutil.process_iter(['pid', 'name', 'cmdline']):
-                    try:
-                        cmdline = proc.info.get('cmdline', [])
-                        if not cmdline:
-                            continue
-                        
-                        cmdline_str = ' '.join(cmdline).lower()
-                        
-                        # Check if this is the main browser process for this profile
-                        if profile_id.lower() in cmdline_str and '--type=renderer' not in cmdline_str:
-                            pid = proc.info['pid']
-                            
-                            # Find window handle for this process
-                            def enum_callback(window_hwnd, pid_list):
-                                if win32gui.IsWindowVisible(window_hwnd):
-                                    _, found_pid = win32process.GetWindowThreadProcessId(window_hwnd)
-                                    if found_pid == pid:
-                                        pid_list.append(window_hwnd)
-                                return True
-                            
-                            windows = []
-                            win32gui.EnumWindows(enum_callback, windows)
-                            
-                            if windows:
-                                hwnd = windows[0]
-                                break
-                                
-                    except (psutil.NoSuchProcess, psutil.AccessDenied):
+                for entry in get_process_index().processes_for_profile(profile_id):
+                    # Check if this is the main browser process for this profile
+                    if '--type=renderer' in entry.cmdline:
                         continue
-                
+                    pid = entry.pid
+
+                    # Find window handle for this process
+                    def enum_callback(window_hwnd, pid_list):
+                        if win32gui.IsWindowVisible(window_hwnd):
+                            _, found_pid = win32process.GetWindowThreadProcessId(window_hwnd)
+                            if found_pid == pid:
+                                pid_list.append(window_hwnd)
+                        return True
+
+                    windows = []
+                    win32gui.EnumWindows(enum_callback, windows)
+
+                    if windows:
+                        hwnd = windows[0]
+                        break
+
                 if not hwnd:
                     print(f"{log_prefix} [{profile_id}] ⚠ Could not find browser window")
                     return False
@@ -871,7 +847,6 @@ class GoLoginProfileHelper:
             print(f"{log_prefix} [{profile_id}] Bringing window to front...")
         
             try:
-                import psutil
                 import platform
             
                 if platform.system() != "Windows":
@@ -888,30 +863,16 @@ class GoLoginProfileHelper:
             
                 print(f"{log_prefix} [{profile_id}] Searching Chrome processes with profile ID in user-data-dir...")
             
-                for proc in psutil.process_iter(['pid', 'name', 'cmdline']):
-                    try:
-                        if proc.info['name'] != 'chrome.exe':
-                            continue
-                    
-                        cmdline = proc.info.get('cmdline', [])
-                        if not cmdline:
-                            continue
-                    
-                        cmdline_str = ' '.join(cmdline)
-                    
-                        # Check if this is MAIN browser process (not renderer/GPU)
-                        if '--type=' in cmdline_str:
-                            continue  # Skip renderer, GPU, utility processes
-                    
-                        # Check if --user-data-dir contains profile ID
-                        if '--user-data-dir' in cmdline_str and profile_id in cmdline_str:
-                            target_pid = proc.info['pid']
-                            print(f"{log_prefix} [{profile_id}] ✓ Found Chrome process PID: {target_pid}")
-                            break
-                
-                    except (psutil.NoSuchProcess, psutil.AccessDenied):
+                for entry in get_process_index().processes_for_profile(profile_id, main_only=True):
+                    if entry.name != 'chrome.exe':
                         continue
-            
+
+                    # Check if --user-data-dir contains profile ID
+                    if '--user-data-dir' in entry.cmdline and profile_id.lower() in entry.cmdline:
+                        target_pid = entry.pid
+                        print(f"{log_prefix} [{profile_id}] ✓ Found Chrome process PID: {target_pid}")
+                        break
+
                 if not target_pid:
                     print(f"{log_prefix} [{profile_id}] ⚠ Could not find Chrome process for this profile")
                     return False
@@ -1529,250 +1490,80 @@ class GoLoginProfileHelper:
         Load proxies from TXT file with 2 formats:
         - TMProxy: provider|proxy_type|apikey
         - ProxyRack: provider|proxy_type|host:port|countries|username|password
-    
+
         Args:
             proxy_file: Path to proxy TXT file
             log_prefix: Prefix for log messages
-        
+
         Returns:
             list: List of proxy config dicts or empty list if error
         """
-        import os
-    
-        if not os.path.exists(proxy_file):
-            print(f"{log_prefix} Proxy file not found: {proxy_file}")
-            return []
-    
-        proxy_configs = []
-    
-        with open(proxy_file, 'r', encoding='utf-8') as f:
-            for line_num, line in enumerate(f, 1):
-                line = line.strip()
-            
-                if not line or line.startswith('#'):
-                    continue
-            
-                parts = line.split('|')
-            
-                # Validate basic structure
-                if len(parts) < 3:
-                    print(f"{log_prefix} Warning - Invalid format line {line_num}: {line}")
-                    continue
-            
-                provider = parts[0].strip().lower()
-                proxy_type = parts[1].strip()
-            
-                # Validate proxy type
-                if proxy_type not in ['socks5', 'http', 'https']:
-                    print(f"{log_prefix} Warning - Invalid type '{proxy_type}' line {line_num}")
-                    continue
-            
-                # Parse based on provider
-                if provider == 'tmproxy':
-                    # Format: tmproxy|socks5|apikey
-                    if len(parts) != 3:
-                        print(f"{log_prefix} Warning - TMProxy expects 3 parts, line {line_num}: {line}")
-                        continue
-                
-                    api_key = parts[2].strip()
-                
-                    if not api_key:
-                        print(f"{log_prefix} Warning - Empty api_key line {line_num}")
-                        continue
-                
-                    proxy_configs.append({
-                        'provider': 'tmproxy',
-                        'type': proxy_type,
-                        'api_key': api_key,
-                        'line_num': line_num
-                    })
-                
-                elif provider == 'proxyrack':
-                    # Format: proxyrack|http|premium.residential.proxyrack.net:10000|robertle;country=US,CA,GB|password
-                    # Username đã có country params sẵn, DNS chỉ là host:port
-                    if len(parts) != 5:
-                        print(f"{log_prefix} Warning - ProxyRack expects 5 parts, line {line_num}: {line}")
-                        continue
-    
-                    host_port = parts[2].strip()
-                    username = parts[3].strip()  # Đã có country params: username;country=US,CA,GB
-                    password = parts[4].strip()
-    
-                    if not all([host_port, username, password]):
-                        print(f"{log_prefix} Warning - Empty values line {line_num}")
-                        continue
-    
-                    # Parse host:port (DNS không có country params nữa)
-                    if ':' not in host_port:
-                        print(f"{log_prefix} Warning - Invalid host:port format line {line_num}")
-                        continue
-    
-                    host, port_str = host_port.split(':', 1)
-    
-                    try:
-                        port = int(port_str)
-                    except ValueError:
-                        print(f"{log_prefix} Warning - Invalid port '{port_str}' line {line_num}")
-                        continue
-    
-                    proxy_configs.append({
-                        'provider': 'proxyrack',
-                        'type': proxy_type,
-                        'host': host,
-                        'port': port,
-                        'username': username,  # Giữ nguyên username với country params
-                        'password': password,
-                        'line_num': line_num
-                    })
-
-            
-                else:
-                    print(f"{log_prefix} Warning - Unknown provider '{provider}' line {line_num}")
-                    continue
-    
-        print(f"{log_prefix} Loaded {len(proxy_configs)} valid proxy configs")
-        return proxy_configs
+        from helpers.proxy_pool import parse_proxy_file
+        return parse_proxy_file(proxy_file, log_prefix)
 
 
     @staticmethod
     def assign_proxy_to_profile(profile_id, proxy_file, gologin_api, ignore_exception = False, log_prefix="[PROXY]"):
         """
-        Assign proxy to profile with round-robin distribution using global session state.
-        Uses TMProxyAPI or ProxyRackAPI to get full proxy details.
-    
+        Assign proxy to profile with round-robin distribution using the shared ProxyPool.
+        ProxyPool parse file một lần (reload khi mtime đổi), prefetch credential TMProxy
+        ở nền và chấm điểm từng dòng (latency / lỗi / cooldown).
+
         Args:
             profile_id: Profile ID to assign proxy
             proxy_file: Path to proxy TXT file
             gologin_api: GoLoginAPI instance for update_proxy_for_profiles call
             ignore_exception : True
             log_prefix: Prefix for log messages
-    
+
         Returns:
             tuple: (bool success, str message)
         """
-        from models.global_variables import GlobalVariables
-        from models.tmproxy_api import TMProxyAPI
-        import time
-        import threading
-        
-        gv = GlobalVariables()
-         # ← THÊM: Lock để tránh race condition
-        if not hasattr(gv, '_proxy_lock'):
-            gv._proxy_lock = threading.Lock()
+        from helpers.proxy_pool import get_proxy_pool
+
         log_prefix = f"{log_prefix}[{profile_id}]"
         print(f"{log_prefix} Starting proxy assignment with round-robin")
-    
-        # Load proxy configs
-        proxy_configs = GoLoginProfileHelper.load_proxies_from_file(proxy_file, log_prefix)
-        if not proxy_configs:
+
+        pool = get_proxy_pool(proxy_file)
+        len_config = pool.size(log_prefix)
+        if not len_config:
             return False, "No valid proxies in file"
-    
-        with gv._proxy_lock:
-            # Get global session state
-            current_index = gv.get("session_proxy_index", 0)
-            used_lines = gv.get("session_used_lines", set())
-    
-            # Reset if all used
-            if len(used_lines) >= len(proxy_configs):
-                print(f"{log_prefix} All {len(proxy_configs)} lines used - resetting for new cycle")
-                used_lines.clear()
-                current_index = 0
-                gv.set("session_used_lines", set())
-                gv.set("session_proxy_index", 0)
-    
-            print(f"{log_prefix} Session state: index={current_index}, used={sorted(used_lines)}, available={len(proxy_configs) - len(used_lines)}")
-    
-        # Try all lines (unused first, then used as fallback)
+
+        # Mỗi dòng thử tối đa một lần cho lần gán này
         attempts = 0
-        len_config = len(proxy_configs)
         tried_lines = set()
-        
-        # If ignore_exception is True, just loop once
-        if ignore_exception:
-            max_attempts = len_config
-        else:
-            max_attempts = len_config * 2
-            
-        while attempts < max_attempts:
-            # Find next unused line
-            found_unused = False
-            for offset in range(len(proxy_configs)):
-                check_index = (current_index + offset) % len(proxy_configs)
-                check_line_num = proxy_configs[check_index]['line_num']
-            
-                if check_line_num not in used_lines and check_index not in tried_lines:
-                    config = proxy_configs[check_index]
-                    found_unused = True
-                    break
-        
-            # Fallback to used lines
-            if not found_unused:
-                print(f"{log_prefix} No unused lines - trying used lines as fallback")
-                for offset in range(len(proxy_configs)):
-                    check_index = (current_index + offset) % len(proxy_configs)
-                    if check_index not in tried_lines:
-                        config = proxy_configs[check_index]
-                        found_unused = True
-                        break
-        
-            if not found_unused:
+
+        while attempts < len_config:
+            lease = pool.acquire(exclude=tried_lines, log_prefix=log_prefix)
+            if lease is None:
                 break
-        
+
             attempts += 1
-            tried_lines.add(check_index)
-        
-            # proxy_info = f"{config['provider']}:{config['type']}:{config['api_key'][-8:]}"
-            # line_status = "used" if config['line_num'] in used_lines else "unused"
-            # print(f"{log_prefix} Attempt {attempts}/{max_attempts}: {proxy_info} line {config['line_num']} ({line_status})")
-        
-            try:
-                # Get full proxy details from provider API
-                full_proxy = None
-                if config['provider'] == 'tmproxy':
-                    proxy_details = TMProxyAPI.get_proxy_static(config['api_key'], config['type'])
-                    if proxy_details:
-                        full_proxy = proxy_details
-                elif config['provider'] == 'proxyrack':
-                    # ProxyRack: Build proxy directly from config (no API call needed)
-                    full_proxy = {
-                        'mode': config['type'],
-                        'host': config['host'],
-                        'port': config['port'],
-                        'username': config['username'],  # Đã có: robertle;country=US,CA,GB
-                        'password': config['password']
-                    }
-                    print(f"{log_prefix} Built ProxyRack proxy: {config['host']}:{config['port']}")
+            tried_lines.add(lease.key)
 
-                else:
-                    print(f"{log_prefix} Unknown provider: {config['provider']}")
-                    continue
-            
-                if not full_proxy:
-                    print(f"{log_prefix} Failed to get proxy details - continue")
-                    time.sleep(1)
-                    continue
-            
+            if not lease.proxy:
+                print(f"{log_prefix} Failed to get proxy details (line {lease.line_num}) - continue")
+                pool.report(lease, False)
+                continue
+
+            if lease.provider == 'proxyrack':
+                print(f"{log_prefix} Built ProxyRack proxy: {lease.proxy['host']}:{lease.proxy['port']}")
+
+            try:
                 # Update profile proxy via GoLogin API
-                update_success, message = gologin_api.update_proxy_for_profiles(profile_id, full_proxy)
-                if update_success:
-                    with gv._proxy_lock:
-                        # Mark as used, update index
-                        used_line_num = config['line_num']
-                        used_lines.add(used_line_num)
-                        next_index = (check_index + 1) % len(proxy_configs)
-                        gv.set("session_used_lines", used_lines.copy())
-                        gv.set("session_proxy_index", next_index)                      
-                        return True, "Assigned"
-                else:
-                    print(f"{log_prefix} API update failed: {message} - continue")
-                    time.sleep(1)
-                    continue
-                
+                update_success, message = gologin_api.update_proxy_for_profiles(profile_id, lease.proxy)
             except Exception as e:
                 print(f"{log_prefix} Exception: {e} - continue")
-                time.sleep(1)
-            continue 
-    
+                pool.report(lease, False, penalize=False)
+                continue
+
+            if update_success:
+                pool.report(lease, True)
+                return True, "Assigned"
+
+            print(f"{log_prefix} API update failed: {message} - continue")
+            pool.report(lease, False, penalize=False)
+
         error_msg = f"All {attempts} attempts failed - no valid proxy assignable"
         print(f"{log_prefix} {error_msg}")
         if ignore_exception:
@@ -1810,51 +1601,35 @@ class GoLoginProfileHelper:
             killed_count = 0
             logger.info(f"{log_prefix} Searching for Orbita processes...")
         
-            for proc in psutil.process_iter(['pid', 'name', 'cmdline', 'exe']):
+            process_index = get_process_index()
+            killed_processes = []
+            for entry in process_index.browser_processes(max_age=0):
+                pid = entry.pid
+                proc = entry.process
                 try:
-                    proc_name = proc.info['name'].lower() if proc.info['name'] else ''
-                    pid = proc.info['pid']
-                
                     # ONLY kill chrome.exe (NOT gologin.exe)
-                    if proc_name != 'chrome.exe':
-                        continue
-                
-                    cmdline = proc.info.get('cmdline', [])
-                    if not cmdline:
+                    if entry.name != 'chrome.exe' or not entry.cmdline:
                         continue
-                
-                    cmdline_str = ' '.join(cmdline).lower()
-                    exe_path = proc.info.get('exe', '').lower() if proc.info.get('exe') else ''
-                
+
                     # Check if this is GoLogin Orbita (NOT regular Chrome)
-                    is_gologin_orbita = (
-                        ('.gologin' in exe_path and 'orbita' in exe_path) or
-                        ('appdata\\local\\gologin\\browser' in exe_path) or
-                        ('.gologin' in cmdline_str and 'orbita' in cmdline_str)
-                    )
-                
-                    if not is_gologin_orbita:
+                    if not entry.is_gologin_orbita:
                         continue
-                
+
                     # Verify user-data-dir flag (safety check - must be profile browser)
-                    has_profile_flag = (
-                        '--user-data-dir' in cmdline_str or
-                        '--profile-directory' in cmdline_str
-                    )
-                
-                    if not has_profile_flag:
+                    if not entry.has_profile_flag:
                         continue
-                
+
                     # Skip renderer/GPU processes (only kill main browser process)
-                    if '--type=' in cmdline_str:
+                    if not entry.is_main:
                         continue
-                
+
                     # ALL checks passed - safe to kill
                     logger.info(f"{log_prefix} Killing Orbita PID {pid}")
                     proc.kill()
                     proc.wait(timeout=3)  # Wait for process to die
                     killed_count += 1
-                
+                    killed_processes.append(pid)
+
                 except psutil.TimeoutExpired:
                     logger.warning(f"{log_prefix} Timeout killing PID {pid}, trying terminate...")
                     try:
@@ -1863,11 +1638,11 @@ class GoLoginProfileHelper:
                         pass
                 except (psutil.NoSuchProcess, psutil.AccessDenied):
                     pass
-        
+
+            process_index.forget(killed_processes)
+
             if killed_count > 0:
                 logger.info(f"{log_prefix} ✓ Total killed: {killed_count} Orbita process(es)")
-                import time
-                time.sleep(2)  # Wait for cleanup to complete
             else:
                 logger.info(f"{log_prefix} No Orbita processes found")
         
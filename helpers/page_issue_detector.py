@@ -0,0 +1,265 @@
+﻿# helpers/page_issue_detector.py
+
+"""
+Page Issue Detector - phát hiện bot challenge / HTTP error / block page cho warmup collector
+
+Rule khai báo trong PAGE_ISSUE_RULES và được biên dịch một lần thành danh sách atom:
+- Mỗi rule = (reason, log label, [alternative, ...]) - rule đúng khi MỘT alternative đúng
+- Mỗi alternative = tuple term - đúng khi MỌI term đúng, term rẻ được xét trước
+- Term: ("title", s) / ("url", s) / ("not_url", s) / ("source", s) / ("max_len", n) / ("max_stripped_len", n)
+
+Đánh giá theo 2 tầng:
+1. Tín hiệu rẻ (title, URL, document.readyState) từ MỘT execute_script nhỏ
+   Tầng 1 chỉ kết luận khi mọi rule ưu tiên hơn rule đúng đã chắc chắn sai (giữ thứ tự cũ)
+2. Chỉ khi tầng 1 chưa kết luận: quét body NGAY TRONG PAGE (indexOf cho mọi pattern
+   trong một script) - không kéo driver.page_source nhiều MB về Python.
+   driver.page_source chỉ còn là fallback khi script lỗi.
+"""
+
+import time
+
+TERM_TITLE = "title"
+TERM_URL = "url"
+TERM_NOT_URL = "not_url"
+TERM_SOURCE = "source"
+TERM_MAX_LEN = "max_len"                    # len(page_source) < n
+TERM_MAX_STRIPPED_LEN = "max_stripped_len"  # len(page_source.strip()) < n
+
+CHEAP_TERMS = (TERM_TITLE, TERM_URL, TERM_NOT_URL)
+_TERM_COST = {TERM_TITLE: 0, TERM_URL: 0, TERM_NOT_URL: 0, TERM_MAX_LEN: 1, TERM_MAX_STRIPPED_LEN: 1, TERM_SOURCE: 2}
+
+READY_WAIT_SECONDS = 2.0       # Chờ tối đa khi document.readyState == 'loading'
+READY_POLL_INTERVAL = 0.25
+
+# Thứ tự rule = thứ tự ưu tiên của _detect_page_issues cũ (STRICT context-based)
+PAGE_ISSUE_RULES = [
+    ("HTTP 404 Not Found", "❌ 404 Not Found", [
+        (("title", "404"), ("title", "not found")),
+        (("title", "404"), ("title", "error")),
+    ]),
+    ("HTTP 500 Internal Server Error", "❌ 500 Server Error", [
+        (("title", "500"), ("title", "error")),
+    ]),
+    ("HTTP 503 Service Unavailable", "❌ 503 Service Unavailable", [
+        (("title", "503"), ("title", "unavailable")),
+    ]),
+    ("Empty Page", "⚪ Empty Page", [
+        (("max_stripped_len", 100),),
+    ]),
+    ("SSL Certificate Error", "🔒 SSL Certificate Error", [
+        (("source", "your connection is not private"),),
+        (("source", "your connection is not secure"),),
+        (("source", "net::err_cert_"),),
+        (("source", "ssl_error_"),),
+        (("source", "this site can't provide a secure connection"),),
+        (("source", "certificate error"), ("source", "continue")),
+        (("title", "privacy error"), ("not_url", "chrome-error:")),
+    ]),
+    ("Cloudflare Challenge", "🛡️ Cloudflare challenge detected", [
+        (("source", "checking your browser"), ("source", "cloudflare")),
+        (("title", "just a moment"), ("source", "cloudflare")),
+        (("source", "ray id"), ("source", "performance & security by cloudflare")),
+        (("source", "<title>just a moment...</title>"),),
+    ]),
+    ("Access Denied / IP Blocked", "🚫 Access Denied/IP Blocked", [
+        (("title", "access denied"),),
+        (("title", "403 forbidden"),),
+        (("source", "your ip has been blocked"), ("max_len", 5000)),
+        (("source", "you have been blocked"), ("source", "cloudflare")),
+    ]),
+    ("Rate Limited", "⏱️ Rate Limited", [
+        (("title", "429"), ("source", "too many requests")),
+        (("source", "rate limit exceeded"), ("max_len", 3000)),
+    ]),
+    ("Redirected to Error Page", "🔄 Redirected to error page", [
+        (("url", "/error"),),
+        (("url", "/404"),),
+        (("url", "/blocked"),),
+        (("url", "/denied"),),
+    ]),
+]
+
+CHEAP_SIGNALS_SCRIPT = """
+return [document.title || '', window.location.href || '', document.readyState || ''];
+"""
+
+BODY_SCAN_SCRIPT = """
+var root = document.documentElement;
+var html = root ? root.outerHTML : '';
+var low = html.toLowerCase();
+var patterns = arguments[0];
+var hits = [];
+for (var i = 0; i < patterns.length; i++) {
+    hits.push(low.indexOf(patterns[i]) !== -1);
+}
+return [html.length, html.trim().length, hits];
+"""
+
+
+class CompiledRules:
+    """PAGE_ISSUE_RULES đã biên dịch: pattern body được gom thành danh sách atom duy nhất"""
+
+    def __init__(self, rules):
+        self.source_patterns = []
+        atom_of = {}
+        self.rules = []
+        for reason, label, alternatives in rules:
+            compiled_alternatives = []
+            for alternative in alternatives:
+                terms = []
+                for kind, value in sorted(alternative, key=lambda term: _TERM_COST[term[0]]):
+                    if kind == TERM_SOURCE:
+                        if value not in atom_of:
+                            atom_of[value] = len(self.source_patterns)
+                            self.source_patterns.append(value)
+                        value = atom_of[value]
+                    terms.append((kind, value))
+                compiled_alternatives.append(tuple(terms))
+            self.rules.append((reason, label, tuple(compiled_alternatives)))
+
+
+class _SourceBody:
+    """Body từ page_source (fallback / benchmark): lower() một lần, mỗi atom quét tối đa một lần"""
+
+    def __init__(self, page_source, patterns):
+        self._source = page_source.lower()
+        self._patterns = patterns
+        self._hits = {}
+        self.length = len(self._source)
+        self.stripped_length = len(self._source.strip())
+
+    def has(self, atom):
+        hit = self._hits.get(atom)
+        if hit is None:
+            hit = self._hits[atom] = self._patterns[atom] in self._source
+        return hit
+
+
+class _ScannedBody:
+    """Body đã quét trong page: chỉ có độ dài + bitmap atom"""
+
+    def __init__(self, length, stripped_length, hits):
+        self.length = length
+        self.stripped_length = stripped_length
+        self._hits = hits
+
+    def has(self, atom):
+        return bool(self._hits[atom])
+
+
+class PageIssueDetector:
+    """Đánh giá CompiledRules trên tín hiệu rẻ trước, body sau"""
+
+    def __init__(self, rules=PAGE_ISSUE_RULES):
+        self.compiled = CompiledRules(rules)
+        self.stats = {'checks': 0, 'decided_cheap': 0, 'body_scans': 0, 'page_source_fallbacks': 0}
+
+    # ========== EVALUATION ==========
+
+    @staticmethod
+    def _term(kind, value, title, url, body):
+        """True / False / None (cần body mà chưa có)"""
+        if kind == TERM_TITLE:
+            return value in title
+        if kind == TERM_URL:
+            return value in url
+        if kind == TERM_NOT_URL:
+            return value not in url
+        if body is None:
+            return None
+        if kind == TERM_SOURCE:
+            return body.has(value)
+        if kind == TERM_MAX_LEN:
+            return body.length < value
+        return body.stripped_length < value
+
+    def evaluate(self, title, url, body=None):
+        """
+        Args:
+            title, url: đã lowercase
+            body: _SourceBody / _ScannedBody hoặc None (chỉ tín hiệu rẻ)
+
+        Returns:
+            tuple: (reason, label) nếu có rule đúng, None nếu sạch,
+                   "undecided" nếu body=None và cần quét body
+
+        Rule xét theo đúng thứ tự ưu tiên: một rule đúng chỉ được trả về khi mọi rule
+        đứng trước đã chắc chắn sai; còn rule trước chưa quyết định → "undecided".
+        """
+        undecided = False
+        for reason, label, alternatives in self.compiled.rules:
+            rule_unknown = False
+            for terms in alternatives:
+                alternative_result = True
+                for kind, value in terms:
+                    result = self._term(kind, value, title, url, body)
+                    if result is False:
+                        alternative_result = False
+                        break
+                    if result is None:
+                        alternative_result = None
+                if alternative_result:
+                    # Tầng rẻ: rule chắc chắn đúng và không rule nào ưu tiên hơn còn bỏ ngỏ
+                    # → blocked, không cần body
+                    return "undecided" if undecided else (reason, label)
+                if alternative_result is None:
+                    rule_unknown = True
+            undecided = undecided or rule_unknown
+        return "undecided" if undecided else None
+
+    def evaluate_html(self, page_source, title, url):
+        """Đánh giá đầy đủ trên HTML đã có (fallback page_source, benchmark)"""
+        title = title.lower()
+        url = url.lower()
+        result = self.evaluate(title, url)
+        if result != "undecided":
+            return result
+        return self.evaluate(title, url, _SourceBody(page_source, self.compiled.source_patterns))
+
+    # ========== DRIVER ==========
+
+    def detect(self, driver):
+        """
+        Returns:
+            tuple: (reason, label, current_url) nếu page có vấn đề, None nếu sạch
+        """
+        self.stats['checks'] += 1
+        title, url, ready_state = driver.execute_script(CHEAP_SIGNALS_SCRIPT)
+
+        deadline = time.time() + READY_WAIT_SECONDS
+        while ready_state == "loading" and time.time() < deadline:
+            time.sleep(READY_POLL_INTERVAL)
+            title, url, ready_state = driver.execute_script(CHEAP_SIGNALS_SCRIPT)
+
+        title = title.lower()
+        url = url.lower()
+        result = self.evaluate(title, url)
+        if result != "undecided":
+            if result:
+                self.stats['decided_cheap'] += 1
+                return result[0], result[1], url
+            return None
+
+        try:
+            length, stripped_length, hits = driver.execute_script(BODY_SCAN_SCRIPT, self.compiled.source_patterns)
+            body = _ScannedBody(length, stripped_length, hits)
+            self.stats['body_scans'] += 1
+        except Exception as e:
+            print(f"[PAGE_ISSUE] In-page body scan failed ({e}), falling back to page_source")
+            body = _SourceBody(driver.page_source, self.compiled.source_patterns)
+            self.stats['page_source_fallbacks'] += 1
+
+        result = self.evaluate(title, url, body)
+        if result:
+            return result[0], result[1], url
+        return None
+
+
+_page_issue_detector = None
+
+def get_page_issue_detector():
+    """Get or create singleton PageIssueDetector"""
+    global _page_issue_detector
+    if _page_issue_detector is None:
+        _page_issue_detector = PageIssueDetector()
+    return _page_issue_detector
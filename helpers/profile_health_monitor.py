@@ -4,13 +4,52 @@
 Profile Health Monitor - Detect when profile closes/crashes and force release action lock
 
 FEATURES:
-- Monitor profile health (driver alive, window exists)
+- Monitor profile health (browser alive via DevTools /json/version)
 - Pause monitoring temporarily (during crashed tab fix)
 - Resume monitoring after fix
+
+ARCHITECTURE:
+- MỘT scheduler thread cho mọi profile: heap theo thời điểm check kế tiếp (timer wheel)
+- Probe chạy trên executor nhỏ (PROBE_WORKERS), HTTP session pooled dùng chung
+- Callback force release chạy trên executor riêng → probe không bị callback chậm chặn
+- Interval thích ứng: profile ổn định giãn dần tới CHECK_INTERVAL_MAX, lỗi → check lại nhanh
+→ Số thread cố định, không tăng theo số profile
 """
 
+import heapq
+import itertools
 import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+CHECK_INTERVAL_START = 2.0       # Interval ban đầu (giống check_interval cũ)
+CHECK_INTERVAL_MAX = 6.0         # Profile ổn định lâu → giãn tới mức này
+CHECK_INTERVAL_GROWTH = 1.25     # Mỗi lần check OK: interval *= growth
+CHECK_INTERVAL_RETRY = 0.5       # Sau khi check lỗi → check lại nhanh để xác nhận
+MAX_FAILURES = 3                 # Failed 3 lần liên tiếp mới force release
+PROBE_TIMEOUT = 2                # Timeout (giây) cho DevTools probe
+PROBE_WORKERS = 4
+CALLBACK_WORKERS = 2
+PROBE_HOST_POOLS = 64            # Mỗi debugger port là một host → giữ keep-alive cho 64 profile
+
+
+class _MonitorEntry:
+    __slots__ = ("profile_id", "driver", "debugger_address", "callback_on_close", "log_prefix",
+                 "interval", "failures", "paused")
+
+    def __init__(self, profile_id, driver, debugger_address, callback_on_close, log_prefix):
+        self.profile_id = profile_id
+        self.driver = driver
+        self.debugger_address = debugger_address
+        self.callback_on_close = callback_on_close
+        self.log_prefix = log_prefix
+        self.interval = CHECK_INTERVAL_START
+        self.failures = 0
+        self.paused = False
+
 
 class ProfileHealthMonitor:
     """Monitor profile health and force release lock if profile closes"""
@@ -30,40 +69,37 @@ class ProfileHealthMonitor:
         if self._initialized:
             return
             
-        self.active_monitors = {}
-        self.stop_events = {}
-        self.dict_lock = threading.Lock()
+        self.entries = {}  # profile_id → _MonitorEntry
+        self._cond = threading.Condition()
+        self._schedule = []  # heap (due, seq, entry)
+        self._seq = itertools.count()
+        self._scheduler_thread = None
+        
+        self._probe_executor = ThreadPoolExecutor(max_workers=PROBE_WORKERS, thread_name_prefix="HealthProbe")
+        self._callback_executor = ThreadPoolExecutor(max_workers=CALLBACK_WORKERS, thread_name_prefix="HealthCallback")
         
-        # NEW: Pause events for each monitor (to pause during crashed tab fix)
-        self.pause_events = {}  # profile_id → Event (set = paused)
+        # Session pooled cho DevTools probe (localhost → bỏ proxy hệ thống)
+        self.session = requests.Session()
+        self.session.trust_env = False
+        adapter = HTTPAdapter(pool_connections=PROBE_HOST_POOLS, pool_maxsize=2)
+        self.session.mount("http://", adapter)
+        
+        self.stats = {'probes': 0, 'failures': 0, 'closed': 0, 'probe_ms': 0.0}
         
         self._initialized = True
         print("[HEALTH MONITOR] ✓ Initialized")
     
     def start_monitoring(self, profile_id, driver, debugger_address, callback_on_close, log_prefix="[MONITOR]"):
-        """Start monitoring a profile"""
-        with self.dict_lock:
-            if profile_id in self.active_monitors:
-                self.stop_monitoring(profile_id)
-            
-            stop_event = threading.Event()
-            self.stop_events[profile_id] = stop_event
-            
-            # NEW: Create pause event (not set initially = not paused)
-            pause_event = threading.Event()
-            self.pause_events[profile_id] = pause_event
-            
-            monitor_thread = threading.Thread(
-                target=self._monitor_loop,
-                args=(profile_id, driver, debugger_address, callback_on_close, stop_event, pause_event, log_prefix),
-                daemon=True,
-                name=f"HealthMonitor-{profile_id[:8]}"
-            )
-            
-            self.active_monitors[profile_id] = monitor_thread
-            monitor_thread.start()
-            
-            print(f"{log_prefix} [{profile_id}] ✓ Health monitoring started")
+        """Start monitoring a profile (đăng ký vào scheduler chung, không tạo thread mới)"""
+        entry = _MonitorEntry(profile_id, driver, debugger_address, callback_on_close, log_prefix)
+        with self._cond:
+            # Entry cũ (nếu có) bị thay thế → lịch của nó trong heap tự bị bỏ qua
+            self.entries[profile_id] = entry
+            self._push(entry, entry.interval)
+            self._ensure_scheduler()
+        
+        probe = "DevTools /json/version" if debugger_address else "window_handles"
+        print(f"{log_prefix} [{profile_id}] ✓ Health monitoring started ({probe}, check every {entry.interval:.0f}-{CHECK_INTERVAL_MAX:.0f}s)")
     
     def pause_monitoring(self, profile_id):
         """
@@ -72,9 +108,10 @@ class ProfileHealthMonitor:
         Args:
             profile_id: Profile ID to pause monitoring
         """
-        with self.dict_lock:
-            if profile_id in self.pause_events:
-                self.pause_events[profile_id].set()  # Set = paused
+        with self._cond:
+            entry = self.entries.get(profile_id)
+            if entry is not None:
+                entry.paused = True
                 print(f"[HEALTH MONITOR] [{profile_id}] ⏸️ Monitoring paused")
     
     def resume_monitoring(self, profile_id):
@@ -84,143 +121,153 @@ class ProfileHealthMonitor:
         Args:
             profile_id: Profile ID to resume monitoring
         """
-        with self.dict_lock:
-            if profile_id in self.pause_events:
-                self.pause_events[profile_id].clear()  # Clear = resumed
+        with self._cond:
+            entry = self.entries.get(profile_id)
+            if entry is not None:
+                entry.paused = False
+                entry.failures = 0
                 print(f"[HEALTH MONITOR] [{profile_id}] ▶️ Monitoring resumed")
     
     def stop_monitoring(self, profile_id):
         """Stop monitoring a profile"""
-        with self.dict_lock:
-            if profile_id in self.stop_events:
-                self.stop_events[profile_id].set()
-                
-                if profile_id in self.active_monitors:
-                    self.active_monitors[profile_id].join(timeout=2)
-                
-                # Cleanup
-                del self.stop_events[profile_id]
-                if profile_id in self.active_monitors:
-                    del self.active_monitors[profile_id]
-                if profile_id in self.pause_events:
-                    del self.pause_events[profile_id]
-                
+        with self._cond:
+            if self.entries.pop(profile_id, None) is not None:
                 print(f"[HEALTH MONITOR] [{profile_id}] Monitoring stopped")
-                
     
-    def _monitor_loop(self, profile_id, driver, debugger_address, callback_on_close, stop_event, pause_event, log_prefix):
+    def get_stats(self):
         """
-        Background thread monitoring profile health
+        Returns:
+            dict: monitored, probes, failures, closed, avg_probe_ms
+        """
+        with self._cond:
+            probes = self.stats['probes']
+            return {
+                'monitored': len(self.entries),
+                'probes': probes,
+                'failures': self.stats['failures'],
+                'closed': self.stats['closed'],
+                'avg_probe_ms': round(self.stats['probe_ms'] / probes, 1) if probes else 0.0,
+            }
     
-        Loop:
-        1. Check if should pause (crashed tab fix in progress)
-        2. Check driver health (alive, window exists)
-        3. If dead → force release lock → exit
-        4. Sleep and repeat
+    # ==================== SCHEDULER ====================
     
-        Args:
-            profile_id: Profile ID to monitor
-            driver: Selenium WebDriver instance
-            debugger_address: Chrome debugger address (not used in current impl)
-            callback_on_close: Callback để force release lock
-            stop_event: Event để stop monitoring
-            pause_event: Event để pause monitoring
-            log_prefix: Prefix cho log messages
-        """
-        check_interval = 2  # Check mỗi 2 giây
-        consecutive_failures = 0
-        max_failures = 3  # Failed 3 lần liên tiếp mới force release
+    def _push(self, entry, delay):
+        heapq.heappush(self._schedule, (time.monotonic() + delay, next(self._seq), entry))
+        self._cond.notify()
     
-        print(f"{log_prefix} [{profile_id}] 🔍 Monitoring started (check every {check_interval}s)")
+    def _ensure_scheduler(self):
+        if self._scheduler_thread is None or not self._scheduler_thread.is_alive():
+            self._scheduler_thread = threading.Thread(
+                target=self._scheduler_loop,
+                daemon=True,
+                name="HealthMonitor-Scheduler"
+            )
+            self._scheduler_thread.start()
     
-        # Main monitoring loop
-        while not stop_event.is_set():
-            try:
-                # ========== CHECK 1: PAUSE EVENT ==========
-                if pause_event and pause_event.is_set():
-                    # Monitoring paused (e.g., during crashed tab fix)
-                    # print(f"{log_prefix} [{profile_id}] ⏸ Monitoring paused")
-                    time.sleep(check_interval)
+    def _scheduler_loop(self):
+        """
+        Scheduler thread duy nhất: lấy entry tới hạn từ heap → gửi probe sang executor
+    
+        Entry đã stop / bị thay thế được bỏ qua khi tới hạn (lazy delete).
+        Entry đang pause được dời lịch, không probe.
+        """
+        while True:
+            with self._cond:
+                while True:
+                    if not self._schedule:
+                        self._cond.wait()
+                        continue
+                    due, _, entry = self._schedule[0]
+                    delay = due - time.monotonic()
+                    if delay <= 0:
+                        break
+                    self._cond.wait(delay)
+                
+                heapq.heappop(self._schedule)
+                if self.entries.get(entry.profile_id) is not entry:
+                    continue
+                if entry.paused:
+                    self._push(entry, entry.interval)
                     continue
-        
-                # ========== CHECK 2: DRIVER HEALTH (NO PAGE LOAD BLOCKING) ==========
-                try:
-                    # Check window handles (fast, no page load wait)
-                    handles = driver.window_handles
             
-                    # If we can get handles, driver is alive
-                    if handles and len(handles) > 0:
-                        # Driver alive, reset failure counter
-                        consecutive_failures = 0
-                        # print(f"{log_prefix} [{profile_id}] ✓ Driver alive ({len(handles)} tabs)")
-                    else:
-                        # No handles = browser closed
-                        raise Exception("No window handles found")
+            try:
+                self._probe_executor.submit(self._run_check, entry)
+            except RuntimeError:
+                # Executor đã shutdown (interpreter đang thoát)
+                return
+            except Exception as e:
+                print(f"[HEALTH MONITOR] [{entry.profile_id}] Scheduler error: {e}")
+                with self._cond:
+                    self._push(entry, entry.interval)
+    
+    def _run_check(self, entry):
+        """Chạy trên probe executor: probe 1 profile, cập nhật interval / failures, lên lịch lần sau"""
+        profile_id = entry.profile_id
+        log_prefix = entry.log_prefix
+        started = time.perf_counter()
+        error = None
+        try:
+            self._probe(entry)
+        except Exception as health_error:
+            error = health_error
+        elapsed_ms = (time.perf_counter() - started) * 1000
         
-                except Exception as health_error:
-                    # Driver check failed
-                    consecutive_failures += 1
-                    print(f"{log_prefix} [{profile_id}] ⚠ Health check failed ({consecutive_failures}/{max_failures}): {health_error}")
+        with self._cond:
+            self.stats['probes'] += 1
+            self.stats['probe_ms'] += elapsed_ms
+            if self.entries.get(profile_id) is not entry:
+                return
+            if entry.paused:
+                # Kết quả probe trong lúc fix crashed tab không đáng tin
+                self._push(entry, entry.interval)
+                return
             
-                    # If max failures reached, force release lock
-                    if consecutive_failures >= max_failures:
-                        print(f"{log_prefix} [{profile_id}] ❌ Profile closed/crashed, force releasing lock")
-                
-                        # Call callback to force release lock
-                        if callback_on_close:
-                            try:
-                                callback_on_close()
-                            except Exception as callback_error:
-                                print(f"{log_prefix} [{profile_id}] Callback error: {callback_error}")
-                
-                        # Stop monitoring
-                        break
+            if error is None:
+                entry.failures = 0
+                entry.interval = min(CHECK_INTERVAL_MAX, entry.interval * CHECK_INTERVAL_GROWTH)
+                self._push(entry, entry.interval)
+                return
+            
+            entry.failures += 1
+            self.stats['failures'] += 1
+            failures = entry.failures
+            if failures < MAX_FAILURES:
+                entry.interval = CHECK_INTERVAL_START
+                self._push(entry, CHECK_INTERVAL_RETRY)
+            else:
+                del self.entries[profile_id]
+                self.stats['closed'] += 1
         
-                # Sleep before next check
-                time.sleep(check_interval)
+        print(f"{log_prefix} [{profile_id}] ⚠ Health check failed ({failures}/{MAX_FAILURES}): {error}")
+        if failures >= MAX_FAILURES:
+            print(f"{log_prefix} [{profile_id}] ❌ Profile closed/crashed, force releasing lock")
+            if entry.callback_on_close:
+                self._callback_executor.submit(self._run_callback, entry)
+            print(f"{log_prefix} [{profile_id}] Monitor stopped")
     
-            except Exception as loop_error:
-                print(f"{log_prefix} [{profile_id}] Loop error: {loop_error}")
-                time.sleep(check_interval)
-
-        # Cleanup
-        print(f"{log_prefix} [{profile_id}] Monitor stopped")
-
-
-
-    
-    def _check_profile_alive(self, driver, debugger_address, profile_id, log_prefix):
-        """Check if profile is still alive"""
+    @staticmethod
+    def _run_callback(entry):
         try:
-            # CHECK 1: JavaScript execution
-            try:
-                result = driver.execute_script("return 1;")
-                if result != 1:
-                    return False
-            except Exception:
-                return False
-            
-            # CHECK 2: Window handles exist
-            try:
-                handles = driver.window_handles
-                if not handles or len(handles) == 0:
-                    return False
-            except Exception:
-                return False
-            
-            # CHECK 3: DevTools API responds
-            try:
-                import requests
-                response = requests.get(f"http://{debugger_address}/json", timeout=2)
-                if response.status_code != 200:
-                    return False
-            except:
-                return False
-            
-            return True
-            
-        except Exception:
-            return False
+            entry.callback_on_close()
+        except Exception as callback_error:
+            print(f"{entry.log_prefix} [{entry.profile_id}] Callback error: {callback_error}")
+    
+    def _probe(self, entry):
+        """
+        Raise nếu profile không còn sống
+        
+        - Có debugger_address: GET /json/version qua session pooled (rẻ, không đi qua chromedriver)
+        - Không có: fallback driver.window_handles như cũ
+        """
+        if entry.debugger_address:
+            response = self.session.get(f"http://{entry.debugger_address}/json/version", timeout=PROBE_TIMEOUT)
+            if response.status_code != 200:
+                raise Exception(f"DevTools returned HTTP {response.status_code}")
+            return
+        
+        handles = entry.driver.window_handles
+        if not handles:
+            raise Exception("No window handles found")
 
 
 _health_monitor = ProfileHealthMonitor()
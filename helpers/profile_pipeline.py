@@ -0,0 +1,353 @@
+﻿# helpers/profile_pipeline.py
+
+"""
+Profile Pipeline - sliding window thay cho batch barrier khi chạy nhiều profile
+
+Mỗi profile đi qua 3 stage, mỗi stage có giới hạn concurrency riêng:
+1. OPEN   - open_profile(profile_id) trên open executor (tối đa open_workers)
+2. RUN    - start_flow() + run_chain() round-robin trên runner thread (tối đa `window` flow)
+3. CLOSE  - close_profile(profile_id, context) trên close executor (tối đa close_workers)
+
+Luôn giữ `window` profile "live" (open + run + close): profile nào close xong (hoặc
+mở thất bại) thì chính worker đó mở profile kế tiếp ngay, kể cả khi runner đang bận một
+chain dài - một profile chậm không còn chặn cả batch, và open / run / close của các
+profile khác nhau chồng lấp nhau. Một profile_id không bao giờ live 2 lần cùng lúc.
+
+Cuối run() in bảng utilization: slot-seconds theo stage, idle slot time, và
+idle mà batch barrier (chia `window` profile / batch) lẽ ra phải chờ profile chậm nhất.
+"""
+
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+EVENT_OPENED = "opened"
+EVENT_CLOSED = "closed"
+
+
+class _ProfileTiming:
+    __slots__ = ("index", "submitted", "opened", "run_end", "closed", "run_seconds", "chains")
+
+    def __init__(self, index):
+        self.index = index
+        self.submitted = time.monotonic()
+        self.opened = None
+        self.run_end = None
+        self.closed = None
+        self.run_seconds = 0.0    # Thời gian runner thực sự chạy chain của profile này
+        self.chains = 0
+
+
+class ProfilePipeline:
+    """
+    Sliding-window scheduler cho open → run → close
+
+    Callbacks:
+        open_profile(profile_id) → context (truthy) hoặc None nếu mở thất bại
+        start_flow(profile_id, context, live_profiles) → flow (có has_next_chain) hoặc None = không chạy chain
+        run_chain(profile_id, flow) → True nếu chain OK (chạy tiếp), False = dừng profile
+        close_profile(profile_id, context) → bool
+
+    Exception trong fatal_exceptions từ open_profile → ngừng mở profile mới, đóng các
+    profile đang live rồi re-raise ở cuối run().
+    """
+
+    def __init__(self, window, open_workers=None, close_workers=None, should_stop=None,
+                 fatal_exceptions=(), log_prefix="[PIPELINE]"):
+        self.window = max(1, int(window))
+        self.open_workers = max(1, int(open_workers or self.window))
+        self.close_workers = max(1, int(close_workers or self.window))
+        self.should_stop = should_stop or (lambda: False)
+        self.fatal_exceptions = fatal_exceptions
+        self.log_prefix = log_prefix
+
+        self._events = queue.Queue()
+        self._timings = {}         # profile_id → _ProfileTiming của lần mở hiện tại
+        self._finished = []        # _ProfileTiming đã close (profile lặp lại có nhiều lần)
+        self.results = {}          # profile_id → 'completed' / 'failed' / 'open_failed' / 'stopped'
+        self.stats = {}
+
+        # Admission: slot được cấp lại ngay từ open/close worker, không chờ runner xong chain
+        self._lock = threading.Lock()
+        self._pending = iter(())
+        self._deferred = deque()   # Profile tới lượt nhưng đang live → mở khi bản live đã close
+        self._live_ids = set()
+        self._index = 0
+        self._total = "?"
+        self._stopping = False
+        self._fatal_error = None
+        self._open_profile = None
+        self._open_executor = None
+
+    # ==================== PUBLIC ====================
+
+    def run(self, profile_list, open_profile, start_flow, run_chain, close_profile):
+        """
+        Chạy toàn bộ profile_list qua pipeline (block tới khi mọi profile đã close)
+
+        profile_list có thể là iterable lazy (RandomizedProfileSequence): chỉ lấy phần tử
+        kế tiếp khi có slot trống. Profile tới lượt mà vẫn đang live (list có phần tử lặp)
+        được hoãn lại, slot dành cho profile kế tiếp.
+
+        Returns:
+            dict: results {profile_id: status}
+        """
+        self._pending = iter(profile_list)
+        self._deferred = deque()
+        self._timings = {}
+        self._finished = []
+        self._live_ids = set()
+        self._index = 0
+        self._total = len(profile_list) if hasattr(profile_list, "__len__") else "?"
+        self._stopping = False
+        self._fatal_error = None
+        self._open_profile = open_profile
+        contexts = {}
+        running = deque()          # profile_id theo thứ tự round-robin
+        flows = {}
+        stop_handled = False
+        started = time.monotonic()
+        runner_busy = 0.0
+
+        self._open_executor = ThreadPoolExecutor(max_workers=self.open_workers, thread_name_prefix="PipelineOpen")
+        close_executor = ThreadPoolExecutor(max_workers=self.close_workers, thread_name_prefix="PipelineClose")
+
+        print(f"{self.log_prefix} Sliding window: {self.window} live profile(s), "
+              f"open ≤{self.open_workers}, close ≤{self.close_workers}, total {self._total}")
+
+        def submit_close(profile_id, status):
+            self.results[profile_id] = status
+            self._timings[profile_id].run_end = time.monotonic()
+            close_executor.submit(self._close_worker, close_profile, profile_id, contexts.pop(profile_id, None))
+
+        try:
+            with self._lock:
+                self._admit_locked()
+
+            while True:
+                # ========== STOP / FATAL → ngừng mở mới, đóng mọi profile đang chạy ==========
+                if not stop_handled and (self._fatal_error is not None or self.should_stop()):
+                    stop_handled = True
+                    with self._lock:
+                        self._stop_locked("fatal error" if self._fatal_error is not None else "stop requested",
+                                          len(running))
+                    while running:
+                        submit_close(running.popleft(), 'stopped')
+
+                # ========== EVENTS TỪ OPEN / CLOSE WORKER ==========
+                block = not running
+                while True:
+                    try:
+                        event, profile_id, context = self._events.get(block=block, timeout=0.5 if block else None)
+                    except queue.Empty:
+                        break
+                    block = False
+
+                    if event == EVENT_CLOSED or not context:
+                        # Slot đã được worker trả lại (và profile kế tiếp đã được mở)
+                        continue
+
+                    # EVENT_OPENED
+                    contexts[profile_id] = context
+                    if stop_handled or self._fatal_error is not None:
+                        submit_close(profile_id, 'stopped')
+                        continue
+
+                    try:
+                        flow = start_flow(profile_id, context, list(running) + [profile_id])
+                    except Exception as e:
+                        print(f"{self.log_prefix} [{profile_id}] ❌ Failed to create flow: {e}")
+                        submit_close(profile_id, 'failed')
+                        continue
+                    if flow is None:
+                        submit_close(profile_id, 'completed')
+                        continue
+                    flows[profile_id] = flow
+                    running.append(profile_id)
+                    print(f"{self.log_prefix} [{profile_id}] → RUN (running {len(running)})")
+
+                if not running or stop_handled:
+                    with self._lock:
+                        if not self._live_ids:
+                            self._admit_locked()
+                            if not self._live_ids:
+                                break  # Không còn profile live và không còn gì để mở
+                    continue
+
+                # ========== RUN: 1 chain cho profile kế tiếp (round-robin) ==========
+                profile_id = running.popleft()
+                flow = flows[profile_id]
+                if not flow.has_next_chain():
+                    print(f"{self.log_prefix} [{profile_id}] All chains completed → CLOSE")
+                    flows.pop(profile_id, None)
+                    submit_close(profile_id, 'completed')
+                    continue
+
+                chain_started = time.monotonic()
+                try:
+                    ok = run_chain(profile_id, flow)
+                except Exception as e:
+                    print(f"{self.log_prefix} [{profile_id}] ❌ Exception during chain execution: {e}")
+                    import traceback
+                    traceback.print_exc()
+                    ok = False
+                elapsed = time.monotonic() - chain_started
+                runner_busy += elapsed
+                self._timings[profile_id].run_seconds += elapsed
+                self._timings[profile_id].chains += 1
+
+                if ok:
+                    running.append(profile_id)
+                else:
+                    flows.pop(profile_id, None)
+                    submit_close(profile_id, 'failed')
+
+        finally:
+            with self._lock:
+                self._stopping = True
+            self._open_executor.shutdown(wait=True)
+            close_executor.shutdown(wait=True)
+            self._report(time.monotonic() - started, runner_busy)
+
+        if self._fatal_error is not None:
+            raise self._fatal_error
+        return self.results
+
+    # ==================== ADMISSION ====================
+
+    def _admit_locked(self):
+        """Mở profile kế tiếp cho tới khi đủ `window` profile live (gọi khi giữ self._lock)"""
+        while not self._stopping and len(self._live_ids) < self.window:
+            profile_id = self._next_candidate_locked()
+            if profile_id is None:
+                return
+            self._index += 1
+            self._live_ids.add(profile_id)
+            self._timings[profile_id] = _ProfileTiming(self._index)
+            try:
+                self._open_executor.submit(self._open_worker, self._open_profile, profile_id)
+            except RuntimeError:
+                # Executor đã shutdown (run() đang thoát)
+                self._live_ids.discard(profile_id)
+                self.results[profile_id] = 'stopped'
+                return
+            print(f"{self.log_prefix} [{profile_id}] → OPEN ({self._index}/{self._total}, "
+                  f"live {len(self._live_ids)}/{self.window})")
+
+    def _next_candidate_locked(self):
+        """Profile hoãn trước (nếu bản live đã close), rồi tới phần tử kế tiếp của list"""
+        for _ in range(len(self._deferred)):
+            profile_id = self._deferred.popleft()
+            if profile_id not in self._live_ids:
+                return profile_id
+            self._deferred.append(profile_id)
+
+        for profile_id in self._pending:
+            if profile_id not in self._live_ids:
+                return profile_id
+            print(f"{self.log_prefix} [{profile_id}] Still live - deferring, opening next profile")
+            self._deferred.append(profile_id)
+        return None
+
+    def _release_locked(self, profile_id):
+        """Profile đã close / mở thất bại → trả slot và mở profile kế tiếp ngay"""
+        timing = self._timings.pop(profile_id, None)
+        if timing is not None:
+            self._finished.append(timing)
+        self._live_ids.discard(profile_id)
+        self._admit_locked()
+
+    def _stop_locked(self, reason, running_count):
+        self._stopping = True
+        remaining = self._total - self._index if isinstance(self._total, int) else "remaining"
+        print(f"{self.log_prefix} ⚠ {reason} - not opening {remaining} remaining profile(s), "
+              f"closing {running_count} running")
+        while self._deferred:
+            self.results[self._deferred.popleft()] = 'stopped'
+
+    # ==================== WORKERS ====================
+
+    def _open_worker(self, open_profile, profile_id):
+        context = None
+        error = None
+        try:
+            context = open_profile(profile_id)
+        except Exception as e:
+            error = e
+            print(f"{self.log_prefix} [{profile_id}] ❌ Exception while opening: {type(e).__name__}: {e}")
+
+        with self._lock:
+            timing = self._timings[profile_id]
+            timing.opened = time.monotonic()
+            if error is not None and isinstance(error, self.fatal_exceptions) and self._fatal_error is None:
+                self._fatal_error = error
+                self._stopping = True
+            if not context:
+                # Mở thất bại → slot trả lại ngay (không có gì để close)
+                self.results[profile_id] = 'open_failed'
+                timing.run_end = timing.closed = time.monotonic()
+                self._release_locked(profile_id)
+        self._events.put((EVENT_OPENED, profile_id, context))
+
+    def _close_worker(self, close_profile, profile_id, context):
+        try:
+            close_profile(profile_id, context)
+        except Exception as e:
+            print(f"{self.log_prefix} [{profile_id}] ⚠ Close error: {e}")
+
+        with self._lock:
+            self._timings[profile_id].closed = time.monotonic()
+            self._release_locked(profile_id)
+        self._events.put((EVENT_CLOSED, profile_id, None))
+
+    # ==================== METRICS ====================
+
+    def _report(self, wall, runner_busy):
+        timings = [t for t in self._finished if t.closed is not None]
+        if not timings or wall <= 0:
+            return
+
+        open_seconds = sum(t.opened - t.submitted for t in timings)
+        run_seconds = sum(t.run_end - t.opened for t in timings)
+        close_seconds = sum(t.closed - t.run_end for t in timings)
+        live_seconds = open_seconds + run_seconds + close_seconds
+        slot_seconds = self.window * wall
+        idle_seconds = max(0.0, slot_seconds - live_seconds)
+
+        # Batch barrier: mỗi nhóm `window` profile liên tiếp chờ profile chậm nhất nhóm
+        ordered = sorted(timings, key=lambda t: t.index)
+        barrier_idle = 0.0
+        for i in range(0, len(ordered), self.window):
+            group = [t.closed - t.submitted for t in ordered[i:i + self.window]]
+            barrier_idle += sum(max(group) - lifetime for lifetime in group)
+
+        self.stats = {
+            'wall_s': round(wall, 1),
+            'profiles': len(timings),
+            'slot_utilization': round(live_seconds / slot_seconds, 3),
+            'idle_slot_s': round(idle_seconds, 1),
+            'batch_barrier_idle_s': round(barrier_idle, 1),
+            'stage_slot_s': {'open': round(open_seconds, 1), 'run': round(run_seconds, 1), 'close': round(close_seconds, 1)},
+            'avg_concurrency': {
+                'open': round(open_seconds / wall, 2),
+                'run': round(run_seconds / wall, 2),
+                'close': round(close_seconds / wall, 2),
+            },
+            'runner_utilization': round(runner_busy / wall, 3),
+            'chains': sum(t.chains for t in timings),
+        }
+        stats = self.stats
+        print("=" * 80)
+        print(f"{self.log_prefix} ========== UTILIZATION ==========")
+        print(f"{self.log_prefix} Wall: {stats['wall_s']}s, profiles: {stats['profiles']}, chains: {stats['chains']}")
+        print(f"{self.log_prefix} Slot utilization: {stats['slot_utilization'] * 100:.1f}% "
+              f"(idle {stats['idle_slot_s']}s of {slot_seconds:.1f} slot-seconds)")
+        print(f"{self.log_prefix} Stage slot-seconds: open {stats['stage_slot_s']['open']}s, "
+              f"run {stats['stage_slot_s']['run']}s, close {stats['stage_slot_s']['close']}s")
+        print(f"{self.log_prefix} Avg concurrency: open {stats['avg_concurrency']['open']}, "
+              f"run {stats['avg_concurrency']['run']}, close {stats['avg_concurrency']['close']}")
+        print(f"{self.log_prefix} Runner busy: {stats['runner_utilization'] * 100:.1f}%")
+        print(f"{self.log_prefix} Batch barrier would have idled {stats['batch_barrier_idle_s']}s slot time waiting for the slowest profile")
+        print("=" * 80)
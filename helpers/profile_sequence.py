@@ -0,0 +1,160 @@
+# helpers/profile_sequence.py
+
+"""
+Profile Sequence - danh sách profile random dạng lazy cho how_to_get = "Random"
+
+Ràng buộc giữ nguyên như create_randomized_profile_list cũ: một profile không lặp lại
+trong window_size - 1 vị trí ngay trước nó (window_size = max_workers * 2).
+
+Thay cho cách cũ (mỗi vị trí dựng lại available_profiles bằng list comprehension trên
+toàn bộ list + cắt slice làm set recent = O(N²)):
+- available: mảng slot + vị trí từng slot → chọn random / bỏ ra / trả lại đều O(1)
+- recent: deque window_size - 1 phần tử + đếm theo profile
+- Sinh từng phần tử khi được lấy → scheduler mở profile đầu tiên ngay, không chờ dựng cả list
+- weight_by_last_run: profile chạy lâu rồi (hoặc chưa chạy lần nào) được ưu tiên,
+  chọn bằng rejection sampling (kỳ vọng ≤ LAST_RUN_MAX_WEIGHT lần thử / phần tử)
+"""
+
+import random
+import threading
+import time
+from collections import deque
+
+LAST_RUN_MAX_WEIGHT = 8.0          # Profile chưa chạy / chạy cách đây ≥ horizon nặng gấp ngần này
+LAST_RUN_WEIGHT_HORIZON = 6 * 3600  # Giây - quá mốc này coi như "đã lâu", weight tối đa
+WEIGHTED_MAX_TRIES = 64
+
+# Lần cuối profile được đưa vào chạy trong phiên app này {profile_id: timestamp}
+_last_run_times = {}
+_last_run_lock = threading.Lock()
+
+
+def record_profile_run(profile_id, timestamp=None):
+    with _last_run_lock:
+        _last_run_times[profile_id] = time.time() if timestamp is None else timestamp
+
+
+def get_last_run_times():
+    with _last_run_lock:
+        return dict(_last_run_times)
+
+
+def last_run_weight(last_run, now):
+    """1.0 (vừa chạy) → LAST_RUN_MAX_WEIGHT (chưa chạy / cách đây ≥ horizon)"""
+    if last_run is None:
+        return LAST_RUN_MAX_WEIGHT
+    age = min(max(0.0, now - last_run), LAST_RUN_WEIGHT_HORIZON)
+    return 1.0 + (LAST_RUN_MAX_WEIGHT - 1.0) * age / LAST_RUN_WEIGHT_HORIZON
+
+
+class RandomizedProfileSequence:
+    """
+    Iterable lazy: len() = số phần tử, mỗi lần iter() sinh một thứ tự random mới
+
+    Profile trùng trong list gốc được giữ nguyên tỉ lệ (mỗi lần xuất hiện = một slot).
+    """
+
+    def __init__(self, profiles, window_size, weight_by_last_run=False, last_run_times=None,
+                 log_prefix="[GOLOGIN]", rng=None):
+        self._profiles = list(profiles)
+        self.window_size = max(1, int(window_size))
+        self.weight_by_last_run = weight_by_last_run
+        self._last_run_times = last_run_times
+        self.log_prefix = log_prefix
+        self._rng = rng or random
+        self.stats = {}
+
+    def __len__(self):
+        return len(self._profiles)
+
+    def __iter__(self):
+        return self._generate()
+
+    # ========== GENERATOR ==========
+
+    def _generate(self):
+        profiles = self._profiles
+        rng = self._rng
+        total = len(profiles)
+
+        available = list(range(total))      # Slot còn được chọn
+        position = list(range(total))       # position[slot] = index trong available (-1 = đã bỏ ra)
+        slots_of = {}                        # profile_id → [slot, ...]
+        for slot, profile_id in enumerate(profiles):
+            slots_of.setdefault(profile_id, []).append(slot)
+
+        recent = deque()
+        recent_count = {}
+        used = set()
+        fallbacks = 0
+        last_run_times = self._last_run_times if self._last_run_times is not None else _last_run_times
+
+        def take_out(profile_id):
+            for slot in slots_of[profile_id]:
+                index = position[slot]
+                last = available.pop()
+                if last != slot:
+                    available[index] = last
+                    position[last] = index
+                position[slot] = -1
+
+        def put_back(profile_id):
+            for slot in slots_of[profile_id]:
+                position[slot] = len(available)
+                available.append(slot)
+
+        for i in range(total):
+            if available:
+                profile_id = self._pick(available, last_run_times)
+            else:
+                # Window > số profile khác nhau → chọn từ toàn bộ list (như bản cũ)
+                fallbacks += 1
+                if fallbacks == 1:
+                    print(f"{self.log_prefix} Warning: No available profiles at index {i}, using full list")
+                profile_id = profiles[rng.randrange(total)]
+
+            # Cập nhật window: profile vừa chọn vào recent, phần tử cũ nhất rời window
+            if self.window_size > 1:
+                count = recent_count.get(profile_id, 0)
+                if count == 0:
+                    take_out(profile_id)
+                recent_count[profile_id] = count + 1
+                recent.append(profile_id)
+                if len(recent) > self.window_size - 1:
+                    oldest = recent.popleft()
+                    recent_count[oldest] -= 1
+                    if recent_count[oldest] == 0:
+                        del recent_count[oldest]
+                        put_back(oldest)
+
+            used.add(profile_id)
+            record_profile_run(profile_id)
+            yield profile_id
+
+        self.stats = {
+            'total': total,
+            'unique': len(used),
+            'duplicates': total - len(used),
+            'fallbacks': fallbacks,
+        }
+        print(f"{self.log_prefix} ✓ Randomized list completed:")
+        print(f"{self.log_prefix}   - Total items: {total}")
+        print(f"{self.log_prefix}   - Unique profiles used: {len(used)}")
+        print(f"{self.log_prefix}   - Duplicates: {total - len(used)}")
+        if fallbacks:
+            print(f"{self.log_prefix}   - Full-list fallbacks: {fallbacks}")
+
+    def _pick(self, available, last_run_times):
+        rng = self._rng
+        profiles = self._profiles
+        if not self.weight_by_last_run:
+            return profiles[available[rng.randrange(len(available))]]
+
+        now = time.time()
+        profile_id = None
+        for _ in range(WEIGHTED_MAX_TRIES):
+            profile_id = profiles[available[rng.randrange(len(available))]]
+            weight = last_run_weight(last_run_times.get(profile_id), now)
+            if rng.random() * LAST_RUN_MAX_WEIGHT < weight:
+                break
+        return profile_id
@@ -0,0 +1,561 @@
+﻿# helpers/proxy_pool.py
+
+"""
+Proxy Pool - proxy file parse một lần, phát proxy round-robin cho assign_proxy_to_profile
+
+Thay cho: đọc + parse lại proxy file mỗi lần gán, state round-robin trên GlobalVariables,
+gọi TMProxyAPI.get_proxy_static đồng bộ trong mỗi attempt.
+
+- Parse file một lần; os.stat tối đa mỗi PROXY_STAT_INTERVAL giây, mtime/size đổi → parse lại
+  (giữ score của các dòng còn nguyên)
+- Round-robin theo vòng: dòng chưa dùng trong vòng trước, hết dòng → vòng mới (như bản cũ).
+  deque + một lock → acquire O(1); dòng đang được gán bị lấy ra khỏi deque nên 2 profile
+  song song không nhận cùng một dòng
+- Prefetch nền: PROXY_PREFETCH_AHEAD dòng sắp tới lấy sẵn credential TMProxy + đo TCP connect
+  tới endpoint → profile launch thường không phải chờ TMProxy API
+- Health score theo dòng: latency EMA (fetch + connect), số lỗi, cooldown tăng dần khi lỗi liên tiếp
+
+Lưu ý TMProxy: get-new-proxy đổi IP của api key → prefetch chỉ giữ tối đa 1 credential / dòng
+và chỉ cho các dòng CHƯA DÙNG của vòng hiện tại sắp tới lượt (không bao giờ dòng đang được gán
+hay đã gán trong vòng → không đổi IP của profile đang chạy). Lỗi "chưa tới lượt đổi IP"
+(next_request) không tính là lỗi proxy, chỉ hoãn prefetch dòng đó.
+"""
+
+import os
+import socket
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+PROXY_STAT_INTERVAL = 1.0          # Giây giữa 2 lần os.stat proxy file
+PROXY_PREFETCH_AHEAD = 2           # Số dòng sắp tới lượt được chuẩn bị sẵn
+PROXY_PREFETCH_WORKERS = 2
+PROXY_CREDENTIAL_TTL = 600.0       # Credential TMProxy prefetch quá hạn này → bỏ, lấy lại
+PROXY_PROBE_INTERVAL = 300.0       # Dòng proxy tĩnh (ProxyRack): đo lại connect tối đa mỗi ngần này
+PROXY_PROBE_TIMEOUT = 5.0
+PROXY_PREPARE_WAIT = 35.0          # acquire gặp dòng đang prefetch → chờ kết quả (TMProxy timeout 30s)
+PROXY_COOLDOWN_BASE = 15.0         # Lỗi liên tiếp thứ n → cooldown BASE * 2^(n-1), tối đa MAX
+PROXY_COOLDOWN_MAX = 300.0
+PROXY_LATENCY_EMA = 0.3
+
+PROXY_TYPES = ('socks5', 'http', 'https')
+
+
+# ========== PARSE ==========
+
+def parse_proxy_file(proxy_file, log_prefix="[PROXY]"):
+    """
+    Parse proxy TXT file with 2 formats:
+    - TMProxy: provider|proxy_type|apikey
+    - ProxyRack: provider|proxy_type|host:port|username|password
+
+    Returns:
+        list: List of proxy config dicts or empty list if file not found
+    """
+    if not os.path.exists(proxy_file):
+        print(f"{log_prefix} Proxy file not found: {proxy_file}")
+        return []
+
+    proxy_configs = []
+
+    with open(proxy_file, 'r', encoding='utf-8') as f:
+        for line_num, line in enumerate(f, 1):
+            line = line.strip()
+
+            if not line or line.startswith('#'):
+                continue
+
+            parts = line.split('|')
+
+            # Validate basic structure
+            if len(parts) < 3:
+                print(f"{log_prefix} Warning - Invalid format line {line_num}: {line}")
+                continue
+
+            provider = parts[0].strip().lower()
+            proxy_type = parts[1].strip()
+
+            # Validate proxy type
+            if proxy_type not in PROXY_TYPES:
+                print(f"{log_prefix} Warning - Invalid type '{proxy_type}' line {line_num}")
+                continue
+
+            # Parse based on provider
+            if provider == 'tmproxy':
+                # Format: tmproxy|socks5|apikey
+                if len(parts) != 3:
+                    print(f"{log_prefix} Warning - TMProxy expects 3 parts, line {line_num}: {line}")
+                    continue
+
+                api_key = parts[2].strip()
+
+                if not api_key:
+                    print(f"{log_prefix} Warning - Empty api_key line {line_num}")
+                    continue
+
+                proxy_configs.append({
+                    'provider': 'tmproxy',
+                    'type': proxy_type,
+                    'api_key': api_key,
+                    'line_num': line_num
+                })
+
+            elif provider == 'proxyrack':
+                # Format: proxyrack|http|premium.residential.proxyrack.net:10000|robertle;country=US,CA,GB|password
+                # Username đã có country params sẵn, DNS chỉ là host:port
+                if len(parts) != 5:
+                    print(f"{log_prefix} Warning - ProxyRack expects 5 parts, line {line_num}: {line}")
+                    continue
+
+                host_port = parts[2].strip()
+                username = parts[3].strip()  # Đã có country params: username;country=US,CA,GB
+                password = parts[4].strip()
+
+                if not all([host_port, username, password]):
+                    print(f"{log_prefix} Warning - Empty values line {line_num}")
+                    continue
+
+                # Parse host:port (DNS không có country params nữa)
+                if ':' not in host_port:
+                    print(f"{log_prefix} Warning - Invalid host:port format line {line_num}")
+                    continue
+
+                host, port_str = host_port.split(':', 1)
+
+                try:
+                    port = int(port_str)
+                except ValueError:
+                    print(f"{log_prefix} Warning - Invalid port '{port_str}' line {line_num}")
+                    continue
+
+                proxy_configs.append({
+                    'provider': 'proxyrack',
+                    'type': proxy_type,
+                    'host': host,
+                    'port': port,
+                    'username': username,  # Giữ nguyên username với country params
+                    'password': password,
+                    'line_num': line_num
+                })
+
+            else:
+                print(f"{log_prefix} Warning - Unknown provider '{provider}' line {line_num}")
+                continue
+
+    print(f"{log_prefix} Loaded {len(proxy_configs)} valid proxy configs")
+    return proxy_configs
+
+
+def _line_key(config):
+    """Key ổn định qua các lần reload (không dùng line_num - thêm dòng phía trên sẽ lệch)"""
+    if config['provider'] == 'tmproxy':
+        return ('tmproxy', config['type'], config['api_key'])
+    return (config['provider'], config['type'], config['host'], config['port'], config['username'])
+
+
+def _static_proxy(config):
+    """ProxyRack: build proxy trực tiếp từ config (không cần gọi API)"""
+    return {
+        'mode': config['type'],
+        'host': config['host'],
+        'port': config['port'],
+        'username': config['username'],  # Đã có: robertle;country=US,CA,GB
+        'password': config['password']
+    }
+
+
+# ========== POOL ==========
+
+class _ProxyLine:
+    __slots__ = ("key", "config", "credential", "credential_at", "preparing", "probed_at", "retry_at",
+                 "handed", "successes", "failures", "consecutive_failures", "cooldown_until",
+                 "latency_ms", "fetch_ms")
+
+    def __init__(self, key, config):
+        self.key = key
+        self.config = config
+        self.credential = None          # Proxy dict TMProxy đã prefetch
+        self.credential_at = 0.0
+        self.preparing = False          # Đang prefetch / probe trên executor
+        self.probed_at = 0.0
+        self.retry_at = 0.0             # TMProxy báo chưa tới lượt đổi IP → không prefetch trước mốc này
+        self.handed = 0
+        self.successes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.cooldown_until = 0.0
+        self.latency_ms = None          # EMA TCP connect tới endpoint proxy
+        self.fetch_ms = None            # EMA thời gian gọi TMProxy API
+
+    @property
+    def is_tmproxy(self):
+        return self.config['provider'] == 'tmproxy'
+
+    def needs_prepare(self, now):
+        if self.preparing or now < self.retry_at:
+            return False
+        if self.is_tmproxy:
+            return self.credential is None or now - self.credential_at > PROXY_CREDENTIAL_TTL
+        return now - self.probed_at > PROXY_PROBE_INTERVAL
+
+
+class ProxyLease:
+    """Proxy đã phát cho một attempt - trả kết quả qua ProxyPool.report()"""
+
+    __slots__ = ("key", "line_num", "provider", "proxy", "prefetched", "retry_later")
+
+    def __init__(self, line, proxy, prefetched, retry_later=False):
+        self.key = line.key
+        self.line_num = line.config['line_num']
+        self.provider = line.config['provider']
+        self.proxy = proxy
+        self.prefetched = prefetched
+        self.retry_later = retry_later  # proxy None vì TMProxy chưa cho đổi IP (không phải lỗi proxy)
+
+
+def _ema(previous, value):
+    return value if previous is None else previous + PROXY_LATENCY_EMA * (value - previous)
+
+
+_prefetch_executor = None
+_prefetch_executor_lock = threading.Lock()
+
+def _get_prefetch_executor():
+    global _prefetch_executor
+    with _prefetch_executor_lock:
+        if _prefetch_executor is None:
+            _prefetch_executor = ThreadPoolExecutor(
+                max_workers=PROXY_PREFETCH_WORKERS, thread_name_prefix="ProxyPrefetch"
+            )
+        return _prefetch_executor
+
+
+class ProxyPool:
+    """Pool proxy của một proxy file (dùng get_proxy_pool để lấy instance chung)"""
+
+    def __init__(self, proxy_file, stat_interval=PROXY_STAT_INTERVAL):
+        self.proxy_file = proxy_file
+        self.stat_interval = stat_interval
+        self._lock = threading.Lock()
+        self._prepared = threading.Condition(self._lock)
+        self._load_lock = threading.Lock()
+        self._lines = {}            # key → _ProxyLine
+        self._order = []            # key theo thứ tự trong file
+        self._unused = deque()      # key chưa dùng trong vòng hiện tại
+        self._used = set()          # key đã gán thành công trong vòng hiện tại
+        self._leased = set()        # key đang được một lần gán giữ (chưa report)
+        self._signature = None
+        self._checked_at = 0.0
+        self.stats = {'acquired': 0, 'prefetch_hits': 0, 'sync_fetches': 0, 'reloads': 0, 'cycles': 0}
+
+    # ========== FILE ==========
+
+    def refresh(self, log_prefix="[PROXY]"):
+        """Parse lại file nếu mtime/size đổi (stat tối đa mỗi stat_interval giây)"""
+        with self._lock:
+            if self._signature is not None and time.monotonic() - self._checked_at < self.stat_interval:
+                return
+
+        with self._load_lock:
+            try:
+                st = os.stat(self.proxy_file)
+                signature = (st.st_mtime_ns, st.st_size)
+            except OSError:
+                signature = None
+
+            with self._lock:
+                self._checked_at = time.monotonic()
+                if signature is not None and signature == self._signature:
+                    return
+
+            configs = parse_proxy_file(self.proxy_file, log_prefix)
+
+            with self._lock:
+                reloaded = self._signature is not None
+                self._signature = signature
+                lines = {}
+                order = []
+                for config in configs:
+                    key = _line_key(config)
+                    if key in lines:
+                        continue
+                    line = self._lines.get(key)
+                    if line is None:
+                        line = _ProxyLine(key, config)
+                    else:
+                        line.config = config  # Giữ score, cập nhật line_num
+                    lines[key] = line
+                    order.append(key)
+                self._lines = lines
+                self._order = order
+                self._used &= set(order)
+                self._unused = deque(key for key in order if key not in self._used and key not in self._leased)
+                if reloaded:
+                    self.stats['reloads'] += 1
+                    print(f"{log_prefix} Proxy file changed - {len(order)} line(s), {len(self._unused)} unused this cycle")
+                self._schedule_prepare_locked()
+
+    def size(self, log_prefix="[PROXY]"):
+        self.refresh(log_prefix)
+        with self._lock:
+            return len(self._order)
+
+    # ========== HANDOUT ==========
+
+    def acquire(self, exclude=(), log_prefix="[PROXY]"):
+        """
+        Phát dòng proxy kế tiếp (round-robin, dòng đang cooldown bị bỏ qua trong vòng hiện tại)
+
+        Args:
+            exclude: key đã thử trong lần gán này
+
+        Returns:
+            ProxyLease (proxy có thể None nếu TMProxy lỗi) hoặc None nếu không còn dòng để thử
+        """
+        self.refresh(log_prefix)
+        now = time.time()
+
+        with self._lock:
+            if not self._order:
+                return None
+
+            line, healthy_left = self._take_locked(exclude, now)
+            if line is None and not healthy_left and self._used:
+                # Mọi dòng khỏe đã dùng (dòng cooldown không giữ vòng lại) → vòng mới
+                print(f"{log_prefix} All {len(self._used)} healthy lines used - resetting for new cycle")
+                self._used.clear()
+                self._unused = deque(key for key in self._order if key not in self._leased)
+                self.stats['cycles'] += 1
+                line, _ = self._take_locked(exclude, now)
+            if line is None:
+                line = self._fallback_locked(exclude, now, log_prefix)
+            if line is None:
+                return None
+
+            self._leased.add(line.key)
+            line.handed += 1
+            self.stats['acquired'] += 1
+
+            # Đang prefetch dòng này → chờ credential đó (gọi thêm get-new-proxy sẽ đổi IP của nó)
+            deadline = time.monotonic() + PROXY_PREPARE_WAIT
+            while line.preparing and time.monotonic() < deadline:
+                self._prepared.wait(timeout=max(0.0, deadline - time.monotonic()))
+            now = time.time()
+
+            proxy = None
+            prefetched = False
+            if not line.is_tmproxy:
+                proxy = _static_proxy(line.config)
+            elif line.credential is not None and now - line.credential_at <= PROXY_CREDENTIAL_TTL:
+                proxy, line.credential = line.credential, None
+                prefetched = True
+                self.stats['prefetch_hits'] += 1
+            else:
+                line.credential = None
+                self.stats['sync_fetches'] += 1
+            self._schedule_prepare_locked()
+
+        retry_later = False
+        if line.is_tmproxy and proxy is None:
+            # Chưa có credential sẵn → gọi TMProxy đồng bộ (như bản cũ); điểm lỗi do report() tính
+            proxy, retry_after = self._fetch_credential(line, penalize=False)
+            retry_later = retry_after is not None
+        if prefetched:
+            print(f"{log_prefix} Using prefetched TMProxy credential (line {line.config['line_num']})")
+        return ProxyLease(line, proxy, prefetched, retry_later)
+
+    def _take_locked(self, exclude, now):
+        """
+        Lấy dòng khỏe đầu tiên của deque (không exclude, không cooldown); O(1) khi dòng đầu hợp lệ
+
+        Returns:
+            tuple: (line hoặc None, còn dòng khỏe chưa dùng nhưng bị exclude)
+        """
+        healthy_left = False
+        for _ in range(len(self._unused)):
+            key = self._unused[0]
+            line = self._lines[key]
+            if line.cooldown_until > now:
+                self._unused.rotate(-1)
+                continue
+            if key in exclude:
+                healthy_left = True
+                self._unused.rotate(-1)
+                continue
+            self._unused.popleft()
+            return line, True
+        return None, healthy_left
+
+    def _fallback_locked(self, exclude, now, log_prefix):
+        """Hết dòng chưa dùng để thử: ưu tiên dòng khỏe, chưa bị lease, rồi mới tới dòng cooldown"""
+        candidates = [self._lines[key] for key in self._order if key not in exclude]
+        if not candidates:
+            return None
+        print(f"{log_prefix} No unused lines - trying used lines as fallback")
+        line = min(candidates, key=lambda c: (c.cooldown_until > now, c.key in self._leased, c.handed))
+        try:
+            self._unused.remove(line.key)
+        except ValueError:
+            pass
+        return line
+
+    def report(self, lease, success, penalize=True):
+        """
+        Kết quả gán proxy
+
+        Args:
+            success: True → dòng được tính là đã dùng trong vòng này
+                     (health chỉ do fetch / probe quyết định, gán thành công không xóa cooldown)
+            penalize: False khi lỗi không do proxy (vd GoLogin API) → không tính điểm lỗi
+                      (lease.retry_later - TMProxy chưa cho đổi IP - cũng không tính)
+        """
+        with self._lock:
+            self._leased.discard(lease.key)
+            line = self._lines.get(lease.key)
+            if line is None:
+                return  # Dòng đã bị xóa khỏi file
+            if success:
+                line.successes += 1
+                self._used.add(lease.key)
+                return
+            if penalize and not lease.retry_later:
+                self._penalize_locked(line)
+            if lease.key not in self._used:
+                self._unused.append(lease.key)
+            self._schedule_prepare_locked()
+
+    def _penalize_locked(self, line):
+        line.failures += 1
+        line.consecutive_failures += 1
+        cooldown = min(PROXY_COOLDOWN_MAX, PROXY_COOLDOWN_BASE * 2 ** (line.consecutive_failures - 1))
+        line.cooldown_until = time.time() + cooldown
+
+    # ========== PREFETCH ==========
+
+    def _schedule_prepare_locked(self):
+        """
+        Chuẩn bị PROXY_PREFETCH_AHEAD dòng sắp tới lượt trong vòng hiện tại
+
+        Chỉ dòng chưa dùng, không lease, không cooldown (đúng các dòng _take_locked sẽ phát):
+        get-new-proxy trên dòng đang gán / đã gán sẽ đổi IP của profile đang dùng nó.
+        """
+        now = time.time()
+        upcoming = islice(
+            (key for key in self._unused
+             if key not in self._used and key not in self._leased and self._lines[key].cooldown_until <= now),
+            PROXY_PREFETCH_AHEAD
+        )
+        for key in list(upcoming):
+            line = self._lines[key]
+            if line.needs_prepare(now):
+                line.preparing = True
+                try:
+                    _get_prefetch_executor().submit(self._prepare, line)
+                except RuntimeError:
+                    line.preparing = False  # Interpreter đang tắt
+                    return
+
+    def _prepare(self, line):
+        """Worker: lấy credential TMProxy (nếu cần) + đo TCP connect tới endpoint"""
+        try:
+            if line.is_tmproxy:
+                proxy, _ = self._fetch_credential(line)
+                if proxy is None:
+                    return
+            else:
+                proxy = _static_proxy(line.config)
+
+            if not self._probe(line, proxy):
+                return
+            if line.is_tmproxy:
+                with self._lock:
+                    line.credential = proxy
+                    line.credential_at = time.time()
+        except Exception as e:
+            print(f"[PROXY_POOL] Prefetch error (line {line.config['line_num']}): {e}")
+        finally:
+            with self._lock:
+                line.preparing = False
+                self._prepared.notify_all()
+
+    def _fetch_credential(self, line, penalize=True):
+        """
+        Returns:
+            tuple: (proxy hoặc None, retry_after giây nếu TMProxy báo chưa tới lượt đổi IP)
+        """
+        from models.tmproxy_api import TMProxyAPI
+
+        started = time.perf_counter()
+        proxy, retry_after = TMProxyAPI.fetch_proxy_static(line.config['api_key'], line.config['type'])
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self._lock:
+            line.fetch_ms = _ema(line.fetch_ms, elapsed_ms)
+            if retry_after is not None:
+                # Key vẫn giữ IP hiện tại, chỉ chưa cho đổi → không phải lỗi proxy
+                line.retry_at = time.time() + retry_after
+            elif proxy is None and penalize:
+                self._penalize_locked(line)
+        if retry_after is not None:
+            print(f"[PROXY_POOL] TMProxy line {line.config['line_num']}: new IP available in {retry_after}s - not counted as failure")
+        return proxy, retry_after
+
+    def _probe(self, line, proxy):
+        """TCP connect tới host:port của proxy; lỗi → tính điểm lỗi + cooldown"""
+        started = time.perf_counter()
+        try:
+            with socket.create_connection((proxy['host'], int(proxy['port'])), timeout=PROXY_PROBE_TIMEOUT):
+                pass
+            ok = True
+        except OSError:
+            ok = False
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self._lock:
+            line.probed_at = time.time()
+            if ok:
+                line.latency_ms = _ema(line.latency_ms, elapsed_ms)
+                line.consecutive_failures = 0
+                line.cooldown_until = 0.0
+            else:
+                self._penalize_locked(line)
+        if not ok:
+            print(f"[PROXY_POOL] ⚠ Proxy line {line.config['line_num']} unreachable: {proxy['host']}:{proxy['port']}")
+        return ok
+
+    # ========== STATS ==========
+
+    def get_stats(self):
+        """
+        Returns:
+            dict: pool counters + {line_num: {handed, successes, failures, latency_ms, fetch_ms, cooldown_s, ready}}
+        """
+        now = time.time()
+        with self._lock:
+            lines = {}
+            for key in self._order:
+                line = self._lines[key]
+                lines[line.config['line_num']] = {
+                    'provider': line.config['provider'],
+                    'handed': line.handed,
+                    'successes': line.successes,
+                    'failures': line.failures,
+                    'latency_ms': round(line.latency_ms, 1) if line.latency_ms is not None else None,
+                    'fetch_ms': round(line.fetch_ms, 1) if line.fetch_ms is not None else None,
+                    'cooldown_s': round(max(0.0, line.cooldown_until - now), 1),
+                    'ready': line.credential is not None or not line.is_tmproxy,
+                }
+            return {**self.stats, 'unused': len(self._unused), 'used': len(self._used), 'lines': lines}
+
+
+_proxy_pools = {}
+_proxy_pools_lock = threading.Lock()
+
+def get_proxy_pool(proxy_file):
+    """Get or create ProxyPool dùng chung cho proxy file"""
+    key = os.path.abspath(proxy_file)
+    with _proxy_pools_lock:
+        pool = _proxy_pools.get(key)
+        if pool is None:
+            pool = _proxy_pools[key] = ProxyPool(proxy_file)
+        return pool
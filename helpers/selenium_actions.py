@@ -20,6 +20,84 @@ from selenium.common.exceptions import (
     StaleElementReferenceException
 )
 
+# ============================================================
+# LINK HARVESTING (1 execute_script thay cho 5-8 WebDriver call / link)
+# ============================================================
+
+# Flag của mỗi candidate trả về từ HARVEST_LINKS_SCRIPT
+LINK_IN_VIEWPORT_PAGE = 1    # width/height > 0 và location (tọa độ page) >= 0
+LINK_STRICT_HREF = 2         # href không phải '#', javascript:, mailto:, tel:, sms:
+LINK_BLACKLISTED = 4         # text/aria/class/id giống nút notification/login hoặc nằm trong modal
+
+LINK_BLACKLIST_TEXT = [
+    "allow", "block", "enable", "disable",
+    "accept all", "reject all", "dismiss",
+    "subscribe", "sign up", "log in", "login",
+    "register", "create account", "join now",
+    "notification", "permission"
+]
+LINK_BLACKLIST_ATTR = [
+    "notif", "permission", "subscribe", "modal", "popup",
+    "dialog", "overlay", "prompt"
+]
+
+# Lọc toàn bộ <a> ngay trong page. Snapshot anchor được giữ ở window.__tsLinkHarvest
+# để click theo index ổn định. Mỗi record: [index, href, text, x, y, w, h, flags]
+HARVEST_LINKS_SCRIPT = """
+var textPatterns = arguments[0], attrPatterns = arguments[1];
+var anchors = Array.prototype.slice.call(document.getElementsByTagName('a'));
+window.__tsLinkHarvest = anchors;
+var sx = window.pageXOffset || 0, sy = window.pageYOffset || 0;
+var out = [];
+function visible(a, rect) {
+    if (typeof a.checkVisibility === 'function') {
+        if (!a.checkVisibility({checkOpacity: true, checkVisibilityCSS: true})) return false;
+    } else {
+        var st = window.getComputedStyle(a);
+        if (st.display === 'none' || st.visibility === 'hidden' || st.opacity === '0') return false;
+    }
+    return rect.width > 0 || rect.height > 0;
+}
+function matches(value, patterns) {
+    for (var k = 0; k < patterns.length; k++) {
+        if (value.indexOf(patterns[k]) !== -1) return true;
+    }
+    return false;
+}
+for (var i = 0; i < anchors.length; i++) {
+    var a = anchors[i];
+    var href = a.href || '';
+    if (!href) continue;
+    var rect = a.getBoundingClientRect();
+    if (!visible(a, rect)) continue;
+
+    var x = rect.left + sx, y = rect.top + sy;
+    var flags = 0;
+    if (rect.width > 0 && rect.height > 0 && x >= 0 && y >= 0) flags |= 1;
+    if (href !== '#' && href.indexOf('javascript:') !== 0 && href.indexOf('mailto:') !== 0 &&
+        href.indexOf('tel:') !== 0 && href.indexOf('sms:') !== 0) flags |= 2;
+
+    var text = (a.innerText || '').trim();
+    var lowerText = text.toLowerCase();
+    var aria = (a.getAttribute('aria-label') || '').toLowerCase();
+    var attrs = ((typeof a.className === 'string' ? a.className : (a.getAttribute('class') || '')) + ' ' + (a.id || '')).toLowerCase();
+    var parent = a.parentElement;
+    if (matches(lowerText, textPatterns) || matches(aria, textPatterns) || matches(attrs, attrPatterns) ||
+        (parent && parent.closest("[role='dialog'],[role='alertdialog'],[class*='modal'],[class*='popup']"))) flags |= 4;
+
+    out.push([i, href, text.substring(0, 50), Math.round(x), Math.round(y),
+              Math.round(rect.width), Math.round(rect.height), flags]);
+}
+return out;
+"""
+
+# Lấy anchor theo index của lần harvest gần nhất (null nếu đã bị gỡ khỏi DOM)
+LINK_BY_INDEX_SCRIPT = """
+var list = window.__tsLinkHarvest;
+var a = list && list[arguments[0]];
+return (a && a.isConnected) ? a : null;
+"""
+
 # ============================================================
 # HUMAN-LIKE MOUSE MOVEMENT (FROM human_like_movement.py)
 # ============================================================
@@ -362,6 +440,33 @@ class SeleniumHumanActions:
             print(f"[SELENIUM] close_popups error: {e}")
             return False
 
+    def harvest_links(self):
+        """
+        Thu thập mọi link hiển thị trên page bằng MỘT lần execute_script
+
+        Returns:
+            list: [{'index', 'href', 'text', 'x', 'y', 'width', 'height', 'flags'}, ...]
+                  index dùng cho get_harvested_link(); flags gồm LINK_* bit
+        """
+        records = self.driver.execute_script(HARVEST_LINKS_SCRIPT, LINK_BLACKLIST_TEXT, LINK_BLACKLIST_ATTR) or []
+        return [
+            {
+                'index': index,
+                'href': href,
+                'text': text,
+                'x': x,
+                'y': y,
+                'width': width,
+                'height': height,
+                'flags': flags
+            }
+            for index, href, text, x, y, width, height, flags in records
+        ]
+
+    def get_harvested_link(self, index):
+        """WebElement của link theo index ở lần harvest_links() gần nhất, None nếu đã mất"""
+        return self.driver.execute_script(LINK_BY_INDEX_SCRIPT, index)
+
     def click_random_link_with_retry(self):
         """
         Click RANDOM link from ALL available links on page
@@ -370,38 +475,14 @@ class SeleniumHumanActions:
         - Returns: bool - True if successful
         """
         try:
-            from selenium.webdriver.common.by import By
-        
-            # Find ALL links on page
-            all_links = self.driver.find_elements(By.TAG_NAME, 'a')
+            # Harvest + filter toàn bộ trong page (1 round trip)
+            candidates = self.harvest_links()
         
-            print(f"Found {len(all_links)} total links on page")
-        
-            # Filter: Only visible, interactable elements with size > 0
-            clickable_links = []
-            for link in all_links:
-                try:
-                    # Check if element is displayed and enabled
-                    if not link.is_displayed() or not link.is_enabled():
-                        continue
-                
-                    # Check size and location
-                    size = link.size
-                    location = link.location
-                
-                    # Must have positive size and valid location
-                    if size['width'] > 0 and size['height'] > 0 and \
-                       location['x'] >= 0 and location['y'] >= 0:
-                    
-                       # Additional check: element must have href
-                       href = link.get_attribute('href')
-                       if href and href not in ['#', 'javascript:void(0)', 'javascript:;'] and not href.startswith('mailto:') and not href.startswith('tel:') and not href.startswith('sms:'):
-                            clickable_links.append(link)
-                        
-                except Exception as filter_err:
-                    # Element became stale or not accessible
-                    continue
+            # Filter: Only visible, interactable elements with size > 0 and a real href
+            required = LINK_IN_VIEWPORT_PAGE | LINK_STRICT_HREF
+            clickable_links = [link for link in candidates if link['flags'] & required == required]
         
+            print(f"Found {len(candidates)} visible links on page")
             print(f"Filtered to {len(clickable_links)} clickable links")
         
             if not clickable_links:
@@ -410,15 +491,14 @@ class SeleniumHumanActions:
         
             # ========== RANDOM SELECT LINK (KEY CHANGE) ==========
             # Randomly pick ONE link from all clickable links
-            target_link = random.choice(clickable_links)
+            selected = random.choice(clickable_links)
+            target_link = self.get_harvested_link(selected['index'])
+            if target_link is None:
+                print("Selected link is no longer attached to the page")
+                return False
         
-            # Get link info for logging
-            try:
-                link_text = target_link.text[:50] if target_link.text else "No text"
-                link_href = target_link.get_attribute('href')[:100] if target_link.get_attribute('href') else "No href"
-                print(f"Selected random link: '{link_text}' -> {link_href}")
-            except:
-                print("Selected random link (info unavailable)")
+            link_text = selected['text'] or "No text"
+            print(f"Selected random link: '{link_text}' -> {selected['href'][:100]}")
             # ====================================================
         
             # Scroll element into view
@@ -430,10 +510,13 @@ class SeleniumHumanActions:
         
             # Highlight element briefly (optional, for debugging)
             try:
-                original_style = target_link.get_attribute('style')
-                self.driver.execute_script("arguments[0].setAttribute('style', 'border: 2px solid red;');", target_link)
+                self.driver.execute_script(
+                    "var el = arguments[0], original = el.getAttribute('style');"
+                    "el.setAttribute('style', 'border: 2px solid red;');"
+                    "setTimeout(function() { if (original === null) { el.removeAttribute('style'); } else { el.setAttribute('style', original); } }, 300);",
+                    target_link
+                )
                 time.sleep(0.3)
-                self.driver.execute_script(f"arguments[0].setAttribute('style', '{original_style}');", target_link)
             except:
                 pass
         
@@ -556,115 +639,23 @@ class SeleniumHumanActions:
         WITH FILTER to avoid notification/popup buttons
         """
         try:
-            # ← THÊM: Blacklist selectors for notification prompts
-            notification_blacklist = [
-                # Button text patterns
-                "allow", "block", "enable", "disable",
-                "accept all", "reject all", "dismiss",
-                "subscribe", "sign up", "log in", "login",
-                "register", "create account", "join now",
-            
-                # Aria labels
-                "[aria-label*='notification']",
-                "[aria-label*='subscribe']",
-                "[aria-label*='sign up']",
-                "[aria-label*='login']",
-            
-                # Common notification button classes
-                ".notification-button",
-                ".notification-action",
-                ".permission-prompt",
-                ".push-notification",
-                "[class*='notif']",
-                "[class*='permission']",
-                "[class*='subscribe']",
-                "[id*='notification']",
-                "[id*='permission']",
-            
-                # Modal/overlay buttons
-                ".modal button",
-                ".overlay button",
-                "[role='dialog'] button",
-                "[role='alertdialog'] button"
+            # Harvest + blacklist (text/aria/class/id, modal ancestor) trong page - 1 round trip
+            valid_links = [
+                link for link in self.harvest_links()
+                if not link['flags'] & LINK_BLACKLISTED
+                and not link['href'].startswith("javascript:") and link['href'] != "#"
             ]
         
-            # Get all clickable links
-            links = self.driver.find_elements(By.TAG_NAME, "a")
-        
-            # Filter valid links
-            valid_links = []
-            for link in links:
-                try:
-                    # Check if link is visible and has href
-                    if not link.is_displayed():
-                        continue
-                
-                    href = link.get_attribute("href")
-                    if not href or href.startswith("javascript:") or href == "#":
-                        continue
-                
-                    # ← FIX: Check if link is inside notification/modal
-                    # Get element text and attributes
-                    link_text = link.text.lower() if link.text else ""
-                    link_class = link.get_attribute("class") or ""
-                    link_id = link.get_attribute("id") or ""
-                    aria_label = link.get_attribute("aria-label") or ""
-                
-                    # Check against blacklist
-                    is_blacklisted = False
-                
-                    # Check text patterns
-                    blacklist_text_patterns = [
-                        "allow", "block", "enable", "disable",
-                        "accept all", "reject all", "dismiss",
-                        "subscribe", "sign up", "log in", "login",
-                        "register", "create account", "join now",
-                        "notification", "permission"
-                    ]
-                
-                    for pattern in blacklist_text_patterns:
-                        if pattern in link_text or pattern in aria_label.lower():
-                            is_blacklisted = True
-                            break
-                
-                    # Check class/id patterns
-                    if not is_blacklisted:
-                        blacklist_attr_patterns = [
-                            "notif", "permission", "subscribe", "modal", "popup",
-                            "dialog", "overlay", "prompt"
-                        ]
-                    
-                        for pattern in blacklist_attr_patterns:
-                            if pattern in link_class.lower() or pattern in link_id.lower():
-                                is_blacklisted = True
-                                break
-                
-                    # Skip blacklisted links
-                    if is_blacklisted:
-                        continue
-                
-                    # ← ADDITIONAL CHECK: Parent element should not be modal/dialog
-                    try:
-                        parent = link.find_element(By.XPATH, "./ancestor::*[@role='dialog' or @role='alertdialog' or contains(@class, 'modal') or contains(@class, 'popup')][1]")
-                        if parent:
-                            # Link is inside modal/dialog, skip
-                            continue
-                    except:
-                        # No modal parent found, safe to click
-                        pass
-                
-                    # Link is valid
-                    valid_links.append(link)
-                
-                except Exception as e:
-                    continue
-        
             if not valid_links:
                 print(f"[SELENIUM] No valid links found")
                 return False
         
             # Click random link
-            link = random.choice(valid_links)
+            selected = random.choice(valid_links)
+            link = self.get_harvested_link(selected['index'])
+            if link is None:
+                print("[SELENIUM] Selected link is no longer attached to the page")
+                return False
         
             # Scroll to link
             self.driver.execute_script("arguments[0].scrollIntoView({behavior: 'smooth', block: 'center'});", link)
@@ -672,7 +663,7 @@ class SeleniumHumanActions:
         
             # Click link
             link.click()
-            print(f"[SELENIUM] Clicked link: {link.get_attribute('href')[:100]}")
+            print(f"[SELENIUM] Clicked link: {selected['href'][:100]}")
             return True
         
         except Exception as e:
@@ -4,6 +4,7 @@ Website Manager Helper
 Manages collect and warmup website files with rotation and caching
 """
 
+import atexit
 import os
 import re
 import random
@@ -12,22 +13,34 @@ from datetime import datetime
 from pathlib import Path
 import logging
 
+from helpers.corpus_service import get_corpus_service, KIND_URLS
+
 logger = logging.getLogger('TomSamAutobot')
 
 # ========== CONSTANTS ==========
 MAX_FILE_SIZE_MB = 5
 MAX_FILE_SIZE_BYTES = MAX_FILE_SIZE_MB * 1024 * 1024
 
+COLLECT_FLUSH_INTERVAL = 0.5   # Writer thread ghi batch URL mỗi N giây
+COLLECT_BATCH_SIZE = 200        # Hoặc sớm hơn khi đủ N URL chờ ghi
+
+# ========== COLLECTED URL STORES (1 STORE / COLLECT FILE) ==========
+_collect_stores_lock = threading.Lock()
+_collect_stores = {}  # abspath(collect_file_path) → CollectedUrlStore
+
 # ========== CACHE FOR WARMUP WEBSITES (SINGLETON PATTERN) ==========
 _warmup_cache_lock = threading.Lock()
-_warmup_websites_cache = None  # List of URLs, loaded once per app session
+_warmup_selected_file = None  # Warmup file chọn một lần mỗi app session (URL do CorpusService cache)
 _warmup_cache_initialized = False
 
 
 # ========== FUNCTION 1: SAVE COLLECTED URL ==========
 def save_collected_url(url, collect_file_path):
     """
-    Save URL to collect file with automatic rotation when file exceeds 10MB
+    Save URL to collect file with automatic rotation when file exceeds MAX_FILE_SIZE_MB
+    
+    URL được đưa vào CollectedUrlStore dùng chung cho collect_file_path:
+    dedup qua index trong RAM (mọi file rotated), ghi batch bất đồng bộ.
     
     Args:
         url (str): URL to save
@@ -52,48 +65,164 @@ def save_collected_url(url, collect_file_path):
         
         url = url.strip()
         
-        # Parse file path
-        file_path = Path(collect_file_path)
-        file_dir = file_path.parent
-        base_name = file_path.stem  # Filename without extension
-        extension = file_path.suffix  # .txt
-        
-        # ========== GET ACTIVE FILE (LATEST OR CREATE NEW) ==========
-        active_file = _get_active_collect_file(file_dir, base_name, extension)
-        
-        # ========== CHECK FILE SIZE & ROTATE IF NEEDED ==========
-        if active_file.exists():
-            file_size = active_file.stat().st_size
-            
-            if file_size >= MAX_FILE_SIZE_BYTES:
-                logger.info(f"Collect file exceeded {MAX_FILE_SIZE_MB}MB, rotating...")
-                active_file = _create_rotated_file(file_dir, base_name, extension)
-        
-        # ========== SAVE URL TO FILE ==========
-        # Check if URL already exists (avoid duplicates)
-        if active_file.exists():
-            with open(active_file, 'r', encoding='utf-8') as f:
-                existing_urls = set(line.strip() for line in f if line.strip())
-            
-            if url in existing_urls:
-                logger.debug(f"URL already exists in collect file: {url}")
-                return True  # Already saved, consider success
-        
-        # Append URL to file
-        with open(active_file, 'a', encoding='utf-8') as f:
-            f.write(url + '\n')
-        
-        logger.debug(f"Saved URL to collect file: {url} -> {active_file.name}")
-        return True
+        if not get_collected_url_store(collect_file_path).add(url):
+            logger.debug(f"URL already exists in collect files: {url}")
+        return True  # Already saved, consider success
     
     except Exception as e:
         logger.error(f"Failed to save collected URL: {e}")
         return False
 
 
-def _get_active_collect_file(file_dir, base_name, extension):
+def get_collected_url_store(collect_file_path):
+    """Get or create CollectedUrlStore dùng chung cho collect_file_path (thread-safe)"""
+    key = os.path.abspath(collect_file_path)
+    with _collect_stores_lock:
+        store = _collect_stores.get(key)
+        if store is None:
+            store = _collect_stores[key] = CollectedUrlStore(collect_file_path)
+        return store
+
+
+def flush_collected_urls():
+    """Ghi hết URL đang chờ của mọi store + đóng file handle (gọi tự động khi thoát app)"""
+    with _collect_stores_lock:
+        stores = list(_collect_stores.values())
+    for store in stores:
+        store.close()
+
+
+atexit.register(flush_collected_urls)
+
+
+class CollectedUrlStore:
     """
-    Get the latest (active) collect file to write to
+    Kho URL đã collect cho một collect file (base file + mọi file rotated)
+    
+    - Index: set hash(url) của mọi file, build MỘT lần khi store được tạo
+    - add(): kiểm tra + thêm vào index, đưa URL vào hàng chờ - O(1), không đụng đĩa
+    - Writer thread: ghi batch qua file handle giữ mở, mỗi COLLECT_FLUSH_INTERVAL giây
+      hoặc khi đủ COLLECT_BATCH_SIZE URL
+    - Rotation: size lấy bằng fstat trên handle sau mỗi batch → không glob/regex mỗi lần ghi
+    """
+    
+    def __init__(self, collect_file_path):
+        file_path = Path(collect_file_path)
+        self.file_dir = file_path.parent
+        self.base_name = file_path.stem
+        self.extension = file_path.suffix
+        
+        self._lock = threading.Lock()        # _seen + _pending
+        self._write_lock = threading.Lock()  # handle + rotation
+        self._seen = set()
+        self._pending = []
+        self._handle = None
+        self._active_size = 0
+        self._closed = False
+        self.active_file = _get_active_collect_file(self.file_dir, self.base_name, self.extension)
+        
+        self._load_index()
+        
+        self._wakeup = threading.Event()
+        self._writer = threading.Thread(
+            target=self._writer_loop,
+            daemon=True,
+            name=f"CollectWriter-{self.base_name}"
+        )
+        self._writer.start()
+    
+    def add(self, url):
+        """
+        Returns:
+            bool: True nếu URL mới (đã vào hàng chờ ghi), False nếu đã có
+        """
+        key = hash(url)
+        with self._lock:
+            if key in self._seen:
+                return False
+            self._seen.add(key)
+            self._pending.append(url)
+            if len(self._pending) >= COLLECT_BATCH_SIZE:
+                self._wakeup.set()
+        return True
+    
+    def flush(self):
+        """Ghi các URL đang chờ xuống active file (rotate nếu đã đủ MAX_FILE_SIZE_BYTES)"""
+        with self._write_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return
+            
+            try:
+                handle = self._open_active_file()
+                handle.write("".join(url + "\n" for url in batch))
+                handle.flush()
+                self._active_size = os.fstat(handle.fileno()).st_size
+                logger.debug(f"Saved {len(batch)} URL(s) to collect file -> {self.active_file.name}")
+            except Exception:
+                # Trả batch về hàng chờ, mở lại handle ở lần flush sau
+                with self._lock:
+                    self._pending[:0] = batch
+                self._close_handle()
+                raise
+    
+    def close(self):
+        self._closed = True
+        self._wakeup.set()
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error(f"Failed to flush collected URLs: {e}")
+        with self._write_lock:
+            self._close_handle()
+    
+    def _open_active_file(self):
+        """Handle của active file; file đã >= MAX_FILE_SIZE_BYTES → rotate sang file mới"""
+        while True:
+            if self._handle is None:
+                self.file_dir.mkdir(parents=True, exist_ok=True)
+                self._handle = open(self.active_file, 'a', encoding='utf-8')
+                self._active_size = os.fstat(self._handle.fileno()).st_size
+            
+            if self._active_size < MAX_FILE_SIZE_BYTES:
+                return self._handle
+            
+            logger.info(f"Collect file exceeded {MAX_FILE_SIZE_MB}MB, rotating...")
+            self._close_handle()
+            self.active_file = _create_rotated_file(self.file_dir, self.base_name, self.extension)
+    
+    def _close_handle(self):
+        if self._handle is not None:
+            try:
+                self._handle.close()
+            except Exception:
+                pass
+            self._handle = None
+    
+    def _load_index(self):
+        files = _list_collect_files(self.file_dir, self.base_name, self.extension)
+        for item in files:
+            try:
+                with open(item['file'], 'r', encoding='utf-8', errors='replace') as f:
+                    self._seen.update(hash(line.strip()) for line in f if line.strip())
+            except OSError as e:
+                logger.warning(f"Cannot index collect file {item['file'].name}: {e}")
+        logger.info(f"Indexed {len(self._seen)} collected URLs from {len(files)} file(s) for '{self.base_name}'")
+    
+    def _writer_loop(self):
+        while not self._closed:
+            self._wakeup.wait(COLLECT_FLUSH_INTERVAL)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Failed to write collected URLs: {e}")
+
+
+def _list_collect_files(file_dir, base_name, extension):
+    """
+    List base file + rotated files, newest first
     
     Logic:
         1. List all files matching pattern:
@@ -103,53 +232,65 @@ def _get_active_collect_file(file_dir, base_name, extension):
            - base_name-DD-MM-YYYY-HH-MM-3.extension (NEW)
         2. Extract timestamp and counter from filenames
         3. Sort by (timestamp DESC, counter DESC) → newest with highest counter first
-        4. Return first file that is < 10MB, else return base file
+    
+    Returns:
+        list: [{'file': Path, 'timestamp': datetime, 'counter': int}, ...]
+    """
+    # Pattern: base_name[-DD-MM-YYYY-HH-MM][-counter].extension
+    # Groups: (day, month, year, hour, minute, counter)
+    pattern = re.compile(
+        rf"^{re.escape(base_name)}"  # Base name
+        rf"(?:-(\d{{2}})-(\d{{2}})-(\d{{4}})-(\d{{2}})-(\d{{2}})"  # Optional timestamp
+        rf"(?:-(\d+))?)?"  # Optional counter (NEW)
+        rf"{re.escape(extension)}$"
+    )
+    
+    # List all matching files
+    matching_files = []
+    
+    for file in file_dir.glob(f"{base_name}*{extension}"):
+        match = pattern.match(file.name)
+        if match:
+            day, month, year, hour, minute, counter_str = match.groups()
+            
+            if day:  # Has timestamp
+                # Parse timestamp
+                timestamp = datetime(
+                    int(year), int(month), int(day),
+                    int(hour), int(minute)
+                )
+                # Parse counter (default to 1 if not present)
+                counter = int(counter_str) if counter_str else 1
+            else:
+                # Base file (no timestamp) - treat as oldest
+                timestamp = datetime.min
+                counter = 0
+            
+            matching_files.append({
+                'file': file,
+                'timestamp': timestamp,
+                'counter': counter
+            })
+    
+    # Sort by timestamp DESC, then counter DESC (newest + highest counter first)
+    matching_files.sort(
+        key=lambda x: (x['timestamp'], x['counter']),
+        reverse=True
+    )
+    return matching_files
+
+
+def _get_active_collect_file(file_dir, base_name, extension):
+    """
+    Get the latest (active) collect file to write to
+    
+    Returns first file from _list_collect_files that is < MAX_FILE_SIZE_MB, else base file
     
     Returns:
         Path: Active file path
     """
     try:
-        # Pattern: base_name[-DD-MM-YYYY-HH-MM][-counter].extension
-        # Groups: (day, month, year, hour, minute, counter)
-        pattern = re.compile(
-            rf"^{re.escape(base_name)}"  # Base name
-            rf"(?:-(\d{{2}})-(\d{{2}})-(\d{{4}})-(\d{{2}})-(\d{{2}})"  # Optional timestamp
-            rf"(?:-(\d+))?)?"  # Optional counter (NEW)
-            rf"{re.escape(extension)}$"
-        )
-        
-        # List all matching files
-        matching_files = []
-        
-        for file in file_dir.glob(f"{base_name}*{extension}"):
-            match = pattern.match(file.name)
-            if match:
-                day, month, year, hour, minute, counter_str = match.groups()
-                
-                if day:  # Has timestamp
-                    # Parse timestamp
-                    timestamp = datetime(
-                        int(year), int(month), int(day),
-                        int(hour), int(minute)
-                    )
-                    # Parse counter (default to 1 if not present)
-                    counter = int(counter_str) if counter_str else 1
-                else:
-                    # Base file (no timestamp) - treat as oldest
-                    timestamp = datetime.min
-                    counter = 0
-                
-                matching_files.append({
-                    'file': file,
-                    'timestamp': timestamp,
-                    'counter': counter
-                })
-        
-        # Sort by timestamp DESC, then counter DESC (newest + highest counter first)
-        matching_files.sort(
-            key=lambda x: (x['timestamp'], x['counter']),
-            reverse=True
-        )
+        matching_files = _list_collect_files(file_dir, base_name, extension)
         
         # Return first file that is < 10MB
         for item in matching_files:
@@ -260,17 +401,46 @@ def load_warmup_websites(warmup_file_path):
     """
     Load warmup websites from a random file matching pattern
     
+    Logic:
+        1. Randomly select one file (_select_warmup_file)
+        2. Return URLs from that file via CorpusService (shared, reload khi file đổi)
+    
+    Args:
+        warmup_file_path (str): Path to warmup file (user input, may have timestamp + counter)
+    
+    Returns:
+        list: List of URLs, or empty list if error/no file
+    """
+    selected_file = _select_warmup_file(warmup_file_path)
+    if selected_file is None:
+        return []
+    
+    try:
+        urls = get_corpus_service().get(str(selected_file), KIND_URLS, "[WARMUP]", skip_comments=True, weighted=True).lines
+        logger.info(f"Loaded {len(urls)} valid URLs from warmup file: {selected_file.name}")
+        return urls
+    
+    except Exception as e:
+        logger.error(f"Failed to load warmup websites: {e}")
+        import traceback
+        traceback.print_exc()
+        return []
+
+
+def _select_warmup_file(warmup_file_path):
+    """
+    Randomly select one warmup file matching pattern
+    
     Logic:
         1. Extract base name from input file (remove timestamp AND counter if exists)
         2. Find all files matching base name pattern
         3. Randomly select one file
-        4. Read and return URLs from that file
     
     Args:
         warmup_file_path (str): Path to warmup file (user input, may have timestamp + counter)
     
     Returns:
-        list: List of URLs, or empty list if error/no file
+        Path: Selected file, or None if error/no file
     
     Example:
         Input:  "warmup-websites-08-11-2025-10-30-2.txt"  (NEW: with counter)
@@ -278,13 +448,13 @@ def load_warmup_websites(warmup_file_path):
                  "warmup-websites-07-11-2025-14-20.txt",
                  "warmup-websites-08-11-2025-10-30.txt",
                  "warmup-websites-08-11-2025-10-30-2.txt"]
-        Action: Randomly pick one → Read URLs → Return list
+        Action: Randomly pick one → Return its path
     """
     try:
         # Validate input
         if not warmup_file_path or not warmup_file_path.strip():
             logger.debug("Warmup file path not provided")
-            return []
+            return None
         
         # Parse file path
         file_path = Path(warmup_file_path)
@@ -305,7 +475,7 @@ def load_warmup_websites(warmup_file_path):
         match = pattern.match(file_name)
         if not match:
             logger.error(f"Invalid warmup file name format: {file_name}")
-            return []
+            return None
         
         base_name = match.group(1)
         logger.debug(f"Extracted base name: '{base_name}' from '{file_name}'")
@@ -327,7 +497,7 @@ def load_warmup_websites(warmup_file_path):
         
         if not matching_files:
             logger.warning(f"No warmup files found matching pattern: {base_name}*{extension}")
-            return []
+            return None
         
         logger.info(f"Found {len(matching_files)} warmup files matching '{base_name}'")
         for f in matching_files:
@@ -337,32 +507,13 @@ def load_warmup_websites(warmup_file_path):
         selected_file = random.choice(matching_files)
         logger.info(f"Randomly selected warmup file: {selected_file.name}")
         
-        # ========== READ URLs FROM FILE ==========
-        urls = []
-        
-        with open(selected_file, 'r', encoding='utf-8') as f:
-            for line_num, line in enumerate(f, 1):
-                url = line.strip()
-                
-                # Skip empty lines and comments
-                if not url or url.startswith('#'):
-                    continue
-                
-                # Basic URL validation
-                if url.startswith('http://') or url.startswith('https://'):
-                    urls.append(url)
-                else:
-                    logger.warning(f"Invalid URL at line {line_num} in {selected_file.name}: {url}")
-        
-        logger.info(f"Loaded {len(urls)} valid URLs from warmup file: {selected_file.name}")
-        
-        return urls
+        return selected_file
     
     except Exception as e:
-        logger.error(f"Failed to load warmup websites: {e}")
+        logger.error(f"Failed to select warmup file: {e}")
         import traceback
         traceback.print_exc()
-        return []
+        return None
 
 
 
@@ -372,9 +523,10 @@ def get_random_warmup_url(warmup_file_path=None):
     Get a random warmup URL from cache
     
     Features:
-        - Loads warmup URLs ONCE per app session (cached)
-        - Thread-safe
-        - Returns random URL from cache on each call
+        - Selects the warmup file ONCE per app session
+        - URLs served by CorpusService: read once, reloaded when the file changes
+        - Thread-safe, no-repeat: mọi URL được trả một lần trước khi lặp lại
+          (file có trọng số "<url>\\t<weight>" → chọn theo trọng số)
         - No profile_id or driver dependency (works with non-Selenium actions)
     
     Args:
@@ -393,39 +545,32 @@ def get_random_warmup_url(warmup_file_path=None):
         url = get_random_warmup_url()  # No file path needed
         url = get_random_warmup_url()  # Returns different random URL
     """
-    global _warmup_websites_cache, _warmup_cache_initialized
+    global _warmup_selected_file, _warmup_cache_initialized
     
     try:
         # ========== THREAD-SAFE CACHE INITIALIZATION ==========
         with _warmup_cache_lock:
-            # Check if cache already initialized
-            if _warmup_cache_initialized:
-                # Cache exists, return random URL
-                if _warmup_websites_cache and len(_warmup_websites_cache) > 0:
-                    return random.choice(_warmup_websites_cache)
+            if not _warmup_cache_initialized:
+                _warmup_cache_initialized = True
+                
+                if not warmup_file_path or not warmup_file_path.strip():
+                    logger.warning("Warmup file path not provided on first call")
+                    _warmup_selected_file = None  # Initialized (but empty)
                 else:
-                    logger.warning("Warmup cache is empty")
-                    return None
-            
-            # ========== FIRST CALL - INITIALIZE CACHE ==========
-            if not warmup_file_path or not warmup_file_path.strip():
-                logger.warning("Warmup file path not provided on first call")
-                _warmup_cache_initialized = True  # Mark as initialized (but empty)
-                _warmup_websites_cache = []
-                return None
+                    logger.info(f"Initializing warmup websites cache from: {warmup_file_path}")
+                    _warmup_selected_file = _select_warmup_file(warmup_file_path)
             
-            logger.info(f"Initializing warmup websites cache from: {warmup_file_path}")
-            
-            # Load URLs from file
-            _warmup_websites_cache = load_warmup_websites(warmup_file_path)
-            _warmup_cache_initialized = True
-            
-            if _warmup_websites_cache:
-                logger.info(f"Warmup cache initialized with {len(_warmup_websites_cache)} URLs")
-                return random.choice(_warmup_websites_cache)
-            else:
-                logger.warning("Warmup cache initialized but empty (no URLs loaded)")
-                return None
+            selected_file = _warmup_selected_file
+        
+        if selected_file is None:
+            logger.warning("Warmup cache is empty")
+            return None
+        
+        corpus = get_corpus_service().get(str(selected_file), KIND_URLS, "[WARMUP]", skip_comments=True, weighted=True)
+        url = corpus.sample(no_repeat_key="warmup")
+        if url is None:
+            logger.warning("Warmup cache is empty")
+        return url
     
     except Exception as e:
         logger.error(f"Error getting random warmup URL: {e}")
@@ -439,10 +584,10 @@ def reset_warmup_cache():
     
     Note: This is NOT called automatically. Only use for debugging/testing.
     """
-    global _warmup_websites_cache, _warmup_cache_initialized
+    global _warmup_selected_file, _warmup_cache_initialized
     
     with _warmup_cache_lock:
-        _warmup_websites_cache = None
+        _warmup_selected_file = None
         _warmup_cache_initialized = False
         logger.info("Warmup cache reset")
 
@@ -456,8 +601,18 @@ def get_warmup_cache_status():
         dict: Cache status info
     """
     with _warmup_cache_lock:
-        return {
-            'initialized': _warmup_cache_initialized,
-            'url_count': len(_warmup_websites_cache) if _warmup_websites_cache else 0,
-            'cache_size_bytes': sum(len(url) for url in _warmup_websites_cache) if _warmup_websites_cache else 0
-        }
+        initialized = _warmup_cache_initialized
+        selected_file = _warmup_selected_file
+    
+    urls = []
+    if selected_file is not None:
+        try:
+            urls = get_corpus_service().get(str(selected_file), KIND_URLS, "[WARMUP]", skip_comments=True, weighted=True).lines
+        except OSError:
+            pass
+    return {
+        'initialized': initialized,
+        'file': str(selected_file) if selected_file else None,
+        'url_count': len(urls),
+        'cache_size_bytes': sum(len(url) for url in urls)
+    }
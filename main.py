@@ -404,6 +404,10 @@ class TomSamAutobot:
         self.controller = ActionController(self.root)  # THAY ĐỔI: Lưu vào self.controller
         self.controller.setup(model, view)
         
+        # --headless: bỏ qua tra cứu/highlight action frame (không có view thì controller tự bỏ qua)
+        if '--headless' in sys.argv:
+            self.controller.headless = True
+        
         # ========== AUTO-START LOGIC (NEW - UPDATED) ==========
         if '--auto-start' in sys.argv:
             logger.info("[AUTO-START] App restarted by watchdog")
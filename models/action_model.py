@@ -1,4 +1,5 @@
 ﻿from constants import ActionType
+from models.action_program import ActionProgram
 import json
 from pathlib import Path
 import os
@@ -52,7 +53,30 @@ class ActionItem:
 class ActionModel:
     def __init__(self):
         self.actions = []
+        self._program = None  # Cache ActionProgram đã biên dịch
         self.is_modified = False  # Thêm flag theo dõi thay đổi
+
+    @property
+    def is_modified(self):
+        return self._is_modified
+
+    @is_modified.setter
+    def is_modified(self, value):
+        self._is_modified = value
+        if value:
+            # Script đã thay đổi → program cũ không còn đúng
+            self._program = None
+
+    def get_program(self):
+        """
+        Trả về ActionProgram đã biên dịch cho self.actions.
+        Cache cho đến khi is_modified bật lên hoặc self.actions bị thay list khác.
+        """
+        program = self._program
+        if program is None or program.source is not self.actions or len(program) != len(self.actions):
+            program = ActionProgram(self.actions)
+            self._program = program
+        return program
         
     def add_action(self, action):
         
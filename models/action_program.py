@@ -0,0 +1,107 @@
+﻿from constants import ActionType
+
+
+class ActionProgram:
+    """
+    Dạng đã "biên dịch" của danh sách ActionItem.
+
+    Tính sẵn các bảng nhảy (jump table) một lần duy nhất để controller
+    không phải quét tìm End For / End If mỗi lần gặp For / If:
+        - end_for:        FOR index      -> END_FOR index
+        - end_if:         IF index       -> END_IF index
+        - else_ifs:       IF index       -> tuple các ELSE_IF index cùng cấp
+        - next_branch:    IF/ELSE_IF idx -> ELSE_IF kế tiếp hoặc END_IF
+        - loop_of:        BREAK/SKIP idx -> FOR index bao quanh gần nhất
+        - index_of:       action.id      -> index
+
+    Program là bất biến; khi script thay đổi thì ActionModel biên dịch lại.
+    """
+
+    __slots__ = ("source", "actions", "index_of", "end_for", "end_if",
+                 "else_ifs", "next_branch", "owner_if", "loop_of")
+
+    def __init__(self, actions):
+        # Giữ tham chiếu list gốc để ActionModel biết program còn hợp lệ không
+        self.source = actions
+        self.actions = tuple(actions)
+        self.index_of = {}
+        self.end_for = {}
+        self.end_if = {}
+        self.else_ifs = {}
+        self.next_branch = {}
+        self.owner_if = {}
+        self.loop_of = {}
+        self._compile()
+
+    def _compile(self):
+        """Một lượt duyệt O(n) với stack riêng cho For và If"""
+        for_stack = []
+        if_stack = []
+        branches = {}  # IF index -> list [IF, ELSE_IF..., END_IF]
+
+        for i, action in enumerate(self.actions):
+            self.index_of[action.id] = i
+            action_type = action.action_type
+
+            if action_type == ActionType.FOR_LOOP:
+                for_stack.append(i)
+            elif action_type == ActionType.END_FOR_LOOP:
+                if for_stack:
+                    self.end_for[for_stack.pop()] = i
+            elif action_type in (ActionType.BREAK_FOR_LOOP, ActionType.SKIP_FOR_LOOP):
+                if for_stack:
+                    self.loop_of[i] = for_stack[-1]
+            elif action_type == ActionType.IF_CONDITION:
+                if_stack.append(i)
+                branches[i] = [i]
+            elif action_type == ActionType.ELSE_IF_CONDITION:
+                if if_stack:
+                    owner = if_stack[-1]
+                    branches[owner].append(i)
+                    self.owner_if[i] = owner
+            elif action_type == ActionType.END_IF_CONDITION:
+                if if_stack:
+                    owner = if_stack.pop()
+                    self.end_if[owner] = i
+                    chain = branches[owner]
+                    chain.append(i)
+                    self.else_ifs[owner] = tuple(chain[1:-1])
+                    for current, following in zip(chain, chain[1:]):
+                        self.next_branch[current] = following
+
+        # IF không có END_IF: bỏ ELSE_IF mồ côi ra khỏi owner_if
+        for owner in if_stack:
+            for else_if_index in branches[owner][1:]:
+                self.owner_if.pop(else_if_index, None)
+
+    def __len__(self):
+        return len(self.actions)
+
+    def find_index(self, action_id):
+        """Trả về index của action theo id, -1 nếu không có"""
+        return self.index_of.get(action_id, -1)
+
+    def matching_end(self, start_index):
+        """End For / End If tương ứng với FOR hoặc IF tại start_index, -1 nếu không có"""
+        action_type = self.actions[start_index].action_type
+        if action_type == ActionType.FOR_LOOP:
+            return self.end_for.get(start_index, -1)
+        if action_type == ActionType.IF_CONDITION:
+            return self.end_if.get(start_index, -1)
+        return -1
+
+    def first_else_if(self, if_index):
+        """ELSE_IF đầu tiên cùng cấp với IF, -1 nếu không có"""
+        else_ifs = self.else_ifs.get(if_index, ())
+        return else_ifs[0] if else_ifs else -1
+
+    def branch_end(self, branch_index):
+        """Kết thúc của nhánh IF/ELSE_IF (ELSE_IF kế tiếp hoặc END_IF), -1 nếu không có"""
+        return self.next_branch.get(branch_index, -1)
+
+    def loop_end_of(self, index):
+        """END_FOR của vòng For bao quanh BREAK/SKIP tại index, -1 nếu không có"""
+        for_index = self.loop_of.get(index)
+        if for_index is None:
+            return -1
+        return self.end_for.get(for_index, -1)
@@ -1,27 +1,39 @@
 ﻿# models/gologin_api.py
 from gologin import GoLogin
-from gologin import getRandomPort
-import requests
 import time
 import tempfile
 import os
 import subprocess
 import psutil
 import json
+from concurrent.futures import ThreadPoolExecutor
+
+from models.gologin_http import get_gologin_http_client
+from models.gologin_launcher import get_gologin_launcher
+from models.process_index import get_process_index
+from models.profile_list_cache import get_profile_list_cache
+from models.profile_teardown import (
+    FILE_RELEASE_TIMEOUT, file_released, process_tree, wait_processes_exit, wait_until,
+)
+
+PROFILE_PAGE_LIMIT = 30      # GoLogin API max limit per page
+PROFILE_PAGE_WORKERS = 4     # Số trang fetch song song (= giới hạn GET /browser/v2 của GoLoginHttpClient)
 
 class GoLoginAPI:
     """Class quản lý GoLogin API - 3 methods: Create, Start, Stop"""
     
     def __init__(self, api_token):
         self.api_token = api_token
-        self.gl = None
         self.base_url = "https://api.gologin.com"
         self.headers = {
             "Authorization": f"Bearer {self.api_token}",
             "Content-Type": "application/json"
         }
-        # ← THÊM: Dictionary lưu GoLogin instances theo profile_id
-        self.active_profiles = {}  # {profile_id: GoLogin_instance}
+        # Session HTTP dùng chung theo token: connection pool + retry/backoff + counter theo endpoint
+        self.http = get_gologin_http_client(api_token)
+        # Registry GoLogin instance theo profile_id + pipeline start (thay self.gl dùng chung)
+        self.launcher = get_gologin_launcher(api_token)
+        self.active_profiles = self.launcher.instances  # {profile_id: GoLogin_instance} - chỉ đọc
         
         # ← FIX #1: Set tmpdir to system temp directory
         self.tmpdir = tempfile.gettempdir()  # C:\Users\xxx\AppData\Local\Temp
@@ -34,7 +46,7 @@ class GoLoginAPI:
         """
         try:
             # ← FIX #2: Thêm tmpdir vào GoLogin init
-            self.gl = GoLogin({
+            gl = GoLogin({
                 "token": self.api_token,
                 "tmpdir": self.tmpdir
             })
@@ -69,10 +81,11 @@ class GoLoginAPI:
             print(f"[GOLOGIN] Creating profile: {profile_name}")
             
             # Create profile
-            profile_id = self.gl.create(profile_data)
+            profile_id = gl.create(profile_data)
             
             if profile_id:
                 print(f"[GOLOGIN] ✓ Profile created: {profile_id}")
+                get_profile_list_cache(self.api_token).invalidate()
                 print(f"[GOLOGIN] ⚠ Wait 2-3 minutes before launching")
                 return True, profile_id
             else:
@@ -82,7 +95,7 @@ class GoLoginAPI:
             print(f"[GOLOGIN] Create error: {e}")
             return False, str(e)
     
-    def start_profile(self, profile_id, wait_for_ready=True, max_wait=180, extra_params=None):
+    def start_profile(self, profile_id, wait_for_ready=True, max_wait=180, extra_params=None, spawn_lock=None):
         """
         Start profile đã tồn tại
         Args:
@@ -90,6 +103,7 @@ class GoLoginAPI:
             wait_for_ready: Poll until profile ready (default True)
             max_wait: Max seconds to wait (default 180 = 3 mins)
             extra_params: List of browser flags (e.g. ['--headless=new'])
+            spawn_lock: Lock chỉ giữ trong bước spawn browser (xem GoLoginLauncher.launch)
         Returns: (success, debugger_address or error_message)
         """
         try:
@@ -108,14 +122,12 @@ class GoLoginAPI:
             max_retries = 2
             for attempt in range(max_retries):
                 try:
-                    # Initialize GoLogin with tmpdir and extra_params
-                    random_port = getRandomPort()
+                    # Initialize GoLogin with tmpdir and extra_params (port do launcher cấp)
                     gologin_config = {
                         "token": self.api_token,
                         "profile_id": profile_id,
                         # "tmpdir": self.tmpdir,                      
                         "uploadCookiesToServer": True,
-                        "port": random_port
                     }
                     
                     default_extra_params = [
@@ -141,18 +153,18 @@ class GoLoginAPI:
 
                     gologin_config["extra_params"] = final_extra_params
                 
-                    self.gl = GoLogin(gologin_config)
-                
                     # Start browser
                     if attempt > 0:
                         print(f"[GOLOGIN] Retry attempt {attempt + 1}/{max_retries}...")
                     else:
                         print(f"[GOLOGIN] Launching browser...")
                     
-                    debugger_address = self.gl.start()
+                    # Instance riêng cho profile, đăng ký vào registry khi browser đã lên
+                    debugger_address = self.launcher.launch(
+                        profile_id, gologin_config, f"[GOLOGIN][{profile_id}]", spawn_lock=spawn_lock
+                    )
                 
                     if debugger_address:
-                        self.active_profiles[profile_id] = self.gl
                         print(f"[GOLOGIN] ✓ Profile started!")
                         print(f"[GOLOGIN] Debugger: {debugger_address}")
                         return True, debugger_address
@@ -235,7 +247,7 @@ class GoLoginAPI:
             print(f"[GOLOGIN] Getting profile details: {profile_id[:8]}...")
         
             # Send GET request
-            response = requests.get(url, headers=self.headers, timeout=30)
+            response = self.http.get(url)
         
             # Check response
             if response.status_code == 200:
@@ -272,12 +284,14 @@ class GoLoginAPI:
         print(f"[GOLOGIN] Stopping profile: {profile_id}")
     
         # Check if profile is active
-        if profile_id not in self.active_profiles:
+        gl = self.launcher.get(profile_id)
+        if gl is None:
             print(f"[GOLOGIN] ⚠ No active instance found for {profile_id}")
             return False, "Profile not running"
     
-        gl = self.active_profiles[profile_id]
-    
+        # Snapshot cây process browser trước khi stop → chờ đúng các PID này thoát thay vì sleep + quét toàn host
+        browser_processes = self.get_browser_processes(profile_id)
+
         # Result container (shared between threads)
         stop_result = {"success": False, "message": "Unknown error", "completed": False}
         
@@ -331,29 +345,9 @@ class GoLoginAPI:
             if stop_result["success"]:
                 # gl.stop() completed successfully
                 print(f"[GOLOGIN] ✓ gl.stop() completed successfully")
-                print(f"[GOLOGIN] Waiting 5s for cloud sync to complete...")
-                time.sleep(5)
-        
                 # Check if browser processes still exist
                 try:
-                    import psutil
-                    profile_folder = f"gologin_{profile_id}".lower()
-                    browser_still_running = False
-            
-                    for proc in psutil.process_iter(['pid', 'name', 'cmdline']):
-                        try:
-                            proc_name = proc.info['name'].lower() if proc.info['name'] else ''
-                            is_browser = any(name in proc_name for name in ['orbita', 'chrome', 'chromium'])
-                            if is_browser and proc.info['cmdline']:
-                                cmdline = ' '.join(proc.info['cmdline']).lower()
-                                if profile_folder in cmdline:
-                                    browser_still_running = True
-                                    print(f"[GOLOGIN] ⚠ Browser process {proc.info['pid']} still running after gl.stop()")
-                                    break
-                        except:
-                            pass
-            
-                    if browser_still_running:
+                    if self._browser_still_running(profile_id, browser_processes):
                         print(f"[GOLOGIN] Force killing remaining browser processes...")
                         self._force_kill_browser_processes(profile_id)
                     else:
@@ -377,24 +371,9 @@ class GoLoginAPI:
             
                     # Still check if browser closed
                     print(f"[GOLOGIN] Checking if browser closed...")
-                    time.sleep(3)
-            
                     try:
-                        import psutil
-                        profile_folder = f"gologin_{profile_id}".lower()
-                        browser_running = False
-                
-                        for proc in psutil.process_iter(['pid', 'name', 'cmdline']):
-                            try:
-                                proc_name = proc.info['name'].lower() if proc.info['name'] else ''
-                                if 'chrome' in proc_name and proc.info['cmdline']:
-                                    cmdline = ' '.join(proc.info['cmdline']).lower()
-                                    if profile_folder in cmdline:
-                                        browser_running = True
-                                        break
-                            except:
-                                pass
-                
+                        browser_running = self._browser_still_running(profile_id, browser_processes)
+
                         if browser_running:
                             print(f"[GOLOGIN] Browser still running, force killing...")
                             self._force_kill_browser_processes(profile_id)
@@ -415,11 +394,8 @@ class GoLoginAPI:
                         print(f"[GOLOGIN] ⚠ Force kill error: {kill_err}")
 
     
-        # Remove from active profiles
-        try:
-            del self.active_profiles[profile_id]
-        except:
-            pass
+        # Remove from active profiles (trả port cho launcher)
+        self.launcher.release(profile_id)
     
         if stop_result["success"]:
             print(f"[GOLOGIN] ✓ Profile stopped successfully!")
@@ -430,6 +406,41 @@ class GoLoginAPI:
             return False, f"Stopped with warnings: {stop_result['message']}"
 
 
+    def get_browser_processes(self, profile_id):
+        """
+        psutil.Process của browser profile + process con
+
+        Ưu tiên process SDK spawn (gl.process), không có thì tra ProcessIndex dùng chung.
+        """
+        gl = self.launcher.get(profile_id)
+        browser_process = getattr(gl, "process", None)
+        if browser_process is not None:
+            processes = process_tree(browser_process.pid)
+            if processes:
+                return processes
+        return [entry.process for entry in get_process_index().processes_for_profile(profile_id) if entry.is_browser]
+
+    def _browser_still_running(self, profile_id, browser_processes):
+        """
+        Browser của profile còn chạy sau gl.stop()?
+
+        Có snapshot PID → psutil.wait_procs (trả về ngay khi thoát, tối đa PROCESS_EXIT_TIMEOUT).
+        Không có → tra ProcessIndex (refresh tăng dần, không quét lại toàn bộ process).
+        """
+        if browser_processes:
+            alive, elapsed = wait_processes_exit(browser_processes)
+            for proc in alive:
+                print(f"[GOLOGIN] ⚠ Browser process {proc.pid} still running after gl.stop()")
+            if not alive:
+                print(f"[GOLOGIN] Browser processes exited in {elapsed:.1f}s")
+            return bool(alive)
+
+        for entry in get_process_index().processes_for_profile(profile_id, max_age=0):
+            if entry.is_browser:
+                print(f"[GOLOGIN] ⚠ Browser process {entry.pid} still running after gl.stop()")
+                return True
+        return False
+
     def _cleanup_temp_files(self, profile_id, max_retries=5):
         """
         Cleanup temp files WITHOUT force killing browser
@@ -447,8 +458,11 @@ class GoLoginAPI:
             upload_zip_path = os.path.join(self.tmpdir, f"gologin_{profile_id}_upload.zip")
             debug_log = os.path.join(profile_temp_path, "chrome_debug.log")
         
-            # Wait for file handles to release
-            time.sleep(2)
+            # Wait for file handles to release (trả về ngay khi không còn bị giữ)
+            wait_until(
+                lambda: file_released(debug_log) and file_released(upload_zip_path),
+                FILE_RELEASE_TIMEOUT
+            )
         
             # 1. Cleanup chrome_debug.log
             if os.path.exists(debug_log):
@@ -506,66 +520,43 @@ class GoLoginAPI:
             import psutil
             import shutil
             killed_count = 0
+            killed_processes = []
         
             profile_folder = f"gologin_{profile_id}".lower()
             print(f"[GOLOGIN] [{profile_id}] Force killing Chrome processes...")
         
-            # Kill Chrome processes for this profile
-            for proc in psutil.process_iter(['pid', 'name', 'cmdline', 'exe']):
+            # Kill Chrome processes for this profile (tra ProcessIndex thay vì quét mọi process)
+            for entry in get_process_index().processes_for_profile(profile_id, max_age=0):
                 try:
-                    proc_name = proc.info['name'].lower() if proc.info['name'] else ''
-                    pid = proc.info['pid']
                     # ONLY kill chrome.exe (NOT gologin.exe)
-                    if proc_name != 'chrome.exe':
+                    if entry.name != 'chrome.exe':
                         continue
-                
-                    cmdline = proc.info.get('cmdline', [])
-                    if not cmdline:
-                        continue
-                
-                    cmdline_str = ' '.join(cmdline).lower()
-                    exe_path = proc.info.get('exe', '').lower() if proc.info.get('exe') else ''
-                
-                    # Check if belongs to this profile
-                    belongs_to_profile = profile_folder in cmdline_str
-                    
-                    if not belongs_to_profile:
-                      
+
+                    # Check if belongs to this profile (chính cmdline, không tính process con kế thừa)
+                    if profile_folder not in entry.cmdline:
                         continue
-                
+
                     # Additional safety: Must be GoLogin Orbita
-                    is_gologin_orbita = (
-                        ('.gologin' in exe_path and 'orbita' in exe_path) or
-                        ('appdata\\local\\gologin\\browser' in exe_path) or
-                        ('.gologin' in cmdline_str and 'orbita' in cmdline_str)
-                    )
-                
-                  
-                
-                    if not is_gologin_orbita:
-                     
+                    if not entry.is_gologin_orbita:
                         continue
-                
+
                     # Verify user-data-dir or profile-directory flag
-                    has_profile_flag = (
-                        '--user-data-dir' in cmdline_str or
-                        '--profile-directory' in cmdline_str
-                    )                 
-                
-                    if not has_profile_flag:
+                    if not entry.has_profile_flag:
                         continue
-                
+
                     # ALL checks passed - safe to kill
-                    print(f"[GOLOGIN] [{profile_id}] Killing PID {proc.info['pid']} (chrome.exe)")
-                    proc.kill()
+                    print(f"[GOLOGIN] [{profile_id}] Killing PID {entry.pid} (chrome.exe)")
+                    entry.process.kill()
                     killed_count += 1
-                
-                except (psutil.NoSuchProcess, psutil.AccessDenied):                   
+                    killed_processes.append(entry.process)
+
+                except (psutil.NoSuchProcess, psutil.AccessDenied):
                     pass
-        
+
             if killed_count > 0:
                 print(f"[GOLOGIN] [{profile_id}] ✓ Killed {killed_count} Chrome process(es)")
-                time.sleep(2)  # Wait for processes to die
+                wait_processes_exit(killed_processes, timeout=5)  # Wait for processes to die
+                get_process_index().forget(proc.pid for proc in killed_processes)
             else:
                 print(f"[GOLOGIN] [{profile_id}] No Chrome processes found")
         
@@ -624,7 +615,7 @@ class GoLoginAPI:
                     url = f"{self.base_url}/browser/{profile_id}"
                 
                     # Step 1: GET current profile data
-                    get_response = requests.get(url, headers=self.headers, timeout=30)
+                    get_response = self.http.get(url)
                 
                     if get_response.status_code != 200:
                         print(f"[GOLOGIN] ✗ Failed to GET profile {profile_id[:8]}...: Status {get_response.status_code}")
@@ -648,49 +639,27 @@ class GoLoginAPI:
                         "torProxyRegion": ""
                     }
                 
-                    # Step 3: PUT updated profile back (with retry)
-                    max_retries = 3
-                    retry_delay = 2
-                
-                    for attempt in range(1, max_retries + 1):
+                    # Step 3: PUT updated profile back (retry/backoff do self.http xử lý)
+                    put_response = self.http.put(url, json=profile_data)
+
+                    if put_response.status_code in [200, 201, 204]:
+                        print(f"[GOLOGIN] ✓ Proxy removed for profile {profile_id[:8]}...")
+                        success_count += 1
+                    else:
+                        error_msg = f"Status {put_response.status_code}"
                         try:
-                            put_response = requests.put(url, json=profile_data, headers=self.headers, timeout=30)
-                        
-                            if put_response.status_code in [200, 201, 204]:
-                                print(f"[GOLOGIN] ✓ Proxy removed for profile {profile_id[:8]}...")
-                                success_count += 1
-                                break
-                            else:
-                                error_msg = f"Status {put_response.status_code}"
-                                try:
-                                    error_data = put_response.json()
-                                    error_msg = error_data.get('message', error_msg)
-                                except:
-                                    pass
-                            
-                                if attempt == max_retries:
-                                    print(f"[GOLOGIN] ✗ Failed PUT for {profile_id[:8]}...: {error_msg}")
-                                    failed_profiles.append(profile_id)
-                    
-                        except (requests.exceptions.SSLError, ConnectionError, requests.exceptions.ConnectionError) as e:
-                            if attempt < max_retries:
-                                wait_time = retry_delay * (2 ** (attempt - 1))
-                                print(f"[GOLOGIN] Retry {attempt}/{max_retries} for {profile_id[:8]}...")
-                                time.sleep(wait_time)
-                            else:
-                                print(f"[GOLOGIN] ✗ SSL error for {profile_id[:8]}...")
-                                failed_profiles.append(profile_id)
-                    
-                        except requests.exceptions.Timeout:
-                            if attempt < max_retries:
-                                time.sleep(retry_delay)
-                            else:
-                                print(f"[GOLOGIN] ✗ Timeout for {profile_id[:8]}...")
-                                failed_profiles.append(profile_id)
-            
+                            error_data = put_response.json()
+                            error_msg = error_data.get('message', error_msg)
+                        except:
+                            pass
+                        print(f"[GOLOGIN] ✗ Failed PUT for {profile_id[:8]}...: {error_msg}")
+                        failed_profiles.append(profile_id)
+
                 except Exception as e:
                     print(f"[GOLOGIN] ✗ Exception for {profile_id[:8]}...: {e}")
                     failed_profiles.append(profile_id)
+
+            get_profile_list_cache(self.api_token).expire()
         
             # Summary
             if failed_profiles:
@@ -768,7 +737,7 @@ class GoLoginAPI:
             
             print(f"[GOLOGIN] Stopping profile via API: {profile_id}")
             
-            response = requests.delete(url, headers=self.headers)
+            response = self.http.delete(url)
             
             # Check response status
             if response.status_code == 200 or response.status_code == 204:
@@ -816,12 +785,8 @@ class GoLoginAPI:
             print(f"[DEBUG] Calling: PATCH {url}")
             print(f"[DEBUG] Request body: {request_body}")
         
-            response = requests.patch(
-                url,
-                headers=self.headers,
-                json=request_body,
-                timeout=30
-            )
+            response = self.http.patch(url, json=request_body)
+            get_profile_list_cache(self.api_token).expire()
         
             print(f"[DEBUG] Response Status: {response.status_code}")
         
@@ -904,56 +869,24 @@ class GoLoginAPI:
             payload = {"proxies": proxies_array}
             url = f"{self.base_url}/browser/proxy/many/v2"
         
-            # RETRY LOGIC FOR SSL ERRORS (FIX)
-            max_retries = 3
-            retry_delay = 2  # seconds (exponential backoff)
-        
-            for attempt in range(1, max_retries + 1):
+            # Retry SSL/connection error + 429 do self.http xử lý tập trung
+            response = self.http.patch(url, json=payload)
+            get_profile_list_cache(self.api_token).expire()
+
+            # Check response status
+            if response.status_code in [200, 201, 204]:
+                print(f"[GOLOGIN] ✓ Proxy updated successfully for all profiles")
+                return True, f"Proxy updated for {len(profile_ids)} profiles"
+            else:
+                error_msg = f"API returned status {response.status_code}"
                 try:
-                    # Send PATCH request
-                    response = requests.patch(url, json=payload, headers=self.headers, timeout=30)
-                
-                    # Check response status
-                    if response.status_code in [200, 201, 204]:
-                        print(f"[GOLOGIN] ✓ Proxy updated successfully for all profiles")
-                        return True, f"Proxy updated for {len(profile_ids)} profiles"
-                    else:
-                        error_msg = f"API returned status {response.status_code}"
-                        try:
-                            error_data = response.json()
-                            error_msg = error_data.get('message', error_msg)
-                        except:
-                            error_msg = f"{error_msg}: {response.text[:200]}"
-                    
-                        print(f"[GOLOGIN] Proxy update failed: {error_msg}")
-                        return False, error_msg
-            
-                except (requests.exceptions.SSLError, 
-                        ConnectionError, 
-                        requests.exceptions.ConnectionError) as e:
-                    # SSL/Connection errors - retry with backoff
-                    error_str = str(e)
-                    print(f"[GOLOGIN] Attempt {attempt}/{max_retries} - SSL/Connection error: {error_str[:150]}")
-                
-                    if attempt < max_retries:
-                        wait_time = retry_delay * (2 ** (attempt - 1))  # Exponential backoff: 2s, 4s, 8s
-                        print(f"[GOLOGIN] Retrying in {wait_time}s...")
-                        time.sleep(wait_time)
-                        continue
-                    else:
-                        # All retries exhausted
-                        print(f"[GOLOGIN] ❌ All {max_retries} attempts failed - SSL/Connection error")
-                        return False, f"SSL/Connection error after {max_retries} attempts: {error_str[:200]}"
-            
-                except requests.exceptions.Timeout:
-                    # Timeout - retry
-                    print(f"[GOLOGIN] Attempt {attempt}/{max_retries} - Request timeout (30s)")
-                    if attempt < max_retries:
-                        print(f"[GOLOGIN] Retrying in {retry_delay}s...")
-                        time.sleep(retry_delay)
-                        continue
-                    else:
-                        return False, f"Request timeout after {max_retries} attempts"
+                    error_data = response.json()
+                    error_msg = error_data.get('message', error_msg)
+                except:
+                    error_msg = f"{error_msg}: {response.text[:200]}"
+
+                print(f"[GOLOGIN] Proxy update failed: {error_msg}")
+                return False, error_msg
     
         except Exception as e:
             print(f"[GOLOGIN] Error updating proxy: {e}")
@@ -976,7 +909,8 @@ class GoLoginAPI:
                 "cleanCookies": str(replace_all).lower()
             }
            
-            response = requests.post(url, headers=self.headers, params=params, json=cookies, timeout=30)
+            response = self.http.post(url, params=params, json=cookies)
+            get_profile_list_cache(self.api_token).expire()
         
             if response.status_code in [200, 204]:                
                 return True, "Cookies updated successfully"
@@ -1038,6 +972,7 @@ class GoLoginAPI:
             # Add cookies using SDK method
             print(f"[GOLOGIN] Adding {len(cookies_for_gologin)} cookies to profile...")
             gl.addCookiesToProfile(profile_id, cookies_for_gologin)
+            get_profile_list_cache(self.api_token).expire()
         
             print(f"[GOLOGIN] ✓ Cookies added to profile")
             return True, f"Added {len(cookies_for_gologin)} cookies"
@@ -1061,7 +996,7 @@ class GoLoginAPI:
         
             print(f"[GOLOGIN] Getting cookies for profile: {profile_id}")
         
-            response = requests.get(url, headers=self.headers, timeout=30)
+            response = self.http.get(url)
         
             if response.status_code == 200:
                 cookies_data = response.json()
@@ -1109,13 +1044,14 @@ class GoLoginAPI:
             print(f"[DEBUG] POST {url}")
             print(f"[DEBUG] Payload: {payload}")
         
-            response = requests.post(url, headers=self.headers, json=payload, timeout=30)
+            response = self.http.post(url, json=payload)
         
             print(f"[DEBUG] Response Status: {response.status_code}")
         
             # HTTP 204 = Success but no content (async operation)
             if response.status_code == 204:
                 print(f"[GOLOGIN] ✓ Clone request accepted (HTTP 204 - async)")
+                get_profile_list_cache(self.api_token).invalidate()
                 return True, []  # Empty list indicates async operation
         
             # Try to parse response body
@@ -1130,6 +1066,7 @@ class GoLoginAPI:
         
             if response.status_code in [200, 201]:
                 data = response.json()
+                get_profile_list_cache(self.api_token).invalidate()
             
                 # API returns array of new profile IDs
                 if isinstance(data, list) and len(data) > 0:
@@ -1155,18 +1092,26 @@ class GoLoginAPI:
             traceback.print_exc()
             return False, str(e)
 
-    def get_all_profiles(self, count=None, start_index=0):
+    def get_api_stats(self):
+        """Latency / lỗi / retry theo endpoint của session HTTP dùng chung"""
+        return self.http.get_stats()
+
+    def get_all_profiles(self, count=None, start_index=0, use_cache=True):
         """
         Get profiles from GoLogin account with PRECISE range support
         API: GET https://api.gologin.com/browser/v2?page={page}&limit={limit}
-    
+
+        Trang được fetch song song (tối đa PROFILE_PAGE_WORKERS) và lưu vào ProfileListCache
+        trên đĩa: trang còn trong TTL resolve offline, trang cũ được revalidate bằng ETag.
+
         Args:
             count: Number of profiles to fetch (None = all)
             start_index: Start from this profile index (0-based)
-    
+            use_cache: False = bỏ qua cache, luôn gọi API (kết quả vẫn được lưu lại)
+
         Returns:
             tuple: (success: bool, profiles: list or error message)
-    
+
         Examples:
             get_all_profiles()              → Fetch ALL profiles
             get_all_profiles(30, 10)        → Fetch 30 profiles from index 10 (profiles 10-39)
@@ -1174,80 +1119,56 @@ class GoLoginAPI:
         """
         try:
             # ========== CALCULATE API PARAMS ==========
-            limit = 30  # GoLogin API max limit per page
-        
+            limit = PROFILE_PAGE_LIMIT  # GoLogin API max limit per page
+
             if count is None:
                 # Fetch ALL profiles (old behavior)
                 print(f"[GOLOGIN] Fetching ALL profiles with pagination...")
-                return self._fetch_all_profiles_paginated()
-        
+                return self._fetch_all_profiles_paginated(use_cache)
+
             # ========== OPTIMIZED: FETCH ONLY NEEDED PROFILES ==========
             print(f"[GOLOGIN] Fetching {count} profiles starting from index {start_index}")
-        
+
             # Calculate which pages to fetch
             # Example: start_index=10, count=30
             #   → Need profiles 10-39
             #   → Page 1 has profiles 0-29 (need 10-29 = 20 profiles)
             #   → Page 2 has profiles 30-59 (need 30-39 = 10 profiles)
-        
+
             start_page = (start_index // limit) + 1  # Page numbers start from 1
             end_index = start_index + count - 1
             end_page = (end_index // limit) + 1
-        
+
             print(f"[GOLOGIN] Calculated: Need pages {start_page} to {end_page}")
-        
+
+            pages = self._fetch_profile_pages(range(start_page, end_page + 1), use_cache)
             all_profiles = []
-        
+
             for page in range(start_page, end_page + 1):
-                url = f"{self.base_url}/browser/v2"
-                params = {
-                    "limit": limit,
-                    "page": page
-                }
-            
-                print(f"[GOLOGIN] Fetching page {page} (limit={limit})...")
-                response = requests.get(url, headers=self.headers, params=params, timeout=30)
-            
-                if response.status_code != 200:
-                    error_msg = f"HTTP {response.status_code}"
-                    try:
-                        error_data = response.json()
-                        error_msg = error_data.get("message", error_msg)
-                    except:
-                        error_msg = f"{error_msg}: {response.text[:200]}"
-                
-                    print(f"[GOLOGIN] ✗ Get profiles failed: {error_msg}")
-                    return False, error_msg
-            
-                # Parse response
-                data = response.json()
-                profiles_page = []
-                if isinstance(data, list):
-                    profiles_page = data
-                elif isinstance(data, dict):
-                    profiles_page = data.get("profiles", data.get("data", []))
-            
-                print(f"[GOLOGIN] Page {page}: Retrieved {len(profiles_page)} profiles")
-            
+                success, profiles_page = pages[page]
+                if not success:
+                    print(f"[GOLOGIN] ✗ Get profiles failed: {profiles_page}")
+                    return False, profiles_page
+
                 if not profiles_page:
-                    print(f"[GOLOGIN] Empty page, stopping")
+                    print(f"[GOLOGIN] Empty page {page}, stopping")
                     break
-            
+
                 all_profiles.extend(profiles_page)
-        
+
             # ========== SLICE TO EXACT RANGE ==========
             # We may have fetched extra profiles at edges, slice precisely
             # Example: Fetched pages 1-2 (60 profiles), need profiles 10-39
             #   → Slice: all_profiles[10:40] from concatenated list
-        
+
             # Calculate offset within fetched data
             offset_in_fetched = start_index - ((start_page - 1) * limit)
             selected_profiles = all_profiles[offset_in_fetched:offset_in_fetched + count]
-        
+
             # Extract only profile IDs (or return full profile objects)
             print(f"[GOLOGIN] ✓ SUCCESS: Selected {len(selected_profiles)} profiles")
             return True, selected_profiles
-        
+
         except Exception as e:
             print(f"[GOLOGIN] Get profiles error: {e}")
             import traceback
@@ -1255,87 +1176,171 @@ class GoLoginAPI:
             return False, str(e)
 
 
-    def _fetch_all_profiles_paginated(self):
+    def _fetch_profile_page(self, page, use_cache=True):
+        """
+        Một trang /browser/v2 qua cache: fresh → cache, stale → conditional GET
+
+        Returns:
+            tuple: (success, profiles list or error message, source: cache/revalidated/fetched)
+        """
+        cache = get_profile_list_cache(self.api_token)
+        entry = cache.get_page(page, PROFILE_PAGE_LIMIT)
+        if use_cache and cache.is_fresh(entry):
+            return True, entry["profiles"], "cache"
+
+        headers = {}
+        if entry is not None:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        url = f"{self.base_url}/browser/v2"
+        params = {
+            "limit": PROFILE_PAGE_LIMIT,
+            "page": page
+        }
+        response = self.http.get(url, params=params, headers=headers or None)
+
+        if response.status_code == 304 and entry is not None:
+            cache.touch(page)
+            return True, entry["profiles"], "revalidated"
+
+        if response.status_code != 200:
+            error_msg = f"HTTP {response.status_code}"
+            try:
+                error_data = response.json()
+                error_msg = error_data.get("message", error_msg)
+            except:
+                error_msg = f"{error_msg}: {response.text[:200]}"
+            return False, error_msg, "fetched"
+
+        # Parse response
+        data = response.json()
+        profiles_page = []
+        if isinstance(data, list):
+            profiles_page = data
+        elif isinstance(data, dict):
+            profiles_page = data.get("profiles", data.get("data", []))
+
+        changed = cache.put_page(page, PROFILE_PAGE_LIMIT, profiles_page,
+                                 etag=response.headers.get("ETag"),
+                                 last_modified=response.headers.get("Last-Modified"))
+        return True, profiles_page, "fetched" if changed or entry is None else "revalidated"
+
+    def _fetch_profile_pages(self, pages, use_cache=True):
+        """
+        Fetch nhiều trang song song (tối đa PROFILE_PAGE_WORKERS request cùng lúc)
+
+        Returns:
+            dict: {page: (success, profiles or error message)}
+        """
+        pages = list(pages)
+        results = {}
+        sources = {}
+
+        # Một trang trong range hết hạn / chưa có → revalidate CẢ range cùng lúc,
+        # không ghép trang cache cũ với trang vừa fetch
+        if use_cache and not get_profile_list_cache(self.api_token).all_fresh(pages, PROFILE_PAGE_LIMIT):
+            use_cache = False
+
+        def fetch(page):
+            try:
+                return self._fetch_profile_page(page, use_cache)
+            except Exception as e:
+                return False, str(e), "fetched"
+
+        if len(pages) == 1:
+            fetched = [fetch(pages[0])]
+        else:
+            with ThreadPoolExecutor(max_workers=min(PROFILE_PAGE_WORKERS, len(pages))) as executor:
+                fetched = list(executor.map(fetch, pages))
+
+        for page, (success, result, source) in zip(pages, fetched):
+            results[page] = (success, result)
+            sources[source] = sources.get(source, 0) + 1
+
+        if sources.get("fetched") or sources.get("revalidated"):
+            get_profile_list_cache(self.api_token).save()
+        summary = ", ".join(f"{count} {source}" for source, count in sorted(sources.items()))
+        print(f"[GOLOGIN] Pages {pages[0]}-{pages[-1]}: {summary}")
+        return results
+
+    def _fetch_all_profiles_paginated(self, use_cache=True):
         """
         Internal method: Fetch ALL profiles with pagination (old behavior)
-        Used when count=None
+        Used when count=None - fetch theo đợt PROFILE_PAGE_WORKERS trang song song
         """
         try:
             all_profiles = []
             seen_profile_ids = set()
             page = 1
-            limit = 30
             max_pages = 100
-        
+            cache = get_profile_list_cache(self.api_token)
+
             print(f"[GOLOGIN] Fetching ALL profiles with pagination...")
-        
+
+            # Chỉ resolve offline khi biết trang cuối và mọi trang tới đó còn fresh
+            if use_cache and (cache.last_page is None or
+                              not cache.all_fresh(range(1, cache.last_page + 2), PROFILE_PAGE_LIMIT)):
+                use_cache = False
+
             while page <= max_pages:
-                url = f"{self.base_url}/browser/v2"
-                params = {
-                    "limit": limit,
-                    "page": page
-                }
-            
-                print(f"[GOLOGIN] Fetching page {page} (limit={limit})...")
-                response = requests.get(url, headers=self.headers, params=params, timeout=30)
-            
-                if response.status_code != 200:
-                    error_msg = f"HTTP {response.status_code}"
-                    try:
-                        error_data = response.json()
-                        error_msg = error_data.get("message", error_msg)
-                    except:
-                        error_msg = f"{error_msg}: {response.text[:200]}"
-                
-                    print(f"[GOLOGIN] ✗ Get profiles failed: {error_msg}")
-                    return False, error_msg
-            
-                # Parse response
-                data = response.json()
-                profiles_page = []
-                if isinstance(data, list):
-                    profiles_page = data
-                elif isinstance(data, dict):
-                    profiles_page = data.get("profiles", data.get("data", []))
-            
-                # Empty page = end
-                if len(profiles_page) == 0:
-                    print(f"[GOLOGIN] Empty page, stopping pagination")
-                    break
-            
-                # Deduplicate
-                new_profiles_count = 0
-                duplicates_in_this_page = 0
-            
-                for profile in profiles_page:
-                    profile_id = profile.get("id")
-                    if not profile_id:
-                        continue
-                
-                    if profile_id in seen_profile_ids:
-                        duplicates_in_this_page += 1
-                        continue
-                
-                    all_profiles.append(profile)
-                    seen_profile_ids.add(profile_id)
-                    new_profiles_count += 1
-            
-                # Log
-                if duplicates_in_this_page > 0:
-                    print(f"[GOLOGIN] Page {page}: Added {new_profiles_count} new profile(s), skipped {duplicates_in_this_page} duplicate(s)")
-                else:
-                    print(f"[GOLOGIN] Page {page}: Added {new_profiles_count} new profile(s)")
-            
-                # Stop if only duplicates
-                if new_profiles_count == 0 and duplicates_in_this_page > 0:
-                    print(f"[GOLOGIN] ⚠ Page {page} contains only duplicates, stopping pagination")
+                wave_end = min(page + PROFILE_PAGE_WORKERS - 1, max_pages)
+                # Đã biết trang cuối từ cache → không bắn request thừa sau trang rỗng
+                if use_cache and cache.last_page is not None and cache.last_page + 1 >= page:
+                    wave_end = min(wave_end, cache.last_page + 1)
+                wave = self._fetch_profile_pages(range(page, wave_end + 1), use_cache)
+
+                stop = False
+                for page in range(page, wave_end + 1):
+                    success, profiles_page = wave[page]
+                    if not success:
+                        print(f"[GOLOGIN] ✗ Get profiles failed: {profiles_page}")
+                        return False, profiles_page
+
+                    # Empty page = end
+                    if len(profiles_page) == 0:
+                        print(f"[GOLOGIN] Empty page, stopping pagination")
+                        stop = True
+                        break
+
+                    # Deduplicate
+                    new_profiles_count = 0
+                    duplicates_in_this_page = 0
+
+                    for profile in profiles_page:
+                        profile_id = profile.get("id")
+                        if not profile_id:
+                            continue
+
+                        if profile_id in seen_profile_ids:
+                            duplicates_in_this_page += 1
+                            continue
+
+                        all_profiles.append(profile)
+                        seen_profile_ids.add(profile_id)
+                        new_profiles_count += 1
+
+                    # Log
+                    if duplicates_in_this_page > 0:
+                        print(f"[GOLOGIN] Page {page}: Added {new_profiles_count} new profile(s), skipped {duplicates_in_this_page} duplicate(s)")
+                    else:
+                        print(f"[GOLOGIN] Page {page}: Added {new_profiles_count} new profile(s)")
+
+                    # Stop if only duplicates
+                    if new_profiles_count == 0 and duplicates_in_this_page > 0:
+                        print(f"[GOLOGIN] ⚠ Page {page} contains only duplicates, stopping pagination")
+                        stop = True
+                        break
+
+                if stop:
                     break
-            
-                page += 1
-        
+                page = wave_end + 1
+
             print(f"[GOLOGIN] ✓ SUCCESS: Retrieved {len(all_profiles)} unique profile(s)")
             return True, all_profiles
-        
+
         except Exception as e:
             print(f"[GOLOGIN] Get profiles error: {e}")
             import traceback
@@ -0,0 +1,240 @@
+﻿# models/gologin_http.py
+import random
+import re
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+API_POOL_SIZE = 32               # Số connection keep-alive tối đa tới api.gologin.com
+API_TIMEOUT = 30                 # Timeout mặc định (giây) - giống các call cũ
+API_MAX_RETRIES = 3              # Tổng số lần thử cho mỗi request
+API_RETRY_DELAY = 2.0            # Backoff: 2s, 4s, 8s ... (giống retry loop cũ)
+API_RETRY_AFTER_MAX = 60.0       # Chặn Retry-After quá lớn từ server
+API_ENDPOINT_CONCURRENCY = 8     # Số request đồng thời tối đa cho mỗi endpoint
+API_LATENCY_WINDOW = 200         # Số mẫu latency giữ lại để tính p95
+
+# Giới hạn riêng cho endpoint nặng / dễ bị rate limit (key = "METHOD /path/:id")
+API_ENDPOINT_LIMITS = {
+    "GET /browser/v2": 4,
+    "PATCH /browser/proxy/many/v2": 4,
+    "PATCH /browser/fingerprints": 4,
+    "POST /browser/clone_multi": 2,
+}
+
+RETRY_STATUS_CODES = (429, 502, 503, 504)
+# POST (clone_multi, cookies) không idempotent → chỉ retry khi server chắc chắn chưa xử lý
+IDEMPOTENT_METHODS = ("GET", "PUT", "DELETE", "PATCH", "HEAD")
+
+_ID_SEGMENT_RE = re.compile(r"/[0-9a-fA-F]{24}(?=/|$)")
+
+
+def endpoint_key(method, url):
+    """Key thống kê: GET https://api.gologin.com/browser/<id>/cookies → GET /browser/:id/cookies"""
+    path = url.split("://", 1)[-1]
+    path = "/" + path.split("/", 1)[1] if "/" in path else "/"
+    return f"{method.upper()} {_ID_SEGMENT_RE.sub('/:id', path.split('?', 1)[0])}"
+
+
+def _retry_after_seconds(response):
+    """Retry-After dạng số giây hoặc HTTP date → số giây (None nếu không có / không hợp lệ)"""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class _EndpointStats:
+    __slots__ = ("calls", "errors", "retries", "throttled", "statuses", "latencies", "total_ms", "max_ms", "in_flight")
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0          # Exception hoặc HTTP >= 400 ở lần thử cuối
+        self.retries = 0
+        self.throttled = 0       # Số response 429
+        self.statuses = {}
+        self.latencies = deque(maxlen=API_LATENCY_WINDOW)
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.in_flight = 0
+
+
+class GoLoginHttpClient:
+    """
+    Session HTTP dùng chung cho một API token
+
+    - requests.Session + HTTPAdapter pool → giữ kết nối TCP/TLS giữa các call và các thread
+    - Retry/backoff tập trung: lỗi kết nối, timeout, 429/502/503/504; 429 tôn trọng Retry-After
+    - Semaphore theo endpoint để 30+ worker không dồn cùng lúc vào một API
+    - Counter latency / lỗi theo endpoint: get_stats()
+    """
+
+    def __init__(self, api_token, pool_size=API_POOL_SIZE):
+        self.api_token = api_token
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            "Authorization": f"Bearer {api_token}",
+            "Content-Type": "application/json",
+        })
+
+        self._lock = threading.Lock()
+        self._semaphores = {}
+        self._stats = {}
+
+    # ========== PUBLIC API ==========
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def put(self, url, **kwargs):
+        return self.request("PUT", url, **kwargs)
+
+    def patch(self, url, **kwargs):
+        return self.request("PATCH", url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request("DELETE", url, **kwargs)
+
+    def request(self, method, url, max_retries=API_MAX_RETRIES, **kwargs):
+        """
+        Gửi request qua session chung với retry tập trung
+
+        Returns:
+            requests.Response của lần thử cuối (status code do caller tự kiểm tra như cũ)
+
+        Raises:
+            requests.RequestException của lần thử cuối nếu mọi lần đều lỗi kết nối/timeout
+        """
+        method = method.upper()
+        kwargs.setdefault("timeout", API_TIMEOUT)
+        key = endpoint_key(method, url)
+        semaphore, stats = self._endpoint(key)
+        idempotent = method in IDEMPOTENT_METHODS
+
+        for attempt in range(1, max_retries + 1):
+            last_attempt = attempt == max_retries
+            response = None
+            error = None
+            started = time.perf_counter()
+
+            with semaphore:
+                with self._lock:
+                    stats.in_flight += 1
+                try:
+                    response = self.session.request(method, url, **kwargs)
+                except requests.RequestException as e:
+                    error = e
+                finally:
+                    elapsed_ms = (time.perf_counter() - started) * 1000
+                    with self._lock:
+                        stats.in_flight -= 1
+                        self._record(stats, response, elapsed_ms)
+
+            wait = self._retry_wait(response, error, attempt, idempotent)
+            if wait is None or last_attempt:
+                with self._lock:
+                    if error is not None or response.status_code >= 400:
+                        stats.errors += 1
+                if error is not None:
+                    raise error
+                return response
+
+            reason = f"HTTP {response.status_code}" if response is not None else type(error).__name__
+            print(f"[GOLOGIN_HTTP] {key}: {reason}, retry {attempt}/{max_retries - 1} in {wait:.1f}s")
+            with self._lock:
+                stats.retries += 1
+            time.sleep(wait)
+
+    def get_stats(self):
+        """
+        Returns:
+            dict: {"METHOD /path": {calls, errors, retries, throttled, in_flight, avg_ms, p95_ms, max_ms, statuses}}
+        """
+        with self._lock:
+            result = {}
+            for key, stats in self._stats.items():
+                latencies = sorted(stats.latencies)
+                p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] if latencies else 0.0
+                result[key] = {
+                    'calls': stats.calls,
+                    'errors': stats.errors,
+                    'retries': stats.retries,
+                    'throttled': stats.throttled,
+                    'in_flight': stats.in_flight,
+                    'avg_ms': round(stats.total_ms / stats.calls, 1) if stats.calls else 0.0,
+                    'p95_ms': round(p95, 1),
+                    'max_ms': round(stats.max_ms, 1),
+                    'statuses': dict(stats.statuses),
+                }
+            return result
+
+    def close(self):
+        self.session.close()
+
+    # ========== INTERNAL ==========
+
+    def _endpoint(self, key):
+        with self._lock:
+            semaphore = self._semaphores.get(key)
+            if semaphore is None:
+                limit = API_ENDPOINT_LIMITS.get(key, API_ENDPOINT_CONCURRENCY)
+                semaphore = self._semaphores[key] = threading.BoundedSemaphore(limit)
+                self._stats[key] = _EndpointStats()
+            return semaphore, self._stats[key]
+
+    @staticmethod
+    def _record(stats, response, elapsed_ms):
+        stats.calls += 1
+        stats.total_ms += elapsed_ms
+        stats.max_ms = max(stats.max_ms, elapsed_ms)
+        stats.latencies.append(elapsed_ms)
+        status = response.status_code if response is not None else "error"
+        stats.statuses[status] = stats.statuses.get(status, 0) + 1
+        if status == 429:
+            stats.throttled += 1
+
+    @staticmethod
+    def _retry_wait(response, error, attempt, idempotent):
+        """Số giây chờ trước lần thử tiếp theo, None = không retry"""
+        backoff = API_RETRY_DELAY * (2 ** (attempt - 1)) * random.uniform(0.8, 1.2)
+
+        if error is not None:
+            # Request không idempotent chỉ retry khi chưa kết nối được (server chưa nhận)
+            if idempotent or isinstance(error, requests.exceptions.ConnectTimeout):
+                return backoff
+            return None
+
+        if response.status_code == 429:
+            retry_after = _retry_after_seconds(response)
+            return min(API_RETRY_AFTER_MAX, retry_after if retry_after is not None else backoff)
+        if response.status_code in RETRY_STATUS_CODES and idempotent:
+            return backoff
+        return None
+
+
+_http_clients = {}
+_http_clients_lock = threading.Lock()
+
+def get_gologin_http_client(api_token):
+    """Get or create GoLoginHttpClient dùng chung cho api_token"""
+    with _http_clients_lock:
+        client = _http_clients.get(api_token)
+        if client is None:
+            client = _http_clients[api_token] = GoLoginHttpClient(api_token)
+        return client
@@ -0,0 +1,156 @@
+# models/gologin_launcher.py
+import contextlib
+import os
+import threading
+import time
+
+from gologin import GoLogin
+from gologin import getRandomPort
+
+# Spawn Orbita tốn CPU → mặc định theo số core; download/extract profile chủ yếu là I/O
+LAUNCH_CONCURRENCY = max(2, (os.cpu_count() or 4) // 2)
+PREPARE_CONCURRENCY = 8
+PORT_ALLOCATE_ATTEMPTS = 20
+
+
+class GoLoginLauncher:
+    """
+    Registry GoLogin instance theo profile_id + pipeline khởi động profile
+
+    Thay cho self.gl dùng chung trên singleton GoLoginAPI: mỗi start có instance riêng,
+    được đăng ký vào self.instances khi browser đã lên.
+
+    Pipeline cho mỗi profile (các profile chồng lấp nhau giữa các stage):
+    1. Port: cấp port chưa bị profile khác giữ (getRandomPort không biết port đã cấp)
+    2. Prepare: download + extract profile (gl.createStartup) - tối đa PREPARE_CONCURRENCY
+    3. Spawn: chạy browser (gl.spawnBrowser) - tối đa launch_concurrency
+    SDK không tách được createStartup/spawnBrowser → gl.start() chạy trọn trong stage 3.
+    spawn_lock (GUI pipeline) chỉ giữ trong stage 3 - prepare của profile khác vẫn chạy song song.
+    """
+
+    def __init__(self, launch_concurrency=LAUNCH_CONCURRENCY, prepare_concurrency=PREPARE_CONCURRENCY):
+        self._lock = threading.Lock()
+        self.instances = {}    # {profile_id: GoLogin_instance}
+        self._ports = {}       # {profile_id: port}
+        self._prepare_semaphore = threading.BoundedSemaphore(prepare_concurrency)
+        self._launch_semaphore = threading.BoundedSemaphore(launch_concurrency)
+        self.launch_concurrency = launch_concurrency
+        self.stats = {'launched': 0, 'failed': 0, 'prepare_seconds': 0.0, 'spawn_seconds': 0.0, 'wait_seconds': 0.0}
+
+    # ========== CONFIG ==========
+
+    def set_launch_concurrency(self, limit):
+        """Đổi số browser spawn đồng thời; start đang chạy giữ semaphore cũ tới khi xong"""
+        limit = max(1, int(limit))
+        with self._lock:
+            if limit != self.launch_concurrency:
+                self._launch_semaphore = threading.BoundedSemaphore(limit)
+                self.launch_concurrency = limit
+                print(f"[GOLOGIN_LAUNCHER] Max concurrent launches: {limit}")
+
+    # ========== LAUNCH ==========
+
+    def allocate_port(self, profile_id):
+        with self._lock:
+            reserved = set(self._ports.values())
+        port = getRandomPort()
+        for _ in range(PORT_ALLOCATE_ATTEMPTS):
+            if port not in reserved:
+                break
+            port = getRandomPort()
+        with self._lock:
+            self._ports[profile_id] = port
+        return port
+
+    def launch(self, profile_id, config, log_prefix="[GOLOGIN]", spawn_lock=None):
+        """
+        Tạo GoLogin instance riêng cho profile và chạy browser qua pipeline
+
+        Args:
+            config: dict cấu hình GoLogin (token, profile_id, extra_params, ...) - port được cấp ở đây
+            spawn_lock: lock giữ quanh bước spawn browser (thao tác cửa sổ dùng chung với runner)
+
+        Returns:
+            str: debugger address (falsy nếu SDK không trả về)
+        """
+        config = dict(config)
+        config["port"] = self.allocate_port(profile_id)
+        try:
+            gl = GoLogin(config)
+            split = self._can_split_start(gl)
+
+            if split:
+                started = time.perf_counter()
+                with self._prepare_semaphore:
+                    waited = time.perf_counter() - started
+                    gl.createStartup()
+                prepare_seconds = time.perf_counter() - started - waited
+            else:
+                waited = prepare_seconds = 0.0
+
+            launch_semaphore = self._launch_semaphore
+            started = time.perf_counter()
+            with launch_semaphore, spawn_lock or contextlib.nullcontext():
+                spawn_started = time.perf_counter()
+                waited += spawn_started - started
+                debugger_address = gl.spawnBrowser() if split else gl.start()
+            spawn_seconds = time.perf_counter() - spawn_started
+
+            with self._lock:
+                self.stats['prepare_seconds'] += prepare_seconds
+                self.stats['spawn_seconds'] += spawn_seconds
+                self.stats['wait_seconds'] += waited
+                if debugger_address:
+                    self.instances[profile_id] = gl
+                    self.stats['launched'] += 1
+                else:
+                    self.stats['failed'] += 1
+            print(f"{log_prefix} Launch pipeline: wait {waited:.1f}s, prepare {prepare_seconds:.1f}s, spawn {spawn_seconds:.1f}s")
+
+            if not debugger_address:
+                self._release_port(profile_id)
+            return debugger_address
+
+        except BaseException:
+            with self._lock:
+                self.stats['failed'] += 1
+            self._release_port(profile_id)
+            raise
+
+    @staticmethod
+    def _can_split_start(gl):
+        """start() của SDK = createStartup() + spawnBrowser() khi spawn_browser bật"""
+        return (
+            getattr(gl, "spawn_browser", True) is True
+            and callable(getattr(gl, "createStartup", None))
+            and callable(getattr(gl, "spawnBrowser", None))
+        )
+
+    # ========== REGISTRY ==========
+
+    def get(self, profile_id):
+        with self._lock:
+            return self.instances.get(profile_id)
+
+    def release(self, profile_id):
+        """Bỏ instance khỏi registry + trả port (sau khi stop)"""
+        with self._lock:
+            self.instances.pop(profile_id, None)
+            self._ports.pop(profile_id, None)
+
+    def _release_port(self, profile_id):
+        with self._lock:
+            if profile_id not in self.instances:
+                self._ports.pop(profile_id, None)
+
+
+_launchers = {}
+_launchers_lock = threading.Lock()
+
+def get_gologin_launcher(api_token):
+    """Get or create GoLoginLauncher dùng chung cho api_token"""
+    with _launchers_lock:
+        launcher = _launchers.get(api_token)
+        if launcher is None:
+            launcher = _launchers[api_token] = GoLoginLauncher()
+        return launcher
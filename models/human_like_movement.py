@@ -1,15 +1,42 @@
 ﻿import math
 import random
+import threading
 import time
+
+import numpy as np
 import pyautogui
 
+# Path = ndarray (n, 3): cột x, y, dt (giây chờ sau khi tới điểm) - unpack được như tuple cũ
+TRAJECTORY_BANK_SIZE = 8          # Số path chuẩn hóa giữ sẵn cho mỗi style
+PLAYBACK_SKIP_BEHIND = 0.05       # Trễ lịch hơn ngần này (giây) → bỏ qua điểm trung gian
+
+_rng = np.random.default_rng()
+
+
+def _uniform(low, high, size=None):
+    return _rng.uniform(low, high, size)
+
+
+def _randint(low, high):
+    """Giống random.randint (gồm cả high)"""
+    return int(_rng.integers(low, high + 1))
+
+
+def _path(x, y, dt):
+    return np.column_stack((x, y, dt)).astype(np.float64, copy=False)
+
+
+def _lerp(p0, p1, t):
+    """Các điểm trên đoạn p0 → p1 tại mảng t"""
+    return p0[0] + t * (p1[0] - p0[0]), p0[1] + t * (p1[1] - p0[1])
+
 
 class HumanLikeMovement:
     """Tạo chuyển động chuột tự nhiên như người với 10 styles khác nhau"""
 
     @staticmethod
     def _bezier_curve(t, p0, p1, p2, p3):
-        """Tính điểm trên đường cong Bezier bậc 3"""
+        """Tính điểm trên đường cong Bezier bậc 3 (t có thể là số hoặc mảng numpy)"""
         return (
             (1-t)**3 * p0 +
             3 * (1-t)**2 * t * p1 +
@@ -17,247 +44,247 @@ class HumanLikeMovement:
             t**3 * p3
         )
 
-    # ==================== 10 STYLES ====================
-    
+    # ==================== 10 STYLES (VECTORIZED) ====================
+    # Mỗi style sinh toàn bộ path (n, 3) trong một lần, cùng khoảng random với bản cũ
+
     @staticmethod
     def _bezier_path(start, end):
         """Style 1: Đường cong Bezier mượt mà"""
-        path = []
-        distance = math.sqrt((end[0] - start[0])**2 + (end[1] - start[1])**2)
-        steps = random.randint(15, 25)
-        
-        offset_x = random.uniform(-0.3, 0.3) * distance
-        offset_y = random.uniform(-0.3, 0.3) * distance
-        
-        p0 = start
-        p3 = end
+        distance = math.hypot(end[0] - start[0], end[1] - start[1])
+        steps = _randint(15, 25)
+
+        offset_x = _uniform(-0.3, 0.3) * distance
+        offset_y = _uniform(-0.3, 0.3) * distance
+
         p1 = (start[0] + distance/3 + offset_x, start[1] + offset_y)
         p2 = (end[0] - distance/3 + offset_x, end[1] + offset_y)
-        
-        for i in range(steps + 1):
-            t = i / steps
-            x = HumanLikeMovement._bezier_curve(t, p0[0], p1[0], p2[0], p3[0])
-            y = HumanLikeMovement._bezier_curve(t, p0[1], p1[1], p2[1], p3[1])
-            
-            if i < steps * 0.2 or i > steps * 0.8:
-                pause = random.uniform(0.001, 0.003)
-            else:
-                pause = random.uniform(0.0005, 0.002)
-            
-            path.append((x, y, pause))
-        
-        return path
+
+        i = np.arange(steps + 1)
+        t = i / steps
+        x = HumanLikeMovement._bezier_curve(t, start[0], p1[0], p2[0], end[0])
+        y = HumanLikeMovement._bezier_curve(t, start[1], p1[1], p2[1], end[1])
+
+        # Chậm ở đầu và cuối đường
+        edge = (i < steps * 0.2) | (i > steps * 0.8)
+        dt = np.where(edge, _uniform(0.001, 0.003, steps + 1), _uniform(0.0005, 0.002, steps + 1))
+        return _path(x, y, dt)
 
     @staticmethod
     def _fast_line_path(start, end):
         """Style 2: Đường thẳng nhanh với nhiễu nhẹ"""
-        path = []
-        distance = math.sqrt((end[0] - start[0])**2 + (end[1] - start[1])**2)
-        steps = random.randint(8, 15)
-        
-        for i in range(steps + 1):
-            t = i / steps
-            noise_x = random.uniform(-2, 2)
-            noise_y = random.uniform(-2, 2)
-            x = start[0] + t * (end[0] - start[0]) + noise_x
-            y = start[1] + t * (end[1] - start[1]) + noise_y
-            pause = random.uniform(0.0005, 0.002)
-            path.append((x, y, pause))
-        
-        return path
+        steps = _randint(8, 15)
+        t = np.arange(steps + 1) / steps
+        x, y = _lerp(start, end, t)
+        x = x + _uniform(-2, 2, steps + 1)
+        y = y + _uniform(-2, 2, steps + 1)
+        return _path(x, y, _uniform(0.0005, 0.002, steps + 1))
 
     @staticmethod
     def _zigzag_path(start, end):
         """Style 3: Đi zigzag từ A đến B"""
-        path = []
-        segments = random.randint(4, 7)
-        amplitude = random.uniform(20, 50)
-        
-        dx = (end[0] - start[0]) / segments
-        dy = (end[1] - start[1]) / segments
-        
-        for i in range(segments + 1):
-            if i == 0:
-                x, y = start
-            elif i == segments:
-                x, y = end
-            else:
-                x = start[0] + dx * i
-                offset = amplitude if i % 2 == 0 else -amplitude
-                y = start[1] + dy * i + offset
-            
-            pause = random.uniform(0.005, 0.015)
-            path.append((x, y, pause))
-        
-        return path
+        segments = _randint(4, 7)
+        amplitude = _uniform(20, 50)
+
+        i = np.arange(segments + 1)
+        x, y = _lerp(start, end, i / segments)
+        y = y + np.where(i % 2 == 0, amplitude, -amplitude)
+        x[0], y[0] = start
+        x[-1], y[-1] = end
+        return _path(x, y, _uniform(0.005, 0.015, segments + 1))
 
     @staticmethod
     def _circle_arc_path(start, end):
         """Style 4: Đi theo vòng cung hoặc vòng tròn"""
-        path = []
         mid = ((start[0] + end[0])/2, (start[1] + end[1])/2)
-        radius = random.uniform(30, 80)
-        points = random.randint(10, 16)
-        angle_start = random.uniform(0, math.pi * 2)
-        
-        path.append((start[0], start[1], random.uniform(0.002, 0.005)))
-        
-        for i in range(1, points):
-            angle = angle_start + i * (2 * math.pi / points)
-            x = mid[0] + radius * math.cos(angle)
-            y = mid[1] + radius * math.sin(angle)
-            pause = random.uniform(0.003, 0.008)
-            path.append((x, y, pause))
-        
-        path.append((end[0], end[1], random.uniform(0.002, 0.005)))
-        return path
+        radius = _uniform(30, 80)
+        points = _randint(10, 16)
+        angle_start = _uniform(0, math.pi * 2)
+
+        angle = angle_start + np.arange(1, points) * (2 * math.pi / points)
+        x = np.concatenate(([start[0]], mid[0] + radius * np.cos(angle), [end[0]]))
+        y = np.concatenate(([start[1]], mid[1] + radius * np.sin(angle), [end[1]]))
+        dt = _uniform(0.003, 0.008, points + 1)
+        dt[[0, -1]] = _uniform(0.002, 0.005, 2)
+        return _path(x, y, dt)
 
     @staticmethod
     def _random_waypoints_path(start, end):
         """Style 5: Đi qua nhiều waypoint ngẫu nhiên"""
-        path = []
-        waypoints = random.randint(3, 6)
-        
-        path.append((start[0], start[1], random.uniform(0.001, 0.003)))
-        
-        for _ in range(waypoints):
-            x = random.uniform(min(start[0], end[0]) - 50, max(start[0], end[0]) + 50)
-            y = random.uniform(min(start[1], end[1]) - 50, max(start[1], end[1]) + 50)
-            pause = random.uniform(0.005, 0.02)
-            path.append((x, y, pause))
-        
-        path.append((end[0], end[1], random.uniform(0.001, 0.003)))
-        return path
+        waypoints = _randint(3, 6)
+
+        x = np.empty(waypoints + 2)
+        y = np.empty(waypoints + 2)
+        x[0], y[0] = start
+        x[-1], y[-1] = end
+        x[1:-1] = _uniform(min(start[0], end[0]) - 50, max(start[0], end[0]) + 50, waypoints)
+        y[1:-1] = _uniform(min(start[1], end[1]) - 50, max(start[1], end[1]) + 50, waypoints)
+
+        dt = _uniform(0.005, 0.02, waypoints + 2)
+        dt[[0, -1]] = _uniform(0.001, 0.003, 2)
+        return _path(x, y, dt)
 
     @staticmethod
     def _right_angle_path(start, end):
         """Style 6: Đi theo hình chữ L (góc vuông)"""
-        path = []
-        
         # Random chọn đi ngang trước hay dọc trước
-        if random.choice([True, False]):
-            # Ngang trước
+        if _rng.random() < 0.5:
             mid = (end[0], start[1])
         else:
-            # Dọc trước
             mid = (start[0], end[1])
-        
-        # Từ start đến mid
-        steps1 = random.randint(10, 15)
-        for i in range(steps1 + 1):
-            t = i / steps1
-            x = start[0] + t * (mid[0] - start[0])
-            y = start[1] + t * (mid[1] - start[1])
-            pause = random.uniform(0.002, 0.006)
-            path.append((x, y, pause))
-        
-        # Dừng tại góc
-        path.append((mid[0], mid[1], random.uniform(0.05, 0.15)))
-        
-        # Từ mid đến end
-        steps2 = random.randint(10, 15)
-        for i in range(1, steps2 + 1):
-            t = i / steps2
-            x = mid[0] + t * (end[0] - mid[0])
-            y = mid[1] + t * (end[1] - mid[1])
-            pause = random.uniform(0.002, 0.006)
-            path.append((x, y, pause))
-        
-        return path
+
+        steps1 = _randint(10, 15)
+        steps2 = _randint(10, 15)
+        x1, y1 = _lerp(start, mid, np.arange(steps1 + 1) / steps1)
+        x2, y2 = _lerp(mid, end, np.arange(1, steps2 + 1) / steps2)
+
+        # Start → mid, dừng tại góc, mid → end
+        x = np.concatenate((x1, [mid[0]], x2))
+        y = np.concatenate((y1, [mid[1]], y2))
+        dt = _uniform(0.002, 0.006, len(x))
+        dt[steps1 + 1] = _uniform(0.05, 0.15)
+        return _path(x, y, dt)
 
     @staticmethod
     def _square_around_path(start, end):
         """Style 7: Đi lệch ra ngoài tạo hình vuông rồi về B"""
-        path = []
-        
-        offset = random.uniform(40, 80)
-        corner1 = (start[0] + offset, start[1])
-        corner2 = (start[0] + offset, end[1])
-        
-        waypoints = [start, corner1, corner2, end]
-        
-        for i, point in enumerate(waypoints):
-            if i == 0:
-                path.append((point[0], point[1], random.uniform(0.001, 0.003)))
-            else:
-                prev = waypoints[i-1]
-                steps = random.randint(8, 12)
-                for j in range(1, steps + 1):
-                    t = j / steps
-                    x = prev[0] + t * (point[0] - prev[0])
-                    y = prev[1] + t * (point[1] - prev[1])
-                    pause = random.uniform(0.003, 0.008)
-                    path.append((x, y, pause))
-        
-        return path
+        offset = _uniform(40, 80)
+        waypoints = [start, (start[0] + offset, start[1]), (start[0] + offset, end[1]), end]
+
+        xs = [np.array([float(start[0])])]
+        ys = [np.array([float(start[1])])]
+        for prev, point in zip(waypoints, waypoints[1:]):
+            steps = _randint(8, 12)
+            x, y = _lerp(prev, point, np.arange(1, steps + 1) / steps)
+            xs.append(x)
+            ys.append(y)
+
+        x = np.concatenate(xs)
+        y = np.concatenate(ys)
+        dt = _uniform(0.003, 0.008, len(x))
+        dt[0] = _uniform(0.001, 0.003)
+        return _path(x, y, dt)
 
     @staticmethod
     def _spiral_in_path(start, end):
         """Style 8: Chuyển động xoắn ốc hẹp dần về điểm cuối"""
-        path = []
         mid = ((start[0] + end[0])/2, (start[1] + end[1])/2)
-        
-        turns = random.uniform(1.5, 3)
-        points = random.randint(20, 30)
-        max_radius = math.sqrt((end[0] - start[0])**2 + (end[1] - start[1])**2) / 2
-        
-        for i in range(points + 1):
-            t = i / points
-            angle = t * turns * 2 * math.pi
-            radius = max_radius * (1 - t)
-            
-            x = mid[0] + radius * math.cos(angle) + t * (end[0] - mid[0])
-            y = mid[1] + radius * math.sin(angle) + t * (end[1] - mid[1])
-            pause = random.uniform(0.002, 0.006)
-            path.append((x, y, pause))
-        
-        return path
+
+        turns = _uniform(1.5, 3)
+        points = _randint(20, 30)
+        max_radius = math.hypot(end[0] - start[0], end[1] - start[1]) / 2
+
+        t = np.arange(points + 1) / points
+        angle = t * turns * 2 * math.pi
+        radius = max_radius * (1 - t)
+        x = mid[0] + radius * np.cos(angle) + t * (end[0] - mid[0])
+        y = mid[1] + radius * np.sin(angle) + t * (end[1] - mid[1])
+        return _path(x, y, _uniform(0.002, 0.006, points + 1))
 
     @staticmethod
     def _step_stutter_path(start, end):
         """Style 9: Di chuyển từng đoạn ngắn, dừng lại, lặp lại (giống lag)"""
-        path = []
-        segments = random.randint(5, 9)
-        
-        for i in range(segments + 1):
-            t = i / segments
-            x = start[0] + t * (end[0] - start[0])
-            y = start[1] + t * (end[1] - start[1])
-            
-            # Move nhanh đến điểm
-            path.append((x, y, random.uniform(0.001, 0.003)))
-            
-            # Dừng lại lâu (stutter)
-            if i < segments:
-                path.append((x, y, random.uniform(0.1, 0.3)))
-        
-        return path
+        segments = _randint(5, 9)
+        x, y = _lerp(start, end, np.arange(segments + 1) / segments)
+
+        # Mỗi điểm: move nhanh đến điểm rồi dừng lâu (stutter), trừ điểm cuối
+        x = np.repeat(x, 2)[:-1]
+        y = np.repeat(y, 2)[:-1]
+        dt = np.empty(len(x))
+        dt[0::2] = _uniform(0.001, 0.003, segments + 1)
+        dt[1::2] = _uniform(0.1, 0.3, segments)
+        return _path(x, y, dt)
 
     @staticmethod
     def _multi_pause_path(start, end):
         """Style 10: Đi thẳng/curve nhưng dừng ngẫu nhiên nhiều lần"""
-        path = []
-        steps = random.randint(15, 25)
-        pause_points = random.sample(range(1, steps), random.randint(3, 5))
-        
-        for i in range(steps + 1):
-            t = i / steps
-            # Thêm chút curve
-            curve_offset = math.sin(t * math.pi) * random.uniform(10, 30)
-            x = start[0] + t * (end[0] - start[0]) + curve_offset
-            y = start[1] + t * (end[1] - start[1])
-            
-            if i in pause_points:
-                pause = random.uniform(0.2, 0.5)
-            else:
-                pause = random.uniform(0.001, 0.005)
-            
-            path.append((x, y, pause))
-        
-        return path
+        steps = _randint(15, 25)
+        pause_points = _rng.choice(np.arange(1, steps), size=_randint(3, 5), replace=False)
+
+        t = np.arange(steps + 1) / steps
+        x, y = _lerp(start, end, t)
+        # Thêm chút curve
+        x = x + np.sin(t * math.pi) * _uniform(10, 30, steps + 1)
+
+        dt = _uniform(0.001, 0.005, steps + 1)
+        dt[pause_points] = _uniform(0.2, 0.5, len(pause_points))
+        return _path(x, y, dt)
+
+    # ==================== PLAYBACK ====================
+
+    # Diagnostics của lần play_path gần nhất
+    last_playback = {}
+
+    @staticmethod
+    def play_path(path, step_interval=None):
+        """
+        Phát path theo lịch tuyệt đối (drift-corrected)
+
+        Điểm k phải xong lúc t0 + Σ(dt + step_interval) của các điểm 0..k → thời gian moveTo
+        và độ trễ của sleep không cộng dồn. Đang trễ quá hạn của một điểm trung gian thì
+        bỏ qua điểm đó; điểm cuối luôn được đi tới.
+
+        Args:
+            path: ndarray (n, 3) hoặc list (x, y, dt)
+            step_interval: Thời gian cố định thêm cho mỗi điểm; None = pyautogui.PAUSE
+                (moveTo trước đây tự sleep PAUSE sau mỗi bước, giữ nguyên nhịp độ đó
+                nhưng do scheduler quản lý thay vì pyautogui)
+        """
+        path = np.asarray(path, dtype=np.float64)
+        if len(path) == 0:
+            return True
+        if step_interval is None:
+            step_interval = pyautogui.PAUSE
+
+        start = time.perf_counter()
+        deadlines = (start + np.cumsum(path[:, 2] + step_interval)).tolist()
+        points = path[:, :2].tolist()
+        last = len(points) - 1
+        skipped = 0
+
+        for k, (x, y) in enumerate(points):
+            if k < last and time.perf_counter() >= deadlines[k]:
+                skipped += 1
+                continue
+            pyautogui.moveTo(x, y, _pause=False)
+            remaining = deadlines[k] - time.perf_counter()
+            if remaining > 0:
+                time.sleep(remaining)
+
+        HumanLikeMovement.last_playback = {
+            'points': len(points),
+            'skipped': skipped,
+            'planned_s': round(deadlines[-1] - start, 4),
+            'actual_s': round(time.perf_counter() - start, 4),
+        }
+        return True
 
     # ==================== MAIN API ====================
 
+    # (style, trọng số) - cùng phân phối với danh sách random.choice cũ
+    STYLE_WEIGHTS = (
+        ("_bezier_path", 1),
+        ("_fast_line_path", 1),
+        ("_zigzag_path", 1),
+        ("_circle_arc_path", 1),
+        ("_right_angle_path", 1),
+        ("_square_around_path", 1),
+        ("_spiral_in_path", 1),
+        ("_random_waypoints_path", 10),
+        ("_step_stutter_path", 9),
+        ("_multi_pause_path", 12),
+    )
+
+    @staticmethod
+    def generate_path(start_x, start_y, end_x, end_y):
+        """Random 1 style, trả về path (n, 3); style bất biến theo tỉ lệ lấy từ trajectory bank"""
+        names = [name for name, _ in HumanLikeMovement.STYLE_WEIGHTS]
+        weights = [weight for _, weight in HumanLikeMovement.STYLE_WEIGHTS]
+        style = random.choices(names, weights=weights)[0]
+
+        if style in BANKED_STYLES and (start_x, start_y) != (end_x, end_y):
+            return get_trajectory_bank().take(style, (start_x, start_y), (end_x, end_y))
+        return getattr(HumanLikeMovement, style)((start_x, start_y), (end_x, end_y))
+
     @staticmethod
     def move_cursor_humanlike(start_x, start_y, end_x, end_y, fast = False):
         """
@@ -266,58 +293,12 @@ class HumanLikeMovement:
         """
         if fast:
             return HumanLikeMovement.move_cursor_fast(start_x, start_y, end_x, end_y)
-        
-        styles = [
-            HumanLikeMovement._bezier_path,
-            HumanLikeMovement._fast_line_path,
-            HumanLikeMovement._zigzag_path,
-            HumanLikeMovement._circle_arc_path,            
-            HumanLikeMovement._right_angle_path,
-            HumanLikeMovement._square_around_path,
-            HumanLikeMovement._spiral_in_path,
-            HumanLikeMovement._random_waypoints_path,
-            HumanLikeMovement._random_waypoints_path,
-            HumanLikeMovement._random_waypoints_path,
-            HumanLikeMovement._random_waypoints_path,
-            HumanLikeMovement._random_waypoints_path,
-            HumanLikeMovement._random_waypoints_path,
-            HumanLikeMovement._random_waypoints_path,
-            HumanLikeMovement._random_waypoints_path,
-            HumanLikeMovement._random_waypoints_path,
-            HumanLikeMovement._random_waypoints_path,            
-            HumanLikeMovement._step_stutter_path,
-            HumanLikeMovement._step_stutter_path,
-            HumanLikeMovement._step_stutter_path,
-            HumanLikeMovement._step_stutter_path,
-            HumanLikeMovement._step_stutter_path,
-            HumanLikeMovement._step_stutter_path,
-            HumanLikeMovement._step_stutter_path,
-            HumanLikeMovement._step_stutter_path,
-            HumanLikeMovement._step_stutter_path,
-            HumanLikeMovement._multi_pause_path,
-            HumanLikeMovement._multi_pause_path,
-            HumanLikeMovement._multi_pause_path,
-            HumanLikeMovement._multi_pause_path,
-            HumanLikeMovement._multi_pause_path,
-            HumanLikeMovement._multi_pause_path,
-            HumanLikeMovement._multi_pause_path,
-            HumanLikeMovement._multi_pause_path,
-            HumanLikeMovement._multi_pause_path,
-            HumanLikeMovement._multi_pause_path,
-            HumanLikeMovement._multi_pause_path,
-            HumanLikeMovement._multi_pause_path,
-        ]
-        
-        style_func = random.choice(styles)
-        path = style_func((start_x, start_y), (end_x, end_y))
-        
-        for x, y, pause in path:
-            pyautogui.moveTo(x, y)
-            time.sleep(pause)
+
+        path = HumanLikeMovement.generate_path(start_x, start_y, end_x, end_y)
+        return HumanLikeMovement.play_path(path)
 
     # ==================== GIỮ NGUYÊN CÁC HÀM CŨ (BACKWARD COMPATIBLE) ====================
     
-    @staticmethod
     # def move_cursor(start_x, start_y, end_x, end_y, speed_factor=1.0, stop_check=None):
     #     """Di chuyển chuột theo đường cong tự nhiên với tốc độ ngẫu nhiên (API cũ)"""
     #     # Tính toán các điểm kiểm soát cho đường cong
@@ -372,27 +353,68 @@ class HumanLikeMovement:
     @staticmethod
     def move_cursor_fast(start_x, start_y, end_x, end_y):
         """Phương thức di chuyển siêu nhanh với ít bước và delay cực thấp"""
-        distance = math.sqrt((end_x - start_x)**2 + (end_y - start_y)**2)
-        
+        distance = math.hypot(end_x - start_x, end_y - start_y)
+
         # Số bước rất thấp cho di chuyển nhanh
         steps = min(max(int(distance/20), 2), 10)
-        
-        # Di chuyển theo đường thẳng với chút nhiễu
-        for i in range(steps + 1):        
-            
-            t = i / steps
-            
-            # Thêm chút nhiễu nhỏ để trông tự nhiên nhưng vẫn nhanh
-            rand_x = random.uniform(-1, 1)
-            rand_y = random.uniform(-1, 1)
-            
-            x = start_x + t * (end_x - start_x) + rand_x
-            y = start_y + t * (end_y - start_y) + rand_y
-            
-            pyautogui.moveTo(x, y)
-            
-            # Chỉ delay ở bước đầu và cuối để trông tự nhiên
-            if i == 0 or i == steps:
-                time.sleep(0.001)
-        
-        return True
+
+        # Đường thẳng với chút nhiễu nhỏ để trông tự nhiên nhưng vẫn nhanh
+        x, y = _lerp((start_x, start_y), (end_x, end_y), np.arange(steps + 1) / steps)
+        x = x + _uniform(-1, 1, steps + 1)
+        y = y + _uniform(-1, 1, steps + 1)
+
+        # Chỉ delay ở bước đầu và cuối
+        dt = np.zeros(steps + 1)
+        dt[[0, -1]] = 0.001
+        return HumanLikeMovement.play_path(_path(x, y, dt))
+
+
+# ==================== TRAJECTORY BANK ====================
+
+# Style chỉ phụ thuộc vectơ start→end → sinh sẵn trên đoạn chuẩn (0,0)→(1,0) rồi xoay về hướng thật.
+# Bezier (offset control point theo trục x màn hình) và spiral (tâm lệch theo trục màn hình)
+# không bất biến khi xoay → luôn sinh trực tiếp.
+BANKED_STYLES = ("_step_stutter_path",)
+
+
+class TrajectoryBank:
+    """
+    Kho path chuẩn hóa (start=(0,0), end=(1,0)) sinh sẵn cho BANKED_STYLES
+
+    take() biến đổi đồng dạng (xoay + co giãn + tịnh tiến, một phép nhân số phức)
+    path chuẩn về cặp start/end thật, rồi thay slot vừa dùng bằng path mới để
+    không lặp lại cùng một đường.
+    """
+
+    def __init__(self, size=TRAJECTORY_BANK_SIZE):
+        self.size = size
+        self._paths = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _generate(style):
+        return getattr(HumanLikeMovement, style)((0.0, 0.0), (1.0, 0.0))
+
+    def take(self, style, start, end):
+        with self._lock:
+            paths = self._paths.get(style)
+            if paths is None:
+                paths = self._paths[style] = [self._generate(style) for _ in range(self.size)]
+            slot = int(_rng.integers(len(paths)))
+            normalized = paths[slot]
+            paths[slot] = self._generate(style)
+
+        origin = complex(start[0], start[1])
+        span = complex(end[0] - start[0], end[1] - start[1])
+        points = origin + span * (normalized[:, 0] + 1j * normalized[:, 1])
+        return _path(points.real, points.imag, normalized[:, 2])
+
+
+_trajectory_bank = None
+
+def get_trajectory_bank():
+    """Get or create singleton TrajectoryBank"""
+    global _trajectory_bank
+    if _trajectory_bank is None:
+        _trajectory_bank = TrajectoryBank()
+    return _trajectory_bank
@@ -4,74 +4,486 @@ import pyautogui
 import random
 import time
 import os
-from PIL import ImageGrab
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image, ImageGrab
+
+
+# Giới hạn bộ nhớ cho cache template (bytes) và thời gian sống của frame cache (giây)
+TEMPLATE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+FRAME_CACHE_TTL = 0.25
+
+# Các engine tìm kiếm của ImageSearcher
+SEARCH_MODE_COLOR = "color"            # matchTemplate 3 kênh full-res (mặc định, như cũ)
+SEARCH_MODE_GRAY = "gray"              # 1 kênh xám: ~3 lần ít phép tính hơn
+SEARCH_MODE_PYRAMID = "pyramid"        # xám, tìm thô trên ảnh thu nhỏ rồi tinh chỉnh quanh ứng viên
+SEARCH_MODE_MULTISCALE = "multiscale"  # xám, thử nhiều tỷ lệ template (DPI/zoom khác nhau)
+SEARCH_MODES = (SEARCH_MODE_COLOR, SEARCH_MODE_GRAY, SEARCH_MODE_PYRAMID, SEARCH_MODE_MULTISCALE)
+
+# Tham số pyramid
+PYRAMID_MAX_LEVELS = 2           # Thu nhỏ tối đa 4 lần
+PYRAMID_MIN_TEMPLATE_SIDE = 12   # Cạnh template ở tầng thô không nhỏ hơn (px)
+PYRAMID_COARSE_MARGIN = 0.15     # Ngưỡng tầng thô = accuracy - margin
+PYRAMID_MAX_CANDIDATES = 5       # Số đỉnh tối đa được tinh chỉnh ở full-res
+
+# Tỷ lệ template mặc định cho multiscale
+MULTISCALE_FACTORS = (0.8, 0.9, 1.0, 1.1, 1.25)
+
+# Batch search: số thread matchTemplate song song (OpenCV nhả GIL khi tính)
+BATCH_SEARCH_WORKERS = min(4, os.cpu_count() or 1)
+MAX_MATCHES_PER_TEMPLATE = 50    # Số kết quả tối đa mỗi template sau NMS
+MAX_NMS_CANDIDATES = 1000        # Chỉ giữ top-K điểm vượt ngưỡng trước khi NMS
+NMS_OVERLAP_THRESHOLD = 0.3      # IoU > ngưỡng → coi là cùng một đối tượng
+
+
+class TemplateCache:
+    """
+    Cache template dùng chung toàn process, key = (path, mtime, size)
+    
+    - Template chỉ được decode (cv2.imread + cvtColor) một lần cho mỗi phiên bản file
+    - File bị sửa → mtime đổi → tự load lại
+    - LRU eviction khi tổng dung lượng vượt max_bytes
+    Mảng trả về là read-only vì được dùng chung giữa các searcher.
+    """
+
+    def __init__(self, max_bytes=TEMPLATE_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> ndarray
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, image_path, grayscale=False):
+        """Trả về template RGB (hoặc xám nếu grayscale=True) dạng ndarray cho image_path"""
+        try:
+            stat = os.stat(image_path)
+        except OSError:
+            raise FileNotFoundError(f"Image file not found: {image_path}")
+
+        key = (os.path.abspath(image_path), stat.st_mtime_ns, stat.st_size, bool(grayscale))
+
+        with self._lock:
+            template = self._entries.get(key)
+            if template is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return template
+
+        # Decode ngoài lock để các thread khác không phải chờ
+        template = cv2.imread(image_path, cv2.IMREAD_COLOR)
+        if template is None:
+            raise ValueError(f"Could not load image: {image_path}")
+        if grayscale:
+            template = cv2.cvtColor(template, cv2.COLOR_BGR2GRAY)
+        else:
+            template = cv2.cvtColor(template, cv2.COLOR_BGR2RGB)
+        template.flags.writeable = False
+
+        with self._lock:
+            self.misses += 1
+            # Bỏ các phiên bản cũ của cùng file
+            for old_key in [k for k in self._entries if k[0] == key[0] and k[1:3] != key[1:3]]:
+                self._total_bytes -= self._entries.pop(old_key).nbytes
+            if key not in self._entries:
+                self._entries[key] = template
+                self._total_bytes += template.nbytes
+            self._evict()
+            return self._entries.get(key, template)
+
+    def _evict(self):
+        # Luôn giữ lại entry mới nhất dù nó lớn hơn max_bytes
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            _, evicted = self._entries.popitem(last=False)
+            self._total_bytes -= evicted.nbytes
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._total_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+
+class FrameCache:
+    """
+    Cache ảnh chụp toàn màn hình trong thời gian ngắn (ttl giây)
+    
+    Nhiều lần tìm hình/tìm text liên tiếp trong cùng chuỗi action dùng chung
+    một lần ImageGrab.grab() thay vì mỗi lần tự chụp. Region được cắt ra từ frame
+    toàn màn hình (numpy view, không copy).
+    Gọi invalidate() sau khi click/gõ phím để lần tìm tiếp theo chụp frame mới.
+    """
+
+    def __init__(self, ttl=FRAME_CACHE_TTL):
+        self.ttl = ttl
+        self._frame = None
+        self._captured_at = 0.0
+        self._lock = threading.Lock()
+
+    def get_frame(self):
+        """Trả về frame toàn màn hình (RGB ndarray), chụp lại nếu đã quá ttl"""
+        with self._lock:
+            now = time.monotonic()
+            if self._frame is None or now - self._captured_at > self.ttl:
+                frame = np.array(ImageGrab.grab())
+                frame.flags.writeable = False
+                self._frame = frame
+                self._captured_at = now
+            return self._frame
+
+    def grab_array(self, region=None):
+        """
+        Trả về ảnh màn hình dạng ndarray RGB, cắt theo region (x, y, width, height)
+        Region rỗng/không hợp lệ → toàn màn hình (giống hành vi cũ của ImageSearcher)
+        """
+        frame = self.get_frame()
+        if not region:
+            return frame
+        x, y, width, height = [int(float(v)) for v in region]
+        if width <= 0 or height <= 0:
+            return frame
+        return frame[max(y, 0):y + height, max(x, 0):x + width]
+
+    def grab_image(self, region=None):
+        """Giống grab_array nhưng trả về PIL Image (cho pytesseract)"""
+        return Image.fromarray(np.ascontiguousarray(self.grab_array(region)))
+
+    def invalidate(self):
+        with self._lock:
+            self._frame = None
+
+
+_template_cache = None
+_frame_cache = None
+_batch_executor = None
+_batch_executor_lock = threading.Lock()
+
+def get_template_cache():
+    """Get or create singleton TemplateCache"""
+    global _template_cache
+    if _template_cache is None:
+        _template_cache = TemplateCache()
+    return _template_cache
+
+def get_frame_cache():
+    """Get or create singleton FrameCache"""
+    global _frame_cache
+    if _frame_cache is None:
+        _frame_cache = FrameCache()
+    return _frame_cache
+
+def _get_batch_executor():
+    """Thread pool dùng chung cho search_batch"""
+    global _batch_executor
+    with _batch_executor_lock:
+        if _batch_executor is None:
+            _batch_executor = ThreadPoolExecutor(max_workers=BATCH_SEARCH_WORKERS, thread_name_prefix="image_search")
+        return _batch_executor
+
+
+def capture_region(region=None, use_frame_cache=True):
+    """Chụp vùng (x, y, width, height), trả về (ndarray RGB, offset_x, offset_y)"""
+    x = y = 0
+    width = height = 0
+    if region:
+        x, y, width, height = region
+        x, y, width, height = int(float(x)), int(float(y)), int(float(width)), int(float(height))
+    
+    # Region không hợp lệ → tìm toàn màn hình, không cộng offset
+    if width <= 0 or height <= 0:
+        if use_frame_cache:
+            return get_frame_cache().grab_array(), 0, 0
+        return np.array(ImageGrab.grab()), 0, 0
+    
+    # Frame cache chỉ chứa màn hình chính → tọa độ âm (màn hình phụ) chụp trực tiếp
+    if use_frame_cache and x >= 0 and y >= 0:
+        return get_frame_cache().grab_array((x, y, width, height)), x, y
+    return np.array(ImageGrab.grab(bbox=(x, y, x + width, y + height))), x, y
+
+
+def non_max_suppression(matches, overlap_threshold=NMS_OVERLAP_THRESHOLD, max_matches=MAX_MATCHES_PER_TEMPLATE):
+    """
+    Greedy NMS trên list (confidence, left, top, width, height)
+    Trả về list đã lọc, sắp xếp confidence giảm dần
+    """
+    kept = []
+    for match in sorted(matches, key=lambda m: m[0], reverse=True):
+        _, left, top, w, h = match
+        overlapped = False
+        for _, k_left, k_top, k_w, k_h in kept:
+            inter_w = min(left + w, k_left + k_w) - max(left, k_left)
+            inter_h = min(top + h, k_top + k_h) - max(top, k_top)
+            if inter_w <= 0 or inter_h <= 0:
+                continue
+            inter = inter_w * inter_h
+            union = w * h + k_w * k_h - inter
+            if inter / union > overlap_threshold:
+                overlapped = True
+                break
+        if not overlapped:
+            kept.append(match)
+            if len(kept) >= max_matches:
+                break
+    return kept
 
 
 class ImageSearcher:
     """Class thực hiện tìm kiếm hình ảnh trên màn hình"""
-    def __init__(self, image_path, region=None, accuracy=0.8):
+    def __init__(self, image_path, region=None, accuracy=0.8, use_frame_cache=True,
+                 search_mode=SEARCH_MODE_COLOR, scales=None):
         self.image_path = image_path
         self.region = region  # (x, y, width, height)
         self.accuracy = float(accuracy) / 100  # Chuyển đổi từ phần trăm (0-100) sang tỷ lệ (0-1)
+        self.use_frame_cache = use_frame_cache
         
-        # Đảm bảo file hình ảnh tồn tại
-        if not os.path.exists(image_path):
-            raise FileNotFoundError(f"Image file not found: {image_path}")
+        if search_mode not in SEARCH_MODES:
+            print(f"[IMAGE_SEARCH] Unknown search mode '{search_mode}', using '{SEARCH_MODE_COLOR}'")
+            search_mode = SEARCH_MODE_COLOR
+        self.search_mode = search_mode
+        self.scales = tuple(scales) if scales else MULTISCALE_FACTORS
         
-        # Đọc hình ảnh template
-        self.template = cv2.imread(image_path, cv2.IMREAD_COLOR)
-        
-        if self.template is None:
-            raise ValueError(f"Could not load image: {image_path}")
-            
-        # Chuyển về RGB để so sánh với screenshot
-        self.template = cv2.cvtColor(self.template, cv2.COLOR_BGR2RGB)
+        # Template lấy từ cache dùng chung (chỉ decode lần đầu hoặc khi file đổi)
+        # → FileNotFoundError / ValueError như trước nếu file không tồn tại / không đọc được
+        self.template = get_template_cache().get(image_path, grayscale=self.grayscale)
+    
+    @property
+    def grayscale(self):
+        """Mọi engine trừ color đều so khớp trên ảnh xám 1 kênh"""
+        return self.search_mode != SEARCH_MODE_COLOR
+    
+    def _capture(self):
+        """Chụp vùng tìm kiếm, trả về (ndarray RGB, offset_x, offset_y)"""
+        return capture_region(self.region, self.use_frame_cache)
     
     def search(self):
         """Tìm kiếm hình ảnh trên màn hình và trả về kết quả"""
         try:
-            # Chụp màn hình
-            if self.region:
-                x, y, width, height = self.region
-                x, y, width, height = int(float(x)), int(float(y)), int(float(width)), int(float(height))
-                
-                # Đảm bảo kích thước hợp lệ
-                if width <= 0 or height <= 0:
-                    screenshot = ImageGrab.grab()
-                else:
-                    screenshot = ImageGrab.grab(bbox=(x, y, x + width, y + height))
-            else:
-                screenshot = ImageGrab.grab()
-                
-            # Chuyển về numpy array
-            screenshot_np = np.array(screenshot)
+            # Chụp màn hình (dùng chung frame cache nếu bật)
+            screenshot_np, offset_x, offset_y = self._capture()
             
-            # Đảm bảo kích thước template phù hợp với screenshot
-            h, w = self.template.shape[:2]
-            screenshot_h, screenshot_w = screenshot_np.shape[:2]
-            
-            if h > screenshot_h or w > screenshot_w:
-                return False, None
-            
-            # Tìm template trong screenshot
-            result = cv2.matchTemplate(screenshot_np, self.template, cv2.TM_CCOEFF_NORMED)
-            
-            # Lấy vị trí và độ tin cậy cao nhất
-            min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(result)
-            
-            # Kiểm tra nếu kết quả tốt hơn hoặc bằng ngưỡng accuracy
-            if max_val >= self.accuracy:
-                # Tính toán vị trí trung tâm của template
-                center_x = max_loc[0] + w // 2
-                center_y = max_loc[1] + h // 2
-                
+            found, result = self.match(screenshot_np)
+            if found:
+                center_x, center_y, confidence = result
                 # Điều chỉnh tọa độ nếu sử dụng region
-                if self.region:
-                    center_x += x
-                    center_y += y
-                    
-                return True, (center_x, center_y, max_val)
+                return True, (center_x + offset_x, center_y + offset_y, confidence)
         except Exception as e:
             print(f"Error during image search: {e}")
             
-        return False, None
\ No newline at end of file
+        return False, None
+    
+    def match(self, screenshot_np):
+        """
+        Tìm template trong ảnh RGB đã có sẵn (không chụp màn hình)
+        
+        Returns:
+            tuple: (found, (center_x, center_y, confidence)) - tọa độ tương đối với screenshot_np
+        """
+        haystack = screenshot_np
+        if self.grayscale and haystack.ndim == 3:
+            haystack = cv2.cvtColor(haystack, cv2.COLOR_RGB2GRAY)
+        
+        if self.search_mode == SEARCH_MODE_PYRAMID:
+            best = self._match_pyramid(haystack)
+        elif self.search_mode == SEARCH_MODE_MULTISCALE:
+            best = self._match_multiscale(haystack)
+        else:
+            best = self._match_direct(haystack, self.template)
+        
+        # Kiểm tra nếu kết quả tốt hơn hoặc bằng ngưỡng accuracy
+        if best is not None and best[0] >= self.accuracy:
+            max_val, (left, top), (w, h) = best
+            # Tính toán vị trí trung tâm của template
+            return True, (left + w // 2, top + h // 2, max_val)
+        return False, None
+    
+    def find_all(self, screenshot_np, max_matches=MAX_MATCHES_PER_TEMPLATE):
+        """
+        Tìm MỌI vị trí khớp >= accuracy trong ảnh RGB đã có sẵn, đã lọc trùng bằng NMS
+        Pyramid dùng so khớp xám full-res (cần bản đồ điểm đầy đủ để lấy mọi đỉnh)
+        
+        Returns:
+            list: [(center_x, center_y, confidence), ...] sắp xếp confidence giảm dần,
+                  tọa độ tương đối với screenshot_np
+        """
+        haystack = screenshot_np
+        if self.grayscale and haystack.ndim == 3:
+            haystack = cv2.cvtColor(haystack, cv2.COLOR_RGB2GRAY)
+        
+        if self.search_mode == SEARCH_MODE_MULTISCALE:
+            templates = [self._scaled_template(scale) for scale in self.scales]
+        else:
+            templates = [self.template]
+        
+        candidates = []
+        haystack_h, haystack_w = haystack.shape[:2]
+        for template in templates:
+            if template is None:
+                continue
+            h, w = template.shape[:2]
+            if h > haystack_h or w > haystack_w:
+                continue
+            result = cv2.matchTemplate(haystack, template, cv2.TM_CCOEFF_NORMED)
+            ys, xs = np.where(result >= self.accuracy)
+            if len(xs) > MAX_NMS_CANDIDATES:
+                scores = result[ys, xs]
+                top = np.argpartition(scores, -MAX_NMS_CANDIDATES)[-MAX_NMS_CANDIDATES:]
+                ys, xs = ys[top], xs[top]
+            for left, top in zip(xs.tolist(), ys.tolist()):
+                candidates.append((float(result[top, left]), left, top, w, h))
+        
+        kept = non_max_suppression(candidates, max_matches=max_matches)
+        return [(left + w // 2, top + h // 2, confidence) for confidence, left, top, w, h in kept]
+    
+    @staticmethod
+    def search_batch(image_paths, region=None, accuracy=80, search_mode=SEARCH_MODE_COLOR,
+                     use_frame_cache=True, max_matches=MAX_MATCHES_PER_TEMPLATE):
+        """
+        Tìm N template trên CÙNG một lần chụp, các matchTemplate chạy song song trên thread pool
+        
+        Args:
+            image_paths: list đường dẫn template, hoặc list (path, accuracy) để đặt ngưỡng riêng
+            region: (x, y, width, height) hoặc None cho toàn màn hình
+            accuracy: Ngưỡng mặc định (0-100)
+        
+        Returns:
+            dict: {image_path: [(center_x, center_y, confidence), ...]} - tọa độ màn hình,
+                  list rỗng nếu không tìm thấy hoặc template lỗi
+        """
+        searchers = {}
+        results = {}
+        for entry in image_paths:
+            path, path_accuracy = entry if isinstance(entry, (tuple, list)) else (entry, accuracy)
+            results[path] = []
+            try:
+                searchers[path] = ImageSearcher(path, region, path_accuracy,
+                                                use_frame_cache=use_frame_cache, search_mode=search_mode)
+            except (FileNotFoundError, ValueError) as e:
+                print(f"[IMAGE_SEARCH] Batch skip template: {e}")
+        
+        if not searchers:
+            return results
+        
+        try:
+            screenshot_np, offset_x, offset_y = capture_region(region, use_frame_cache)
+            
+            # Chuyển xám MỘT lần cho mọi template dùng engine xám
+            haystack = screenshot_np
+            if search_mode != SEARCH_MODE_COLOR and haystack.ndim == 3:
+                haystack = cv2.cvtColor(haystack, cv2.COLOR_RGB2GRAY)
+            
+            executor = _get_batch_executor()
+            futures = {
+                path: executor.submit(searcher.find_all, haystack, max_matches)
+                for path, searcher in searchers.items()
+            }
+            for path, future in futures.items():
+                results[path] = [
+                    (center_x + offset_x, center_y + offset_y, confidence)
+                    for center_x, center_y, confidence in future.result()
+                ]
+        except Exception as e:
+            print(f"Error during batch image search: {e}")
+        
+        return results
+    
+    def _scaled_template(self, scale):
+        """Template đã resize theo scale, None nếu quá nhỏ"""
+        if scale == 1.0:
+            return self.template
+        th, tw = self.template.shape[:2]
+        new_w, new_h = int(round(tw * scale)), int(round(th * scale))
+        if new_w < 4 or new_h < 4:
+            return None
+        interpolation = cv2.INTER_AREA if scale < 1.0 else cv2.INTER_LINEAR
+        return cv2.resize(self.template, (new_w, new_h), interpolation=interpolation)
+    
+    @staticmethod
+    def _match_direct(haystack, template):
+        """matchTemplate toàn ảnh, trả về (max_val, (x, y), (w, h)) hoặc None"""
+        h, w = template.shape[:2]
+        haystack_h, haystack_w = haystack.shape[:2]
+        
+        # Đảm bảo kích thước template phù hợp với screenshot
+        if h > haystack_h or w > haystack_w:
+            return None
+        
+        result = cv2.matchTemplate(haystack, template, cv2.TM_CCOEFF_NORMED)
+        _, max_val, _, max_loc = cv2.minMaxLoc(result)
+        return max_val, max_loc, (w, h)
+    
+    def _match_pyramid(self, haystack):
+        """
+        Coarse-to-fine: matchTemplate trên ảnh đã pyrDown, lấy tối đa
+        PYRAMID_MAX_CANDIDATES đỉnh vượt ngưỡng thô, rồi chỉ tinh chỉnh ở
+        full-res trong cửa sổ nhỏ quanh từng đỉnh
+        """
+        template = self.template
+        th, tw = template.shape[:2]
+        
+        levels = 0
+        while levels < PYRAMID_MAX_LEVELS and min(th, tw) >> (levels + 1) >= PYRAMID_MIN_TEMPLATE_SIDE:
+            levels += 1
+        if levels == 0:
+            # Template quá nhỏ, thu nhỏ thêm sẽ mất chi tiết
+            return self._match_direct(haystack, template)
+        
+        coarse_haystack = haystack
+        coarse_template = template
+        for _ in range(levels):
+            coarse_haystack = cv2.pyrDown(coarse_haystack)
+            coarse_template = cv2.pyrDown(coarse_template)
+        
+        if coarse_template.shape[0] > coarse_haystack.shape[0] or coarse_template.shape[1] > coarse_haystack.shape[1]:
+            return self._match_direct(haystack, template)
+        
+        coarse = cv2.matchTemplate(coarse_haystack, coarse_template, cv2.TM_CCOEFF_NORMED)
+        coarse_threshold = self.accuracy - PYRAMID_COARSE_MARGIN
+        
+        # Lấy các đỉnh tốt nhất, xóa vùng lân cận sau mỗi đỉnh (non-maximum suppression)
+        candidates = []
+        ctw, cth = coarse_template.shape[1], coarse_template.shape[0]
+        for _ in range(PYRAMID_MAX_CANDIDATES):
+            _, peak_val, _, peak_loc = cv2.minMaxLoc(coarse)
+            if peak_val < coarse_threshold:
+                break
+            candidates.append(peak_loc)
+            px, py = peak_loc
+            coarse[max(py - cth // 2, 0):py + cth // 2 + 1, max(px - ctw // 2, 0):px + ctw // 2 + 1] = -1.0
+        
+        factor = 1 << levels
+        pad = factor * 2
+        haystack_h, haystack_w = haystack.shape[:2]
+        best = None
+        for px, py in candidates:
+            x0 = max(px * factor - pad, 0)
+            y0 = max(py * factor - pad, 0)
+            x1 = min(px * factor + tw + pad, haystack_w)
+            y1 = min(py * factor + th + pad, haystack_h)
+            refined = self._match_direct(haystack[y0:y1, x0:x1], template)
+            if refined is None:
+                continue
+            max_val, (left, top), size = refined
+            if best is None or max_val > best[0]:
+                best = (max_val, (x0 + left, y0 + top), size)
+        return best
+    
+    def _match_multiscale(self, haystack):
+        """Thử template ở nhiều tỷ lệ (self.scales), trả về tỷ lệ khớp tốt nhất"""
+        best = None
+        for scale in self.scales:
+            scaled = self._scaled_template(scale)
+            if scaled is None:
+                continue
+            result = self._match_direct(haystack, scaled)
+            if result is not None and (best is None or result[0] > best[0]):
+                best = result
+        return best
@@ -0,0 +1,152 @@
+﻿# models/motion_detector.py
+import math
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+from PIL import ImageGrab
+
+COMPARE_MODE_PAIR = "pair"          # Hành vi gốc: 2 screenshot cách nhau compare_delay
+COMPARE_MODE_SAMPLING = "sampling"  # Lấy mẫu liên tục frame thu nhỏ, dừng sớm khi chắc chắn
+COMPARE_MODES = (COMPARE_MODE_PAIR, COMPARE_MODE_SAMPLING)
+
+SAMPLE_FPS = 8                 # Tốc độ lấy mẫu mặc định
+SAMPLE_WIDTH = 160             # Frame được thu nhỏ về chiều rộng này (giữ tỉ lệ)
+PIXEL_DIFF_THRESHOLD = 30      # Giống fallback absdiff: pixel lệch > 30 mới tính là đổi
+MOTION_EMA_ALPHA = 0.3         # Hệ số rolling motion score
+
+# Sequential probability ratio test trên chuỗi quan sát "có chuyển động / đứng yên"
+P_MOTION_WHEN_PLAYING = 0.8    # Video đang play: phần lớn mẫu có thay đổi so với frame tham chiếu
+P_MOTION_WHEN_PAUSED = 0.05    # Video pause: gần như không mẫu nào thay đổi (trừ nhiễu/cursor)
+SPRT_ERROR_RATE = 0.01         # Xác suất kết luận sai chấp nhận được (cả 2 phía)
+PAUSE_MIN_SECONDS = 1.0        # Chỉ kết luận pause sau tối thiểu ngần này (cảnh tĩnh khi play)
+
+
+class MotionSampler:
+    """
+    Phát hiện video play/pause bằng chuỗi frame nhỏ thay vì 2 screenshot + sleep cố định
+
+    Mỗi frame được so với frame tham chiếu chụp trước nó compare_delay giây (ring buffer);
+    khi chưa đủ compare_delay thì tham chiếu là frame đầu. Threshold được định nghĩa cho 2
+    ảnh cách nhau compare_delay, nên % pixel thay đổi đo trên khoảng lag ngắn hơn được quy
+    đổi tuyến tính về compare_delay → điểm similarity cùng thang với chế độ pair.
+    Điểm < threshold là một quan sát "có chuyển động". SPRT cộng dồn log-likelihood ratio
+    và dừng ngay khi vượt ngưỡng quyết định; max_seconds chỉ còn là giới hạn trên.
+    """
+
+    def __init__(self, region=None, threshold=95.0, max_seconds=2.0, fps=SAMPLE_FPS, sample_width=SAMPLE_WIDTH,
+                 compare_delay=None):
+        """
+        Args:
+            region: (x, y, width, height) hoặc None cho toàn màn hình
+            threshold: Ngưỡng similarity (0-100), >= ngưỡng → đứng yên
+            max_seconds: Thời gian lấy mẫu tối đa (giây)
+            fps: Số frame lấy mẫu mỗi giây
+            sample_width: Chiều rộng frame sau khi thu nhỏ
+            compare_delay: Khoảng cách giữa 2 ảnh mà threshold áp dụng (mặc định = max_seconds)
+        """
+        self.region = region
+        self.threshold = threshold
+        self.max_seconds = max(0.0, max_seconds)
+        self.fps = max(1.0, fps)
+        self.sample_width = sample_width
+        self.compare_delay = self.max_seconds if compare_delay is None else max(0.0, compare_delay)
+
+        # Diagnostics của lần run() gần nhất
+        self.motion_series = []   # [(elapsed_s, similarity_pct), ...] cho mỗi frame sau frame đầu (đã quy đổi)
+        self.motion_score = 0.0   # Rolling (EMA) % pixel thay đổi
+        self.decision_reason = ""
+
+        accept = math.log((1 - SPRT_ERROR_RATE) / SPRT_ERROR_RATE)
+        self._upper = accept        # LLR >= upper → playing
+        self._lower = -accept       # LLR <= lower → paused
+        self._llr_motion = math.log(P_MOTION_WHEN_PLAYING / P_MOTION_WHEN_PAUSED)
+        self._llr_still = math.log((1 - P_MOTION_WHEN_PLAYING) / (1 - P_MOTION_WHEN_PAUSED))
+
+    def grab(self):
+        """Chụp vùng, trả về frame xám đã thu nhỏ"""
+        if self.region:
+            x, y, width, height = self.region
+            screenshot = ImageGrab.grab(bbox=(x, y, x + width, y + height))
+        else:
+            screenshot = ImageGrab.grab()
+        gray = cv2.cvtColor(np.asarray(screenshot), cv2.COLOR_RGB2GRAY)
+        h, w = gray.shape[:2]
+        if w > self.sample_width:
+            new_h = max(1, int(round(h * self.sample_width / w)))
+            gray = cv2.resize(gray, (self.sample_width, new_h), interpolation=cv2.INTER_AREA)
+        return gray
+
+    @staticmethod
+    def similarity(gray1, gray2):
+        """% pixel không đổi giữa 2 frame xám cùng kích thước"""
+        diff = cv2.absdiff(gray1, gray2)
+        changed = np.count_nonzero(diff > PIXEL_DIFF_THRESHOLD)
+        return (1.0 - changed / diff.size) * 100
+
+    def scale_to_delay(self, similarity, lag):
+        """Quy đổi similarity đo trên khoảng lag về thang compare_delay (giả định thay đổi tăng tuyến tính)"""
+        if lag <= 0 or self.compare_delay <= 0:
+            return similarity
+        return max(0.0, 100 - (100 - similarity) * self.compare_delay / lag)
+
+    def run(self, should_stop=None):
+        """
+        Lấy mẫu cho tới khi chắc chắn play/pause hoặc hết max_seconds
+
+        Args:
+            should_stop: callable trả True để dừng sớm (ví dụ BaseAction.should_stop)
+
+        Returns:
+            tuple: (is_similar, similarity_score) - cùng ý nghĩa với compare_screenshots
+        """
+        self.motion_series = []
+        self.motion_score = 0.0
+        self.decision_reason = ""
+
+        interval = 1.0 / self.fps
+        start = time.perf_counter()
+        first = self.grab()
+        frames = deque([(0.0, first)])     # (elapsed, frame) - ring buffer tới compare_delay
+        similarity = 100.0
+        llr = 0.0
+        tick = 0
+
+        while True:
+            # Lịch tuyệt đối theo start → không trôi khi grab chậm
+            tick += 1
+            wait = start + tick * interval - time.perf_counter()
+            if wait > 0:
+                time.sleep(wait)
+            elapsed = time.perf_counter() - start
+
+            current = self.grab()
+            if current.shape != first.shape:
+                self.decision_reason = "shape changed"
+                return False, 0.0
+
+            # Tham chiếu = frame mới nhất đã cũ ít nhất compare_delay (chưa có → frame đầu)
+            while len(frames) > 1 and elapsed - frames[1][0] >= self.compare_delay:
+                frames.popleft()
+            reference_elapsed, reference = frames[0]
+            similarity = self.scale_to_delay(self.similarity(reference, current), elapsed - reference_elapsed)
+            frames.append((elapsed, current))
+
+            self.motion_series.append((round(elapsed, 3), round(similarity, 2)))
+            self.motion_score = (1 - MOTION_EMA_ALPHA) * self.motion_score + MOTION_EMA_ALPHA * (100 - similarity)
+            llr += self._llr_motion if similarity < self.threshold else self._llr_still
+
+            if llr >= self._upper:
+                self.decision_reason = f"motion certain after {len(self.motion_series)} frames"
+                return False, similarity
+            if llr <= self._lower and elapsed >= min(PAUSE_MIN_SECONDS, self.max_seconds):
+                self.decision_reason = f"still certain after {len(self.motion_series)} frames"
+                return True, similarity
+            if elapsed >= self.max_seconds or (should_stop and should_stop()):
+                break
+
+        # Không đủ chắc chắn trong thời gian cho phép → kết quả của lần so sánh cuối
+        # (max_seconds = compare_delay → chính là frame đầu / frame cuối như chế độ pair)
+        self.decision_reason = "upper bound reached, reference vs last frame"
+        return similarity >= self.threshold, similarity
@@ -0,0 +1,260 @@
+# models/process_index.py
+import re
+import threading
+import time
+
+import psutil
+
+PROCESS_INDEX_INTERVAL = 1.0     # Chu kỳ refresh nền (giây)
+PROCESS_INDEX_MAX_AGE = 2.0      # Lookup thấy index cũ hơn ngần này → refresh đồng bộ trước
+PROCESS_INDEX_IDLE = 60.0        # Không ai lookup trong ngần này → thread nền tự dừng
+BROWSER_PROCESS_NAMES = ("chrome", "orbita", "chromium")
+
+_PROFILE_FOLDER_RE = re.compile(r"gologin_([0-9a-z]+)")
+_USER_DATA_DIR_FLAG = "--user-data-dir="
+
+
+def profile_id_from_cmdline(args):
+    """
+    Profile id từ --user-data-dir: folder cuối của path, bỏ prefix gologin_ nếu có
+    - SDK: --user-data-dir=%TEMP%/gologin_{profile_id}
+    - GoLogin desktop: --user-data-dir=.../{profile_id}/
+    Không có flag → thử gologin_{id} ở bất kỳ đâu trong cmdline
+    """
+    for arg in args:
+        if arg.lower().startswith(_USER_DATA_DIR_FLAG):
+            path = arg[len(_USER_DATA_DIR_FLAG):].strip().strip('"').rstrip("\\/")
+            folder = re.split(r"[\\/]", path)[-1].lower()
+            if folder.startswith("gologin_"):
+                folder = folder[len("gologin_"):]
+            if folder:
+                return folder
+    match = _PROFILE_FOLDER_RE.search(" ".join(args).lower())
+    return match.group(1) if match else None
+
+
+class ProcessInfo:
+    """Thông tin process đã cache: cmdline/exe chỉ đọc MỘT lần khi process xuất hiện"""
+
+    __slots__ = (
+        "pid", "ppid", "name", "cmdline", "exe", "create_time", "profile_id", "cmdline_profile_id", "process",
+    )
+
+    def __init__(self, process, name, ppid, create_time, cmdline="", exe=""):
+        self.process = process
+        self.pid = process.pid
+        self.ppid = ppid
+        self.name = name
+        self.create_time = create_time
+        self.cmdline = cmdline      # ' '.join(cmdline).lower()
+        self.exe = exe              # exe path lowercase
+        self.profile_id = None      # Profile của nó hoặc của process cha
+        self.cmdline_profile_id = None  # Profile đọc từ --user-data-dir trong cmdline của chính nó
+
+    @property
+    def is_browser(self):
+        return any(name in self.name for name in BROWSER_PROCESS_NAMES)
+
+    @property
+    def is_main(self):
+        """Process browser chính (không phải renderer/GPU/utility)"""
+        return "--type=" not in self.cmdline
+
+    @property
+    def is_gologin_orbita(self):
+        return (
+            ('.gologin' in self.exe and 'orbita' in self.exe) or
+            ('appdata\\local\\gologin\\browser' in self.exe) or
+            ('.gologin' in self.cmdline and 'orbita' in self.cmdline)
+        )
+
+    @property
+    def has_profile_flag(self):
+        return '--user-data-dir' in self.cmdline or '--profile-directory' in self.cmdline
+
+    def is_running(self):
+        """psutil so create_time → không nhầm khi PID bị tái sử dụng"""
+        try:
+            return self.process.is_running() and self.process.status() != psutil.STATUS_ZOMBIE
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            return False
+
+
+class ProcessIndex:
+    """
+    Index process dùng chung: profile (folder --user-data-dir) → PID, gồm cả cây process con
+
+    Thay cho psutil.process_iter(['pid','name','cmdline']) + join/lower cmdline ở mỗi lần
+    stop/kill/verify (40 profile × ~15 Chrome process = 600+ process mỗi lần quét).
+    - Refresh tăng dần: psutil.pids() rồi chỉ đọc process MỚI; cmdline/exe chỉ đọc với browser
+    - Process biến mất → xóa khỏi index; PID tái sử dụng (create_time khác) → đọc lại entry
+    - Thread nền refresh mỗi PROCESS_INDEX_INTERVAL khi có người dùng, tự dừng khi idle
+    """
+
+    def __init__(self, interval=PROCESS_INDEX_INTERVAL, max_age=PROCESS_INDEX_MAX_AGE):
+        self.interval = interval
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._entries = {}          # {pid: ProcessInfo}
+        self._by_profile = {}       # {profile_id: set(pid)}
+        self._refreshed_at = 0.0
+        self._last_used = 0.0
+        self._thread = None
+        self.stats = {'refreshes': 0, 'added': 0, 'removed': 0, 'refresh_ms': 0.0}
+
+    # ========== LOOKUP ==========
+
+    def processes_for_profile(self, profile_id, main_only=False, max_age=None):
+        """
+        Returns:
+            list[ProcessInfo]: process còn sống thuộc profile_id (cả process con)
+        """
+        self._touch(max_age)
+        profile_key = str(profile_id).strip().lower()
+        with self._lock:
+            pids = self._by_profile.get(profile_key, ())
+            entries = [self._entries[pid] for pid in pids if pid in self._entries]
+            if not entries and profile_key:
+                # Fallback như lookup cũ: profile_id xuất hiện ở đâu đó trong cmdline browser
+                entries = [
+                    entry for entry in self._entries.values()
+                    if entry.is_browser and profile_key in entry.cmdline
+                ]
+        return [
+            entry for entry in entries
+            if (not main_only or entry.is_main) and entry.is_running()
+        ]
+
+    def browser_processes(self, max_age=None):
+        """Mọi process browser (chrome/orbita/chromium) còn sống"""
+        self._touch(max_age)
+        with self._lock:
+            entries = [entry for entry in self._entries.values() if entry.is_browser]
+        return [entry for entry in entries if entry.is_running()]
+
+    def is_profile_running(self, profile_id, max_age=None):
+        return bool(self.processes_for_profile(profile_id, max_age=max_age))
+
+    def forget(self, pids):
+        """Bỏ PID vừa kill khỏi index ngay (không đợi refresh kế tiếp)"""
+        with self._lock:
+            for pid in pids:
+                self._remove(pid)
+
+    # ========== REFRESH ==========
+
+    def refresh(self):
+        """Refresh tăng dần: đọc process mới, xóa process đã thoát, đọc lại PID bị tái sử dụng"""
+        with self._refresh_lock:
+            started = time.perf_counter()
+            current = set(psutil.pids())
+            with self._lock:
+                known = dict(self._entries)
+
+            # PID vẫn còn nhưng entry cache không còn sống: process cũ đã thoát và PID được cấp
+            # lại giữa 2 lần refresh (is_running() của psutil so cả create_time)
+            reused = {pid for pid, entry in known.items() if pid in current and not entry.is_running()}
+
+            new_entries = []
+            for pid in (current - known.keys()) | reused:
+                entry = self._read(pid)
+                if entry is not None:
+                    new_entries.append(entry)
+
+            with self._lock:
+                gone = (known.keys() - current) | reused
+                for pid in gone:
+                    self._remove(pid)
+                for entry in new_entries:
+                    self._entries[entry.pid] = entry
+                for entry in new_entries:
+                    self._assign_profile(entry)
+                self._refreshed_at = time.monotonic()
+
+            self.stats['refreshes'] += 1
+            self.stats['added'] += len(new_entries)
+            self.stats['removed'] += len(gone)
+            self.stats['refresh_ms'] += (time.perf_counter() - started) * 1000
+
+    @staticmethod
+    def _read(pid):
+        try:
+            process = psutil.Process(pid)
+            with process.oneshot():
+                name = (process.name() or "").lower()
+                entry = ProcessInfo(process, name, process.ppid(), process.create_time())
+                if entry.is_browser:
+                    try:
+                        args = process.cmdline()
+                        entry.cmdline = " ".join(args).lower()
+                        entry.cmdline_profile_id = profile_id_from_cmdline(args)
+                        entry.exe = (process.exe() or "").lower()
+                    except psutil.AccessDenied:
+                        pass
+            return entry
+        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+            return None
+
+    def _assign_profile(self, entry):
+        """Profile từ cmdline của chính nó, nếu không thì kế thừa từ process cha"""
+        profile_id = entry.cmdline_profile_id
+
+        parent_pid = entry.ppid
+        depth = 0
+        while profile_id is None and entry.is_browser and parent_pid in self._entries and depth < 8:
+            parent = self._entries[parent_pid]
+            if parent.create_time > entry.create_time:
+                break  # PID cha đã bị tái sử dụng
+            profile_id = parent.profile_id or parent.cmdline_profile_id
+            parent_pid = parent.ppid
+            depth += 1
+
+        if profile_id:
+            entry.profile_id = profile_id
+            self._by_profile.setdefault(profile_id, set()).add(entry.pid)
+
+    def _remove(self, pid):
+        entry = self._entries.pop(pid, None)
+        if entry is not None and entry.profile_id:
+            pids = self._by_profile.get(entry.profile_id)
+            if pids is not None:
+                pids.discard(pid)
+                if not pids:
+                    del self._by_profile[entry.profile_id]
+
+    # ========== BACKGROUND ==========
+
+    def _touch(self, max_age):
+        """Đánh dấu đang được dùng, đảm bảo thread nền chạy và index đủ mới"""
+        max_age = self.max_age if max_age is None else max_age
+        self._last_used = time.monotonic()
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, daemon=True, name="ProcessIndex-Refresh")
+                self._thread.start()
+            stale = time.monotonic() - self._refreshed_at > max_age
+        if stale:
+            self.refresh()
+
+    def _run(self):
+        while time.monotonic() - self._last_used < PROCESS_INDEX_IDLE:
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"[PROCESS_INDEX] Refresh error: {e}")
+            time.sleep(self.interval)
+        with self._lock:
+            self._thread = None
+
+
+_process_index = None
+_process_index_lock = threading.Lock()
+
+def get_process_index():
+    """Get or create singleton ProcessIndex"""
+    global _process_index
+    with _process_index_lock:
+        if _process_index is None:
+            _process_index = ProcessIndex()
+        return _process_index
@@ -0,0 +1,161 @@
+# models/profile_list_cache.py
+import hashlib
+import json
+import os
+import threading
+import time
+
+try:
+    from config import CONFIG_DIR
+except (ImportError, AttributeError):
+    CONFIG_DIR = "C:\\tomsamautobot"
+
+PROFILE_CACHE_DIR = os.path.join(CONFIG_DIR, "cache")
+PROFILE_CACHE_TTL = 600          # Trang profile cũ hơn ngần này (giây) → revalidate với API
+PROFILE_CACHE_VERSION = 1
+
+
+def _updated_at(profiles):
+    """Mốc updatedAt mới nhất trong trang (chuỗi ISO so sánh được), "" nếu API không trả"""
+    return max((str(p.get("updatedAt") or "") for p in profiles if isinstance(p, dict)), default="")
+
+
+class ProfileListCache:
+    """
+    Index profile trên đĩa cho một API token, lưu theo trang của /browser/v2
+
+    Mỗi trang: profiles, fetched_at, etag, last_modified, updated_at.
+    - Trang còn trong TTL → dùng luôn, không gọi API
+    - Trang hết hạn → gửi If-None-Match / If-Modified-Since; 304 → chỉ gia hạn fetched_at
+    - Một range chỉ đọc offline khi MỌI trang trong range còn fresh (không trộn trang mới/cũ)
+    - last_page: trang cuối đã biết (trang rỗng đầu tiên - 1) để fetch-all resolve offline
+    """
+
+    def __init__(self, api_token, ttl=PROFILE_CACHE_TTL, cache_dir=PROFILE_CACHE_DIR):
+        token_hash = hashlib.sha256(api_token.encode("utf-8")).hexdigest()[:16]
+        self.path = os.path.join(cache_dir, f"profiles_{token_hash}.json")
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._pages = {}
+        self._page_size = None
+        self.last_page = None
+        self._load()
+
+    # ========== PAGES ==========
+
+    def get_page(self, page, page_size):
+        """Entry của trang (dict) hoặc None nếu chưa có / khác page size"""
+        with self._lock:
+            if self._page_size != page_size:
+                return None
+            return self._pages.get(page)
+
+    def is_fresh(self, entry):
+        return entry is not None and time.time() - entry["fetched_at"] < self.ttl
+
+    def all_fresh(self, pages, page_size):
+        """True nếu mọi trang trong pages đều có trong cache và còn trong TTL"""
+        with self._lock:
+            if self._page_size != page_size:
+                return False
+            entries = [self._pages.get(page) for page in pages]
+        return all(self.is_fresh(entry) for entry in entries)
+
+    def put_page(self, page, page_size, profiles, etag=None, last_modified=None):
+        """Lưu trang vừa fetch; trả về True nếu nội dung đổi so với bản cache"""
+        entry = {
+            "profiles": profiles,
+            "fetched_at": time.time(),
+            "etag": etag,
+            "last_modified": last_modified,
+            "updated_at": _updated_at(profiles),
+        }
+        with self._lock:
+            if self._page_size != page_size:
+                self._pages = {}
+                self.last_page = None
+                self._page_size = page_size
+            previous = self._pages.get(page)
+            self._pages[page] = entry
+            if not profiles and (self.last_page is None or page <= self.last_page):
+                self.last_page = page - 1
+            elif profiles and self.last_page is not None and page > self.last_page:
+                self.last_page = None
+        return previous is None or previous["updated_at"] != entry["updated_at"] or \
+            [p.get("id") for p in previous["profiles"]] != [p.get("id") for p in profiles]
+
+    def touch(self, page):
+        """304 Not Modified → gia hạn TTL của trang"""
+        with self._lock:
+            entry = self._pages.get(page)
+            if entry is not None:
+                entry["fetched_at"] = time.time()
+
+    def invalidate(self):
+        """Profile được tạo/clone → thứ tự trang có thể đổi, bỏ toàn bộ cache"""
+        with self._lock:
+            self._pages = {}
+            self.last_page = None
+        self.save()
+
+    def expire(self):
+        """
+        Profile bị sửa (proxy, fingerprint, cookies) → mọi trang hết hạn ngay
+
+        Giữ etag/last_modified: lần đọc sau revalidate bằng conditional GET,
+        trang không đổi chỉ tốn một 304.
+        """
+        with self._lock:
+            if not self._pages:
+                return
+            for entry in self._pages.values():
+                entry["fetched_at"] = 0
+        self.save()
+
+    # ========== DISK ==========
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") != PROFILE_CACHE_VERSION:
+                return
+            self._page_size = data.get("page_size")
+            self._pages = {int(page): entry for page, entry in data.get("pages", {}).items()}
+            self.last_page = data.get("last_page")
+            print(f"[PROFILE_CACHE] Loaded {len(self._pages)} cached page(s): {self.path}")
+        except Exception as e:
+            print(f"[PROFILE_CACHE] Ignoring unreadable cache {self.path}: {e}")
+            self._pages = {}
+
+    def save(self):
+        """Ghi atomic (file tạm + os.replace) để nhiều action đọc song song không thấy file dở"""
+        with self._lock:
+            data = {
+                "version": PROFILE_CACHE_VERSION,
+                "page_size": self._page_size,
+                "last_page": self.last_page,
+                "pages": {str(page): entry for page, entry in self._pages.items()},
+            }
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            temp_path = f"{self.path}.{threading.get_ident()}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(temp_path, self.path)
+        except Exception as e:
+            print(f"[PROFILE_CACHE] Save error: {e}")
+
+
+_profile_list_caches = {}
+_profile_list_caches_lock = threading.Lock()
+
+def get_profile_list_cache(api_token):
+    """Get or create ProfileListCache dùng chung cho api_token"""
+    with _profile_list_caches_lock:
+        cache = _profile_list_caches.get(api_token)
+        if cache is None:
+            cache = _profile_list_caches[api_token] = ProfileListCache(api_token)
+        return cache
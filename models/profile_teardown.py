@@ -0,0 +1,213 @@
+# models/profile_teardown.py
+
+"""
+Profile teardown - chờ tín hiệu sẵn sàng thật thay cho time.sleep cố định khi đóng profile
+
+- DevTools socket: port debugger hết nhận kết nối = browser đã đóng endpoint
+- Process exit: psutil.wait_procs trên cây process của browser (trả về ngay khi process chết)
+- File handle: trên Windows mở thử Cookies/History với share mode 0 - WinError 32 = Chrome còn giữ handle
+  (chỉ mở rồi đóng handle, không đổi tên/ghi vào file profile)
+Mọi wait đều có timeout và trả về (ok, elapsed) để caller ghi timing theo step.
+"""
+
+import os
+import socket
+import threading
+import time
+
+import psutil
+
+DEVTOOLS_CLOSE_TIMEOUT = 10.0     # Chờ port debugger đóng sau driver.quit()
+PROCESS_EXIT_TIMEOUT = 15.0       # Chờ cây process browser thoát
+FILE_RELEASE_TIMEOUT = 10.0       # Chờ Chrome nhả handle file profile
+TAB_CLOSE_TIMEOUT = 5.0           # Chờ window_handles còn 1 tab
+READY_POLL_INTERVAL = 0.1
+CLEANUP_WORKERS = 8               # Số profile cleanup song song
+ERROR_SHARING_VIOLATION = 32
+
+# File SQLite Chrome giữ suốt phiên - gl.stop() zip profile sẽ lỗi WinError 32 nếu còn bị giữ
+PROFILE_LOCKED_FILES = (
+    os.path.join("Default", "Cookies"),
+    os.path.join("Default", "Network", "Cookies"),
+    os.path.join("Default", "History"),
+    os.path.join("Default", "Login Data"),
+)
+
+
+def wait_until(predicate, timeout, interval=READY_POLL_INTERVAL):
+    """
+    Poll predicate tới khi True hoặc hết timeout
+
+    Returns:
+        tuple: (ok, elapsed_seconds)
+    """
+    started = time.perf_counter()
+    deadline = started + timeout
+    while True:
+        try:
+            if predicate():
+                return True, time.perf_counter() - started
+        except Exception:
+            pass
+        if time.perf_counter() >= deadline:
+            return False, time.perf_counter() - started
+        time.sleep(interval)
+
+
+# ========== DEVTOOLS ==========
+
+def get_debugger_address(driver):
+    """debuggerAddress mà chromedriver đang attach (None nếu không đọc được)"""
+    try:
+        options = driver.capabilities.get("goog:chromeOptions", {})
+        return options.get("debuggerAddress")
+    except Exception:
+        return None
+
+
+def devtools_open(debugger_address):
+    """True nếu port debugger còn nhận kết nối TCP"""
+    host, port = debugger_address.rsplit(":", 1)
+    try:
+        with socket.create_connection((host, int(port)), timeout=0.5):
+            return True
+    except OSError:
+        return False
+
+
+def wait_devtools_closed(debugger_address, timeout=DEVTOOLS_CLOSE_TIMEOUT):
+    if not debugger_address:
+        return True, 0.0
+    return wait_until(lambda: not devtools_open(debugger_address), timeout)
+
+
+# ========== PROCESS ==========
+
+def process_tree(pid):
+    """psutil.Process của pid + toàn bộ process con (renderer, GPU, utility, ...)"""
+    try:
+        root = psutil.Process(pid)
+        return [root] + root.children(recursive=True)
+    except (psutil.NoSuchProcess, psutil.AccessDenied):
+        return []
+
+
+def wait_processes_exit(processes, timeout=PROCESS_EXIT_TIMEOUT):
+    """
+    Returns:
+        tuple: (alive_processes, elapsed_seconds) - alive rỗng = đã thoát hết
+    """
+    started = time.perf_counter()
+    if not processes:
+        return [], 0.0
+    try:
+        _, alive = psutil.wait_procs(processes, timeout=timeout)
+    except Exception:
+        alive = [p for p in processes if _is_running(p)]
+    return alive, time.perf_counter() - started
+
+
+def _is_running(proc):
+    try:
+        return proc.is_running() and proc.status() != psutil.STATUS_ZOMBIE
+    except (psutil.NoSuchProcess, psutil.AccessDenied):
+        return False
+
+
+# ========== FILE HANDLES ==========
+
+def file_released(path):
+    """
+    True nếu không process nào còn mở file
+
+    Windows: CreateFile với share mode 0 trả ERROR_SHARING_VIOLATION (32) khi còn handle khác.
+    Chỉ mở đọc rồi đóng ngay - không đổi tên hay ghi gì vào file của profile.
+    Hệ khác / thiếu pywin32: không kiểm tra được → luôn True (step chờ process thoát đã đủ).
+    """
+    if os.name != "nt" or not os.path.exists(path):
+        return True
+    try:
+        import pywintypes
+        import win32con
+        import win32file
+    except ImportError:
+        return True
+    try:
+        handle = win32file.CreateFile(
+            path, win32con.GENERIC_READ, 0, None,
+            win32con.OPEN_EXISTING, win32con.FILE_ATTRIBUTE_NORMAL, None,
+        )
+    except pywintypes.error as e:
+        return e.winerror != ERROR_SHARING_VIOLATION
+    handle.Close()
+    return True
+
+
+def wait_files_released(profile_path, timeout=FILE_RELEASE_TIMEOUT):
+    if not profile_path:
+        return True, 0.0
+    paths = [os.path.join(profile_path, name) for name in PROFILE_LOCKED_FILES]
+    return wait_until(lambda: all(file_released(path) for path in paths), timeout)
+
+
+# ========== TIMING ==========
+
+class StepTimer:
+    """Đo thời gian từng step của một profile: with timer.step("quit"): ..."""
+
+    def __init__(self):
+        self.steps = {}
+        self._started = time.perf_counter()
+
+    def step(self, name):
+        return _TimedStep(self, name)
+
+    def add(self, name, seconds):
+        self.steps[name] = self.steps.get(name, 0.0) + seconds
+
+    @property
+    def total(self):
+        return time.perf_counter() - self._started
+
+    def format(self):
+        parts = [f"{name} {seconds:.1f}s" for name, seconds in self.steps.items()]
+        return ", ".join(parts) + f" | total {self.total:.1f}s"
+
+
+class _TimedStep:
+    def __init__(self, timer, name):
+        self._timer = timer
+        self._name = name
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._timer.add(self._name, time.perf_counter() - self._started)
+        return False
+
+
+class TeardownStats:
+    """Tổng hợp timing của cả batch cleanup (thread-safe)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.steps = {}
+        self.profiles = 0
+        self.profile_seconds = 0.0
+
+    def add(self, timer):
+        with self._lock:
+            self.profiles += 1
+            self.profile_seconds += timer.total
+            for name, seconds in timer.steps.items():
+                self.steps[name] = self.steps.get(name, 0.0) + seconds
+
+    def format(self, wall_seconds):
+        with self._lock:
+            if not self.profiles:
+                return f"0 profile(s) in {wall_seconds:.1f}s"
+            avg = ", ".join(f"{name} {seconds / self.profiles:.1f}s" for name, seconds in self.steps.items())
+            return (f"{self.profiles} profile(s) in {wall_seconds:.1f}s wall "
+                    f"(sequential would be ~{self.profile_seconds:.1f}s) | avg per profile: {avg}")
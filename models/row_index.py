@@ -0,0 +1,217 @@
+﻿# models/row_index.py
+import csv
+import io
+import mmap
+import os
+import re
+import threading
+from array import array
+from collections import OrderedDict
+
+ROW_INDEX_MAX_FILES = 16       # Số file giữ index + mmap cùng lúc (LRU)
+UTF8_BOM = b'\xef\xbb\xbf'
+
+# Universal newlines giống open() text mode: '\r\n', '\r' và '\n' đều kết thúc dòng
+_NEWLINE_RE = re.compile(rb'\r\n|\r|\n')
+_NONEMPTY_LINE_RE = re.compile(rb'[^\r\n]+')
+# Có ký tự ASCII in được → chắc chắn line.strip() != '' (không cần decode)
+_ASCII_VISIBLE_RE = re.compile(rb'[\x21-\x7e]')
+
+
+class _MappedRows:
+    """
+    Index offset (start, end) của từng dòng hợp lệ trên file đã mmap
+    Truy cập dòng thứ i là O(1): cắt mmap theo offset rồi decode đúng dòng đó
+    """
+
+    def __init__(self, path, skip_bom):
+        self.path = path
+        self.starts = array('q')
+        self.ends = array('q')
+        self._file = None
+        self._mm = None
+
+        if os.path.getsize(path) == 0:
+            return
+
+        self._file = open(path, 'rb')
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        begin = len(UTF8_BOM) if skip_bom and self._mm[:len(UTF8_BOM)] == UTF8_BOM else 0
+        for start, end in self._scan(begin):
+            self.starts.append(start)
+            self.ends.append(end)
+
+    def _lines(self, begin):
+        """(start, end, next_start) của từng dòng vật lý, end không gồm ký tự xuống dòng"""
+        mm = self._mm
+        pos = begin
+        for match in _NEWLINE_RE.finditer(mm, begin):
+            yield pos, match.start(), match.end()
+            pos = match.end()
+        if pos < len(mm):
+            yield pos, len(mm), len(mm)
+
+    def _scan(self, begin):
+        """Sinh (start, end) của từng dòng hợp lệ"""
+        raise NotImplementedError
+
+    def __len__(self):
+        return len(self.starts)
+
+    def raw(self, index):
+        return self._mm[self.starts[index]:self.ends[index]].decode('utf-8')
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class TextRowIndex(_MappedRows):
+    """Các dòng không rỗng của file TXT, đã strip()"""
+
+    def __init__(self, path):
+        super().__init__(path, skip_bom=False)
+
+    def _scan(self, begin):
+        mm = self._mm
+        for match in _NONEMPTY_LINE_RE.finditer(mm, begin):
+            start, end = match.span()
+            # Khoảng trắng Unicode (\xa0, \u3000...) chỉ nhận ra được sau khi decode
+            if _ASCII_VISIBLE_RE.search(mm, start, end) or mm[start:end].decode('utf-8').strip():
+                yield start, end
+
+    def row(self, index):
+        return self.raw(index).strip()
+
+
+class CsvRowIndex(_MappedRows):
+    """
+    Các bản ghi CSV không rỗng (utf-8-sig), parse bằng csv.reader khi truy cập
+
+    Ranh giới bản ghi lấy từ chính csv.reader chạy trên các dòng vật lý (giống _read_csv cũ):
+    reader kéo từng dòng và trả bản ghi khi dòng cuối của nó kết thúc → offset luôn khớp
+    với cách csv xử lý ngoặc kép (chỉ mở quote ở đầu field, '55" screen' là ký tự thường).
+    """
+
+    def __init__(self, path):
+        super().__init__(path, skip_bom=True)
+
+    def _scan(self, begin):
+        mm = self._mm
+        if mm.find(b'"', begin) == -1:
+            # Không có ngoặc kép → mỗi dòng không rỗng là một bản ghi (csv.reader chỉ trả [] cho dòng rỗng)
+            for match in _NONEMPTY_LINE_RE.finditer(mm, begin):
+                yield match.span()
+            return
+
+        consumed = [begin]
+
+        def lines():
+            for start, end, next_start in self._lines(begin):
+                consumed[0] = next_start
+                yield mm[start:end].decode('utf-8') + '\n'
+
+        start = begin
+        for record in csv.reader(lines()):
+            if record:
+                yield start, consumed[0]
+            start = consumed[0]
+
+    def row(self, index):
+        # Universal newlines giống open() text mode của _read_csv cũ
+        return next(csv.reader(io.StringIO(self.raw(index), newline=None)), [])
+
+
+class ExcelRows:
+    """Sheet Excel được chuyển MỘT lần thành list dòng (giống _read_excel cũ)"""
+
+    def __init__(self, path):
+        self.path = path
+        self._rows = []
+        import openpyxl
+        workbook = openpyxl.load_workbook(path, data_only=True, read_only=True)
+        try:
+            sheet = workbook.active
+            for values in sheet.iter_rows(values_only=True):
+                if any(cell is not None for cell in values):
+                    self._rows.append([str(cell) if cell is not None else "" for cell in values])
+        finally:
+            workbook.close()
+
+    def __len__(self):
+        return len(self._rows)
+
+    def row(self, index):
+        return self._rows[index]
+
+    def close(self):
+        pass
+
+
+ROW_INDEX_KINDS = {
+    'txt': TextRowIndex,
+    'csv': CsvRowIndex,
+    'excel': ExcelRows,
+}
+
+
+class RowIndexCache:
+    """
+    Cache index theo (path, kind), hợp lệ khi (size, mtime_ns) của file không đổi
+    File đổi → đóng mmap cũ và index lại; vượt ROW_INDEX_MAX_FILES → bỏ file ít dùng nhất
+    """
+
+    def __init__(self, max_files=ROW_INDEX_MAX_FILES):
+        self.max_files = max_files
+        self._entries = OrderedDict()  # (path, kind) -> (stat, index)
+        self._lock = threading.Lock()
+
+    def get(self, path, kind):
+        path = os.path.abspath(path)
+        st = os.stat(path)
+        stat = (st.st_size, st.st_mtime_ns)
+        key = (path, kind)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == stat:
+                self._entries.move_to_end(key)
+                return entry[1]
+            if entry is not None:
+                entry[1].close()
+                del self._entries[key]
+
+            index = ROW_INDEX_KINDS[kind](path)
+            print(f"[ROW_INDEX] Indexed {len(index)} row(s) ({kind}): {path}")
+            self._entries[key] = (stat, index)
+            while len(self._entries) > self.max_files:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                evicted.close()
+            return index
+
+    def release(self, path):
+        """Đóng mmap của path (trước khi ghi/truncate/replace file - bắt buộc trên Windows)"""
+        path = os.path.abspath(path)
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == path]:
+                self._entries.pop(key)[1].close()
+
+    def clear(self):
+        with self._lock:
+            for _, index in self._entries.values():
+                index.close()
+            self._entries.clear()
+
+
+_row_index_cache = None
+
+def get_row_index_cache():
+    """Get or create singleton RowIndexCache"""
+    global _row_index_cache
+    if _row_index_cache is None:
+        _row_index_cache = RowIndexCache()
+    return _row_index_cache
@@ -0,0 +1,330 @@
+﻿# models/streaming_writer.py
+import atexit
+import csv
+import os
+import threading
+import time
+
+from models.row_index import get_row_index_cache
+
+WRITE_BUFFER_ROWS = 100        # Buffered mode: flush khi đủ N dòng ...
+WRITE_BUFFER_SECONDS = 5.0     # ... hoặc dòng cũ nhất đã chờ T giây
+FLUSHER_INTERVAL = 1.0         # Chu kỳ thread nền kiểm tra buffer quá hạn
+TAIL_CHUNK_SIZE = 4096
+
+
+class _CsvState:
+    """Trạng thái đã quét của một file CSV: số cột, số dòng, stat sau lần ghi cuối"""
+
+    __slots__ = ("columns", "rows", "needs_newline", "needs_normalize", "stat")
+
+    def __init__(self):
+        self.columns = 0
+        self.rows = 0
+        self.needs_newline = False     # File không kết thúc bằng xuống dòng
+        self.needs_normalize = False   # Dòng lệch số cột / dòng rỗng ở cuối
+        self.stat = None
+
+
+class _Buffer:
+    """Dữ liệu chờ ghi của một file ở buffered mode"""
+
+    __slots__ = ("kind", "items", "first_at", "flush_rows", "flush_seconds")
+
+    def __init__(self, kind, flush_rows, flush_seconds):
+        self.kind = kind
+        self.items = []
+        self.first_at = 0.0
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_seconds
+
+
+def buffer_options(params):
+    """Buffered mode params của Write CSV / Write TXT: flush mỗi N dòng hoặc T giây"""
+    try:
+        flush_rows = max(1, int(params.get("flush_rows", WRITE_BUFFER_ROWS)))
+    except (TypeError, ValueError):
+        flush_rows = WRITE_BUFFER_ROWS
+    try:
+        flush_seconds = max(0.0, float(params.get("flush_seconds", WRITE_BUFFER_SECONDS)))
+    except (TypeError, ValueError):
+        flush_seconds = WRITE_BUFFER_SECONDS
+    return {
+        'buffered': bool(params.get("buffered", False)),
+        'flush_rows': flush_rows,
+        'flush_seconds': flush_seconds
+    }
+
+
+def _file_stat(path):
+    st = os.stat(path)
+    return (st.st_size, st.st_mtime_ns)
+
+
+class StreamingWriter:
+    """
+    Ghi nối (append-only) cho WriteCsvAction / WriteTxtAction
+
+    - CSV: số cột được cache theo (path, size, mtime) → mỗi lần ghi chỉ append một dòng.
+      Chỉ viết lại toàn bộ file (streaming qua file tạm) khi schema đổi: dòng mới rộng
+      hơn số cột hiện có, hoặc file có dòng lệch cột / dòng rỗng ở cuối.
+    - TXT: cắt các dòng trắng ở cuối (chỉ đọc phần đuôi file) rồi append.
+    - Buffered mode (tùy chọn): gom dòng trong RAM, flush mỗi N dòng hoặc T giây.
+    - close_all(fsync=True): hook khi dừng run / thoát app để dữ liệu chắc chắn xuống đĩa.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._csv_states = {}
+        self._buffers = {}
+        self._dirty = set()   # File đã ghi nhưng chưa fsync
+        self._flusher = None
+        self._flusher_stop = threading.Event()
+
+    # ========== PUBLIC API ==========
+
+    def append_csv_row(self, path, items, buffered=False,
+                       flush_rows=WRITE_BUFFER_ROWS, flush_seconds=WRITE_BUFFER_SECONDS):
+        """
+        Ghi một dòng vào cuối file CSV (pad theo số cột hiện có)
+
+        Returns:
+            int: Số thứ tự dòng vừa ghi (1-based, tính cả dòng đang buffer)
+        """
+        path = os.path.abspath(path)
+        items = list(items)
+        with self._lock:
+            state = self._get_csv_state(path)
+            buffer = self._buffers.get(path)
+
+            if len(items) > state.columns and state.rows + (len(buffer.items) if buffer else 0) > 0:
+                # Schema đổi: flush phần đang chờ rồi normalize toàn bộ file theo số cột mới
+                self._flush_locked(path)
+                self._normalize_csv(path, state, len(items))
+            elif state.needs_normalize:
+                self._flush_locked(path)
+                self._normalize_csv(path, state, max(state.columns, len(items)))
+
+            state.columns = max(state.columns, len(items))
+            if len(items) < state.columns:
+                items.extend([''] * (state.columns - len(items)))
+
+            if buffered:
+                self._buffer_item(path, "csv", items, flush_rows, flush_seconds)
+                buffer = self._buffers.get(path)
+                return state.rows + (len(buffer.items) if buffer else 0)
+
+            self._flush_locked(path)
+            self._write_csv_rows(path, state, [items])
+            return state.rows
+
+    def append_txt_lines(self, path, lines, buffered=False,
+                         flush_rows=WRITE_BUFFER_ROWS, flush_seconds=WRITE_BUFFER_SECONDS):
+        """Ghi các dòng vào cuối file TXT (bỏ dòng trắng ở cuối file trước khi ghi)"""
+        path = os.path.abspath(path)
+        with self._lock:
+            if buffered:
+                for line in lines:
+                    self._buffer_item(path, "txt", line, flush_rows, flush_seconds)
+                return
+            self._flush_locked(path)
+            self._write_txt_lines(path, list(lines))
+
+    def flush(self, path=None, fsync=False):
+        """Flush buffer của một file (hoặc tất cả nếu path=None)"""
+        with self._lock:
+            paths = [os.path.abspath(path)] if path else list(self._buffers)
+            for buffered_path in paths:
+                self._flush_locked(buffered_path)
+            if fsync:
+                targets = [p for p in paths if p in self._dirty] if path else list(self._dirty)
+                for dirty_path in targets:
+                    self._fsync(dirty_path)
+
+    def close_all(self, fsync=True):
+        """Fsync-on-stop hook: flush mọi buffer, fsync mọi file đã ghi"""
+        self.flush(fsync=fsync)
+        with self._lock:
+            self._csv_states.clear()
+
+    # ========== CSV ==========
+
+    def _get_csv_state(self, path):
+        """Lấy state từ cache; quét lại file nếu file đã bị sửa từ bên ngoài"""
+        state = self._csv_states.get(path)
+        current_stat = _file_stat(path)
+        if state is not None and state.stat == current_stat:
+            return state
+
+        state = _CsvState()
+        trailing_empty = 0
+        widths = set()
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            for row in csv.reader(f):
+                if all(cell.strip() == '' for cell in row):
+                    trailing_empty += 1
+                    continue
+                # Dòng rỗng ở giữa file được giữ lại như dòng thường (giống hành vi cũ)
+                state.rows += trailing_empty + 1
+                if trailing_empty:
+                    widths.add(0)
+                trailing_empty = 0
+                widths.add(len(row))
+                state.columns = max(state.columns, len(row))
+
+        state.needs_normalize = trailing_empty > 0 or len(widths) > 1
+        state.needs_newline = current_stat[0] > 0 and not self._ends_with_newline(path)
+        state.stat = current_stat
+        self._csv_states[path] = state
+        return state
+
+    def _write_csv_rows(self, path, state, rows):
+        get_row_index_cache().release(path)
+        with open(path, 'a', encoding='utf-8', newline='') as f:
+            if state.needs_newline:
+                f.write('\r\n')
+                state.needs_newline = False
+            csv.writer(f).writerows(rows)
+        state.rows += len(rows)
+        state.stat = _file_stat(path)
+        self._dirty.add(path)
+
+    def _normalize_csv(self, path, state, columns):
+        """Viết lại file qua file tạm: bỏ dòng rỗng ở cuối, pad mọi dòng đủ số cột"""
+        get_row_index_cache().release(path)
+        temp_path = path + ".tmp"
+        rows = 0
+        pending_empty = []
+        with open(path, 'r', encoding='utf-8', newline='') as src, \
+                open(temp_path, 'w', encoding='utf-8', newline='') as dst:
+            writer = csv.writer(dst)
+            for row in csv.reader(src):
+                if all(cell.strip() == '' for cell in row):
+                    pending_empty.append(row)
+                    continue
+                for held in pending_empty + [row]:
+                    if len(held) < columns:
+                        held = held + [''] * (columns - len(held))
+                    writer.writerow(held)
+                    rows += 1
+                pending_empty = []
+        os.replace(temp_path, path)
+
+        print(f"[STREAMING_WRITER] Normalized {rows} row(s) to {columns} column(s): {path}")
+        state.columns = columns
+        state.rows = rows
+        state.needs_newline = False
+        state.needs_normalize = False
+        state.stat = _file_stat(path)
+        self._dirty.add(path)
+
+    # ========== TXT ==========
+
+    def _write_txt_lines(self, path, lines):
+        if not lines:
+            return
+        # mmap của ReadTxt/ReadCsv phải đóng trước khi truncate (Windows)
+        get_row_index_cache().release(path)
+        with open(path, 'r+b') as f:
+            content_end = self._strip_trailing_newlines(f)
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(('\n' if content_end > 0 else '') + '\n'.join(lines))
+        self._dirty.add(path)
+
+    @staticmethod
+    def _strip_trailing_newlines(f):
+        """Cắt \\r/\\n ở cuối file (chỉ đọc phần đuôi), trả về kích thước sau khi cắt"""
+        f.seek(0, os.SEEK_END)
+        end = f.tell()
+        pos = end
+        while pos > 0:
+            chunk_start = max(0, pos - TAIL_CHUNK_SIZE)
+            f.seek(chunk_start)
+            stripped = f.read(pos - chunk_start).rstrip(b'\r\n')
+            if stripped:
+                pos = chunk_start + len(stripped)
+                break
+            pos = chunk_start
+        if pos < end:
+            f.truncate(pos)
+        return pos
+
+    @staticmethod
+    def _ends_with_newline(path):
+        with open(path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b'\n'
+
+    # ========== BUFFER ==========
+
+    def _buffer_item(self, path, kind, item, flush_rows, flush_seconds):
+        buffer = self._buffers.get(path)
+        if buffer is None or buffer.kind != kind:
+            self._flush_locked(path)
+            buffer = self._buffers[path] = _Buffer(kind, flush_rows, flush_seconds)
+        if not buffer.items:
+            buffer.first_at = time.monotonic()
+        buffer.items.append(item)
+
+        if len(buffer.items) >= buffer.flush_rows or time.monotonic() - buffer.first_at >= buffer.flush_seconds:
+            self._flush_locked(path)
+        else:
+            self._ensure_flusher()
+
+    def _flush_locked(self, path):
+        buffer = self._buffers.pop(path, None)
+        if buffer is None or not buffer.items:
+            return
+        try:
+            if buffer.kind == "csv":
+                self._write_csv_rows(path, self._get_csv_state(path), buffer.items)
+            else:
+                self._write_txt_lines(path, buffer.items)
+            print(f"[STREAMING_WRITER] Flushed {len(buffer.items)} buffered row(s): {path}")
+        except Exception as e:
+            print(f"[STREAMING_WRITER] Flush error {path}: {e}")
+
+    def _fsync(self, path):
+        if not os.path.exists(path):
+            self._dirty.discard(path)
+            return
+        try:
+            with open(path, 'ab') as f:
+                f.flush()
+                os.fsync(f.fileno())
+        except OSError as e:
+            print(f"[STREAMING_WRITER] fsync error {path}: {e}")
+        self._dirty.discard(path)
+
+    def _ensure_flusher(self):
+        """Thread nền flush các buffer đã chờ quá flush_seconds (khi không có lần ghi mới)"""
+        if self._flusher is not None and self._flusher.is_alive():
+            return
+        self._flusher_stop.clear()
+        self._flusher = threading.Thread(target=self._flusher_loop, name="streaming_writer", daemon=True)
+        self._flusher.start()
+
+    def _flusher_loop(self):
+        while not self._flusher_stop.wait(FLUSHER_INTERVAL):
+            with self._lock:
+                now = time.monotonic()
+                expired = [
+                    path for path, buffer in self._buffers.items()
+                    if buffer.items and now - buffer.first_at >= buffer.flush_seconds
+                ]
+                for path in expired:
+                    self._flush_locked(path)
+                if not self._buffers:
+                    self._flusher = None
+                    return
+
+
+_streaming_writer = None
+
+def get_streaming_writer():
+    """Get or create singleton StreamingWriter"""
+    global _streaming_writer
+    if _streaming_writer is None:
+        _streaming_writer = StreamingWriter()
+        atexit.register(_streaming_writer.close_all)
+    return _streaming_writer
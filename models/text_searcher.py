@@ -1,5 +1,13 @@
 ﻿# models/text_searcher.py
+import hashlib
+import itertools
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
 import pyautogui
+from models.image_search import get_frame_cache
 try:
     import pytesseract
     from PIL import Image
@@ -8,67 +16,287 @@ except ImportError:
     TESSERACT_AVAILABLE = False
     print("[TEXT_SEARCHER] Warning: pytesseract not installed. Text search will not work.")
 
+OCR_LANG = 'eng+vie'
+OCR_CACHE_MAX_ENTRIES = 32     # Số kết quả OCR giữ lại (LRU)
+OCR_HASH_DOWNSCALE = 4         # Hash trên ảnh xám thu nhỏ 1/4 ...
+OCR_HASH_QUANT_SHIFT = 4       # ... lượng tử 16 mức → bỏ qua nhiễu nén/anti-alias nhỏ
+OCR_TILE_HEIGHT = 64           # Incremental OCR: chia vùng thành các dải ngang cao 64px
+OCR_TILE_MARGIN = 12           # Nới dải đã đổi lên/xuống để không cắt ngang dòng chữ
+
+
+def perceptual_hash(gray):
+    """
+    Hash "cảm quan" của ảnh xám: thu nhỏ INTER_AREA + lượng tử hóa rồi băm
+    Cùng nội dung hiển thị → cùng hash, dù pixel lệch nhẹ giữa hai lần chụp
+    """
+    h, w = gray.shape[:2]
+    small_w = max(1, w // OCR_HASH_DOWNSCALE)
+    small_h = max(1, h // OCR_HASH_DOWNSCALE)
+    small = cv2.resize(gray, (small_w, small_h), interpolation=cv2.INTER_AREA)
+    quantized = np.right_shift(small, OCR_HASH_QUANT_SHIFT)
+    digest = hashlib.blake2b(quantized.tobytes(), digest_size=16)
+    digest.update(f"{w}x{h}".encode())
+    return digest.hexdigest()
+
+
+def _ocr_words(image, offset_y=0, line_prefix=0):
+    """
+    Chạy Tesseract trên PIL image, trả về list word box:
+    (text, left, top, width, height, line_key) - top đã cộng offset_y
+    """
+    data = pytesseract.image_to_data(
+        image,
+        output_type=pytesseract.Output.DICT,
+        lang=OCR_LANG
+    )
+    words = []
+    for i in range(len(data['text'])):
+        text = data['text'][i].strip()
+        if not text:
+            continue
+        line_key = (line_prefix, data['block_num'][i], data['par_num'][i], data['line_num'][i])
+        words.append((
+            text,
+            data['left'][i],
+            data['top'][i] + offset_y,
+            data['width'][i],
+            data['height'][i],
+            line_key
+        ))
+    return words
+
+
+class OcrCache:
+    """
+    Cache kết quả OCR theo (region, perceptual hash)
+    Màn hình không đổi → không chạy lại Tesseract
+
+    Đồng thời giữ trạng thái dải (tile) của lần chụp trước cho từng region
+    để incremental OCR chỉ nhận dạng lại các dải đã thay đổi.
+    """
+
+    def __init__(self, max_entries=OCR_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._tiles = {}  # region -> (tile_hashes, shape, words)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            words = self._entries.get(key)
+            if words is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return words
+
+    def put(self, key, words):
+        with self._lock:
+            self._entries[key] = words
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_tiles(self, region):
+        with self._lock:
+            return self._tiles.get(region)
+
+    def put_tiles(self, region, tile_hashes, shape, words):
+        with self._lock:
+            self._tiles[region] = (tile_hashes, shape, words)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tiles.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'regions': len(self._tiles),
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+
+_ocr_cache = None
+_ocr_line_ids = itertools.count(1)  # Prefix line_key duy nhất cho mỗi lần OCR một dải
+
+def get_ocr_cache():
+    """Get or create singleton OcrCache"""
+    global _ocr_cache
+    if _ocr_cache is None:
+        _ocr_cache = OcrCache()
+    return _ocr_cache
+
+
 class TextSearcher:
     """Class để tìm kiếm text trên màn hình sử dụng OCR"""
-    
-    def __init__(self, search_text, region=None):
+
+    def __init__(self, search_text, region=None, incremental=False):
         """
         Args:
-            search_text: Text cần tìm
+            search_text: Text cần tìm (một từ hoặc cụm nhiều từ)
             region: Tuple (x, y, width, height) hoặc None để tìm toàn màn hình
+            incremental: True → chỉ OCR lại các dải đã thay đổi so với lần chụp trước
         """
         self.search_text = search_text
         self.region = region
-    
+        self.incremental = incremental
+
     def search(self):
         """
         Tìm kiếm text trên màn hình
-        
+
         Returns:
-            tuple: (found, location) 
+            tuple: (found, location)
                 - found: True nếu tìm thấy, False nếu không
                 - location: (x, y) vị trí trung tâm của text tìm thấy
         """
         if not TESSERACT_AVAILABLE:
             print("[TEXT_SEARCHER] pytesseract not available")
             return False, None
-        
+
         try:
-            # Chụp màn hình
-            if self.region:
+            # Chụp màn hình (dùng chung frame cache với ImageSearcher)
+            if self.region and self.region[0] >= 0 and self.region[1] >= 0:
+                screenshot = get_frame_cache().grab_image(self.region)
+                offset_x, offset_y = self.region[0], self.region[1]
+            elif self.region:
                 screenshot = pyautogui.screenshot(region=self.region)
                 offset_x, offset_y = self.region[0], self.region[1]
             else:
-                screenshot = pyautogui.screenshot()
+                screenshot = get_frame_cache().grab_image()
                 offset_x, offset_y = 0, 0
-            
-            # Sử dụng pytesseract để OCR
-            # Lấy vị trí của từng từ
-            data = pytesseract.image_to_data(
-                screenshot, 
-                output_type=pytesseract.Output.DICT,
-                lang='eng+vie'
-            )
-            
-            # Tìm text trong kết quả OCR
-            n_boxes = len(data['text'])
-            for i in range(n_boxes):
-                text = data['text'][i].strip()
-                
-                # So sánh text (không phân biệt hoa thường)
-                if text.lower() == self.search_text.lower():
-                    x, y, w, h = data['left'][i], data['top'][i], data['width'][i], data['height'][i]
-                    
-                    # Tính vị trí trung tâm
-                    center_x = offset_x + x + w // 2
-                    center_y = offset_y + y + h // 2
-                    
-                    print(f"[TEXT_SEARCHER] Found text '{self.search_text}' at ({center_x}, {center_y})")
-                    return True, (center_x, center_y)
-            
+
+            words = self.get_words(screenshot)
+
+            # Tìm text (một từ hoặc cụm từ) trong kết quả OCR
+            match = self.find_phrase(words, self.search_text)
+            if match:
+                x, y, w, h = match
+
+                # Tính vị trí trung tâm
+                center_x = offset_x + x + w // 2
+                center_y = offset_y + y + h // 2
+
+                print(f"[TEXT_SEARCHER] Found text '{self.search_text}' at ({center_x}, {center_y})")
+                return True, (center_x, center_y)
+
             print(f"[TEXT_SEARCHER] Text '{self.search_text}' not found")
             return False, None
-            
+
         except Exception as e:
             print(f"[TEXT_SEARCHER] Error during search: {e}")
             return False, None
+
+    def get_words(self, screenshot):
+        """
+        Word box của screenshot, ưu tiên lấy từ OcrCache
+
+        Returns:
+            list: [(text, left, top, width, height, line_key), ...] tọa độ tương đối với screenshot
+        """
+        cache = get_ocr_cache()
+        region_key = tuple(self.region) if self.region else None
+        gray = np.asarray(screenshot.convert('L'))
+        key = (region_key, perceptual_hash(gray))
+
+        words = cache.get(key)
+        if words is not None:
+            print("[TEXT_SEARCHER] OCR cache hit")
+            return words
+
+        if self.incremental:
+            words = self._ocr_incremental(screenshot, gray, region_key, cache)
+        else:
+            words = _ocr_words(screenshot)
+
+        cache.put(key, words)
+        return words
+
+    def _ocr_incremental(self, screenshot, gray, region_key, cache):
+        """
+        Chia ảnh thành các dải ngang OCR_TILE_HEIGHT, so hash từng dải với lần chụp trước
+        Chỉ OCR lại các dải đã đổi (gộp dải liền kề, nới OCR_TILE_MARGIN), giữ word
+        của dải không đổi. Dải ngang full-width nên không cắt đôi từ theo chiều ngang.
+        """
+        height, width = gray.shape[:2]
+        bands = [(top, min(top + OCR_TILE_HEIGHT, height)) for top in range(0, height, OCR_TILE_HEIGHT)]
+        tile_hashes = [perceptual_hash(gray[top:bottom]) for top, bottom in bands]
+
+        previous = cache.get_tiles(region_key)
+        if previous is None or previous[1] != gray.shape:
+            words = _ocr_words(screenshot)
+            cache.put_tiles(region_key, tile_hashes, gray.shape, words)
+            return words
+
+        previous_hashes, _, previous_words = previous
+        changed = [i for i, tile_hash in enumerate(tile_hashes) if tile_hash != previous_hashes[i]]
+        if not changed:
+            return previous_words
+
+        # Gộp các dải đã đổi liền kề thành span [start_band, end_band]
+        spans = []
+        for i in changed:
+            if spans and spans[-1][1] == i - 1:
+                spans[-1][1] = i
+            else:
+                spans.append([i, i])
+
+        def in_spans(center_y):
+            return any(bands[start][0] <= center_y < bands[end][1] for start, end in spans)
+
+        # Word cũ nằm trong dải không đổi được giữ nguyên
+        words = [word for word in previous_words if not in_spans(word[2] + word[4] // 2)]
+
+        for start, end in spans:
+            span_top, span_bottom = bands[start][0], bands[end][1]
+            crop_top = max(0, span_top - OCR_TILE_MARGIN)
+            crop_bottom = min(height, span_bottom + OCR_TILE_MARGIN)
+            crop = screenshot.crop((0, crop_top, width, crop_bottom))
+            for word in _ocr_words(crop, offset_y=crop_top, line_prefix=next(_ocr_line_ids)):
+                if span_top <= word[2] + word[4] // 2 < span_bottom:
+                    words.append(word)
+
+        print(f"[TEXT_SEARCHER] Incremental OCR: {len(changed)}/{len(bands)} tiles re-read")
+        cache.put_tiles(region_key, tile_hashes, gray.shape, words)
+        return words
+
+    @staticmethod
+    def find_phrase(words, search_text):
+        """
+        Tìm cụm từ (không phân biệt hoa thường) trên cùng một dòng OCR
+        Mỗi từ của cụm phải bằng đúng từ OCR tương ứng, liên tiếp nhau
+
+        Returns:
+            tuple: (left, top, width, height) bao toàn bộ cụm, hoặc None
+        """
+        tokens = search_text.lower().split()
+        if not tokens:
+            return None
+
+        # Gom word theo dòng, giữ thứ tự xuất hiện
+        lines = OrderedDict()
+        for word in words:
+            lines.setdefault(word[5], []).append(word)
+
+        count = len(tokens)
+        for line_words in lines.values():
+            texts = [word[0].lower() for word in line_words]
+            for start in range(len(texts) - count + 1):
+                if texts[start:start + count] != tokens:
+                    continue
+                matched = line_words[start:start + count]
+                left = min(word[1] for word in matched)
+                top = min(word[2] for word in matched)
+                right = max(word[1] + word[3] for word in matched)
+                bottom = max(word[2] + word[4] for word in matched)
+                return (left, top, right - left, bottom - top)
+        return None
@@ -1,7 +1,13 @@
 ﻿# models/tmproxy_api.py
 
+import re
+
 import requests
 
+# Message lỗi get-new-proxy khi chưa tới lượt đổi IP (next_request chưa về 0)
+TMPROXY_WAIT_KEYWORDS = ("next_request", "wait", "second", "too early", "giây", "chờ", "đợi")
+TMPROXY_WAIT_DEFAULT = 60          # Giây chờ khi message không kèm số
+
 class TMProxyAPI:
     """Class to interact with TMProxy API"""
     
@@ -147,6 +153,18 @@ class TMProxyAPI:
         Returns:
             dict: {'mode': str, 'host': str, 'port': int, 'username': str, 'password': str} or None if error
         """
+        return TMProxyAPI.fetch_proxy_static(api_key, proxy_type)[0]
+
+    @staticmethod
+    def fetch_proxy_static(api_key, proxy_type):
+        """
+        Như get_proxy_static nhưng phân biệt lỗi "chưa tới lượt đổi IP" với lỗi thật
+
+        Returns:
+            tuple: (proxy dict hoặc None,
+                    retry_after: số giây TMProxy yêu cầu chờ trước khi lấy IP mới,
+                                 None nếu thành công hoặc lỗi khác)
+        """
         try:
             # Map proxy_type: 'https' -> 'http' for consistency (GoLogin uses 'http' for HTTPS proxies)
             if proxy_type == 'https':
@@ -186,13 +204,13 @@ class TMProxyAPI:
             if data.get("code") != 0:
                 error_msg = data.get("message", "Unknown error")
                 print(f"TMProxy API error (code={data.get('code')}): {error_msg}")
-                return None
+                return None, TMProxyAPI.retry_after(data)
         
             # Extract proxy_data
             proxy_data = data.get("data", {})
             if not proxy_data:
                 print("TMProxy API: No 'data' in response")
-                return None
+                return None, None
         
             # Select endpoint based on mapped_type: 'socks5' or 'https' field
             # Note: 'https' field = HTTP/HTTPS proxy; use it for 'http' too
@@ -201,20 +219,20 @@ class TMProxyAPI:
         
             if not endpoint:
                 print(f"TMProxy API: No endpoint for mapped_type '{mapped_type}' (key: {endpoint_key}) in response")
-                return None
+                return None, None
         
             # Parse IP:PORT from endpoint (e.g., "27.64.124.75:42993" -> host, port)
             host_port = endpoint.split(':')
             if len(host_port) != 2:
                 print(f"TMProxy API: Invalid endpoint format '{endpoint}' (expected IP:PORT)")
-                return None
+                return None, None
         
             host = host_port[0].strip()
             try:
                 port = int(host_port[1].strip())
             except ValueError:
                 print(f"TMProxy API: Invalid port '{host_port[1]}' in endpoint '{endpoint}'")
-                return None
+                return None, None
         
             # Extract username and password (same as response)
             username = proxy_data.get('username', '').strip()
@@ -222,7 +240,7 @@ class TMProxyAPI:
         
             if not username or not password:
                 print("TMProxy API: Missing username or password in response")
-                return None
+                return None, None
         
             # Optional: Extract and log ports like get_new_proxy (for consistency)
             socks5_str = proxy_data.get("socks5", "")
@@ -242,18 +260,40 @@ class TMProxyAPI:
                 'port': port,
                 'username': username,
                 'password': password
-            }
+            }, None
         
         except requests.RequestException as e:
             print(f"TMProxy API request error: {e}")
-            return None
+            return None, None
         except (KeyError, ValueError, TypeError) as e:
             print(f"TMProxy API parse error: {e}")
-            return None
+            return None, None
         except Exception as e:
             print(f"TMProxy API unexpected error: {e}")
             import traceback
             traceback.print_exc()
-            return None
+            return None, None
 
+    @staticmethod
+    def retry_after(response_data):
+        """
+        Lỗi get-new-proxy vì gọi quá sớm (next_request / giới hạn đổi IP) → số giây cần chờ
 
+        Returns:
+            int hoặc None nếu không phải lỗi chờ
+        """
+        proxy_data = response_data.get("data")
+        if not isinstance(proxy_data, dict):
+            proxy_data = {}
+        try:
+            next_request = int(proxy_data.get("next_request") or 0)
+        except (TypeError, ValueError):
+            next_request = 0
+        if next_request > 0:
+            return next_request
+
+        message = str(response_data.get("message") or "").lower()
+        if not any(keyword in message for keyword in TMPROXY_WAIT_KEYWORDS):
+            return None
+        seconds = re.search(r"\d+", message)
+        return int(seconds.group()) if seconds else TMPROXY_WAIT_DEFAULT
@@ -1250,6 +1250,7 @@ class ActionListView(ttk.Frame):
         super().__init__(parent, padding=cfg.SMALL_PADDING)  # Giảm padding chung
         self.parent = parent
         self.action_frames = []
+        self._frames_by_id = {}  # action.id -> ActionItemFrame, tra O(1) khi highlight lúc chạy
     
         # Thiết lập style
         style = ttk.Style()
@@ -1522,6 +1523,8 @@ class ActionListView(ttk.Frame):
             if hasattr(action, 'is_disabled') and action.is_disabled:
                 frame._apply_disabled_style()
     
+        self._rebuild_frame_index()
+    
         # Khôi phục selection nếu vẫn còn hợp lệ
         if current_selection is not None and current_selection < len(actions):
             self.set_selected_action(current_selection)
@@ -1581,9 +1584,19 @@ class ActionListView(ttk.Frame):
         
             self.action_frames.append(frame)
     
+        self._rebuild_frame_index()
+    
         # Force update
         self.update_idletasks()
 
+    def _rebuild_frame_index(self):
+        """Dựng lại index action.id -> frame sau mỗi lần thêm/xóa/di chuyển/sắp xếp"""
+        self._frames_by_id = {frame.action.id: frame for frame in self.action_frames}
+
+    def get_frame(self, action_id):
+        """Trả về ActionItemFrame của action theo id, None nếu không có"""
+        return self._frames_by_id.get(action_id)
+
 
     def _on_delete_all(self):
         """Xử lý khi nút Xóa tất cả được nhấn"""
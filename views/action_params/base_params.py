@@ -113,6 +113,26 @@ class BaseActionParams:
             'select_area_button': select_area_button
         }
     
+    def create_buffered_write_section(self):
+        """Tùy chọn ghi buffered cho Write CSV / Write TXT (flush mỗi N dòng hoặc T giây)"""
+        buffer_frame = tk.Frame(self.parent_frame, bg=cfg.LIGHT_BG_COLOR)
+        buffer_frame.pack(fill=tk.X, pady=5)
+        
+        self.variables["buffered_var"] = tk.BooleanVar(value=self.parameters.get("buffered", False))
+        ttk.Checkbutton(
+            buffer_frame,
+            text="Buffered (flush mỗi",
+            variable=self.variables["buffered_var"]
+        ).pack(side=tk.LEFT, padx=(10, 5))
+        
+        self.variables["flush_rows_var"] = tk.StringVar(value=self.parameters.get("flush_rows", "100"))
+        ttk.Entry(buffer_frame, textvariable=self.variables["flush_rows_var"], width=6).pack(side=tk.LEFT)
+        tk.Label(buffer_frame, text="dòng hoặc", bg=cfg.LIGHT_BG_COLOR).pack(side=tk.LEFT, padx=5)
+        
+        self.variables["flush_seconds_var"] = tk.StringVar(value=self.parameters.get("flush_seconds", "5"))
+        ttk.Entry(buffer_frame, textvariable=self.variables["flush_seconds_var"], width=6).pack(side=tk.LEFT)
+        tk.Label(buffer_frame, text="giây)", bg=cfg.LIGHT_BG_COLOR).pack(side=tk.LEFT, padx=5)
+    
     def create_common_params(self,
                             show_variable=True,
                             show_random_time=True,
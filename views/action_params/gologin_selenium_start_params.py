@@ -806,6 +806,40 @@ class GoLoginSeleniumStartParams(BaseActionParams):
         )
         workers_hint.pack(side=tk.LEFT, padx=5)
 
+        # Max concurrent launches (headless): số browser spawn cùng lúc, trống = theo số core
+        launch_frame = tk.Frame(options_frame, bg=cfg.LIGHT_BG_COLOR)
+        launch_frame.pack(fill=tk.X, pady=5)
+
+        launch_label = tk.Label(
+            launch_frame,
+            text="Max concurrent launches:",
+            bg=cfg.LIGHT_BG_COLOR,
+            font=("Segoe UI", 9)
+        )
+        launch_label.pack(side=tk.LEFT, padx=(20, 5))
+
+        self.max_concurrent_launch_var = tk.StringVar()
+        if self.parameters:
+            self.max_concurrent_launch_var.set(self.parameters.get("max_concurrent_launch", ""))
+        else:
+            self.max_concurrent_launch_var.set("")
+
+        launch_entry = ttk.Entry(
+            launch_frame,
+            textvariable=self.max_concurrent_launch_var,
+            width=5
+        )
+        launch_entry.pack(side=tk.LEFT, padx=5)
+
+        launch_hint = tk.Label(
+            launch_frame,
+            text="(Headless only, empty = auto by CPU cores)",
+            bg=cfg.LIGHT_BG_COLOR,
+            font=("Segoe UI", 8),
+            fg="#666666"
+        )
+        launch_hint.pack(side=tk.LEFT, padx=5)
+
         
     def create_action_type_section(self):
         """Action type selection: None, Youtube, Google"""
@@ -1054,6 +1088,7 @@ class GoLoginSeleniumStartParams(BaseActionParams):
         params["headless"] = self.headless_var.get()
         params["enable_threading"] = self.enable_threading_var.get()
         params["max_workers"] = self.max_workers_var.get().strip()
+        params["max_concurrent_launch"] = self.max_concurrent_launch_var.get().strip()
         
         # Youtube Option params
         params["youtube_main_area_x"] = self.youtube_main_area_x_var.get().strip()
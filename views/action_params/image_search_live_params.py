@@ -3,6 +3,7 @@ import tkinter as tk
 from tkinter import ttk
 import config as cfg
 from views.action_params.base_params import BaseActionParams
+from models.motion_detector import COMPARE_MODES, COMPARE_MODE_PAIR, SAMPLE_FPS
 
 class ImageSearchLiveParams(BaseActionParams):
     """UI for Image Search Live action parameters."""
@@ -116,6 +117,52 @@ class ImageSearchLiveParams(BaseActionParams):
             fg="gray"
         )
         hint_label.pack(side=tk.LEFT, padx=5)
+        
+        # Chế độ so sánh: pair (2 screenshot) / sampling (lấy mẫu liên tục, dừng sớm)
+        mode_frame = tk.Frame(self.parent_frame, bg=cfg.LIGHT_BG_COLOR)
+        mode_frame.pack(fill=tk.X, pady=5)
+        
+        tk.Label(
+            mode_frame,
+            text="Chế độ so sánh:",
+            bg=cfg.LIGHT_BG_COLOR,
+            font=("Segoe UI", 10)
+        ).pack(side=tk.LEFT, padx=(10, 5))
+        
+        self.variables["compare_mode_var"] = tk.StringVar(
+            value=self.parameters.get("compare_mode", COMPARE_MODE_PAIR) if self.parameters else COMPARE_MODE_PAIR
+        )
+        ttk.Combobox(
+            mode_frame,
+            textvariable=self.variables["compare_mode_var"],
+            values=list(COMPARE_MODES),
+            state="readonly",
+            width=10
+        ).pack(side=tk.LEFT, padx=5)
+        
+        tk.Label(
+            mode_frame,
+            text="FPS:",
+            bg=cfg.LIGHT_BG_COLOR,
+            font=("Segoe UI", 10)
+        ).pack(side=tk.LEFT, padx=(10, 5))
+        
+        self.variables["sample_fps_var"] = tk.StringVar(
+            value=self.parameters.get("sample_fps", str(SAMPLE_FPS)) if self.parameters else str(SAMPLE_FPS)
+        )
+        ttk.Entry(
+            mode_frame,
+            textvariable=self.variables["sample_fps_var"],
+            width=5
+        ).pack(side=tk.LEFT, padx=5)
+        
+        tk.Label(
+            mode_frame,
+            text="(sampling: delay là thời gian tối đa)",
+            bg=cfg.LIGHT_BG_COLOR,
+            font=("Segoe UI", 8),
+            fg="gray"
+        ).pack(side=tk.LEFT, padx=5)
     
     def create_similarity_section(self):
         """Create similarity threshold slider section"""
@@ -197,4 +244,8 @@ class ImageSearchLiveParams(BaseActionParams):
         # Get similarity threshold
         params["similarity_threshold"] = self.variables["similarity_threshold_var"].get()
         
+        # Get compare mode + sampling rate
+        params["compare_mode"] = self.variables["compare_mode_var"].get()
+        params["sample_fps"] = self.variables["sample_fps_var"].get()
+        
         return params
@@ -7,6 +7,7 @@ import time
 import os
 import pyautogui
 from views.action_params.base_params import BaseActionParams
+from models.image_search import SEARCH_MODES, SEARCH_MODE_COLOR
 
 class ImageSearchParams(BaseActionParams):
     def __init__(self, parent_frame, parameters=None):
@@ -214,6 +215,21 @@ class ImageSearchParams(BaseActionParams):
                 pass
         
         self.variables["accuracy_var"].trace_add("write", update_scale)
+        
+        # Engine tìm kiếm: color (mặc định) / gray / pyramid / multiscale
+        mode_frame = tk.Frame(accuracy_frame, bg=cfg.LIGHT_BG_COLOR)
+        mode_frame.pack(fill=tk.X, pady=5)
+        
+        tk.Label(mode_frame, text="Chế độ tìm:", bg=cfg.LIGHT_BG_COLOR).pack(side=tk.LEFT, padx=5)
+        self.variables["search_mode_var"] = tk.StringVar(value=self.parameters.get("search_mode", SEARCH_MODE_COLOR))
+        mode_combo = ttk.Combobox(
+            mode_frame,
+            textvariable=self.variables["search_mode_var"],
+            values=list(SEARCH_MODES),
+            state="readonly",
+            width=12
+        )
+        mode_combo.pack(side=tk.LEFT, padx=5)
     
     def get_parameters(self):
         """Collect all parameters"""
@@ -222,5 +238,6 @@ class ImageSearchParams(BaseActionParams):
         # Image-specific params
         params["image_path"] = self.variables["image_path_var"].get()
         params["accuracy"] = self.variables["accuracy_var"].get()
+        params["search_mode"] = self.variables["search_mode_var"].get()
         
         return params
@@ -157,6 +157,17 @@ class TextSearchParams(BaseActionParams):
             width=20
         )
         combo.pack(side=tk.LEFT, padx=5)
+        
+        # Incremental OCR: chỉ nhận dạng lại các dải màn hình đã thay đổi
+        self.variables["incremental_ocr_var"] = tk.BooleanVar(
+            value=self.parameters.get("incremental_ocr", False) if self.parameters else False
+        )
+        incremental_checkbox = ttk.Checkbutton(
+            get_frame,
+            text="Incremental OCR (chỉ OCR vùng thay đổi)",
+            variable=self.variables["incremental_ocr_var"]
+        )
+        incremental_checkbox.pack(side=tk.LEFT, padx=10)
     
     def create_region_section(self):
         """Create search region input section"""
@@ -193,4 +204,7 @@ class TextSearchParams(BaseActionParams):
         # Get how_to_get selection
         params["how_to_get"] = self.variables["how_to_get_var"].get()
         
+        # Get incremental OCR option
+        params["incremental_ocr"] = self.variables["incremental_ocr_var"].get()
+        
         return params
@@ -24,6 +24,9 @@ class WriteCsvParams(BaseActionParams):
         # ========== CONTENT TO WRITE SECTION ==========
         self.create_content_section()
         
+        # ========== BUFFERED WRITE ==========
+        self.create_buffered_write_section()
+        
         # ========== COMMON PARAMETERS ==========
         self.create_common_params()
         